@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import math
+import os
 
 st.set_page_config(
     page_title="NPB Game Simulator",
@@ -60,8 +61,18 @@ st.html(HIDE_ST_STYLE)
 from app.utils.load_data import load_data_from_csv, load_default_lineups
 from app.utils.player import Player
 from app.utils.game import BaseballGame
-from app.utils.simulator import display_player_stats, find_best_and_worst_lineups, simulate_season
-from app.utils.constants import PITCHER_STATS, TEAM_COLORS
+from app.utils.simulator import display_player_stats, find_best_and_worst_lineups, search_all_lineups, simulate_season
+from app.utils.constants import PITCHER_STATS, PROB_COLS, SEASON_GAMES, TEAM_COLORS
+from app.utils.sampling import spawn_generators
+from app.utils.eval_cache import configure_evaluation_cache
+from app.utils.markov import IncrementalEvaluator
+from app.utils.batch_game import GameState
+from app.utils.situation import optimize_from_state
+from app.utils.run_expectancy import compute_run_expectancy, run_expectancy_frame, run_values_frame, team_lineups
+from app.utils.league import load_league, simulate_league, standings_frame
+from app.utils.roster import load_position_eligibility, select_lineup, valid_rosters
+from app.utils.run_distribution import distribution_frame, distribution_stats, run_distribution
+from app.utils.manifest import data_version
 
 TEAM_NAME_TO_ABBR = {
     "阪神": "t", "広島": "c", "DeNA": "db", "巨人": "g", "ヤクルト": "s", "中日": "d",
@@ -70,22 +81,105 @@ TEAM_NAME_TO_ABBR = {
 
 CENTRAL_LEAGUE_TEAMS = ["阪神", "広島", "DeNA", "巨人", "ヤクルト", "中日"]
 
-PROB_COLS = ["1B_ratio", "2B_ratio", "3B_ratio", "HR_ratio", "BB+HBP_ratio", "SO_ratio", "Ground_Out_ratio", "Fly_Out_ratio"]
+YEARS = [2025, 2024, 2023, 2022]
 
-def create_player_list(lineup: list[str], player_data: pd.DataFrame) -> list[Player]:
-    """選択された打順と選手データからPlayerオブジェクトのリストを作成する"""
-    players = []
-    for player_name in lineup:
-        # 投手データの場合
-        if player_name == "投手":
-            player_stats = pd.Series(PITCHER_STATS)
-        else:
-            player_stats = player_data[player_data["Player"] == player_name].iloc[0]
-        probabilities = player_stats[PROB_COLS].tolist()
-        speed = player_stats["Speed"] # Speedカラムを読み込む
-        player = Player(name=player_name, probabilities=probabilities, speed=speed)
-        players.append(player)
-    return players
+# Streamlit のキャッシュの有効期限 (秒) と保持数。多数のセッションで共有しても使用メモリが一定に収まるようにする
+CACHE_TTL = 60 * 60
+# 年度・チーム・DH制ごとのデータ (4年度 * 12球団 * DH制の有無)
+DATA_CACHE_MAX_ENTRIES = 96
+# 計算結果 (リーグ順位予測・得点期待値) は条件の組み合わせが多いため少なめに保持する
+RESULT_CACHE_MAX_ENTRIES = 16
+
+# 以下のキャッシュする関数の version 引数は、データのバージョン (manifest.data_version) を渡す。
+# データが更新されるとキーが変わり、そのチーム (または年度) の結果だけが読み込み直される。
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_team_data(year: int, team_abbr: str, use_dh: bool, version: str | None) -> pd.DataFrame:
+    """チームの選手データ。DH制でない場合は投手の行を末尾に加える。"""
+    player_data = load_data_from_csv(year, team_abbr)
+    if not use_dh and not player_data.empty:
+        player_data = pd.concat([player_data, pd.DataFrame([PITCHER_STATS])], ignore_index=True)
+    return player_data
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_team_display_data(year: int, team_abbr: str, version: str | None) -> pd.DataFrame:
+    """表示用のチームの選手データ (data/raw、50打席以上の選手)"""
+    player_data_display = load_data_from_csv(year, team_abbr, base_path="./data/raw")
+    return player_data_display[player_data_display["打席"] >= 50].reset_index(drop=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=len(YEARS), show_spinner=False)
+def load_year_lineups(year: int, version: str | None) -> pd.DataFrame:
+    """年度のデフォルトスタメン"""
+    return load_default_lineups(year)
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_player_table(year: int, team_abbr: str, use_dh: bool, version: str | None) -> dict[str, Player]:
+    """
+    選手名から Player への辞書。全セッションで共有するため、成績を記録する場合は create_player_list で複製して使う。
+    """
+    player_data = load_team_data(year, team_abbr, use_dh, version)
+    if player_data.empty:
+        return {}
+    return {name: Player(name=name, probabilities=probabilities, speed=speed)
+            for name, probabilities, speed in zip(player_data["Player"], player_data[PROB_COLS].to_numpy().tolist(),
+                                                  player_data["Speed"])}
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=DATA_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_roster_options(year: int, team_abbr: str, use_dh: bool, version: str | None) -> tuple[dict[str, set[str]], int]:
+    """(選手名から守れる守備位置への辞書, 守備位置に就ける9名の組み合わせの数)。version は年度のデータのバージョン"""
+    position_eligibility = load_position_eligibility(year, team_abbr)
+    roster_pool = list(load_player_table(year, team_abbr, True, data_version(year, team_abbr)).values())
+    return position_eligibility, len(valid_rosters(roster_pool, position_eligibility, use_dh))
+
+
+@st.cache_resource(ttl=CACHE_TTL, max_entries=len(YEARS), show_spinner=False)
+def load_league_teams(year: int, version: str | None) -> list:
+    """リーグ順位予測に使う12球団のスタメン (全セッションで共有し、読み取り専用で使う)"""
+    return load_league(year)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES, show_spinner=False)
+def project_standings(year: int, num_seasons: int, version: str | None) -> pd.DataFrame:
+    """リーグ順位予測の結果 (シードは固定のため、同じ条件の結果は再計算しない)"""
+    return standings_frame(simulate_league(load_league_teams(year, version), num_seasons, seed=0, year=year))
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=RESULT_CACHE_MAX_ENTRIES, show_spinner=False)
+def run_expectancy_tables(year: int, team_abbr: str | None, num_games: int,
+                          version: str | None) -> tuple[int, pd.DataFrame, pd.DataFrame]:
+    """(イニング数, 得点期待値の表, 得点価値の表)。team_abbr が None の場合は全12球団のスタメン"""
+    result = compute_run_expectancy(team_lineups(year, team_abbr), num_games, seed=0)
+    return result.innings, run_expectancy_frame(result), run_values_frame(result)
+
+
+def prefetch_adjacent(year: int, team_name: str, use_dh: bool):
+    """
+    前後のチームと前後の年度の同じチームのデータをキャッシュに読み込んでおく。
+    サイドバーの選択が変わったときだけ実行する。
+    """
+    selection = (year, team_name, use_dh)
+    if st.session_state.get("prefetched_selection") == selection:
+        return
+    st.session_state.prefetched_selection = selection
+    teams = list(TEAM_NAME_TO_ABBR.keys())
+    team_index = teams.index(team_name)
+    year_index = YEARS.index(year)
+    neighbours = [(year, TEAM_NAME_TO_ABBR[teams[(team_index + step) % len(teams)]]) for step in (-1, 1)]
+    neighbours += [(YEARS[i], TEAM_NAME_TO_ABBR[team_name]) for i in (year_index - 1, year_index + 1) if 0 <= i < len(YEARS)]
+    for neighbour_year, neighbour_abbr in neighbours:
+        load_player_table(neighbour_year, neighbour_abbr, use_dh, data_version(neighbour_year, neighbour_abbr))
+        load_team_display_data(neighbour_year, neighbour_abbr, data_version(neighbour_year, neighbour_abbr, "./data/raw"))
+        load_year_lineups(neighbour_year, data_version(neighbour_year))
+
+
+def create_player_list(lineup: list[str], player_table: dict[str, Player]) -> list[Player]:
+    """選択された打順の選手を、共有の選手の辞書 (load_player_table) から成績を持たない複製として作成する"""
+    return [player_table[player_name].copy() for player_name in lineup]
 
 def main():
     # セッションステートの初期化
@@ -96,7 +190,7 @@ def main():
 
     # サイドバー
     st.sidebar.header("設定")
-    year = st.sidebar.selectbox("年度", [2025, 2024, 2023, 2022],index=1)
+    year = st.sidebar.selectbox("年度", YEARS, index=1)
     
     # チーム選択
     st.sidebar.subheader("チーム選択")
@@ -132,6 +226,10 @@ def main():
     # 選択されたチームの略称を取得
     team_abbr = TEAM_NAME_TO_ABBR[team_name]
 
+    # 同じ打順・シードの評価結果はキャッシュ (data/cache/evaluations) から返す。
+    # キャッシュはプロセス内の全セッション (スレッド) で共有する (EvaluationCache はスレッドセーフ)
+    configure_evaluation_cache()
+
     # チームカラーの取得
     selected_team_colors = TEAM_COLORS.get(team_abbr, {"main": "#000000", "accent": "#FFFFFF"}) # デフォルトは黒
 
@@ -177,12 +275,17 @@ def main():
         """)
 
     # 選手データの読み込み
-    player_data = load_data_from_csv(year, team_abbr)
-    default_lineup_df = load_default_lineups(year)
-    player_data_display = load_data_from_csv(year,team_abbr,base_path="./data/raw")
-    player_data_display = player_data_display[player_data_display['打席']>=50].reset_index(drop=True)
+    # (年度・チームごとにキャッシュし、DH制でない場合は投手の行を含む)
+    team_version = data_version(year, team_abbr)
+    year_version = data_version(year)
+    player_data = load_team_data(year, team_abbr, use_dh, team_version)
+    player_table = load_player_table(year, team_abbr, use_dh, team_version)
+    default_lineup_df = load_year_lineups(year, year_version)
+    player_data_display = load_team_display_data(year, team_abbr, data_version(year, team_abbr, "./data/raw"))
+    prefetch_adjacent(year, team_name, use_dh)
     # メインコンテンツ
-    tab1, tab2 = st.tabs(["任意打順でシミュレーション", "最適打順を探索"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["任意打順でシミュレーション", "最適打順を探索", "状況別の打順最適化", "得点期待値 (RE24)",
+                                            "リーグ順位予測"])
 
     with tab1:
         st.header("任意打順でシミュレーション")
@@ -194,11 +297,8 @@ def main():
 
             st.header("打順設定")
             st.write("ポジションごとの最多出場選手を取得しています。")
-            # DH制がオフの場合、投手データをplayer_dataに追加
-            if not use_dh:
-                pitcher_name = PITCHER_STATS["Player"]
-                pitcher_df = pd.DataFrame([PITCHER_STATS])
-                player_data = pd.concat([player_data, pitcher_df], ignore_index=True)
+            # DH制がオフの場合、player_dataには投手データが含まれている
+            pitcher_name = PITCHER_STATS["Player"]
 
             player_names = player_data["Player"].tolist()
 
@@ -233,31 +333,45 @@ def main():
             # 探索モード用に選択された打順を保存
             st.session_state.lineup_for_exploration = lineup
 
+            # 打順を変更するたびに、変更した打順の分だけマルコフ連鎖の期待得点を計算し直して前の打順と比べる
+            lineup_players = create_player_list(lineup, player_table)
+            if "lineup_evaluator" not in st.session_state:
+                st.session_state.lineup_evaluator = IncrementalEvaluator(lineup_players)
+                lineup_runs, lineup_delta = st.session_state.lineup_evaluator.expected_runs, 0.0
+            else:
+                lineup_runs, lineup_delta = st.session_state.lineup_evaluator.update(lineup_players)
+            st.metric("1試合の期待得点 (マルコフ連鎖)", f"{lineup_runs:.3f}点",
+                      delta=f"{lineup_delta:+.3f}点" if lineup_delta else None,
+                      help="前の打順からの増減を表示します。シミュレーションを実行しなくても打順の変更の効果を確認できます。")
+            with st.expander("1試合の得点の分布 (厳密計算)"):
+                game_distribution = run_distribution(lineup_players)
+                distribution_mean, distribution_std = distribution_stats(game_distribution)
+                distribution_table = distribution_frame(game_distribution).iloc[:16]
+                st.bar_chart(distribution_table.set_index("得点")["確率"])
+                st.write(f"平均 {distribution_mean:.3f}点 / 標準偏差 {distribution_std:.3f}点 / "
+                         f"3点以上 {game_distribution[3:].sum():.1%} / 0点 {game_distribution[0]:.1%}")
+
+            game_seed_text = st.text_input("乱数シード (空欄の場合はランダム)", value="", key="game_seed")
+            game_seed = int(game_seed_text) if game_seed_text.strip().isdigit() else None
+
             if st.button("シミュレーション実行"):
                 # Playerオブジェクトのリストを作成
-                players = create_player_list(lineup, player_data)
+                players = create_player_list(lineup, player_table)
+                # 1試合とシーズンには、同じシードから作った別々の乱数列を使う
+                game_rng, season_rng = spawn_generators(game_seed, 2)
 
                 # 1試合のシミュレーションを実行
                 game = BaseballGame(players)
-                final_score, game_log = game.simulate_game()
+                final_score, game_log = game.simulate_game(rng=game_rng)
 
                 st.header("シミュレーション結果")
                 st.metric("最終スコア", f"{final_score}点")
 
                 # イニングごとの詳細ログ (DataFrame形式)
                 with st.expander("イニングごとの詳細ログを見る"):
-                    log_df = pd.DataFrame(index=[p.name for p in players], columns=range(1, 10))
-                    for i, inning_events in enumerate(game_log):
-                        inning_col = i + 1
-                        for player_name, result, rbi in inning_events:
-                            rbi_text = f"({rbi})" if rbi > 0 else ""
-                            event_text = f"{result}{rbi_text}"
-                            # 同じイニングに同じ選手が複数回打席に立った場合
-                            if pd.isna(log_df.loc[player_name, inning_col]):
-                                log_df.loc[player_name, inning_col] = event_text
-                            else:
-                                log_df.loc[player_name, inning_col] += f", {event_text}"
-                    st.dataframe(log_df.fillna("-"),use_container_width=True)
+                    # 打席結果は uint8 の配列で記録されており、表示するときにだけ選手名に変換する
+                    log_df = game_log.to_frame([p.name for p in players])
+                    st.dataframe(log_df,use_container_width=True)
                 
                 # 選手個人の成績
                 st.header("打者成績")
@@ -266,8 +380,8 @@ def main():
 
                 simulation_status_message = st.empty()
                 simulation_status_message.info("1年間のシミュレーションを開始します。少々お待ちください。")
-                total_score, season_player_stats_df = simulate_season(143, players)
-                avg_score = total_score / 143
+                total_score, season_player_stats_df = simulate_season(SEASON_GAMES, players, rng=season_rng)
+                avg_score = total_score / SEASON_GAMES
                 simulation_status_message.empty() # 完了後にメッセージをクリア
 
                 st.metric("シーズン総得点", f"{total_score}点")
@@ -296,50 +410,212 @@ def main():
         # Calculate factorial for "任意打順で選択した9名の並び替えで探索"
         factorial_9 = math.factorial(9)
 
+        # 守備位置に就ける9名の組み合わせだけを対象にする場合の打順の数
+        roster_pool = [player.copy() for name, player in player_table.items() if name != PITCHER_STATS["Player"]]
+        position_eligibility, num_position_rosters = load_roster_options(year, team_abbr, use_dh, year_version)
+        num_position_lineups = num_position_rosters * factorial_9
+
         simulation_mode = st.radio(
             "シミュレーションモード",
             (f"全選手からランダムに9名選んで探索 ({permutations_all_players:,}通り)",
-             f"任意打順で選択した9名の並び替えで探索 ({factorial_9:,}通り)"),
-            index=0
+             f"任意打順で選択した9名の並び替えで探索 ({factorial_9:,}通り)",
+             f"守備位置を考慮して全選手から9名と打順を最適化 ({num_position_lineups:,}通り)"),
+            index=0,
+            help="守備位置を考慮する場合は、先発出場した守備位置を守れる選手の組み合わせだけをマルコフ連鎖の期待得点で評価します。"
+                 "評価方法と探索方法の設定は使いません。",
+        )
+
+        evaluation_method = st.radio(
+            "評価方法",
+            ("マルコフ連鎖による期待得点 (厳密・高速)", "143試合のシミュレーション", "レース方式のシミュレーション (劣る打順を早期に打ち切り)"),
+            index=0,
+            help="マルコフ連鎖では各打順の1試合あたりの期待得点を乱数を使わずに計算するため、試行ごとのぶれがありません。"
+                 "レース方式では、143試合のシミュレーションと同じ総試合数で、より多くの打順を少ない試合数から評価し、明らかに劣る打順を打ち切ります。",
         )
+        use_markov = evaluation_method.startswith("マルコフ")
+        use_racing = evaluation_method.startswith("レース")
+        confirm_with_simulation = False
+        exhaustive = False
+        if use_markov:
+            confirm_with_simulation = st.checkbox("最高・最低の打順を143試合のシミュレーションで確認する", value=True)
+            if simulation_mode.startswith("任意打順"):
+                exhaustive = st.checkbox(f"全{factorial_9:,}通りをすべて評価する", value=False,
+                                         help="試行する打順の数は無視され、すべての並び替えを評価して上位の打順を表示します。")
+        evaluator = "markov" if use_markov else "racing" if use_racing else "simulation"
+        strategy = "random"
+        if not use_racing and not exhaustive:
+            strategy_label = st.radio(
+                "探索方法",
+                ("ランダム", "焼きなまし法", "遺伝的アルゴリズム"),
+                index=0, horizontal=True,
+                help="焼きなまし法と遺伝的アルゴリズムは、良い打順の近く (入れ替え・移動・控え選手との交代) を重点的に探します。"
+                     "試行する打順の数は、新たに評価する打順の数の上限になります。",
+            )
+            strategy = {"ランダム": "random", "焼きなまし法": "annealing", "遺伝的アルゴリズム": "genetic"}[strategy_label]
+        num_workers = None
+        common_random_numbers = False
+        if not use_markov and strategy == "random":
+            common_random_numbers = st.checkbox("共通乱数で打順を比較する", value=False,
+                                                help="すべての打順で、同じ選手の同じ試合・同じ打席には同じ乱数を使います。得点差が運ではなく打順の違いを反映するようになります。")
+        if evaluator == "simulation" and strategy == "random":
+            cpu_count = os.cpu_count() or 1
+            num_workers = st.number_input("並列ワーカー数", min_value=1, max_value=cpu_count, value=cpu_count,
+                                          help="試行を複数のプロセスに分けて実行します。ワーカー数を変えても結果は変わりません。")
+        seed_text = st.text_input("乱数シード (空欄の場合はランダム)", value="")
+        seed = int(seed_text) if seed_text.strip().isdigit() else None
 
         if st.button("探索開始"):
             if player_data.empty:
                 st.error("選手データを読み込めませんでした。年度とチームを選択してください。")
+            elif simulation_mode.startswith("守備位置を考慮"):
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+                try:
+                    selection = select_lineup(roster_pool, position_eligibility, use_dh, seed=seed,
+                                              progress_bar=progress_bar, status_text=status_text)
+                except ValueError:
+                    st.error("すべての守備位置を守れる選手の組み合わせがありません。")
+                    return
+                status_text.empty()
+                st.success("探索が完了しました！")
+                st.header("最高期待得点打順")
+                st.write(f"期待総得点: {selection["total_score"]:.1f} (1試合の期待得点: {selection["avg_score"]:.3f})")
+                st.dataframe(pd.DataFrame({"打順": range(1, 10), "守備位置": selection["positions"], "選手": selection["lineup"]}),
+                             use_container_width=True, hide_index=True)
+                st.caption(f"守備位置を考慮しない打順 {selection["num_candidates"]:,}通りのうち、守備位置に就ける組み合わせ "
+                           f"{selection["num_rosters"]:,}通り ({selection["num_valid_lineups"]:,}打順) を評価 / "
+                           f"打順を最適化した組み合わせ: {selection["refined"]:,}通り / 打ち切った組み合わせ: {selection["pruned"]:,}通り")
             else:
                 st.info(f"{num_trials}回のシミュレーションを開始します。時間がかかる場合があります。")
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-                if simulation_mode == "全選手からランダムに9名選んで探索":
+                if simulation_mode.startswith("全選手からランダム"):
                     # 全選手データからPlayerオブジェクトのリストを作成
-                    all_players_list = []
-                    for _, row in player_data.iterrows():
-                        probabilities = row[PROB_COLS].tolist()
-                        all_players_list.append(Player(name=row["Player"], probabilities=probabilities))
-                    best_lineup, worst_lineup = find_best_and_worst_lineups(num_trials, all_players_list, progress_bar, status_text, shuffle_only=False)
+                    all_players_list = create_player_list(list(player_table), player_table)
+                    best_lineup, worst_lineup = find_best_and_worst_lineups(num_trials, all_players_list, progress_bar, status_text, shuffle_only=False, evaluator=evaluator, confirm_with_simulation=confirm_with_simulation, num_workers=num_workers, seed=seed, common_random_numbers=common_random_numbers, strategy=strategy)
                 else: # 任意打順で選択した9名の並び替えで探索
                     if not st.session_state.lineup_for_exploration:
                         st.error("任意打順タブで打順が選択されていません。先に任意打順タブで打順を設定してください。")
                         return
                     
                     # 任意打順で選択された9名のPlayerオブジェクトのリストを作成
-                    selected_players_for_exploration = create_player_list(st.session_state.lineup_for_exploration, player_data)
+                    selected_players_for_exploration = create_player_list(st.session_state.lineup_for_exploration, player_table)
                     if len(selected_players_for_exploration) != 9:
                         st.error("任意打順タブで9名の選手が選択されていません。")
                         return
-                    best_lineup, worst_lineup = find_best_and_worst_lineups(num_trials, selected_players_for_exploration, progress_bar, status_text, shuffle_only=True)
+                    if exhaustive:
+                        best_lineup, worst_lineup, top_lineups = search_all_lineups(selected_players_for_exploration, 10, progress_bar, status_text, confirm_with_simulation=confirm_with_simulation, seed=seed)
+                    else:
+                        best_lineup, worst_lineup = find_best_and_worst_lineups(num_trials, selected_players_for_exploration, progress_bar, status_text, shuffle_only=True, evaluator=evaluator, confirm_with_simulation=confirm_with_simulation, num_workers=num_workers, seed=seed, common_random_numbers=common_random_numbers, strategy=strategy)
 
                 st.success("探索が完了しました！")
                 status_text.empty() # 完了後にテキストをクリア
 
-                st.header("最高平均得点打順")
-                st.write(f"総得点: {best_lineup["total_score"]} (平均得点: {best_lineup["avg_score"]:.2f})")
-                st.dataframe(best_lineup["player_stats"],use_container_width=True)
-
-                st.header("最低平均得点打順")
-                st.write(f"総得点: {worst_lineup["total_score"]} (平均得点: {worst_lineup["avg_score"]:.2f})")
-                st.dataframe(worst_lineup["player_stats"],use_container_width=True)
+                for header, lineup_info in (("最高平均得点打順", best_lineup), ("最低平均得点打順", worst_lineup)):
+                    st.header(header)
+                    if use_markov:
+                        st.write(f"期待総得点: {lineup_info["total_score"]:.1f} (1試合の期待得点: {lineup_info["avg_score"]:.3f})")
+                        st.write(" → ".join(lineup_info["lineup"]))
+                        if "simulated_total_score" in lineup_info:
+                            st.write(f"シミュレーションでの総得点: {lineup_info["simulated_total_score"]}")
+                    elif use_racing:
+                        st.write(f"143試合換算の総得点: {lineup_info["total_score"]:.1f} (平均得点: {lineup_info["avg_score"]:.3f} ± {lineup_info["std_error"]:.3f})")
+                        st.write(" → ".join(lineup_info["lineup"]))
+                        st.caption(f"{lineup_info["candidates"]:,}通りの候補から選択 / この打順の試合数: {lineup_info["games"]:,} / "
+                                   f"最後まで残った候補の中で真に{header[:2]}である確率: {lineup_info["confidence"]:.1%} "
+                                   f"(全候補の中で: {lineup_info["confidence_all"]:.1%})")
+                    else:
+                        st.write(f"総得点: {lineup_info["total_score"]} (平均得点: {lineup_info["avg_score"]:.2f})")
+                        if "trial" in lineup_info:
+                            st.caption(f"シード: {lineup_info["seed"]} / 試行番号: {lineup_info["trial"]}")
+                    if "evaluations" in lineup_info:
+                        st.caption(f"評価した打順: {lineup_info["evaluations"]:,}通り / 評価済みの打順の再利用: {lineup_info["cache_hits"]:,}回")
+                    if not lineup_info["player_stats"].empty:
+                        st.dataframe(lineup_info["player_stats"],use_container_width=True)
+
+                if exhaustive:
+                    st.header("期待得点の上位10打順")
+                    st.dataframe(pd.DataFrame({
+                        "期待得点": [info["avg_score"] for info in top_lineups],
+                        "打順": [" → ".join(info["lineup"]) for info in top_lineups],
+                    }), use_container_width=True)
+
+    with tab3:
+        st.header("状況別の打順最適化")
+        st.write("試合の途中の状況から、次に打席に入る打者の枠に誰をどの順で置くと良いかを、候補の並びをすべて評価して探します。"
+                 "枠以外の打順は任意打順タブで選択した打順のままです。")
+        if len(st.session_state.lineup_for_exploration) != 9 or player_data.empty:
+            st.info("先に任意打順タブで9名の打順を設定してください。")
+        else:
+            situation_lineup = create_player_list(st.session_state.lineup_for_exploration, player_table)
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                situation_inning = st.number_input("イニング", min_value=1, max_value=9, value=7)
+                situation_outs = st.radio("アウト数", (0, 1, 2), index=1, horizontal=True)
+            with col2:
+                on_first = st.checkbox("一塁走者", value=False)
+                on_second = st.checkbox("二塁走者", value=True)
+                on_third = st.checkbox("三塁走者", value=False)
+            with col3:
+                situation_batter = st.selectbox("打席に入る打者", range(9), index=2, format_func=lambda b: f"{b + 1}番")
+                situation_deficit = st.number_input("負けている点数", min_value=0, max_value=20, value=0)
+            num_slots = st.slider("最適化する打者の人数 (打席に入る打者から)", min_value=1, max_value=5, value=3)
+            include_bench = st.checkbox("控え選手も候補にする", value=False)
+            situation_objective = st.radio(
+                "評価の目的",
+                ("このイニングの期待得点", "試合終了までの期待得点", "追いつく確率", "勝ち越す確率"),
+                index=0, horizontal=True,
+                help="確率はシミュレーションで推定します (期待得点の上位の並びだけを評価します)。",
+            )
+            if st.button("最適化"):
+                state = GameState(situation_inning, situation_outs, on_first + 2 * on_second + 4 * on_third, situation_batter, situation_deficit)
+                slots = [(situation_batter + i) % 9 for i in range(num_slots)]
+                candidates = [situation_lineup[slot] for slot in slots]
+                if include_bench:
+                    bench_names = [name for name in player_data["Player"] if name not in st.session_state.lineup_for_exploration]
+                    candidates += create_player_list(bench_names, player_table)
+                objective, innings = {
+                    "このイニングの期待得点": ("runs", 1), "試合終了までの期待得点": ("runs", None),
+                    "追いつく確率": ("tie", None), "勝ち越す確率": ("lead", None),
+                }[situation_objective]
+                with st.spinner("評価中..."):
+                    results = optimize_from_state(situation_lineup, state, slots, candidates, objective, innings, seed=seed)
+                table = pd.DataFrame({
+                    "打順": [" → ".join(info["lineup"][slot] for slot in slots) for info in results],
+                    "期待得点": [round(info["expected_runs"], 3) for info in results],
+                })
+                if objective != "runs":
+                    table["確率"] = [f"{info["probability"]:.1%}" for info in results]
+                st.dataframe(table, use_container_width=True)
+
+    with tab4:
+        st.header("得点期待値 (RE24) と得点価値")
+        st.write("スタメンの打順で多数のイニングをシミュレートし、塁・アウト状況別のイニング終了までの得点期待値と、"
+                 "打席結果ごとの得点価値 (打席後の得点期待値 + 得点 - 打席前の得点期待値) を計算します。")
+        re_scope = st.radio("対象", (f"{team_name}のスタメン", "全12球団のスタメン"), index=0, horizontal=True)
+        re_games = st.select_slider("打順ごとの試合数", options=[1000, 5000, 10000, 20000, 50000], value=10000)
+        if st.button("計算", key="run_expectancy"):
+            with st.spinner("シミュレーション中..."):
+                re_innings, re_table, rv_table = run_expectancy_tables(year, None if re_scope.startswith("全") else team_abbr, re_games, year_version)
+            st.caption(f"{re_innings:,} イニングのシミュレーション結果")
+            st.subheader("塁・アウト状況別の得点期待値")
+            st.dataframe(re_table, use_container_width=True)
+            st.subheader("打席結果ごとの得点価値")
+            st.dataframe(rv_table, use_container_width=True, hide_index=True)
+
+    with tab5:
+        st.header("リーグ順位予測")
+        st.write("12球団のスタメンで143試合の日程 (交流戦はホームチームのリーグのDH制) を多数のシーズン分シミュレートし、"
+                 "順位の分布と優勝・クライマックスシリーズの確率を計算します。投手・守備の能力は考慮しません。")
+        league_seasons = st.select_slider("シーズン数", options=[100, 500, 1000, 5000, 10000], value=1000)
+        if st.button("シミュレーション実行", key="league"):
+            with st.spinner("シミュレーション中..."):
+                standings = project_standings(year, league_seasons, year_version)
+            for league_name, label in (("Central", "セ・リーグ"), ("Pacific", "パ・リーグ")):
+                st.subheader(label)
+                st.dataframe(standings[standings["リーグ"] == league_name].drop(columns="リーグ"),
+                             use_container_width=True, hide_index=True)
 
 if __name__ == "__main__":
     main()
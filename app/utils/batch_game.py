@@ -0,0 +1,250 @@
+# src/main/utils/batch_game.py
+
+import numpy as np
+from typing import NamedTuple, Sequence
+
+from .constants import (
+    BUNT_ATTEMPT_FACTOR, SACRIFICE_BUNT_SUCCESS_RATE,
+    DOUBLE_PLAY_PROBABILITY, GROUND_OUT_ADVANCE_PROBABILITY, SACRIFICE_FLY_PROBABILITY
+)
+from .player import Player
+from .sampling import CommonUniforms, alias_sample
+from .transitions import (
+    DOUBLE, STRIKEOUT, GROUND_OUT, FLY_OUT,
+    DOUBLE_PLAY, GROUND_OUT_ADVANCE, SACRIFICE_FLY, SACRIFICE_BUNT, BUNT_FAIL, NUM_OUTCOMES,
+    NUM_OUTS, NUM_DECISIONS, EXTRA_SECOND_BIT, EXTRA_FIRST_BIT, KIND_SINGLE_FROM_SECOND, KIND_SINGLE_FROM_FIRST,
+    KIND_DOUBLE_FROM_FIRST, RUNS, OUTS_ADDED, RUNNER_SOURCE, extra_base_probabilities
+)
+
+# 1打席で消費する一様乱数の列 (打席結果, 犠打企図, 犠打成否, 併殺, 進塁打, 犠飛, 二塁走者の追加進塁, 一塁走者の追加進塁)
+U_AT_BAT, U_BUNT, U_BUNT_SUCCESS, U_DOUBLE_PLAY, U_GROUND_OUT_ADVANCE, U_SACRIFICE_FLY, U_EXTRA_SECOND, U_EXTRA_FIRST = range(8)
+NUM_UNIFORMS = 8
+
+# 遷移表を1次元にしたもの (キー: ((塁状況 * 3 + アウト数) * 打席結果の種類 + 打席結果) * 4 + 判定ビット)
+_FLAT_RUNS = RUNS.ravel()
+_FLAT_OUTS_ADDED = OUTS_ADDED.ravel()
+_FLAT_RUNNER_SOURCE = RUNNER_SOURCE.reshape(-1, 3)
+
+# 1試合あたりに確保する作業領域のおおよそのバイト数 (状態配列 + 乱数 + 一時配列)
+_BYTES_PER_GAME = 8 * (3 * NUM_UNIFORMS + 32)
+
+
+class BatchGameResult(NamedTuple):
+    """複数試合のシミュレーション結果。"""
+    scores: np.ndarray          # (打順数, 試合数) 各試合の得点
+    runs_by_inning: np.ndarray  # (打順数, 試合数, イニング数) イニングごとの得点
+    outcome_counts: np.ndarray  # (打順数, 9, len(OUTCOME_TYPES)) 打順ごとの打席結果の回数
+    runs_batted_in: np.ndarray  # (打順数, 9) 打順ごとの打点
+
+
+class GameState(NamedTuple):
+    """試合の途中の状況。"""
+    inning: int = 1     # イニング (1始まり)
+    outs: int = 0       # アウト数 (0-2)
+    bases: int = 0      # 塁状況のマスク (1: 一塁, 2: 二塁, 4: 三塁)
+    batter: int = 0     # 打席に入る打者の打順 (0始まり)
+    deficit: int = 0    # 相手との点差 (負けている点数。同点は0)
+
+
+def initial_runners(state: GameState) -> np.ndarray:
+    """
+    状況の塁上の走者を打順の番号で返す (-1は空き)。走者が誰かは状況に含まれないため、
+    マルコフ連鎖と同じく後ろの塁の走者ほど直近の打者 (一塁走者は1人前の打者) とみなす。
+    """
+    runners = np.full(3, -1, dtype=np.int64)
+    previous = state.batter
+    for base in range(3):
+        if state.bases >> base & 1:
+            previous = (previous - 1) % 9
+            runners[base] = previous
+    return runners
+
+
+class BatchBaseballGame:
+    """
+    複数の試合を NumPy 配列でまとめてシミュレートするクラス。
+
+    アウトカウント・塁上の走者・打順・得点を試合数分の配列で保持し、
+    1ステップごとに進行中の全試合を1打席ずつ進める。
+    走塁や犠打・併殺打・進塁打・犠飛の規則は BaseballGame と同じ。
+    """
+    def __init__(self, lineups: Sequence[Sequence[Player]], memory_budget_mb: float = 64.0):
+        """
+        Args:
+            lineups (Sequence[Sequence[Player]]): 打順 (9名の Player のリスト) のリスト。
+            memory_budget_mb (float): 一度に確保する作業領域の上限 (MB)。試合数はこの範囲に収まるよう分割される。
+        """
+        if not lineups:
+            raise ValueError("lineups must contain at least one lineup")
+        for lineup in lineups:
+            if len(lineup) != 9:
+                raise ValueError("Each lineup must contain exactly 9 players")
+
+        self.lineups = [list(lineup) for lineup in lineups]
+        self.memory_budget_mb = memory_budget_mb
+
+        probabilities = np.array([[p.probabilities for p in lineup] for lineup in self.lineups], dtype=np.float64)
+        # 各選手が構築時に作ったエイリアス表を (打順数*9, 打席結果の種類) に並べる
+        self.alias_prob = np.array([p.sampler.prob for lineup in self.lineups for p in lineup])
+        self.alias_index = np.array([p.sampler.alias for lineup in self.lineups for p in lineup])
+        self.speed = np.array([[p.speed for p in lineup] for lineup in self.lineups], dtype=np.float64)
+        # 打順ごとの追加進塁の確率表 (打順数*9, 種類, アウト数)
+        self.extra_base = extra_base_probabilities(self.speed).reshape(-1, 3, NUM_OUTS)
+        out_ratio = probabilities[..., STRIKEOUT] + probabilities[..., GROUND_OUT] + probabilities[..., FLY_OUT]
+        self.bunt_probability = out_ratio * BUNT_ATTEMPT_FACTOR
+
+    @property
+    def num_lineups(self) -> int:
+        return len(self.lineups)
+
+    def games_per_chunk(self, num_innings: int = 9) -> int:
+        """メモリ予算内で同時にシミュレートできる試合数を返す。"""
+        bytes_per_game = _BYTES_PER_GAME + 8 * num_innings
+        return max(1, int(self.memory_budget_mb * 1024 * 1024) // bytes_per_game)
+
+    def simulate_games(self, num_games: int, num_innings: int = 9, rng: np.random.Generator | None = None,
+                       common_uniforms: CommonUniforms | None = None, game_offset: int = 0,
+                       player_keys: np.ndarray | None = None, start_state: GameState | None = None,
+                       observer=None) -> BatchGameResult:
+        """
+        各打順について num_games 試合ずつシミュレートする。
+
+        Args:
+            num_games (int): 打順ごとの試合数。
+            num_innings (int): 1試合のイニング数。デフォルトは9。
+            rng (np.random.Generator | None): 乱数生成器。None の場合は新たに生成する。
+            common_uniforms (CommonUniforms | None): 指定した場合は rng の代わりに共通乱数を使い、
+                どの打順でも同じ選手の j 試合目の k 打席目には同じ一様乱数の組 (打席結果・犠打・併殺・進塁打・犠飛・追加進塁) を使う。
+            game_offset (int): 共通乱数を使う場合の最初の試合番号。打順ごとに game_offset + j 番の試合の乱数を使う。
+            player_keys (np.ndarray | None): (打順数, 9) 共通乱数を引くときの各打順の選手番号 (選手プール内の番号など)。
+                None の場合は、このエンジンの打順に現れる順に選手に番号を付ける。別々のエンジンで共通乱数を
+                共有する場合は、同じ選手に同じ番号を付けること。
+            start_state (GameState | None): 指定した場合は試合の始めからではなく、この状況から num_innings 回の終わりまでを
+                シミュレートする (それより前のイニングの得点は0)。
+            observer: 指定した場合は、試合のまとまりごとに observer.begin(試合数) を呼び、1ステップごとに
+                observer.observe(試合の番号 (まとまり内), 打席前の状態, 打席結果, 得点, 打席後の状態) を呼ぶ。
+                状態は アウト数 * 8 + 塁状況のマスク で、3アウトでイニングが終わった場合は24。
+
+        Returns:
+            BatchGameResult: 試合ごとの得点と打順ごとの累積成績。
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        num_lineups = self.num_lineups
+        total_games = num_lineups * num_games
+        lineup_of_game = np.repeat(np.arange(num_lineups), num_games)
+        if common_uniforms is not None:
+            if player_keys is None:
+                keys = {}
+                player_keys = [[keys.setdefault(id(p), len(keys)) for p in lineup] for lineup in self.lineups]
+            player_keys = np.asarray(player_keys, dtype=np.int64).reshape(num_lineups, 9)
+            game_number = np.tile(np.arange(game_offset, game_offset + num_games), num_lineups)
+
+        runs_by_inning = np.zeros((total_games, num_innings), dtype=np.int64)
+        outcome_counts = np.zeros(num_lineups * 9 * NUM_OUTCOMES, dtype=np.int64)
+        runs_batted_in = np.zeros(num_lineups * 9, dtype=np.float64)
+
+        chunk = self.games_per_chunk(num_innings)
+        for start in range(0, total_games, chunk):
+            stop = min(start + chunk, total_games)
+            self._simulate_chunk(
+                lineup_of_game[start:stop], num_innings, rng,
+                runs_by_inning[start:stop], outcome_counts, runs_batted_in,
+                None if common_uniforms is None else (common_uniforms, game_number[start:stop], player_keys),
+                start_state, observer
+            )
+
+        runs_by_inning = runs_by_inning.reshape(num_lineups, num_games, num_innings)
+        return BatchGameResult(
+            scores=runs_by_inning.sum(axis=-1),
+            runs_by_inning=runs_by_inning,
+            outcome_counts=outcome_counts.reshape(num_lineups, 9, NUM_OUTCOMES),
+            runs_batted_in=runs_batted_in.reshape(num_lineups, 9),
+        )
+
+    def _simulate_chunk(self, lineup_of_game: np.ndarray, num_innings: int, rng: np.random.Generator,
+                        runs_by_inning: np.ndarray, outcome_counts: np.ndarray, runs_batted_in: np.ndarray,
+                        common: tuple[CommonUniforms, np.ndarray, np.ndarray] | None = None,
+                        start_state: GameState | None = None, observer=None):
+        """
+        試合のまとまりを全試合終了まで進め、結果を引数の配列に書き込む。
+        common が (共通乱数, 各試合の試合番号, 打順ごとの選手番号) の場合は、
+        試合番号・選手番号・その選手の打席番号で共通乱数を引く。
+        start_state を指定した場合は、全試合をその状況から始める。
+        """
+        n = len(lineup_of_game)
+        start_state = start_state or GameState()
+        batter = np.full(n, start_state.batter, dtype=np.int64)    # 次の打者の打順 (0-8)
+        outs = np.full(n, start_state.outs, dtype=np.int64)
+        inning = np.full(n, start_state.inning - 1, dtype=np.int64)
+        runners = np.tile(initial_runners(start_state), (n, 1))  # 各塁の走者の打順 (-1は空き)
+        live = np.flatnonzero(inning < num_innings)
+        if observer is not None:
+            observer.begin(n)
+        plate_appearances = np.zeros((n, 9), dtype=np.int64) # 共通乱数を引くための各打者の打席番号
+
+        while live.size:
+            lineup = lineup_of_game[live]
+            b = batter[live]
+            o = outs[live]
+            r = runners[live]
+            occupied = r >= 0
+            on_first, on_second, on_third = occupied[:, 0], occupied[:, 1], occupied[:, 2]
+            if common is None:
+                u = rng.random((live.size, NUM_UNIFORMS))
+            else:
+                common_uniforms, game_number, player_keys = common
+                u = common_uniforms.take(game_number[live], player_keys[lineup, b], plate_appearances[live, b])
+                plate_appearances[live, b] += 1
+
+            # 犠打の試行判定 (0,1アウトで一塁か二塁に走者がいる場合)
+            bunt = (o < 2) & (on_first | on_second) & (u[:, U_BUNT] < self.bunt_probability[lineup, b])
+            bunt_success = bunt & (u[:, U_BUNT_SUCCESS] < SACRIFICE_BUNT_SUCCESS_RATE)
+
+            # 通常の打席結果
+            slot = lineup * 9 + b
+            event = alias_sample(self.alias_prob, self.alias_index, slot, u[:, U_AT_BAT])
+            outcome = np.where(bunt, np.where(bunt_success, SACRIFICE_BUNT, BUNT_FAIL), event)
+
+            ground_out = outcome == GROUND_OUT
+            double_play = ground_out & on_first & (o < 2) & (u[:, U_DOUBLE_PLAY] < DOUBLE_PLAY_PROBABILITY)
+            ground_out_advance = ground_out & ~double_play & occupied.any(axis=1) & (u[:, U_GROUND_OUT_ADVANCE] < GROUND_OUT_ADVANCE_PROBABILITY)
+            sacrifice_fly = (outcome == FLY_OUT) & on_third & (o < 2) & (u[:, U_SACRIFICE_FLY] < SACRIFICE_FLY_PROBABILITY)
+            outcome[double_play] = DOUBLE_PLAY
+            outcome[ground_out_advance] = GROUND_OUT_ADVANCE
+            outcome[sacrifice_fly] = SACRIFICE_FLY
+
+            # 追加進塁の判定 (単打: 二塁走者の本塁突入と一塁走者の三塁到達、二塁打: 一塁走者の本塁突入)
+            # 確率は打順ごと・アウトカウントごとに事前計算した表から引く。判定が不要な場合のビットは遷移表で無視される
+            first_slot = lineup * 9 + np.maximum(r[:, 0], 0)
+            second_slot = lineup * 9 + np.maximum(r[:, 1], 0)
+            first_kind = np.where(outcome == DOUBLE, KIND_DOUBLE_FROM_FIRST, KIND_SINGLE_FROM_FIRST)
+            bits = (u[:, U_EXTRA_SECOND] < self.extra_base[second_slot, KIND_SINGLE_FROM_SECOND, o]) * EXTRA_SECOND_BIT
+            bits += (u[:, U_EXTRA_FIRST] < self.extra_base[first_slot, first_kind, o]) * EXTRA_FIRST_BIT
+
+            # 遷移表を引いて得点・アウト数・走者を更新する
+            mask = occupied[:, 0] + 2 * occupied[:, 1] + 4 * occupied[:, 2]
+            key = ((mask * NUM_OUTS + o) * NUM_OUTCOMES + outcome) * NUM_DECISIONS + bits
+            runs = _FLAT_RUNS[key]
+            new_outs = o + _FLAT_OUTS_ADDED[key]
+            # 出どころ (0-2: 元の塁, 3: 打者, -1: 空き) で候補の列を選ぶ。-1 は末尾の空き (-1) の列を指す
+            candidates = np.concatenate([r, b[:, None], np.full((live.size, 1), -1, dtype=np.int64)], axis=1)
+            new_runners = np.take_along_axis(candidates, _FLAT_RUNNER_SOURCE[key], axis=1)
+
+            # 成績の集計
+            outcome_counts += np.bincount(slot * NUM_OUTCOMES + outcome, minlength=outcome_counts.size)
+            runs_batted_in += np.bincount(slot, weights=runs, minlength=runs_batted_in.size)
+            runs_by_inning[live, inning[live]] += runs
+
+            # 状態の更新 (3アウトでイニング終了)
+            inning_over = new_outs >= 3
+            batter[live] = (b + 1) % 9
+            outs[live] = np.where(inning_over, 0, new_outs)
+            runners[live] = np.where(inning_over[:, None], -1, new_runners)
+            inning[live] += inning_over
+            if observer is not None:
+                new_mask = (new_runners >= 0) @ np.array([1, 2, 4])
+                observer.observe(live, o * 8 + mask, outcome, runs, np.where(inning_over, 3 * 8, new_outs * 8 + new_mask))
+
+            live = live[inning[live] < num_innings]
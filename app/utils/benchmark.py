@@ -0,0 +1,247 @@
+# src/main/utils/benchmark.py
+"""
+シミュレーションエンジンのスループットを計測するベンチマーク。
+
+使い方 (リポジトリのルートで実行):
+    python -m app.utils.benchmark run --year 2024 --team t
+    python -m app.utils.benchmark compare <基準のコミット> [<比較するコミット>] --threshold 0.05
+
+run は結果を JSON (既定は benchmark_results.json) にコミットのハッシュをキーとして保存する。
+compare は2つのコミットの中央値のスループットを比べ、閾値を超えて遅くなった項目があれば終了コード1で終わる。
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from .constants import SEASON_GAMES
+from .game import BaseballGame
+from .load_data import load_roster
+from .player import Player
+from .sampling import spawn_generators
+from .simulator import find_best_and_worst_lineups, simulate_season
+from .stats import PLATE_APPEARANCES
+
+DEFAULT_RESULTS_PATH = "benchmark_results.json"
+DEFAULT_BASE_PATH = "./data/processed"
+# 報告するパーセンタイル
+PERCENTILES = (5, 50, 95)
+
+
+def measure(workload: Callable[[], Dict[str, float]], warmup: int, repeats: int) -> Tuple[List[float], List[Dict[str, float]]]:
+    """
+    workload を warmup 回実行してから repeats 回計測する。
+
+    Args:
+        workload (Callable[[], Dict[str, float]]): 1回分の処理。処理した量 (単位名 -> 数) を返す。
+
+    Returns:
+        Tuple[List[float], List[Dict[str, float]]]: (各回の経過秒数, 各回の処理量)
+    """
+    for _ in range(warmup):
+        workload()
+    seconds, counts = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = workload()
+        seconds.append(time.perf_counter() - start)
+        counts.append(count)
+    return seconds, counts
+
+
+def summarize(seconds: List[float], counts: List[Dict[str, float]]) -> Dict:
+    """計測結果から、単位ごとの毎秒の処理量のパーセンタイルを求める。"""
+    seconds_array = np.array(seconds)
+    throughput = {}
+    for unit in counts[0]:
+        rates = np.array([count[unit] for count in counts]) / seconds_array
+        throughput[f"{unit}/s"] = {f"p{q}": float(np.percentile(rates, q)) for q in PERCENTILES}
+    return {"seconds": seconds, "throughput": throughput}
+
+
+def game_workload(lineup: List[Player], num_games: int, seed: int) -> Callable[[], Dict[str, float]]:
+    """BaseballGame.simulate_game を num_games 回 (ログなし) 実行する処理。"""
+    game = BaseballGame(lineup, log_mode="none")
+    def run() -> Dict[str, float]:
+        for player in lineup:
+            player.reset_stats()
+        for rng in spawn_generators(seed, num_games):
+            game.simulate_game(rng=rng)
+        plate_appearances = sum(int(player.stats_values[PLATE_APPEARANCES]) for player in {id(p): p for p in lineup}.values())
+        return {"games": num_games, "PAs": plate_appearances}
+    return run
+
+
+def season_workload(lineup: List[Player], num_seasons: int, seed: int) -> Callable[[], Dict[str, float]]:
+    """simulate_season (143試合) を num_seasons 回実行する処理。"""
+    def run() -> Dict[str, float]:
+        plate_appearances = 0
+        for rng in spawn_generators(seed, num_seasons):
+            _, stats_df = simulate_season(SEASON_GAMES, lineup, rng=rng)
+            plate_appearances += int(stats_df["打席"].sum())
+        return {"seasons": num_seasons, "games": SEASON_GAMES * num_seasons, "PAs": plate_appearances}
+    return run
+
+
+def search_workload(pool: List[Player], num_trials: int, seed: int, evaluator: str) -> Callable[[], Dict[str, float]]:
+    """find_best_and_worst_lineups で num_trials 通りの打順を評価する処理。"""
+    def run() -> Dict[str, float]:
+        find_best_and_worst_lineups(num_trials, pool, evaluator=evaluator, confirm_with_simulation=False,
+                                    num_workers=1 if evaluator == "simulation" else None, seed=seed, use_cache=False)
+        return {"lineups": num_trials}
+    return run
+
+
+def run_benchmarks(lineup: List[Player], pool: List[Player], warmup: int = 1, repeats: int = 5, num_games: int = 1000,
+                   num_seasons: int = 20, num_trials: int = 50, seed: int = 0) -> Dict[str, Dict]:
+    """
+    各ベンチマークを計測し、名前 -> summarize の結果 の辞書を返す。
+
+    Args:
+        lineup (List[Player]): 1試合とシーズンのベンチマークに使う打順。
+        pool (List[Player]): 打順探索のベンチマークに使う選手プール。
+        num_games (int): 1回あたりの試合数 (game)。
+        num_seasons (int): 1回あたりのシーズン数 (season)。
+        num_trials (int): 1回あたりに評価する打順の数 (search_*)。
+    """
+    workloads = {
+        "game": game_workload(lineup, num_games, seed),
+        "season": season_workload(lineup, num_seasons, seed),
+        "search_simulation": search_workload(pool, num_trials, seed, "simulation"),
+        "search_markov": search_workload(pool, num_trials, seed, "markov"),
+    }
+    return {name: summarize(*measure(workload, warmup, repeats)) for name, workload in workloads.items()}
+
+
+def git_commit() -> Tuple[str, bool]:
+    """現在のコミットのハッシュと、作業ツリーに未コミットの変更があるかを返す。git がない場合は "unknown"。"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, bool(status.strip())
+
+
+def load_results(path: str) -> Dict[str, Dict]:
+    """保存したベンチマーク結果 (コミット -> 結果) を読み込む。ファイルがなければ空の辞書。"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_result(path: str, commit: str, result: Dict):
+    """ベンチマーク結果をコミットのハッシュをキーとして保存する。同じコミットの結果は上書きする。"""
+    results = load_results(path)
+    results[commit] = result
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def find_commit(results: Dict[str, Dict], commit: str) -> str:
+    """保存済みの結果から、前方一致するコミットのキーを探す。"""
+    matches = [key for key in results if key.startswith(commit)]
+    if len(matches) != 1:
+        raise KeyError(f"{commit!r} matches {len(matches)} recorded commits")
+    return matches[0]
+
+
+def compare_results(base: Dict, head: Dict, threshold: float = 0.05) -> List[Dict]:
+    """
+    2つの結果の中央値 (p50) のスループットを比べる。
+
+    Args:
+        base (Dict): 基準の結果 (run_benchmarks の戻り値を含む "benchmarks")。
+        head (Dict): 比較する結果。
+        threshold (float): この割合を超えてスループットが下がった項目を regression とする。
+
+    Returns:
+        List[Dict]: 両方にある項目ごとの "benchmark", "unit", "base", "head", "change", "regression"。
+    """
+    rows = []
+    for name, base_bench in base["benchmarks"].items():
+        head_bench = head["benchmarks"].get(name)
+        if head_bench is None:
+            continue
+        for unit, base_rates in base_bench["throughput"].items():
+            if unit not in head_bench["throughput"]:
+                continue
+            before, after = base_rates["p50"], head_bench["throughput"][unit]["p50"]
+            change = after / before - 1.0 if before > 0 else 0.0
+            rows.append({"benchmark": name, "unit": unit, "base": before, "head": after,
+                         "change": change, "regression": change < -threshold})
+    return rows
+
+
+def _command_run(args) -> int:
+    lineup, pool = load_roster(args.year, args.team, args.base_path)
+    benchmarks = run_benchmarks(lineup, pool, args.warmup, args.repeats, args.games, args.seasons, args.trials, args.seed)
+    commit, dirty = git_commit()
+    result = {
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "roster": f"{args.year}/{args.team}",
+        "config": {"warmup": args.warmup, "repeats": args.repeats, "games": args.games,
+                   "seasons": args.seasons, "trials": args.trials, "seed": args.seed},
+        "benchmarks": benchmarks,
+    }
+    save_result(args.output, commit, result)
+    print(f"commit {commit[:12]}{' (dirty)' if dirty else ''} -> {args.output}")
+    for name, bench in benchmarks.items():
+        rates = ", ".join(f"{unit} {r['p50']:,.1f} [p5 {r['p5']:,.1f} / p95 {r['p95']:,.1f}]" for unit, r in bench["throughput"].items())
+        print(f"  {name:<18} {rates}")
+    return 0
+
+
+def _command_compare(args) -> int:
+    results = load_results(args.output)
+    base_key = find_commit(results, args.base)
+    head_key = find_commit(results, args.head or git_commit()[0])
+    rows = compare_results(results[base_key], results[head_key], args.threshold)
+    print(f"{base_key[:12]} -> {head_key[:12]} (threshold {args.threshold:.0%})")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"  {row['benchmark']:<18} {row['unit']:<12} {row['base']:>14,.1f} -> {row['head']:>14,.1f} ({row['change']:+.1%}){flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark simulation throughput and compare results between commits.")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_PATH, help="JSON file keyed by git commit.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and record the result for the current commit.")
+    run_parser.add_argument("--year", type=int, default=2024)
+    run_parser.add_argument("--team", default="t")
+    run_parser.add_argument("--base-path", default=DEFAULT_BASE_PATH)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--repeats", type=int, default=5)
+    run_parser.add_argument("--games", type=int, default=1000, help="Games per repeat for the single-game benchmark.")
+    run_parser.add_argument("--seasons", type=int, default=20, help="143-game seasons per repeat.")
+    run_parser.add_argument("--trials", type=int, default=50, help="Lineups per repeat for the search benchmarks.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.set_defaults(func=_command_run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare median throughput between two recorded commits.")
+    compare_parser.add_argument("base", help="Baseline commit (prefix).")
+    compare_parser.add_argument("head", nargs="?", help="Commit to compare (prefix). Defaults to the current commit.")
+    compare_parser.add_argument("--threshold", type=float, default=0.05, help="Flag slowdowns larger than this fraction.")
+    compare_parser.set_defaults(func=_command_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
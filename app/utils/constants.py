@@ -17,12 +17,18 @@ EVENT_CONFIG: Dict[str, Dict[str, Any]] = {
     "fly_out":  {"is_hit": False, "is_walk": False, "is_out": True,  "bases_to_advance": 0, "slugging_value": 0, "stat_counter_key": None},
 }
 
+# 打席の最終結果の種類 (EVENT_TYPESに状況依存の結果を加えたもの。整数コードはこのリストのインデックス)
+OUTCOME_TYPES: List[str] = EVENT_TYPES + ["double_play", "ground_out_advance", "sacrifice_fly", "sacrifice_bunt", "bunt_fail"]
+
 STAT_KEYS: List[str] = [
     "hits", "at_bats", "walks", "plate_appearances", "runs_batted_in",
     "singles", "doubles", "triples", "homeruns", "slugging_points",
     "strikeouts", "double_plays", "sacrifice_bunts", "ground_out_advances", "bunt_fails", "sacrifice_flies"
 ]
 
+# 選手データ (data/processed/<年度>/<チーム>.csv) の打席結果の確率のカラム (EVENT_TYPES の順)
+PROB_COLS: List[str] = ["1B_ratio", "2B_ratio", "3B_ratio", "HR_ratio", "BB+HBP_ratio", "SO_ratio", "Ground_Out_ratio", "Fly_Out_ratio"]
+
 # 投手（架空の選手）の打撃成績の仮の値
 PITCHER_STATS = {
     "Player": "投手",
@@ -37,6 +43,9 @@ PITCHER_STATS = {
     "Speed": 0 # スピード
 }
 
+# 1シーズンの試合数
+SEASON_GAMES = 143
+
 # シミュレーション確率設定
 BUNT_ATTEMPT_FACTOR = 0.1 # 犠打試行確率の係数
 SACRIFICE_BUNT_SUCCESS_RATE = 0.8 # 犠打成功率
@@ -1,34 +1,37 @@
 import os
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
 
 import pandas as pd
 import numpy as np
 
-
-def process_batting_stats(df):
+from .manifest import MANIFEST_FILE, DataManifest, file_content_hash
+from .player_store import STORE_FILE, build_player_store, get_player_store
+
+# 12球団の略称 (data/raw/<year>/<team>.csv のファイル名)
+TEAMS = ["g", "t", "c", "db", "s", "d", "f", "e", "m", "l", "b", "h"]
+# rawデータの列名 (英語)
+ENG_COLUMNS = [
+    'Player', 'G', 'PA', 'AB', 'R', 'H', '2B', '3B', 'HR', 'TB', 'RBI',
+    'SB', 'CS', 'SH', 'SF', 'BB', 'IBB', 'HBP', 'SO', 'GIDP', 'AVG', 'SLG', 'OBP'
+]
+# 正規化する打席結果の割合の列
+RATIO_COLS = ['1B_ratio', '2B_ratio', '3B_ratio', 'HR_ratio', 'BB+HBP_ratio', 'SO_ratio', 'Ground_Out_ratio', 'Fly_Out_ratio']
+# 加工済みデータの列
+OUTPUT_COLS = ["Player"] + RATIO_COLS + ["Out_ratio"]
+# 加工済みデータに含める打席数の下限
+MIN_PLATE_APPEARANCES = 50
+# 加工済みの CSV を並列に書き込むスレッド数
+WRITE_WORKERS = 8
+
+
+def _batting_ratios(df):
     """
-    rawな選手データ(DataFrame)をシミュレーションで使える形に加工する
-
-    Args:
-        df (pd.DataFrame): get_dataから取得したrawデータ
-
-    Returns:
-        pd.DataFrame: 加工済みの選手データ
+    英語の列名の選手データ (打席数 MIN_PLATE_APPEARANCES 以上) に打席結果の割合の列を加える。
+    process_batting_stats と process_all が共有し、列ごとの演算で全選手を一度に計算する。
     """
-    # 列名を英語に置き換え
-    eng_columns = [
-        'Player', 'G', 'PA', 'AB', 'R', 'H', '2B', '3B', 'HR', 'TB', 'RBI',
-        'SB', 'CS', 'SH', 'SF', 'BB', 'IBB', 'HBP', 'SO', 'GIDP', 'AVG', 'SLG','OBP'
-    ]
-    df.columns = eng_columns
-
-    # データ型を数値に変換（エラーは無視）
-    for col in ['PA', 'H', '2B', '3B', 'HR', 'BB', 'HBP', 'SO']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # 50打席未満の選手を除外
-    df = df[df["PA"]>=50].reset_index(drop=True)
-
     # 一塁打を計算
     df['1B'] = df['H'] - (df['2B'] + df['3B'] + df['HR'])
     # 四死球を計算
@@ -58,20 +61,38 @@ def process_batting_stats(df):
         df.loc[mask, col] = 1e-4
 
     # 全ての確率の合計が1になるように正規化
-    cols_to_normalize = ['1B_ratio', '2B_ratio', '3B_ratio', 'HR_ratio', 'BB+HBP_ratio', 'SO_ratio', 'Ground_Out_ratio', 'Fly_Out_ratio']
-    total_ratio = df[cols_to_normalize].sum(axis=1)
-    for col in cols_to_normalize:
+    total_ratio = df[RATIO_COLS].sum(axis=1)
+    for col in RATIO_COLS:
         df[col] = df[col] / total_ratio
 
     # Out_ratioも計算しておく（デバッグや分析用）
     df['Out_ratio'] = df['SO_ratio'] + df['Ground_Out_ratio'] + df['Fly_Out_ratio']
+    return df
+
+
+def process_batting_stats(df):
+    """
+    rawな選手データ(DataFrame)をシミュレーションで使える形に加工する
+
+    Args:
+        df (pd.DataFrame): get_dataから取得したrawデータ
+
+    Returns:
+        pd.DataFrame: 加工済みの選手データ
+    """
+    # 列名を英語に置き換え
+    df.columns = ENG_COLUMNS
+
+    # データ型を数値に変換（エラーは無視）
+    for col in ['PA', 'H', '2B', '3B', 'HR', 'BB', 'HBP', 'SO']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # 50打席未満の選手を除外
+    df = df[df["PA"]>=MIN_PLATE_APPEARANCES].reset_index(drop=True)
+    df = _batting_ratios(df)
 
     # 最終的な出力列
-    output_cols = [
-        "Player", "1B_ratio", "2B_ratio", "3B_ratio", "HR_ratio",
-        "BB+HBP_ratio", "SO_ratio", "Ground_Out_ratio", "Fly_Out_ratio", "Out_ratio"
-    ]
-    df_res = df[output_cols].reset_index(drop=True)
+    df_res = df[OUTPUT_COLS].reset_index(drop=True)
 
     return df_res
 
@@ -95,20 +116,14 @@ def add_speed_score(year: str, team: str, raw_dir="./data/raw"):
         print(f"Error: {raw_path} not found.")
         return None
 
-    # process_dataと同様にカラム名を英語に変換
-    eng_columns = [
-        'Player', 'G', 'PA', 'AB', 'R', 'H', '2B', '3B', 'HR', 'TB', 'RBI',
-        'SB', 'CS', 'SH', 'SF', 'BB', 'IBB', 'HBP', 'SO', 'GIDP', 'AVG', 'SLG', 'OBP'
-    ]
-    # 元のデータフレームのカラム数がeng_columnsと一致するか確認
-    if len(df.columns) == len(eng_columns):
-        df.columns = eng_columns
+    # 元のデータフレームのカラム数がENG_COLUMNSと一致するか確認
+    if len(df.columns) == len(ENG_COLUMNS):
+        df.columns = ENG_COLUMNS
     else:
         # 選手名と成績データのみを抽出し、カラム名を再設定
         # 元データはヘッダーが2行あるため、2行目以降をデータとして扱う
-        df = df.iloc[1:, :len(eng_columns)]
-        df.columns = eng_columns
-
+        df = df.iloc[1:, :len(ENG_COLUMNS)]
+        df.columns = ENG_COLUMNS
 
     # データ型を数値に変換（エラーは無視）
     for col in ['3B', 'SB', 'CS']:
@@ -121,12 +136,13 @@ def add_speed_score(year: str, team: str, raw_dir="./data/raw"):
     return df
 
 
-def process_data(df, team, year, output_dir="./data/processed"):
+def process_data(df, team, year, output_dir="./data/processed", raw_dir="./data/raw"):
+    """1チーム分のrawデータを加工してCSVに保存する (rawデータは走力ポイントのためにもう一度読み込む)"""
     # process_batting_stats関数を呼び出してデータを加工
     df_processed = process_batting_stats(df.copy())
 
     # 走力スコアデータを取得 (rawデータの場所を指定)
-    df_speed = add_speed_score(year, team)
+    df_speed = add_speed_score(year, team, raw_dir)
     if df_speed is None:
         return
     # 必要なカラムのみに絞る
@@ -146,60 +162,210 @@ def process_data(df, team, year, output_dir="./data/processed"):
     return df_merged
 
 
-def main(teams, year, raw_dir="./data/raw", processed_dir="./data/processed"):
-    """指定されたチームと年度のデータを取得・加工するメイン関数"""
-    for team in teams:
-        print(f"Processing: {year} {team}")
-        # get_dataはWebから取ってくるので、テストでは使いにくい。ここではrawデータは既にある前提とする。
-        # raw_df = get_data(team, year)
-        raw_path = os.path.join(raw_dir, f"{year}/{team}.csv")
+def read_raw_data(years: Sequence, teams: Sequence[str] = TEAMS, raw_dir: str = "./data/raw") -> pd.DataFrame:
+    """
+    data/raw/<year>/<team>.csv を1回ずつ読み込み、Year・Team の列を付けて1つの DataFrame にする。
+    ファイルがない (年度, チーム) は飛ばす。列名は ENG_COLUMNS に置き換える。
+    """
+    return read_raw_files([(year, team) for year in years for team in teams], raw_dir)
+
+
+def read_raw_files(keys: Sequence[Tuple], raw_dir: str = "./data/raw") -> pd.DataFrame:
+    """read_raw_data と同じ。(年度, チーム) のリストで読み込むファイルを指定する。"""
+    frames = []
+    for year, team in keys:
+        raw_path = os.path.join(raw_dir, str(year), f"{team}.csv")
         try:
-            raw_df = pd.read_csv(raw_path)
+            frame = pd.read_csv(raw_path)
         except FileNotFoundError:
             print(f"Raw data not found at {raw_path}, skipping.")
             continue
-
-        if not raw_df.empty:
-            # process_data内で保存先を指定できるようにする
-            df = process_data(raw_df, team, year, processed_dir)
-            print(f"Saved processed data to {processed_dir}/{year}/{team}.csv")
-            #print(df)
-        else:
+        if frame.empty:
             print(f"No data found for {team} in {year}.")
+            continue
+        # ヘッダーが2行ある場合は2行目以降をデータとして扱う (add_speed_score と同じ)
+        if len(frame.columns) != len(ENG_COLUMNS):
+            frame = frame.iloc[1:, :len(ENG_COLUMNS)]
+        frame.columns = ENG_COLUMNS
+        frame.insert(0, "Team", team)
+        frame.insert(0, "Year", int(year))
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=["Year", "Team"] + ENG_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def process_all(raw: pd.DataFrame) -> Dict[Tuple[int, str], pd.DataFrame]:
+    """
+    read_raw_data で読み込んだ全年度・全チームの選手データを一度に加工する。
+
+    打席結果の割合・微小な値の付与・正規化・走力ポイントを全選手の列に対する演算で計算し、
+    (年度, チーム) ごとに process_data と同じ加工済みデータ (同じ列・型・値) に分ける。
+
+    Returns:
+        Dict[Tuple[int, str], pd.DataFrame]: (年度, チーム) から加工済みの選手データへの辞書。
+    """
+    df = raw.copy()
+    for col in ['PA', 'H', '2B', '3B', 'HR', 'BB', 'HBP', 'SO']:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    # 走力ポイント = (三塁打数 * 3) + (盗塁数 * 1) - (盗塁死数 * 2)
+    speed_stats = pd.DataFrame({col: pd.to_numeric(df[col], errors='coerce') for col in ['3B', 'SB', 'CS']})
+    # 数値でない値があったチームは、process_data と同じく走力ポイントを小数で書き出す
+    has_missing = speed_stats.isna().any(axis=1).groupby([df["Year"], df["Team"]], sort=False).any()
+    speed_stats = speed_stats.fillna(0)
+    df['Speed'] = (speed_stats['3B'] * 3) + (speed_stats['SB'] * 1) - (speed_stats['CS'] * 2)
+
+    df = df[df["PA"] >= MIN_PLATE_APPEARANCES].reset_index(drop=True)
+    df = _batting_ratios(df)
+
+    processed = {}
+    for (year, team), group in df.groupby(["Year", "Team"], sort=False):
+        frame = group[OUTPUT_COLS + ["Speed"]].reset_index(drop=True)
+        if not has_missing[(year, team)]:
+            frame['Speed'] = frame['Speed'].astype(np.int64)
+        processed[(int(year), team)] = frame
+    return processed
+
+
+def write_processed(processed: Dict[Tuple[int, str], pd.DataFrame], output_dir: str = "./data/processed",
+                    raw_dir: str = "./data/raw", raw: pd.DataFrame | None = None, build_store: bool = True) -> List[str]:
+    """
+    加工済みデータを <output_dir>/<year>/<team>.csv に並列に書き込み、選手データのストア (player_store.bin) を作り直す。
+
+    Args:
+        processed (Dict[Tuple[int, str], pd.DataFrame]): process_all の結果。
+        raw (pd.DataFrame | None): read_raw_data の結果。指定した場合、書き込んだチームのストアの打席数を
+            raw_dir の CSV を読み直さずに求める。
+        build_store (bool): False の場合はストアを作らない。
+
+    Returns:
+        List[str]: 書き込んだ CSV のパス。
+    """
+    paths = {}
+    for year, team in processed:
+        os.makedirs(os.path.join(output_dir, str(year)), exist_ok=True)
+        paths[(year, team)] = os.path.join(output_dir, str(year), f"{team}.csv")
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+        list(executor.map(lambda key: processed[key].to_csv(paths[key], index=False), paths))
+    if build_store:
+        plate_appearances = None
+        if raw is not None:
+            plate_appearances = {}
+            counts = pd.to_numeric(raw["PA"], errors="coerce").fillna(0).astype(np.int64)
+            for (year, team), group in raw.groupby(["Year", "Team"], sort=False):
+                lookup = dict(zip(group["Player"], counts[group.index]))
+                frame = processed.get((int(year), team))
+                if frame is not None:
+                    names = frame["Player"].tolist()
+                    plate_appearances[f"{year}/{team}.csv"] = np.array([lookup.get(name, 0) for name in names], dtype=np.int64)
+        build_player_store(output_dir, raw_dir, plate_appearances).save(os.path.join(output_dir, STORE_FILE))
+    return list(paths.values())
+
+
+def update_processed(years: Sequence, teams: Sequence[str] = TEAMS, raw_dir: str = "./data/raw",
+                     processed_dir: str = "./data/processed", force: bool = False) -> List[str]:
+    """
+    rawデータが変わったチームだけを加工し直して保存する。
+
+    <processed_dir>/manifest.json に (年度, チーム) ごとの rawデータと加工済みデータの内容のハッシュを記録し、
+    rawデータのハッシュが前回と同じで加工済みデータも前回書き込んだ内容のままのチームは飛ばす。
+    加工し直したチームがある場合と、選手データのストアがないか古い場合は、ストアを作り直す。
+
+    Args:
+        force (bool): True の場合は記録にかかわらず全チームを加工し直す。
+
+    Returns:
+        List[str]: 書き込んだ CSV のパス。
+    """
+    manifest = DataManifest(os.path.join(processed_dir, MANIFEST_FILE))
+    input_hashes = {}
+    for year in years:
+        for team in teams:
+            input_hash = file_content_hash(os.path.join(raw_dir, str(year), f"{team}.csv"))
+            if input_hash is None:
+                continue
+            output = os.path.join(processed_dir, str(year), f"{team}.csv")
+            if force or not manifest.is_current("processed", f"{year}/{team}", input_hash, [output]):
+                input_hashes[(int(year), team)] = input_hash
+    if not input_hashes:
+        if get_player_store(processed_dir) is None:
+            build_player_store(processed_dir, raw_dir).save(os.path.join(processed_dir, STORE_FILE))
+        return []
+
+    raw = read_raw_files(list(input_hashes), raw_dir)
+    processed = process_all(raw)
+    paths = write_processed(processed, processed_dir, raw_dir, raw)
+    for (year, team), path in zip(processed, paths):
+        manifest.record("processed", f"{year}/{team}", input_hashes[(year, team)], [path])
+    manifest.save()
+    return paths
+
+
+def main(teams, year, raw_dir="./data/raw", processed_dir="./data/processed"):
+    """指定されたチームと年度のデータのうち、rawデータが変わったものを加工して保存するメイン関数"""
+    # get_dataはWebから取ってくるので、テストでは使いにくい。ここではrawデータは既にある前提とする。
+    for path in update_processed([year], teams, raw_dir, processed_dir):
+        print(f"Saved processed data to {path}")
+
+# calculate_player_stats で使う打席結果の列と、そこから打席・打数・安打・塁打・アウトを求める係数
+_RESULT_COLS = ['1B', '2B', '3B', 'HR', 'BB+HBP', 'SO', 'Ground_Out', 'Fly_Out', 'Sacrifice_Attempts']
+_DERIVED_COLS = ['PA', 'AB', 'H', 'TB', 'Out']
+_DERIVED_WEIGHTS = np.array([
+    # PA AB  H  TB Out
+    [1, 1, 1, 1, 0],  # 1B
+    [1, 1, 1, 2, 0],  # 2B
+    [1, 1, 1, 3, 0],  # 3B
+    [1, 1, 1, 4, 0],  # HR
+    [1, 0, 0, 0, 0],  # BB+HBP
+    [1, 1, 0, 0, 1],  # SO
+    [1, 1, 0, 0, 1],  # Ground_Out
+    [1, 1, 0, 0, 1],  # Fly_Out
+    [1, 0, 0, 0, 0],  # Sacrifice_Attempts
+], dtype=np.int64)
+
+def _safe_divide(numerator, denominator):
+    """分母が0の要素を0とする割り算。"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=np.asarray(denominator) > 0)
 
 def calculate_player_stats(stats_df):
-    """シミュレーション結果から各種成績を計算する"""
-    required_cols = ['1B', '2B', '3B', 'HR', 'BB+HBP', 'SO', 'Ground_Out', 'Fly_Out', 'Sacrifice_Attempts', 'RBI', 'Sacrifice_Success']
+    """
+    シミュレーション結果から各種成績を計算する。
+
+    打席結果の回数を (選手数, 打席結果) の整数行列として取り出し、
+    係数行列との積で打席・打数・安打・塁打・アウトをまとめて求める。
+    """
+    required_cols = _RESULT_COLS + ['RBI', 'Sacrifice_Success']
     for col in required_cols:
         if col not in stats_df.columns:
             stats_df[col] = 0
 
-    stats_df['Out'] = stats_df['SO'] + stats_df['Ground_Out'] + stats_df['Fly_Out']
-    stats_df['PA'] = stats_df[['1B', '2B', '3B', 'HR', 'BB+HBP', 'SO', 'Ground_Out', 'Fly_Out', 'Sacrifice_Attempts']].sum(axis=1)
-    stats_df['AB'] = stats_df[['1B', '2B', '3B', 'HR', 'SO', 'Ground_Out', 'Fly_Out']].sum(axis=1)
-    stats_df['H'] = stats_df[['1B', '2B', '3B', 'HR']].sum(axis=1)
-    stats_df['TB'] = stats_df['1B'] + 2*stats_df['2B'] + 3*stats_df['3B'] + 4*stats_df['HR']
-    
-    stats_df['AVG'] = (stats_df['H'] / stats_df['AB']).where(stats_df['AB'] > 0, 0)
-    stats_df['OBP'] = ((stats_df['H'] + stats_df['BB+HBP']) / stats_df['PA']).where(stats_df['PA'] > 0, 0)
-    stats_df['SLG'] = (stats_df['TB'] / stats_df['AB']).where(stats_df['AB'] > 0, 0)
-    
+    counts = stats_df[_RESULT_COLS].to_numpy(dtype=np.int64)
+    derived = counts @ _DERIVED_WEIGHTS
+    for i, col in enumerate(_DERIVED_COLS):
+        stats_df[col] = derived[:, i]
+
+    pa, ab, h, tb = derived[:, 0], derived[:, 1], derived[:, 2], derived[:, 3]
+    stats_df['AVG'] = _safe_divide(h, ab)
+    stats_df['OBP'] = _safe_divide(h + counts[:, _RESULT_COLS.index('BB+HBP')], pa)
+    stats_df['SLG'] = _safe_divide(tb, ab)
     stats_df['OPS'] = stats_df['OBP'] + stats_df['SLG']
     return stats_df
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process player data for a specific year or a range of years.')
     parser.add_argument('--year', type=str, help='The year to process data for.')
+    parser.add_argument('--raw-dir', default="./data/raw")
+    parser.add_argument('--processed-dir', default="./data/processed")
+    parser.add_argument('--force', action='store_true', help='rawデータが変わっていないチームも加工し直す')
     args = parser.parse_args()
 
-    team_list = ["g","t","c","db","s","d","f","e","m","l","b","h"]
-
     if args.year:
         years_to_process = [args.year]
     else:
-        years_to_process = ["2022", "2023", "2024"]
+        # 年度を指定しない場合は data/raw にある全年度
+        years_to_process = sorted(name for name in os.listdir(args.raw_dir) if name.isdigit())
 
-    for year in years_to_process:
-        for team in team_list:
-            main([team], year)
-    
\ No newline at end of file
+    started = time.perf_counter()
+    paths = update_processed(years_to_process, TEAMS, args.raw_dir, args.processed_dir, args.force)
+    print(f"{len(paths)} チームの加工済みデータを {args.processed_dir} に保存しました ({time.perf_counter() - started:.2f}秒)")
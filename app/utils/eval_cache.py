@@ -0,0 +1,234 @@
+# src/main/utils/eval_cache.py
+"""
+打順の評価結果 (シーズンのシミュレーション・打順探索) のキャッシュ。
+
+キーは (評価の種類, 打順の選手とその確率・走力, シミュレーションの定数, エンジンのバージョン, シード, 試合数など) で、
+値はメモリ上の LRU とディスク上のファイル (合計サイズの上限を超えたら古いものから削除) の2段で保持する。
+選手データが変わると打順の選手の確率・走力が変わるため、キーに年度・チームやデータのバージョンは含めない。
+DH制も打順 (投手の打席の有無) に表れる。打順以外に結果に影響する条件は make_key の options で渡す。
+同じシードの結果は常に同じになるため、シードが整数の場合だけキャッシュを使う。
+"""
+
+import copy
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from . import constants
+from .player import Player
+
+# ディスクのキャッシュの既定の場所 (リポジトリのルートからの相対パス)
+DEFAULT_CACHE_DIR = "./data/cache/evaluations"
+# メモリに保持する評価結果の数
+DEFAULT_MEMORY_ENTRIES = 1024
+# ディスクのキャッシュの合計サイズの上限 (バイト)
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# 結果に影響するシミュレーションの定数 (constants の名前)
+SIMULATION_CONSTANTS = ("BUNT_ATTEMPT_FACTOR", "SACRIFICE_BUNT_SUCCESS_RATE", "DOUBLE_PLAY_PROBABILITY",
+                        "GROUND_OUT_ADVANCE_PROBABILITY", "SACRIFICE_FLY_PROBABILITY")
+# エンジンのバージョンとしてソースの内容のハッシュを使うモジュール (app/utils からの相対パス)
+ENGINE_MODULES = ("batch_game.py", "game.py", "markov.py", "optimizer.py", "permutations.py", "player.py",
+                  "racing.py", "run_expectancy.py", "sampling.py", "simulator.py", "stats.py", "transitions.py")
+
+_engine_version: str | None = None
+
+
+class SeasonEvaluation(NamedTuple):
+    """1つの打順のシーズンの評価結果。"""
+    mean: float         # 1試合あたりの平均得点
+    variance: float     # 1試合の得点の不偏分散
+    stats: np.ndarray   # (打順の人数, len(STAT_KEYS)) 打順の並びごとのシーズン成績
+    total: int          # シーズンの総得点
+
+
+def engine_version() -> str:
+    """シミュレーションエンジンのソースの内容のハッシュ。エンジンを変更すると以前の結果は使われなくなる。"""
+    global _engine_version
+    if _engine_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in ENGINE_MODULES:
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(name.encode() + b"\0" + f.read())
+        _engine_version = digest.hexdigest()[:16]
+    return _engine_version
+
+
+def simulation_constants() -> Tuple[Tuple[str, Any], ...]:
+    """結果に影響するシミュレーションの定数の現在の値。"""
+    return tuple((name, getattr(constants, name)) for name in SIMULATION_CONSTANTS)
+
+
+def lineup_key(players: Sequence[Player]) -> Tuple:
+    """打順の選手 (名前・打席結果の確率・走力) の並びをキーにする。"""
+    return tuple((p.name, tuple(float(x) for x in p.probabilities), float(p.speed)) for p in players)
+
+
+def is_cacheable_seed(seed) -> bool:
+    """結果が seed だけで決まる (整数のシード) かどうか。"""
+    return isinstance(seed, (int, np.integer)) and not isinstance(seed, bool)
+
+
+class EvaluationCache:
+    """
+    評価結果のメモリ上の LRU とディスク上のストア。
+
+    ディスクにはキーの SHA-256 をファイル名として値を pickle で保存する。読み出したファイルは
+    更新時刻を新しくし、合計サイズが max_disk_bytes を超えたら更新時刻の古いファイルから削除する。
+    アプリの複数のセッション (スレッド) から同時に使えるように、メモリの LRU・件数・ディスクの合計サイズは
+    ロックの中で更新し、ディスクへの書き込みはスレッドごとの一時ファイルから置き換える。
+    """
+    def __init__(self, directory: str | None = None, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        """
+        Args:
+            directory (str | None): ディスクのキャッシュの場所。None の場合はメモリだけを使う。
+            max_memory_entries (int): メモリに保持する評価結果の数。
+            max_disk_bytes (int): ディスクのキャッシュの合計サイズの上限 (バイト)。
+        """
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._disk_bytes: int | None = None
+        self._lock = threading.Lock()
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def make_key(self, kind: str, players: Sequence[Player], seed, num_games: int, *options: Hashable) -> Tuple:
+        """評価の種類・打順・シード・試合数とその他の条件 (options) からキーを作る。"""
+        return (kind, lineup_key(players), simulation_constants(), engine_version(),
+                int(seed), num_games) + tuple(options)
+
+    def _path(self, key: Tuple) -> str:
+        return os.path.join(self.directory, hashlib.sha256(repr(key).encode()).hexdigest() + ".pkl")
+
+    def get(self, key: Tuple) -> Any | None:
+        """キーの値を返す。ない場合は None。返す値はコピーなので変更してもキャッシュには影響しない。"""
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.hits += 1
+        if value is not None:
+            return copy.deepcopy(value)
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    stored_key, value = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                stored_key = None
+            if stored_key == key:
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    pass # 別のスレッドが削除した
+                with self._lock:
+                    self._remember(key, value)
+                    self.hits += 1
+                return copy.deepcopy(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: Tuple, value: Any):
+        """キーの値を保存する。"""
+        value = copy.deepcopy(value)
+        size = None
+        if self.directory is not None:
+            path = self._path(key)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as f:
+                pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(temporary, path)
+        with self._lock:
+            self._remember(key, value)
+            if size is not None:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += size
+                self._evict_disk()
+
+    def _remember(self, key: Tuple, value: Any):
+        """メモリの LRU に値を入れる (ロックの中で呼ぶ)。"""
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _disk_files(self):
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".pkl"):
+                    try:
+                        status = entry.stat()
+                    except FileNotFoundError:
+                        continue # 別のスレッドが削除した
+                    files.append((status.st_mtime_ns, status.st_size, entry.path))
+        return files
+
+    def _evict_disk(self):
+        """ディスクのキャッシュの合計サイズが上限を超えたら、更新時刻の古いファイルから削除する (ロックの中で呼ぶ)。"""
+        if self._disk_bytes is not None and self._disk_bytes <= self.max_disk_bytes:
+            return
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._disk_bytes = total
+
+    def clear(self):
+        """メモリとディスクのキャッシュをすべて削除する。"""
+        with self._lock:
+            self.memory.clear()
+            if self.directory is not None:
+                for _, _, path in self._disk_files():
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                self._disk_bytes = 0
+
+
+_default_cache: EvaluationCache | None = None
+_default_lock = threading.Lock()
+
+
+def get_evaluation_cache() -> EvaluationCache:
+    """simulate_season などが既定で使うキャッシュ。configure_evaluation_cache を呼ぶまではメモリだけを使う。"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = EvaluationCache()
+        return _default_cache
+
+
+def configure_evaluation_cache(directory: str | None = DEFAULT_CACHE_DIR, max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                               max_disk_bytes: int = DEFAULT_DISK_BYTES) -> EvaluationCache:
+    """
+    既定のキャッシュの保存場所と上限を設定して返す。設定が同じ場合は既存のキャッシュ (メモリ上の内容) をそのまま使う。
+    """
+    global _default_cache
+    with _default_lock:
+        current = _default_cache
+        if (current is None or current.directory != directory or current.max_memory_entries != max_memory_entries
+                or current.max_disk_bytes != max_disk_bytes):
+            _default_cache = EvaluationCache(directory, max_memory_entries, max_disk_bytes)
+        return _default_cache
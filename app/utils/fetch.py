@@ -0,0 +1,352 @@
+# src/main/utils/fetch.py
+"""
+スクレイピング (get_player_data, get_default_lineup) で使う HTML の取得と、そのローカルキャッシュ。
+
+取得は1つの HTTP セッションの接続プールを共有するスレッドプールで並列に行い、接続エラーと
+429/5xx の応答は指数的に間隔を空けて再試行する。取得した HTML は内容の SHA-256 をファイル名として
+(<cache_dir>/objects/<先頭2文字>/<SHA-256>.html) 保存し、URL から (SHA-256, ETag, Last-Modified, 取得時刻) への
+索引 (<cache_dir>/index.json) を持つ。キャッシュにある URL は If-None-Match / If-Modified-Since を付けて取得し、
+304 (変更なし) の場合はキャッシュの HTML を使う。
+
+リプレイモードではネットワークにアクセスせず、キャッシュの HTML だけを使う (解析処理のテストと計測用)。
+serve_cache はキャッシュの HTML を返すローカルのサーバーで、mirror に指定するとネットワークを使わずに
+取得処理全体を試せる。
+
+使い方 (リポジトリのルートで実行):
+    python -m app.utils.fetch serve --port 8765
+    python -m app.utils.get_player_data --year 2024 --mirror http://127.0.0.1:8765
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Tuple
+from urllib.parse import urlsplit
+
+# キャッシュの既定の場所 (リポジトリのルートからの相対パス)
+DEFAULT_CACHE_DIR = "./data/cache/html"
+INDEX_FILE = "index.json"
+# 同時に取得するページの数 (接続プールの大きさ)
+DEFAULT_WORKERS = 6
+# 再試行の回数と間隔 (backoff * 2 ** (回数 - 1) 秒)
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5
+# 1回の取得のタイムアウト (秒)
+DEFAULT_TIMEOUT = 30.0
+# 再試行する HTTP のステータス
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+USER_AGENT = "npb-game-simulator/0.1"
+
+
+class CacheMissError(LookupError):
+    """リプレイモードで、URL の HTML がキャッシュにない。"""
+
+
+class HtmlCache:
+    """
+    URL ごとの HTML の内容アドレスのキャッシュ。同じ内容の HTML は1つのファイルを共有する。
+    索引の更新はスレッドセーフで、メモリ上で行う。索引のファイルへの書き込みは save で行う。
+    """
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self.index: Dict[str, Dict] = {}
+        self._dirty = False
+        try:
+            with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.html")
+
+    def get(self, url: str) -> Tuple[Dict, bytes] | None:
+        """(索引の項目, HTML) を返す。ない場合や HTML のファイルが壊れている場合は None。"""
+        entry = self.index.get(url)
+        if entry is None:
+            return None
+        try:
+            with open(self.object_path(entry["sha256"]), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            return None
+        return entry, body
+
+    def put(self, url: str, body: bytes, etag: str | None = None, last_modified: str | None = None) -> str:
+        """HTML を保存して索引 (メモリ上) を更新し、内容の SHA-256 を返す。"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(body)
+            os.replace(temporary, path)
+        with self._lock:
+            self.index[url] = {"sha256": digest, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}
+            self._dirty = True
+        return digest
+
+    def touch(self, url: str):
+        """変更がなかった (304) URL の取得時刻 (メモリ上の索引) を更新する。"""
+        with self._lock:
+            self.index[url]["fetched_at"] = time.time()
+            self._dirty = True
+
+    def save(self):
+        """索引に変更があれば、ファイルに書き込む (一時ファイルに書いてから置き換える)。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, INDEX_FILE)
+            temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(self.index, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(temporary, path)
+            self._dirty = False
+
+
+class HtmlFetcher:
+    """
+    HTML の取得。同じ URL は1つの HtmlFetcher につき1回だけ取得する (2回目以降はメモリから返す)。
+    キャッシュの索引のファイルは fetch では1回ごとに、fetch_all ではすべての取得の後に1回だけ書き込む。
+    """
+    def __init__(self, cache_dir: str | None = DEFAULT_CACHE_DIR, replay: bool = False, max_workers: int = DEFAULT_WORKERS,
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                 max_age: float = 0.0, mirror: str | None = None):
+        """
+        Args:
+            cache_dir (str | None): キャッシュの場所。None の場合はキャッシュを使わない。
+            replay (bool): True の場合はネットワークにアクセスせず、キャッシュの HTML だけを使う。
+            max_workers (int): fetch_all で同時に取得するページの数 (接続プールの大きさ)。
+            retries (int): 接続エラーと RETRY_STATUSES の応答を再試行する回数。
+            backoff (float): 再試行の間隔の基準 (秒)。
+            timeout (float): 1回の取得のタイムアウト (秒)。
+            max_age (float): キャッシュの HTML をサーバーに確認せずに使う期間 (秒)。0 の場合は常に確認する。
+            mirror (str | None): 指定した場合、https://<host>/<path> の代わりに <mirror>/<host>/<path> から取得する
+                (serve_cache のサーバー)。キャッシュのキーは元の URL のまま。
+        """
+        if replay and cache_dir is None:
+            raise ValueError("Replay mode requires a cache directory")
+        self.cache = HtmlCache(cache_dir) if cache_dir is not None else None
+        self.replay = replay
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.max_age = max_age
+        self.mirror = mirror.rstrip("/") if mirror else None
+        self.downloads = 0
+        self.not_modified = 0
+        self.cache_hits = 0
+        self._fetched: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        """接続プールと再試行の設定をした requests のセッション (最初に使うときに作る)。"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(total=self.retries, connect=self.retries, read=self.retries, status=self.retries,
+                          backoff_factor=self.backoff, status_forcelist=RETRY_STATUSES, allowed_methods=frozenset(["GET"]),
+                          respect_retry_after_header=True, raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            self._session = session
+        return self._session
+
+    def _request_url(self, url: str) -> str:
+        if self.mirror is None:
+            return url
+        parts = urlsplit(url)
+        return f"{self.mirror}/{parts.netloc}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+    def fetch(self, url: str) -> bytes:
+        """
+        URL の HTML (バイト列) を返し、キャッシュの索引を保存する。
+
+        Raises:
+            CacheMissError: リプレイモードで、URL の HTML がキャッシュにない場合。
+            requests.HTTPError: 再試行しても取得できなかった場合。
+        """
+        try:
+            return self._fetch(url)
+        finally:
+            if self.cache is not None:
+                self.cache.save()
+
+    def _fetch(self, url: str) -> bytes:
+        """fetch の本体 (キャッシュの索引はメモリ上で更新し、保存しない)。"""
+        with self._lock:
+            if url in self._fetched:
+                return self._fetched[url]
+        cached = self.cache.get(url) if self.cache is not None else None
+        if self.replay:
+            if cached is None:
+                raise CacheMissError(url)
+            body, counter = cached[1], "cache_hits"
+        elif cached is not None and self.max_age > 0 and time.time() - cached[0]["fetched_at"] < self.max_age:
+            body, counter = cached[1], "cache_hits"
+        else:
+            headers = {}
+            if cached is not None:
+                if cached[0].get("etag"):
+                    headers["If-None-Match"] = cached[0]["etag"]
+                if cached[0].get("last_modified"):
+                    headers["If-Modified-Since"] = cached[0]["last_modified"]
+            response = self.session.get(self._request_url(url), headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached is not None:
+                body, counter = cached[1], "not_modified"
+                self.cache.touch(url)
+            else:
+                response.raise_for_status()
+                body, counter = response.content, "downloads"
+                if self.cache is not None:
+                    self.cache.put(url, body, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        with self._lock:
+            self._fetched[url] = body
+            setattr(self, counter, getattr(self, counter) + 1)
+        return body
+
+    def fetch_all(self, urls: Iterable[str]) -> Dict[str, bytes]:
+        """
+        URL の HTML を max_workers 件ずつ並列に取得し、最後にキャッシュの索引を1回だけ保存する。
+
+        Returns:
+            Dict[str, bytes]: URL から HTML への辞書。取得できなかった URL は含めない (エラーを表示する)。
+        """
+        urls = list(dict.fromkeys(urls))
+
+        def fetch_or_none(url: str) -> bytes | None:
+            try:
+                return self._fetch(url)
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+                return None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                bodies = list(executor.map(fetch_or_none, urls))
+        finally:
+            if self.cache is not None:
+                self.cache.save()
+        return {url: body for url, body in zip(urls, bodies) if body is not None}
+
+    def summary(self) -> str:
+        return f"ダウンロード {self.downloads} 件 / 変更なし (304) {self.not_modified} 件 / キャッシュ {self.cache_hits} 件"
+
+
+_default_fetcher: HtmlFetcher | None = None
+
+
+def get_html_fetcher() -> HtmlFetcher:
+    """スクレイピングの関数が既定で使う HtmlFetcher。configure_html_fetcher を呼ぶまでは既定の設定を使う。"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = HtmlFetcher()
+    return _default_fetcher
+
+
+def configure_html_fetcher(**options) -> HtmlFetcher:
+    """既定の HtmlFetcher を options (HtmlFetcher の引数) で作り直して返す。"""
+    global _default_fetcher
+    _default_fetcher = HtmlFetcher(**options)
+    return _default_fetcher
+
+
+def add_fetch_arguments(parser: argparse.ArgumentParser):
+    """スクレイピングのコマンドに共通の引数を加える。"""
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="取得した HTML のキャッシュの場所")
+    parser.add_argument("--replay", action="store_true", help="ネットワークにアクセスせず、キャッシュの HTML だけを使う")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同時に取得するページの数")
+    parser.add_argument("--max-age", type=float, default=0.0, help="キャッシュの HTML をサーバーに確認せずに使う期間 (秒)")
+    parser.add_argument("--mirror", default=None, help="serve_cache のサーバーの URL (例: http://127.0.0.1:8765)")
+
+
+def fetcher_from_arguments(args: argparse.Namespace) -> HtmlFetcher:
+    """add_fetch_arguments の引数で既定の HtmlFetcher を設定して返す。"""
+    return configure_html_fetcher(cache_dir=args.cache_dir, replay=args.replay, max_workers=args.workers,
+                                  max_age=args.max_age, mirror=args.mirror)
+
+
+def serve_cache(cache_dir: str = DEFAULT_CACHE_DIR, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    キャッシュの HTML を /<host>/<path> で返すローカルのサーバーを作る (serve_forever は呼び出し側で実行する)。
+    ETag は内容の SHA-256 で、If-None-Match が一致する場合は 304 を返す。
+    """
+    cache = HtmlCache(cache_dir)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.lstrip("/")
+            cached = None
+            for scheme in ("https", "http"):
+                cached = cache.get(f"{scheme}://{path}")
+                if cached is not None:
+                    break
+            if cached is None:
+                self.send_error(404)
+                return
+            etag = f'"{cached[0]["sha256"]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(cached[1])))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(cached[1])
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="スクレイピングの HTML のキャッシュ")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="キャッシュの HTML を返すローカルのサーバーを起動する")
+    serve_parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    subparsers.add_parser("list", help="キャッシュにある URL を表示する").add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for url, entry in sorted(HtmlCache(args.cache_dir).index.items()):
+            print(f"{entry['sha256'][:12]}  {url}")
+        return 0
+    server = serve_cache(args.cache_dir, args.host, args.port)
+    print(f"http://{args.host}:{server.server_address[1]} でキャッシュの HTML を返します (Ctrl+C で終了)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
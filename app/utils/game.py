@@ -2,25 +2,62 @@
 
 import numpy as np
 from collections import deque
+from functools import lru_cache
 from typing import List, Tuple, Any
 
-from .constants import EVENT_CONFIG, EVENT_TYPES, BUNT_ATTEMPT_FACTOR, SACRIFICE_BUNT_SUCCESS_RATE, DOUBLE_PLAY_PROBABILITY, GROUND_OUT_ADVANCE_PROBABILITY, SACRIFICE_FLY_PROBABILITY
+from .constants import EVENT_CONFIG, EVENT_TYPES, OUTCOME_TYPES, BUNT_ATTEMPT_FACTOR, SACRIFICE_BUNT_SUCCESS_RATE, DOUBLE_PLAY_PROBABILITY, GROUND_OUT_ADVANCE_PROBABILITY, SACRIFICE_FLY_PROBABILITY
+from .game_log import GameLog, LOG_MODES
 from .player import Player
+from .sampling import SeedLike, UniformBuffer, as_generator
+from .stats import StatsMatrix
+from .transitions import (
+    SCALAR_TRANSITIONS, SCALAR_EXTRA_SECOND_NEEDED, SCALAR_EXTRA_FIRST_NEEDED, EXTRA_SECOND_BIT, EXTRA_FIRST_BIT,
+    EXTRA_BASE_KIND, OUTCOME_CODES, NUM_OUTCOMES, extra_base_probabilities
+)
+
+# 1試合分として最初に用意する一様乱数の数 (不足した場合は自動的に補充される)
+UNIFORM_BUFFER_SIZE = 256
+
+@lru_cache(maxsize=None)
+def _extra_base_table(speed) -> List[List[float]]:
+    """Speed ごとの追加進塁の確率表 [種類][アウト数]。一度計算した Speed は再利用する。"""
+    return extra_base_probabilities(speed).tolist()
 
 class BaseballGame:
     """野球の試合をシミュレートするクラス。"""
-    def __init__(self, players: List[Player]):
+    def __init__(self, players: List[Player], log_mode: str = "full"):
         """
         Args:
             players (List[Player]): 試合に出場する選手のリスト。打順もこのリスト順に従う。
+            log_mode (str): 打席結果の記録方法 (LOG_MODES)。simulate_game で上書きできる。
         """
         self.players = players # 初期打順
         self.current_lineup: deque[Player] = deque()
         self.score = 0
         self.bases: List[Player | None] = [None, None, None]  # [一塁, 二塁, 三塁] 各塁にいるPlayerオブジェクト、またはNone
         self.outs = 0
-        self.game_log: List[List[Tuple[str, str, int]]] = [] # イニングごとの (選手名, 結果, 打点) のログ
-        
+        self.log_mode = log_mode
+        self.game_log: GameLog | List[int] | None = self._new_log() # log_mode に応じた試合のログ
+        self._uniforms: UniformBuffer | None = None # 試合中に使う一様乱数のバッファ
+        self._stats: StatsMatrix | None = None # 試合中に選手の成績を集計する行列
+        self._events: Tuple[List[int], List[int], List[int]] = ([], [], []) # 集計前の (打席のコード, 打点の行番号, 打点)
+
+    def _new_log(self) -> GameLog | List[int] | None:
+        """log_mode に応じた空のログを作る。"""
+        if self.log_mode == "full":
+            # 打者の番号は StatsMatrix の行番号 (重複を除いた出場順) と同じ
+            return GameLog([p.name for p in {id(p): p for p in self.players}.values()])
+        if self.log_mode == "summary":
+            return []
+        if self.log_mode == "none":
+            return None
+        raise ValueError(f"Unknown log_mode: {self.log_mode}")
+
+    def _rand(self) -> float:
+        """一様乱数を1つ返す。試合中は事前に生成したバッファから取り出す。"""
+        if self._uniforms is not None:
+            return self._uniforms.next()
+        return np.random.rand()
 
     def _reset_inning_state(self):
         """イニング開始時に状態をリセットする。"""
@@ -40,254 +77,163 @@ class BaseballGame:
         # ここではPlayerオブジェクトからOut_ratioを取得するように修正
         out_ratio = player_stats.probabilities[EVENT_TYPES.index("strikeout")] + player_stats.probabilities[EVENT_TYPES.index("ground_out")] + player_stats.probabilities[EVENT_TYPES.index("fly_out")]
         bunt_probability = out_ratio * BUNT_ATTEMPT_FACTOR # 係数は調整可能
-        return np.random.rand() < bunt_probability
+        return self._rand() < bunt_probability
 
     def simulate_bunt(self):
         """犠打の成否をシミュレートする"""
         # 成功率は固定値 (例: 80%)
-        return 'sacrifice_bunt' if np.random.rand() < SACRIFICE_BUNT_SUCCESS_RATE else 'bunt_fail'
+        return 'sacrifice_bunt' if self._rand() < SACRIFICE_BUNT_SUCCESS_RATE else 'bunt_fail'
 
     
 
     def should_advance_extra_base(self, runner: Player, current_base_index: int, event_type: str)->bool:
         """
         ランナーが追加の塁に進むべきかを判定するヘルパー関数。
+        確率は走者の Speed とアウトカウントから事前に計算した表を引く。
         """
-        # ベース確率 (仮の値、調整が必要)
-        base_prob = 0.0 # デフォルトは進まない
-
-        if event_type == "single":
-            if current_base_index == 0: # 一塁走者が3塁へ
-                base_prob = 0.1
-            elif current_base_index == 1: # 二塁走者が本塁へ
-                base_prob = 0.1 # シングルヒットで二塁から本塁へ
-            
-        elif event_type == "double":
-            if current_base_index == 0: # 一塁走者が本塁へ
-                base_prob = 0.1
-        
-        # Speedによる調整 (仮の値、調整が必要)
-        # Speedが正の値なら確率増加、負の値なら確率減少
-        speed_factor = 0.02 # Speed 1につき2%変化
-        adjusted_prob = base_prob + (runner.speed * speed_factor)
-
-        # アウトカウントによる調整 (仮の値、調整が必要)
-        if self.outs == 0:
-            adjusted_prob *= 0.9 # 0アウトではやや慎重
-        elif self.outs == 2:
-            adjusted_prob *= 1.1 # 2アウトでは積極的に
-
-        # 確率のクランプ
-        adjusted_prob = max(0.0, min(1.0, adjusted_prob))
-
-        return np.random.rand() < adjusted_prob
+        kind = EXTRA_BASE_KIND[OUTCOME_CODES[event_type]][current_base_index]
+        if kind is None:
+            return False # 追加進塁の判定がないプレーでは進まない
+        adjusted_prob = _extra_base_table(runner.speed)[kind][min(self.outs, 2)]
+        return self._rand() < adjusted_prob
 
+    def _apply_transition(self, batter: Player, outcome: int) -> int:
+        """
+        遷移表を引いて塁上の走者とアウト数を更新し、このプレーの得点を返す。
 
+        Args:
+            batter (Player): 打者オブジェクト。
+            outcome (int): 打席の最終結果のコード (OUTCOME_TYPES のインデックス)。
+        """
+        bases = self.bases
+        mask = (bases[0] is not None) | (bases[1] is not None) << 1 | (bases[2] is not None) << 2
+        bits = 0
+        # 追加進塁は判定が必要な走者についてのみ、二塁走者 → 一塁走者の順に判定する
+        if SCALAR_EXTRA_SECOND_NEEDED[mask][outcome] and self.should_advance_extra_base(bases[1], 1, OUTCOME_TYPES[outcome]):
+            bits |= EXTRA_SECOND_BIT
+        if SCALAR_EXTRA_FIRST_NEEDED[mask][outcome][bits] and self.should_advance_extra_base(bases[0], 0, OUTCOME_TYPES[outcome]):
+            bits |= EXTRA_FIRST_BIT
+
+        runs, outs_added, (first, second, third) = SCALAR_TRANSITIONS[mask][self.outs][outcome][bits]
+        # 出どころ EMPTY (-1) は末尾の None を指す
+        runners = (bases[0], bases[1], bases[2], batter, None)
+        self.bases = [runners[first], runners[second], runners[third]]
+        self.outs += outs_added
+        return runs
 
     def advance_runners(self, batter: Player, event_type: str) -> int:
         """
-        走者を進塁させ、得点を計算する。
+        走者を進塁させ、得点を計算する。アウト数は変更しない。
         Args:
             batter (Player): 打者オブジェクト。
             event_type (str): 打席結果のイベントタイプ。
         Returns:
             int: このプレーで発生した得点。
         """
-        runs_scored = 0
-        new_bases: List[Player | None] = [None, None, None] # 新しい塁の状態
-
-        # 走者の移動を処理
-        # 三塁走者から順に処理することで、進塁による衝突を防ぐ
-        # 四死球の場合の特殊処理
-        if event_type == "walk":
-            if self.bases[2] is not None:
-                if self.bases[1] is not None: 
-                    if self.bases[0] is not None:# 満塁
-                        runs_scored += 1
-                        new_bases[2] = self.bases[1]
-                        new_bases[1] = self.bases[0]
-                    # 2,3塁はそのまま
-                elif self.bases[0] is not None:# 1,3塁
-                    new_bases[1] = self.bases[0]
-
-            else:
-                if self.bases[1] is not None:
-                    if self.bases[0] is not None:# 1,2塁
-                        new_bases[2] = self.bases[1]
-                        new_bases[1] = self.bases[0]
-                        
-                else:
-                    if self.bases[0] is not None:#1塁
-                        new_bases[1] = self.bases[0]
-                        
-            new_bases[0] = batter # 打者が一塁へ
-
-        elif event_type == "sacrifice_bunt" or event_type == "ground_out_advance" or event_type == "sacrifice_fly":
-            # 犠打成功または進塁打または犠飛の場合、ランナーを進める
-            if self.bases[2] is not None: # 三塁ランナーはホームへ
-                runs_scored += 1
-            new_bases[2] = self.bases[1] # 二塁ランナーは三塁へ
-            new_bases[1] = self.bases[0] # 一塁ランナーは二塁へ
-            # 打者はアウトなので塁には残らない
-
-        elif event_type == "homerun":
-            runs_scored += 1 # 打者自身の得点
-            # 塁上の走者も全て本塁生還
-            for i in range(3):
-                if self.bases[i] is not None:
-                    runs_scored += 1
-            new_bases = [None, None, None]  # 全ての走者が帰還するため塁は空になる
-            return runs_scored  # この分岐では早期リターン
-
-        elif event_type == '3B':
-            # All runners score
-            for i in range(0, 3):
-                if self.bases[i] is not None:
-                    runs_scored += 1
-                    self.bases[i] = None
-            # Batter to 3rd
-            new_bases[2] = batter
-        
-        elif event_type == '2B':
-            # 3rd, 2nd base runners score
-            if self.bases[2] is not None: 
-                runs_scored += 1
-                self.bases[2] = None
-                new_bases[2] = None
-            if self.bases[1] is not None: 
-                runs_scored += 1
-                self.bases[1] = None
-                new_bases[1] = None
-            # 1st base runner
-            if self.bases[0]is not None:
-                if self.should_advance_extra_base(self.bases[0], 0, event_type):
-                    runs_scored += 1
-                else:
-                    new_bases[2] = self.bases[0]
-                new_bases[0] = None
-            # Batter to 2nd
-            new_bases[1] = batter
-
-        else:
-            # 3rd base runners score
-            if self.bases[2] is not None: 
-                runs_scored += 1
-                self.bases[2] = None
-                new_bases[2] = None
-            if self.bases[1] is not None:
-                if self.should_advance_extra_base(self.bases[1], 1, event_type):
-                    runs_scored += 1
-                    self.bases[1] = None
-                    new_bases[1] = None
-                else:
-                    new_bases[2] = self.bases[1]
-            
-            if self.bases[0] is not None:
-                if new_bases[2] is None and self.should_advance_extra_base(self.bases[0], 0, event_type):
-                    new_bases[2] = self.bases[0]
-                else:
-                    new_bases[1] = self.bases[0]
-                new_bases[0] = None
-            # Batter to 1st
-            new_bases[0] = batter
-                
-            
-        self.bases = new_bases
-        
-        return runs_scored
+        outs = self.outs
+        self.outs = min(outs, 2)
+        runs = self._apply_transition(batter, OUTCOME_CODES[event_type])
+        self.outs = outs
+        return runs
 
     def play_inning(self):
         """1イニング分の攻撃をシミュレートする。"""
         self._reset_inning_state()
-        inning_log: List[Tuple[str, str, int]] = [] 
+        score_at_start = self.score
+        game_log = self.game_log
+        full_log = self.log_mode == "full"
+        if full_log:
+            game_log.start_inning()
 
         if not self.current_lineup: # 初回または新しい試合
             self.current_lineup = deque(self.players)
 
+        in_game = self._stats is not None
+        if not in_game: # play_inning を単独で呼び出した場合はこのイニングの分だけ集計する
+            self._stats = StatsMatrix(self.players)
+        # 打席ごとに (行番号 * NUM_OUTCOMES + 打席結果のコード) を記録し、試合 (イニング) の最後にまとめて成績に加算する
+        row_of = self._stats.row_of
+        event_codes, rbi_rows, rbi_runs = self._events
 
         while self.outs < 3:
             if not self.current_lineup: # 万が一のため (通常は起こらない)
                 break 
             
             current_player = self.current_lineup.popleft()
-            runs = 0 # Initialize runs for this plate appearance
 
             # 犠打の試行判定
             if self.should_attempt_bunt(current_player, self.outs, self.bases):
-                current_player.stats["plate_appearances"] += 1 # 犠打は打席数にカウント
-                event_type = self.simulate_bunt()
-                if event_type == "sacrifice_bunt":
-                    self.outs += 1
-                    runs = self.advance_runners(current_player, event_type) # Advance runners for sacrifice bunt
-                    self.score += runs
-                    current_player.stats["runs_batted_in"] += runs
-                    current_player.stats["sacrifice_bunts"] += 1
-                else: # bunt_fail
-                    self.outs += 1
-                    current_player.stats["bunt_fails"] += 1
+                event_type = self.simulate_bunt() # sacrifice_bunt または bunt_fail
             else:
-                # 通常の打席シミュレーション
-                event_type, _ = current_player.simulate_at_bat() # bases_to_advance is handled by advance_runners
+                # 通常の打席シミュレーション (成績は最終結果で集計するためここでは記録しない)
+                event_type, _ = current_player.simulate_at_bat(self._rand(), record=False)
                 
                 if event_type == "ground_out":
                     # 併殺打の判定 (1塁にランナーがいる場合)
-                    if self.bases[0] is not None and self.outs < 2 and np.random.rand() < DOUBLE_PLAY_PROBABILITY: # 併殺確率0.4 (仮)
+                    if self.bases[0] is not None and self.outs < 2 and self._rand() < DOUBLE_PLAY_PROBABILITY: # 併殺確率0.4 (仮)
                         event_type = "double_play"
-                        self.outs += 2 # Double play is 2 outs
-                        if self.bases[0] is not None: # Runner on first is out
-                            self.bases[0] = None
-                        current_player.stats["double_plays"] += 1
                     # 進塁打の判定 (併殺打にならず、ランナーが進塁可能な場合)
-                    elif any(self.bases) and np.random.rand() < GROUND_OUT_ADVANCE_PROBABILITY: # 進塁打確率0.3 (仮)
+                    elif any(self.bases) and self._rand() < GROUND_OUT_ADVANCE_PROBABILITY: # 進塁打確率0.3 (仮)
                         event_type = "ground_out_advance"
-                        self.outs += 1
-                        runs = self.advance_runners(current_player, event_type) # Advance runners for ground_out_advance
-                        self.score += runs
-                        current_player.stats["runs_batted_in"] += runs
-                        current_player.stats["ground_out_advances"] += 1
-                    else: # Regular ground out
-                        self.outs += 1
-                elif event_type == "strikeout": # Other outs
-                    self.outs += 1
-                    current_player.stats["strikeouts"] += 1
-                elif event_type == "fly_out": # Other outs
+                elif event_type == "fly_out":
                     # 犠飛の判定 (3塁にランナーがいる場合)
-                    if self.bases[2] is not None and self.outs < 2 and np.random.rand() < SACRIFICE_FLY_PROBABILITY: # 犠飛確率0.5 (仮)
+                    if self.bases[2] is not None and self.outs < 2 and self._rand() < SACRIFICE_FLY_PROBABILITY: # 犠飛確率0.5 (仮)
                         event_type = "sacrifice_fly"
-                        self.outs += 1
-                        runs = self.advance_runners(current_player, event_type) # Advance runners for sacrifice fly
-                        self.score += runs
-                        current_player.stats["runs_batted_in"] += runs
-                        current_player.stats["sacrifice_flies"] += 1
-                        current_player.stats["at_bats"] -= 1 # 犠飛は打数にカウントしない
-                    else:
-                        self.outs += 1
-                else: # Not an out (single, double, triple, homerun, walk)
-                    runs = self.advance_runners(current_player, event_type)
-                    self.score += runs
-                    current_player.stats["runs_batted_in"] += runs
 
-            inning_log.append((current_player.name, event_type, runs))
+            # 走者・アウト数・得点の更新は遷移表で行う
+            outcome = OUTCOME_CODES[event_type]
+            runs = self._apply_transition(current_player, outcome)
+            self.score += runs
+
+            row = row_of[id(current_player)]
+            event_codes.append(row * NUM_OUTCOMES + outcome)
+            if runs:
+                rbi_rows.append(row)
+                rbi_runs.append(runs)
+            if full_log:
+                game_log.append(row, outcome, runs)
 
             
             self.current_lineup.append(current_player) # 打順の最後に再度追加
 
-        self.game_log.append(inning_log)
+        if self.log_mode == "summary":
+            game_log.append(self.score - score_at_start)
+        if not in_game:
+            self._flush_stats()
+            self._stats = None
+
+    def _flush_stats(self):
+        """記録した打席結果をまとめて選手の成績に加算する。"""
+        event_codes, rbi_rows, rbi_runs = self._events
+        if event_codes:
+            self._stats.add_event_codes(event_codes, rbi_rows, rbi_runs)
+        self._events = ([], [], [])
 
-    def simulate_game(self, num_innings: int = 9) -> Tuple[int, List[List[Tuple[str, str, int]]]]:
+    def simulate_game(self, num_innings: int = 9, rng: SeedLike = None, log_mode: str | None = None) -> Tuple[int, GameLog | List[int] | None]:
         """
         指定されたイニング数の試合をシミュレートする。
 
         Args:
             num_innings (int): 試合のイニング数。デフォルトは9。
+            rng (SeedLike): 乱数生成器またはシード。None の場合は np.random のグローバルな乱数を使う。
+            log_mode (str | None): "none" はログを記録しない。"summary" はイニングごとの得点のリスト、
+                "full" は全打席の結果 (GameLog) を記録する。None の場合はコンストラクタの指定に従う。
 
         Returns:
-            Tuple[int, List[List[Tuple[str, str]]]]: (最終スコア, ゲームログ)
+            Tuple[int, GameLog | List[int] | None]: (最終スコア, ゲームログ)
         """
+        if log_mode is not None:
+            if log_mode not in LOG_MODES:
+                raise ValueError(f"Unknown log_mode: {log_mode}")
+            self.log_mode = log_mode
         self.score = 0
-        self.game_log = []
+        self.game_log = self._new_log()
         # 各試合開始時に打順をセット
         self.current_lineup = deque(self.players) 
+        # 試合で使う一様乱数をまとめて生成しておく
+        source = None if rng is None else as_generator(rng).random
+        self._uniforms = UniformBuffer(UNIFORM_BUFFER_SIZE, source)
+        self._stats = StatsMatrix(self.players)
 
         for _ in range(num_innings):
             self.play_inning()
@@ -295,5 +241,8 @@ class BaseballGame:
         # simulate_gameの最後にoutsとbasesをリセット
         self.outs = 0
         self.bases = [None, None, None]
+        self._uniforms = None
+        self._flush_stats()
+        self._stats = None
 
         return self.score, self.game_log
\ No newline at end of file
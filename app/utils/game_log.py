@@ -0,0 +1,106 @@
+# src/main/utils/game_log.py
+
+import numpy as np
+import pandas as pd
+from typing import Iterator, List, Sequence, Tuple
+
+from .constants import OUTCOME_TYPES
+
+# BaseballGame.simulate_game の log_mode
+# "none": 記録しない, "summary": イニングごとの得点のみ, "full": 全打席の結果
+LOG_MODES = ("none", "summary", "full")
+
+# 1試合分として最初に確保する打席数 (不足した場合は倍に広げる)
+INITIAL_CAPACITY = 128
+
+
+class GameLog:
+    """
+    1試合の打席結果を、事前に確保した uint8 の配列 (打席結果のコード・打者の番号・打点) に記録するログ。
+
+    選手名への変換は読み出すときにだけ行う。イニングごとの (選手名, 結果, 打点) のリストの
+    リストとしても扱えるため、従来の game_log と同じように len(log) や log[i] で読み出せる。
+    """
+    def __init__(self, names: Sequence[str], capacity: int = INITIAL_CAPACITY):
+        """
+        Args:
+            names (Sequence[str]): 打者の番号に対応する選手名。
+            capacity (int): 最初に確保する打席数。
+        """
+        self.names = list(names)
+        self.outcomes = np.zeros(capacity, dtype=np.uint8)
+        self.batters = np.zeros(capacity, dtype=np.uint8)
+        self.runs = np.zeros(capacity, dtype=np.uint8)
+        self.size = 0
+        self.inning_starts: List[int] = [] # 各イニングの最初の打席の位置
+
+    def start_inning(self):
+        """新しいイニングの記録を始める。"""
+        self.inning_starts.append(self.size)
+
+    def append(self, batter: int, outcome: int, runs: int):
+        """1打席分の結果を記録する。"""
+        size = self.size
+        if size == len(self.outcomes):
+            self._grow()
+        self.outcomes[size] = outcome
+        self.batters[size] = batter
+        self.runs[size] = runs
+        self.size = size + 1
+
+    def _grow(self):
+        capacity = 2 * len(self.outcomes)
+        for name in ("outcomes", "batters", "runs"):
+            values = np.zeros(capacity, dtype=np.uint8)
+            values[:self.size] = getattr(self, name)
+            setattr(self, name, values)
+
+    def inning_slice(self, inning: int) -> slice:
+        """inning 番目 (0始まり) のイニングの打席の範囲を返す。"""
+        stop = self.inning_starts[inning + 1] if inning + 1 < len(self.inning_starts) else self.size
+        return slice(self.inning_starts[inning], stop)
+
+    def inning_runs(self) -> List[int]:
+        """イニングごとの得点を返す。"""
+        return [int(self.runs[self.inning_slice(i)].sum()) for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return len(self.inning_starts)
+
+    def __getitem__(self, inning: int) -> List[Tuple[str, str, int]]:
+        if inning < 0:
+            inning += len(self)
+        if not 0 <= inning < len(self):
+            raise IndexError("inning out of range")
+        window = self.inning_slice(inning)
+        return [(self.names[b], OUTCOME_TYPES[o], r) for b, o, r in
+                zip(self.batters[window].tolist(), self.outcomes[window].tolist(), self.runs[window].tolist())]
+
+    def __iter__(self) -> Iterator[List[Tuple[str, str, int]]]:
+        return (self[i] for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, GameLog):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_frame(self, lineup_names: Sequence[str]) -> pd.DataFrame:
+        """
+        選手 × イニングの表に変換する。各マスは "結果(打点)" で、同じイニングの複数打席はカンマで区切る。
+
+        Args:
+            lineup_names (Sequence[str]): 表の行に並べる選手名 (打順)。
+        """
+        table = pd.DataFrame(index=list(lineup_names), columns=range(1, len(self) + 1))
+        for inning, inning_events in enumerate(self, start=1):
+            for player_name, result, rbi in inning_events:
+                event_text = f"{result}({rbi})" if rbi > 0 else result
+                if pd.isna(table.loc[player_name, inning]):
+                    table.loc[player_name, inning] = event_text
+                else:
+                    table.loc[player_name, inning] += f", {event_text}"
+        return table.fillna("-")
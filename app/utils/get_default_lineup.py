@@ -1,9 +1,12 @@
+import io
 import os
 import argparse
 import pandas as pd
 import numpy as np
 import random
 
+from .fetch import HtmlFetcher, add_fetch_arguments, fetcher_from_arguments, get_html_fetcher
+from .manifest import MANIFEST_FILE, DataManifest, combined_hash, content_hash
 
 
 def get_initial_players(df, default_lineups_df, year, team, team_abbreviations):
@@ -32,30 +35,43 @@ def get_initial_players(df, default_lineups_df, year, team, team_abbreviations):
         
     return initial_players[:9]
 
-def get_default_lineup(year: str, league: str, team_abbr: str):
-    """
-    指定された年度、リーグ、チームのデフォルトスタメン（各ポジション最多先発出場選手）を抽出する。
+# 起用情報の表の守備位置の列名と略称
+POSITION_MAP = {
+    '捕手': '捕',
+    '一塁': '一',
+    '二塁': '二',
+    '三塁': '三',
+    '遊撃': '遊',
+    '左翼': '左',
+    '中堅': '中',
+    '右翼': '右',
+    'ＤＨ': '指'
+}
+
+
+def position_starts_url(year: str, league: str, team_abbr: str) -> str:
+    """チームの起用情報のページの URL"""
+    if str(year) == "2025":
+        return f'https://nf3.sakura.ne.jp/{league}/{team_abbr}/t/kiyou.htm'
+    return f'https://nf3.sakura.ne.jp/{year}/{league}/{team_abbr}/t/kiyou.htm'
 
-    Args:
-        year (str): 年度 (例: "2024")
-        league (str): リーグ ("Pacific" または "Central")
-        team_abbr (str): チーム略称 (例: "M" for Marines)
+
+def read_position_starts_table(year: str, league: str, team_abbr: str, fetcher: HtmlFetcher | None = None) -> pd.DataFrame:
+    """
+    起用情報のページから、選手ごとの守備位置別の先発出場数の表を読み込む (HTML は fetcher のキャッシュを使う)。
 
     Returns:
-        dict: ポジション名をキー、選手名を値とする辞書。投手は含まない。
-              例: {'捕': '選手A', '一': '選手B', ...}
+        pd.DataFrame: '名前' と '<守備位置>_先発' (例: '捕手_先発') のカラムを持つ表。読み込めない場合は空の DataFrame。
     """
-    if year == "2025":
-        url = f'https://nf3.sakura.ne.jp/{league}/{team_abbr}/t/kiyou.htm'
-    else:
-        url = f'https://nf3.sakura.ne.jp/{year}/{league}/{team_abbr}/t/kiyou.htm'
+    fetcher = fetcher or get_html_fetcher()
+    url = position_starts_url(year, league, team_abbr)
     try:
         # header=[0, 1] で2行をヘッダーとして読み込む
-        tables = pd.read_html(url, header=[0, 1])
+        tables = pd.read_html(io.BytesIO(fetcher.fetch(url)), header=[0, 1])
         df = tables[1] # 2番目のテーブルが起用情報
     except Exception as e:
         print(f"Error reading HTML from {url}: {e}")
-        return {}
+        return pd.DataFrame()
 
     # カラム名の整形
     # MultiIndexのカラム名を結合して扱いやすくする
@@ -72,10 +88,6 @@ def get_default_lineup(year: str, league: str, team_abbr: str):
             new_columns.append(col)
     df.columns = new_columns
 
-    # デバッグプリントを削除
-    # print("--- DataFrame Columns after processing ---")
-    # print(df.columns)
-
     # 不要なカラムを削除 (背番、守備、試合、途中、変更)
     # 選手名カラムは '名前'
     cols_to_drop = [col for col in df.columns if 
@@ -89,39 +101,65 @@ def get_default_lineup(year: str, league: str, team_abbr: str):
     # 選手名から<a>タグを除去
     df['名前'] = df['名前'].apply(lambda x: x.split('>')[1].split('<')[0] if '<a' in str(x) else x)
 
+    # '-' を 0 に変換し、先発出場数を数値型にする
+    for pos_jp in POSITION_MAP:
+        start_col = f'{pos_jp}_先発'
+        if start_col in df.columns:
+            df[start_col] = pd.to_numeric(df[start_col].replace('-', 0), errors='coerce').fillna(0).astype(int)
+    return df
+
+
+def get_position_starts(year: str, league: str, team_abbr: str, fetcher: HtmlFetcher | None = None) -> pd.DataFrame:
+    """
+    選手ごとの守備位置別の先発出場数 (先発出場がある守備位置のみ) を返す。
+
+    Returns:
+        pd.DataFrame: 'Player', 'Position' (略称), 'Starts' のカラムを持つ表。
+    """
+    df = read_position_starts_table(year, league, team_abbr, fetcher)
+    rows = []
+    for pos_jp, pos_abbr in POSITION_MAP.items():
+        start_col = f'{pos_jp}_先発'
+        if df.empty or start_col not in df.columns:
+            continue
+        for player_name, games_started in zip(df['名前'], df[start_col]):
+            if games_started > 0:
+                rows.append({"Player": player_name, "Position": pos_abbr, "Starts": int(games_started)})
+    return pd.DataFrame(rows, columns=["Player", "Position", "Starts"])
+
+
+def get_default_lineup(year: str, league: str, team_abbr: str, fetcher: HtmlFetcher | None = None):
+    """
+    指定された年度、リーグ、チームのデフォルトスタメン（各ポジション最多先発出場選手）を抽出する。
+
+    Args:
+        year (str): 年度 (例: "2024")
+        league (str): リーグ ("Pacific" または "Central")
+        team_abbr (str): チーム略称 (例: "M" for Marines)
+        fetcher (HtmlFetcher | None): HTML の取得に使う HtmlFetcher。None の場合は既定のもの。
+
+    Returns:
+        dict: ポジション名をキー、選手名を値とする辞書。投手は含まない。
+              例: {'捕': '選手A', '一': '選手B', ...}
+    """
+    df = read_position_starts_table(year, league, team_abbr, fetcher)
+    if df.empty:
+        return {}
+
     default_lineup = {}
     selected_players = set()
 
-    # ポジションの優先順位 (一般的な野球のポジション)
-    # 投手(P)は含めない
-    # DHはパ・リーグのみ
-    position_map = {
-        '捕手': '捕',
-        '一塁': '一',
-        '二塁': '二',
-        '三塁': '三',
-        '遊撃': '遊',
-        '左翼': '左',
-        '中堅': '中',
-        '右翼': '右',
-        'ＤＨ': '指'
-    }
     # 守備位置の表示順
     display_order = ['捕', '一', '二', '三', '遊', '左', '中', '右', '指']
 
     # 各ポジションの最多先発出場選手を抽出
-    for pos_jp, pos_abbr in position_map.items():
+    for pos_jp, pos_abbr in POSITION_MAP.items():
         start_col = f'{pos_jp}_先発'
         if start_col not in df.columns:
             continue
 
-        # ポジションごとの選手と先発出場数を抽出
-        # '-' を 0 に変換し、数値型にする
-        df_pos_players = df[['名前', start_col]].copy()
-        df_pos_players[start_col] = pd.to_numeric(df_pos_players[start_col].replace('-', 0), errors='coerce').fillna(0).astype(int)
-        
-        # 先発出場数でソート
-        df_pos_players = df_pos_players.sort_values(by=start_col, ascending=False)
+        # ポジションごとの選手と先発出場数を抽出し、先発出場数でソート
+        df_pos_players = df[['名前', start_col]].sort_values(by=start_col, ascending=False)
 
         # 最多出場選手を抽出 (重複を避ける)
         for idx, row in df_pos_players.iterrows():
@@ -165,17 +203,33 @@ TEAM_ABBREVIATIONS = {
 # get_default_lineup が期待するリーグ名
 LEAGUE_MAP = {"Central": "Central", "Pacific": "Pacific"}
 
-def generate_and_save_default_lineups(year: str, output_dir: str = "./data/processed"):
+def generate_and_save_default_lineups(year: str, output_dir: str = "./data/processed", fetcher: HtmlFetcher | None = None,
+                                      manifest: DataManifest | None = None, force: bool = False):
     """
-    全球団のデフォルトスタメンを抽出し、CSVファイルとして保存する。
+    全球団のデフォルトスタメンと選手ごとの守備位置別の先発出場数を抽出し、CSVファイルとして保存する。
+    全球団の起用情報のページを先に並列に取得し、1ページにつき1回だけ取得する。
 
     Args:
         year (str): データを取得する年度。
         output_dir (str): CSVファイルを保存するディレクトリ。
+        fetcher (HtmlFetcher | None): HTML の取得に使う HtmlFetcher。None の場合は既定のもの。
+        manifest (DataManifest | None): 指定した場合、全球団のページの内容が前回と同じで CSV も前回書き込んだ内容のままなら
+            何もしない。force の場合は常に保存する。
     """
     all_lineups_data = []
+    all_position_starts = []
+    fetcher = fetcher or get_html_fetcher()
 
     print(f"Generating default lineups for {year}...")
+    urls = [position_starts_url(year, LEAGUE_MAP[info["league"]], info["abbr"]) for info in TEAM_ABBREVIATIONS.values()]
+    bodies = fetcher.fetch_all(urls)
+    outputs = [os.path.join(output_dir, f"default_lineups_{year}.csv"), os.path.join(output_dir, f"position_starts_{year}.csv")]
+    # 取得できなかったページがある場合は記録しない (次回は必ず作り直す)
+    input_hash = combined_hash([(url, content_hash(bodies[url])) for url in urls]) if len(bodies) == len(urls) else None
+    if manifest is not None and input_hash is not None and not force:
+        if manifest.is_current("lineups", f"{year}/lineups", input_hash, outputs):
+            print(f"Unchanged: default lineups for {year}")
+            return
 
     for team_name, info in TEAM_ABBREVIATIONS.items():
         team_abbr = info["abbr"]
@@ -184,7 +238,10 @@ def generate_and_save_default_lineups(year: str, output_dir: str = "./data/proce
         print(f"  Processing {team_name} ({league_type})...")
 
         # get_default_lineupのleague引数は "Pacific" or "Central" を期待
-        lineup = get_default_lineup(year=year, league=LEAGUE_MAP[league_type], team_abbr=team_abbr)
+        lineup = get_default_lineup(year=year, league=LEAGUE_MAP[league_type], team_abbr=team_abbr, fetcher=fetcher)
+        position_starts = get_position_starts(year=year, league=LEAGUE_MAP[league_type], team_abbr=team_abbr, fetcher=fetcher)
+        for _, row in position_starts.iterrows():
+            all_position_starts.append({"Year": year, "Team_Abbr": team_abbr, **row.to_dict()})
 
         if lineup:
             print(f"    Successfully retrieved lineup for {team_name}.")
@@ -214,9 +271,23 @@ def generate_and_save_default_lineups(year: str, output_dir: str = "./data/proce
     else:
         print("No lineup data generated.")
 
+    # 守備位置を考慮した打順の選手選び (roster) で使う、選手ごとの守備位置別の先発出場数
+    if all_position_starts:
+        output_file = os.path.join(output_dir, f"position_starts_{year}.csv")
+        os.makedirs(output_dir, exist_ok=True)
+        pd.DataFrame(all_position_starts)[["Year", "Team_Abbr", "Player", "Position", "Starts"]].to_csv(output_file, index=False)
+        print(f"Successfully saved position starts to {output_file}")
+
+    if manifest is not None and input_hash is not None:
+        manifest.record("lineups", f"{year}/lineups", input_hash, outputs)
+        manifest.save()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate default lineups for a specific year or a range of years.')
     parser.add_argument('--year', type=str, help='The year to generate lineups for.')
+    parser.add_argument('--output-dir', default="./data/processed")
+    parser.add_argument('--force', action='store_true', help='ページが変わっていない年度も保存し直す')
+    add_fetch_arguments(parser)
     args = parser.parse_args()
 
     if args.year:
@@ -224,5 +295,11 @@ if __name__ == "__main__":
     else:
         years_to_generate = [str(y) for y in range(2022, 2026)]
 
+    fetcher = fetcher_from_arguments(args)
+    # 全年度のページをまとめて並列に取得しておく
+    fetcher.fetch_all(position_starts_url(year, LEAGUE_MAP[info["league"]], info["abbr"])
+                      for year in years_to_generate for info in TEAM_ABBREVIATIONS.values())
+    manifest = DataManifest(os.path.join(args.output_dir, MANIFEST_FILE))
     for year in years_to_generate:
-        generate_and_save_default_lineups(year=year)
+        generate_and_save_default_lineups(year=year, output_dir=args.output_dir, fetcher=fetcher, manifest=manifest, force=args.force)
+    print(fetcher.summary())
@@ -1,19 +1,32 @@
+import io
 import os
 import argparse
-#import requests
-#import urllib  #HTMLにアクセス＆取得
-#from bs4 import BeautifulSoup #HTMLからデータ抽出
 import pandas as pd
-import numpy as np
+from typing import Dict, Sequence, Tuple
 
+from .fetch import HtmlFetcher, add_fetch_arguments, fetcher_from_arguments, get_html_fetcher
+from .manifest import DEFAULT_PROCESSED_DIR, MANIFEST_FILE, DataManifest, content_hash
 
-def scrape_player_data(team:str, year:str):
+TEAMS = ["g", "t", "c", "db", "s", "d", "f", "e", "m", "l", "b", "h"]
 
-    # URLを指定
-    url = f'https://npb.jp/bis/{year}/stats/idb1_{team}.html'
 
+def player_data_url(team: str, year: str) -> str:
+    """チームの打撃成績のページの URL"""
+    return f'https://npb.jp/bis/{year}/stats/idb1_{team}.html'
+
+
+def parse_player_table(html: bytes) -> pd.DataFrame:
+    """
+    打撃成績のページの HTML から選手ごとの成績の表を取り出す。
+
+    Args:
+        html (bytes): ページの HTML (文字コードは HTML の meta から判定する)。
+
+    Returns:
+        pd.DataFrame: data/raw/<year>/<team>.csv と同じ形式の表。
+    """
     # HTMLからテーブルを読み込む
-    tables = pd.read_html(url)
+    tables = pd.read_html(io.BytesIO(html))
 
     # 最初のテーブルを取得
     df = tables[0]
@@ -42,27 +55,71 @@ def scrape_player_data(team:str, year:str):
             pass
 
     df['選手'] = df['選手'].str.replace(r'\s+', '', regex=True)
+    return df
+
+
+def scrape_player_data(team:str, year:str, fetcher: HtmlFetcher | None = None, raw_dir: str = "./data/raw"):
+    """チームの打撃成績を取得して <raw_dir>/<year>/<team>.csv に保存する (HTML は fetcher のキャッシュを使う)"""
+    fetcher = fetcher or get_html_fetcher()
+    df = parse_player_table(fetcher.fetch(player_data_url(team, year)))
 
-    os.makedirs(f"./data/raw/{year}", exist_ok=True)
-    csv_path = f"./data/raw/{year}/{team}.csv"
+    os.makedirs(os.path.join(raw_dir, str(year)), exist_ok=True)
+    csv_path = os.path.join(raw_dir, str(year), f"{team}.csv")
     df.to_csv(csv_path,index=False)
 
     return df
 
+
+def scrape_all(years: Sequence[str], teams: Sequence[str] = TEAMS, fetcher: HtmlFetcher | None = None,
+               raw_dir: str = "./data/raw", manifest: DataManifest | None = None,
+               force: bool = False) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """
+    全年度・全チームのページを並列に取得してから、1チームずつ解析して保存する。
+    取得できなかったチームは飛ばす。
+
+    manifest を指定した場合、ページの内容のハッシュが前回と同じで CSV も前回書き込んだ内容のままのチームは
+    解析も保存もしない (CSV が変わらないため、data_process もそのチームを加工し直さない)。force の場合は常に保存する。
+
+    Returns:
+        Dict[Tuple[str, str], pd.DataFrame]: (年度, チーム) から保存した表への辞書。
+    """
+    fetcher = fetcher or get_html_fetcher()
+    keys = [(str(year), team) for year in years for team in teams]
+    bodies = fetcher.fetch_all(player_data_url(team, year) for year, team in keys)
+    results = {}
+    for year, team in keys:
+        body = bodies.get(player_data_url(team, year))
+        if body is None:
+            print(f"Skipping team: {team}, year: {year}")
+            continue
+        csv_path = os.path.join(raw_dir, year, f"{team}.csv")
+        if not force and manifest is not None and manifest.is_current("raw", f"{year}/{team}", content_hash(body), [csv_path]):
+            print(f"Unchanged: team: {team}, year: {year}")
+            continue
+        print(f"Scraping data for team: {team}, year: {year}")
+        results[(year, team)] = scrape_player_data(team, year, fetcher, raw_dir)
+        if manifest is not None:
+            manifest.record("raw", f"{year}/{team}", content_hash(body), [csv_path])
+    if manifest is not None:
+        manifest.save()
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Scrape player data for a specific year or a range of years.')
     parser.add_argument('--year', type=str, help='The year to scrape data for.')
+    parser.add_argument('--raw-dir', default="./data/raw")
+    parser.add_argument('--manifest', default=os.path.join(DEFAULT_PROCESSED_DIR, MANIFEST_FILE),
+                        help='入力と出力のハッシュの記録 (ページが変わっていないチームは保存しない)')
+    parser.add_argument('--force', action='store_true', help='ページが変わっていないチームも保存し直す')
+    add_fetch_arguments(parser)
     args = parser.parse_args()
 
-    team_list = ["g","t","c","db","s","d","f","e","m","l","b","h"]
-    
     if args.year:
         years_to_scrape = [args.year]
     else:
         years_to_scrape = ["2022", "2023", "2024"]
 
-    for year in years_to_scrape:
-        for team in team_list:
-            print(f"Scraping data for team: {team}, year: {year}")
-            scrape_player_data(team, year)
-    
+    fetcher = fetcher_from_arguments(args)
+    scrape_all(years_to_scrape, TEAMS, fetcher, args.raw_dir, DataManifest(args.manifest), args.force)
+    print(fetcher.summary())
@@ -0,0 +1,326 @@
+# src/main/utils/league.py
+"""
+12球団のスタメンによるリーグ全体のシーズン (143試合) の予測。
+
+各チームのイニングの得点の分布 (run_distribution で厳密に計算したもの) から、表と裏のイニングを
+1回ずつ引いて試合を進める。9回裏はホームチームがリードしていれば行わず、サヨナラの場合は勝ち越した時点で
+打ち切る。延長は12回までで、決着しない場合は引き分け。多数のシーズンの全試合を配列でまとめて進め、
+順位の分布・優勝確率・クライマックスシリーズの確率・得失点差を集計する。
+
+守備・投手の能力はモデルにないため、失点は対戦相手の打線の得点で決まる。
+
+使い方 (リポジトリのルートで実行):
+    python -m app.utils.league --year 2024 --seasons 1000
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import List, NamedTuple, Sequence, Tuple
+
+from .constants import PITCHER_STATS, PROB_COLS
+from .load_data import load_roster
+from .markov import lineup_arrays
+from .player import Player
+from .run_distribution import DEFAULT_INNING_RUN_CAP, inning_run_distribution
+from .sampling import AliasTable, SeedLike, alias_sample, as_generator
+
+LEAGUES = ("Central", "Pacific")
+# ホームチームのリーグで DH 制を使うか (交流戦もホームチームのリーグの規則に従う)
+LEAGUE_USES_DH = {"Central": False, "Pacific": True}
+# 同一リーグの各チームとの対戦数と、交流戦の各チームとの対戦数
+INTRALEAGUE_GAMES = 25
+INTERLEAGUE_GAMES = 3
+# 1試合の規定のイニング数と、延長を含めた最大のイニング数
+REGULATION_INNINGS = 9
+MAX_INNINGS = 12
+# クライマックスシリーズ (ファーストステージ: 2位と3位が3試合、ファイナルステージ: 1位に1勝のアドバンテージで6試合)
+FIRST_STAGE_GAMES = 3
+FINAL_STAGE_GAMES = 6
+# 一度にまとめてシミュレートするシーズン数
+LEAGUE_BATCH_SEASONS = 256
+
+
+class LeagueTeam(NamedTuple):
+    """リーグのチームとその打順。"""
+    abbr: str                   # チームの略称 (data/processed/<year>/<abbr>.csv)
+    name: str                   # チーム名
+    league: str                 # "Central" か "Pacific"
+    dh_lineup: List[Player]     # DH 制の試合の打順
+    pitcher_lineup: List[Player]  # DH 制でない試合の打順 (9番が投手)
+
+
+class LeagueProjection(NamedTuple):
+    """リーグのシーズンのシミュレーション結果。(シーズン数, チーム数) の配列はチームの順が teams と同じ。"""
+    teams: List[LeagueTeam]
+    wins: np.ndarray            # (シーズン数, チーム数) 勝利数
+    losses: np.ndarray          # 敗戦数
+    ties: np.ndarray            # 引き分け数
+    runs_scored: np.ndarray     # 得点
+    runs_allowed: np.ndarray    # 失点
+    league_rank: np.ndarray     # リーグ内の順位 (1始まり)
+    climax_winner: np.ndarray   # (シーズン数, チーム数) クライマックスシリーズを勝ち抜いた (日本シリーズに進出した) か
+
+
+def pitcher_player() -> Player:
+    """DH 制でない試合で9番に入る投手 (PITCHER_STATS の仮の成績)。"""
+    return Player(PITCHER_STATS["Player"], [PITCHER_STATS[column] for column in PROB_COLS], speed=PITCHER_STATS["Speed"])
+
+
+def load_league(year: int, base_path: str = "./data/processed") -> List[LeagueTeam]:
+    """
+    default_lineups_<year>.csv のチームの順に、各チームのスタメン (load_roster) から DH 制あり・なしの打順を作る。
+    DH 制なしの打順は、スタメンから指名打者を除いた8人の後に投手を置く。
+    """
+    defaults = pd.read_csv(os.path.join(base_path, f"default_lineups_{year}.csv"))
+    teams = []
+    for (league, name, abbr), rows in defaults.groupby(["League", "Team", "Team_Abbr"], sort=False):
+        if league not in LEAGUES:
+            raise ValueError(f"Unknown league: {league}")
+        lineup, _ = load_roster(year, abbr.lower(), base_path)
+        designated = set(rows.loc[rows["Position"] == "指", "Player"])
+        fielders = [player for player in lineup if player.name not in designated][:8]
+        teams.append(LeagueTeam(abbr.lower(), name, league, lineup, fielders + [pitcher_player()]))
+    return teams
+
+
+def league_schedule(leagues: Sequence[str], year: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    1シーズンの全試合の (ホームチーム, ビジターチーム) の番号を返す。
+
+    同一リーグの各チームと INTRALEAGUE_GAMES 試合 (ホームは12試合か13試合)、他リーグの各チームと
+    INTERLEAGUE_GAMES 試合 (同じ球場で3連戦。ホームは年度で入れ替わる) を行う。試合の順序は結果に影響しないため考えない。
+
+    Args:
+        leagues (Sequence[str]): 各チームのリーグ。各リーグのチーム数は同じであること。
+        year (int): 年度 (ホームの割り当ての入れ替えに使う)。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (試合数,) のホームチームとビジターチームの番号。
+    """
+    members = {league: [t for t, name in enumerate(leagues) if name == league] for league in LEAGUES}
+    size = len(members[LEAGUES[0]])
+    if len(members[LEAGUES[1]]) != size or size * 2 != len(leagues):
+        raise ValueError("Each league must have the same number of teams")
+    home, away = [], []
+
+    def add(host: int, visitor: int, games: int):
+        home.extend([host] * games)
+        away.extend([visitor] * games)
+
+    more, fewer = (INTRALEAGUE_GAMES + 1) // 2, INTRALEAGUE_GAMES // 2
+    for teams in members.values():
+        for i in range(size):
+            for j in range(i + 1, size):
+                # 番号の差が 1, 2 なら前のチーム、-1, -2 なら後ろのチームが多くホームで戦う (差が3は年度で入れ替え)
+                offset = (j - i) % size
+                first_hosts_more = offset < size - offset or (offset == size - offset and year % 2 == 0)
+                add(teams[i], teams[j], more if first_hosts_more else fewer)
+                add(teams[j], teams[i], fewer if first_hosts_more else more)
+    for c, central in enumerate(members[LEAGUES[0]]):
+        for p, pacific in enumerate(members[LEAGUES[1]]):
+            host, visitor = (central, pacific) if (c + p + year) % 2 == 0 else (pacific, central)
+            add(host, visitor, INTERLEAGUE_GAMES)
+    return np.array(home, dtype=np.int64), np.array(away, dtype=np.int64)
+
+
+class InningTables(NamedTuple):
+    """各チームの打順のイニングの (次の先頭打者, 得点) の同時分布のエイリアス表。"""
+    prob: np.ndarray    # (チーム数 * 2 * 9, 9 * (得点の上限 + 1)) 行は (チーム * 2 + DH 制) * 9 + 先頭打者
+    alias: np.ndarray
+    num_runs: int       # 得点の種類の数 (得点の上限 + 1)
+
+
+def inning_tables(teams: Sequence[LeagueTeam], run_cap: int = DEFAULT_INNING_RUN_CAP) -> InningTables:
+    """各チームの DH 制あり・なしの打順について、先頭打者ごとのイニングの結果のエイリアス表を作る。"""
+    lineups = [lineup for team in teams for lineup in (team.pitcher_lineup, team.dh_lineup)]
+    probabilities, speeds = lineup_arrays(lineups)
+    distribution = inning_run_distribution(probabilities, speeds, run_cap) # (打順数, 先頭打者, 次の先頭打者, 得点)
+    rows = distribution.reshape(len(lineups) * 9, -1)
+    tables = [AliasTable(row) for row in rows]
+    return InningTables(np.array([t.prob for t in tables]), np.array([t.alias for t in tables]), run_cap + 1)
+
+
+def play_games(tables: InningTables, home_rows: np.ndarray, away_rows: np.ndarray, rng: np.random.Generator,
+               max_innings: int = MAX_INNINGS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    試合をまとめてシミュレートする。
+
+    Args:
+        tables (InningTables): inning_tables で作った表。
+        home_rows (np.ndarray): (試合数,) ホームチームの打順の番号 (チーム * 2 + DH 制)。
+        away_rows (np.ndarray): (試合数,) ビジターチームの打順の番号。
+        rng (np.random.Generator): 乱数生成器。
+        max_innings (int): 延長を含めた最大のイニング数。この回で同点なら引き分け。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (試合数,) のホームチームとビジターチームの得点。
+    """
+    n = len(home_rows)
+    home_score = np.zeros(n, dtype=np.int64)
+    away_score = np.zeros(n, dtype=np.int64)
+    home_leadoff = np.zeros(n, dtype=np.int64)
+    away_leadoff = np.zeros(n, dtype=np.int64)
+    live = np.arange(n)
+
+    for inning in range(max_innings):
+        code = alias_sample(tables.prob, tables.alias, away_rows[live] * 9 + away_leadoff[live], rng.random(live.size))
+        away_leadoff[live] = code // tables.num_runs
+        away_score[live] += code % tables.num_runs
+
+        final = inning >= REGULATION_INNINGS - 1
+        # 9回以降はホームチームがリードしていれば裏の攻撃を行わない
+        batting = live[home_score[live] <= away_score[live]] if final else live
+        code = alias_sample(tables.prob, tables.alias, home_rows[batting] * 9 + home_leadoff[batting], rng.random(batting.size))
+        runs = code % tables.num_runs
+        if final:
+            # サヨナラは勝ち越した時点で試合終了 (サヨナラ本塁打の走者の得点は数えない近似)
+            runs = np.minimum(runs, away_score[batting] - home_score[batting] + 1)
+        home_leadoff[batting] = code // tables.num_runs
+        home_score[batting] += runs
+        if final:
+            live = live[home_score[live] == away_score[live]]
+        if not live.size:
+            break
+    return home_score, away_score
+
+
+def _standings(wins: np.ndarray, losses: np.ndarray, leagues: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """勝率 (引き分けを除く)、勝利数、抽選の順にリーグ内の順位 (1始まり) を決める。"""
+    games = wins + losses
+    percentage = np.divide(wins, games, out=np.zeros(wins.shape), where=games > 0)
+    rank = np.zeros(wins.shape, dtype=np.int64)
+    for league in np.unique(leagues):
+        columns = np.flatnonzero(leagues == league)
+        order = np.lexsort((rng.random((len(wins), len(columns))), -wins[:, columns], -percentage[:, columns]), axis=-1)
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1, len(columns) + 1), order.shape), axis=-1)
+        rank[:, columns] = ranks
+    return rank
+
+
+def _series_wins(tables: InningTables, higher_rows: np.ndarray, lower_rows: np.ndarray, games: int,
+                 rng: np.random.Generator) -> np.ndarray:
+    """上位チームのホームで games 試合を行い、下位チームの勝利数を返す。"""
+    home_score, away_score = play_games(tables, np.repeat(higher_rows, games), np.repeat(lower_rows, games), rng)
+    return (away_score > home_score).reshape(-1, games).sum(axis=1)
+
+
+def _climax_series(tables: InningTables, rank: np.ndarray, leagues: np.ndarray, dh_of: np.ndarray,
+                   rng: np.random.Generator) -> np.ndarray:
+    """
+    各リーグの上位3チームでクライマックスシリーズを行い、勝ち抜いたチームを返す。
+    ファーストステージは3位が2勝すれば勝ち抜け、ファイナルステージは1位に1勝のアドバンテージがあり
+    挑戦者が4勝すれば勝ち抜ける (引き分けを含めて決着しない場合は上位チームが勝ち抜ける)。
+    全試合を行っても勝ち抜けるチームは変わらないため、各ステージの試合をすべて行って勝利数で判定する。
+    """
+    seasons = np.arange(len(rank))
+    winner = np.zeros(rank.shape, dtype=bool)
+    for league in np.unique(leagues):
+        columns = np.flatnonzero(leagues == league)
+        seeds = [columns[np.argmax(rank[:, columns] == place, axis=1)] for place in (1, 2, 3)]
+        rows = [seed * 2 + dh_of[seed] for seed in seeds]
+        third_wins = _series_wins(tables, rows[1], rows[2], FIRST_STAGE_GAMES, rng)
+        challenger = np.where(third_wins * 2 > FIRST_STAGE_GAMES, seeds[2], seeds[1])
+        challenger_wins = _series_wins(tables, rows[0], challenger * 2 + dh_of[challenger], FINAL_STAGE_GAMES, rng)
+        champion = np.where(challenger_wins > FINAL_STAGE_GAMES // 2, challenger, seeds[0])
+        winner[seasons, champion] = True
+    return winner
+
+
+def simulate_league(teams: Sequence[LeagueTeam], num_seasons: int = 1000, seed: SeedLike = None, year: int = 0,
+                    batch_seasons: int = LEAGUE_BATCH_SEASONS) -> LeagueProjection:
+    """
+    リーグのシーズンを num_seasons 回シミュレートする。
+
+    Args:
+        teams (Sequence[LeagueTeam]): load_league で読み込んだチーム。
+        num_seasons (int): シーズン数。
+        seed (SeedLike): 乱数のシード。
+        year (int): 年度 (日程のホームの割り当てに使う)。
+        batch_seasons (int): 一度にまとめてシミュレートするシーズン数。
+
+    Returns:
+        LeagueProjection: シーズンごとの成績と順位。
+    """
+    rng = as_generator(seed)
+    teams = list(teams)
+    num_teams = len(teams)
+    leagues = np.array([team.league for team in teams])
+    dh_of = np.array([LEAGUE_USES_DH[team.league] for team in teams], dtype=np.int64)
+    home, away = league_schedule(leagues, year)
+    tables = inning_tables(teams)
+    # ホームチームのリーグの規則で両チームの打順を決める
+    home_rows = home * 2 + dh_of[home]
+    away_rows = away * 2 + dh_of[home]
+
+    shape = (num_seasons, num_teams)
+    wins, losses, ties = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+    runs_scored, runs_allowed = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+    for start in range(0, num_seasons, batch_seasons):
+        count = min(batch_seasons, num_seasons - start)
+        home_score, away_score = play_games(tables, np.tile(home_rows, count), np.tile(away_rows, count), rng)
+        season = np.repeat(np.arange(count), len(home)) * num_teams
+        home_key, away_key = season + np.tile(home, count), season + np.tile(away, count)
+        size = count * num_teams
+
+        def tally(keys: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+            return np.bincount(keys, weights, minlength=size).reshape(count, num_teams).astype(np.int64)
+
+        home_won, away_won, tied = home_score > away_score, away_score > home_score, home_score == away_score
+        block = slice(start, start + count)
+        wins[block] = tally(home_key[home_won]) + tally(away_key[away_won])
+        losses[block] = tally(home_key[away_won]) + tally(away_key[home_won])
+        ties[block] = tally(home_key[tied]) + tally(away_key[tied])
+        runs_scored[block] = tally(home_key, home_score) + tally(away_key, away_score)
+        runs_allowed[block] = tally(home_key, away_score) + tally(away_key, home_score)
+
+    league_rank = _standings(wins, losses, leagues, rng)
+    climax_winner = _climax_series(tables, league_rank, leagues, dh_of, rng)
+    return LeagueProjection(teams, wins, losses, ties, runs_scored, runs_allowed, league_rank, climax_winner)
+
+
+def standings_frame(projection: LeagueProjection) -> pd.DataFrame:
+    """チームごとの平均成績、順位の分布、優勝・クライマックスシリーズ進出・日本シリーズ進出の確率の表。"""
+    rank = projection.league_rank
+    differential = projection.runs_scored - projection.runs_allowed
+    games = projection.wins + projection.losses
+    table = pd.DataFrame({
+        "リーグ": [team.league for team in projection.teams],
+        "チーム": [team.name for team in projection.teams],
+        "勝": projection.wins.mean(axis=0).round(1),
+        "敗": projection.losses.mean(axis=0).round(1),
+        "分": projection.ties.mean(axis=0).round(1),
+        "勝率": (projection.wins.sum(axis=0) / np.maximum(games.sum(axis=0), 1)).round(3),
+        "得点": projection.runs_scored.mean(axis=0).round(1),
+        "失点": projection.runs_allowed.mean(axis=0).round(1),
+        "得失点差": differential.mean(axis=0).round(1),
+        "得失点差の標準偏差": differential.std(axis=0).round(1),
+        "平均順位": rank.mean(axis=0).round(2),
+        "優勝": (rank == 1).mean(axis=0),
+        "CS進出": (rank <= 3).mean(axis=0),
+        "日本シリーズ進出": projection.climax_winner.mean(axis=0),
+    })
+    for place in range(1, rank.max() + 1):
+        table[f"{place}位"] = (rank == place).mean(axis=0)
+    return table.sort_values(["リーグ", "平均順位"]).reset_index(drop=True)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="12球団のスタメンでリーグ全体のシーズンをシミュレートし、順位を予測する")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--seasons", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-path", default="./data/processed")
+    args = parser.parse_args(argv)
+
+    projection = simulate_league(load_league(args.year, args.base_path), args.seasons, args.seed, args.year)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(standings_frame(projection).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,18 @@
 
+import os
 import pandas as pd
+from typing import List, Tuple
 
-def load_default_lineups(year):
-    """指定された年のデフォルトスタメンデータを読み込む"""
-    file_path = f"./data/processed/default_lineups_{year}.csv"
+from .constants import PROB_COLS
+from .player import Player
+from .player_store import get_player_store
+
+def load_default_lineups(year, base_path: str = "./data/processed"):
+    """指定された年のデフォルトスタメンデータを読み込む (選手データのストアがあればそこから返す)"""
+    store = get_player_store(base_path)
+    if store is not None:
+        return store.default_lineups(year)
+    file_path = f"{base_path}/default_lineups_{year}.csv"
     try:
         return pd.read_csv(file_path)
     except FileNotFoundError:
@@ -11,7 +20,13 @@ def load_default_lineups(year):
     
 
 def load_data_from_csv(year: int, team_abbr: str, base_path: str = "./data/processed"):
-    """指定された年とチームの選手成績データをCSVから読み込む"""
+    """
+    指定された年とチームの選手成績データをCSVから読み込む。
+    base_path の選手データのストア (player_store) にある場合は、CSV を読まずにストアから返す。
+    """
+    store = get_player_store(base_path)
+    if store is not None and (year, team_abbr) in store:
+        return store.frame(year, team_abbr)
     file_path_processed = f"{base_path}/{year}/{team_abbr}.csv"
 
     try:
@@ -19,3 +34,30 @@ def load_data_from_csv(year: int, team_abbr: str, base_path: str = "./data/proce
         return df
     except FileNotFoundError:
         return pd.DataFrame(), pd.DataFrame()
+
+
+def load_roster(year: int, team: str, base_path: str = "./data/processed") -> Tuple[List[Player], List[Player]]:
+    """
+    data/processed/<year>/<team>.csv から打順と選手プールを作る。
+    打順は default_lineups_<year>.csv のスタメン (チームの選手データにいる選手のみ) を使い、足りない分は CSV の先頭から補う。
+
+    Returns:
+        Tuple[List[Player], List[Player]]: (9名の打順, チームの全選手)
+    """
+    store = get_player_store(base_path)
+    if store is not None and (year, team) in store:
+        pool = store.players(year, team)
+    else:
+        data = pd.read_csv(os.path.join(base_path, str(year), f"{team}.csv"))
+        pool = [Player(name=row["Player"], probabilities=row[PROB_COLS].tolist(), speed=row["Speed"]) for _, row in data.iterrows()]
+    if len(pool) < 9:
+        raise ValueError(f"{year}/{team} has fewer than 9 players")
+    by_name = {player.name: player for player in pool}
+
+    lineup: List[Player] = []
+    defaults = load_default_lineups(year, base_path)
+    if not defaults.empty:
+        names = defaults.loc[defaults["Team_Abbr"].str.upper() == team.upper(), "Player"]
+        lineup = [by_name[name] for name in dict.fromkeys(names) if name in by_name][:9]
+    lineup += [player for player in pool if player not in lineup][:9 - len(lineup)]
+    return lineup, pool
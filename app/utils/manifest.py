@@ -0,0 +1,124 @@
+# src/main/utils/manifest.py
+"""
+データの更新処理 (get_player_data → data_process → get_default_lineup) の入力と出力の内容のハッシュの記録と、
+データのバージョン。
+
+記録 (data/processed/manifest.json) は (年度, チーム) ごと (スタメンは年度ごと) に、処理の段階ごとの
+入力のハッシュと出力のファイルのハッシュを持つ。入力のハッシュが前回と同じで、出力のファイルも前回書き込んだ
+内容のままであれば、その出力は作り直さない。
+
+data_version は選手データのファイルの内容から決まる短いトークンで、アプリのキャッシュのキーに含める。データが変わったチーム (または年度) の結果だけが使われなくなる。
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_PROCESSED_DIR = "./data/processed"
+MANIFEST_FILE = "manifest.json"
+# data_version のトークンの長さ (16進数の文字数)
+VERSION_LENGTH = 16
+
+_file_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def content_hash(data: bytes) -> str:
+    """バイト列の SHA-256。"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path: str) -> str | None:
+    """
+    ファイルの内容の SHA-256 を返す。ファイルがない場合は None。
+    更新時刻とサイズが変わらない間は前回の値を使う。
+    """
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (status.st_mtime_ns, status.st_size)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = content_hash(f.read())
+    _file_hashes[path] = (signature, digest)
+    return digest
+
+
+def combined_hash(hashes: Sequence[Tuple[str, str | None]]) -> str:
+    """(名前, ハッシュ) の並びをまとめた1つのハッシュ。"""
+    digest = hashlib.sha256()
+    for name, value in hashes:
+        digest.update(f"{name}\0{value}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DataManifest:
+    """
+    処理の段階 (stage) と対象 (key、"<year>/<team>" や "<year>/lineups") ごとの入力と出力のハッシュの記録。
+    """
+    def __init__(self, path: str = os.path.join(DEFAULT_PROCESSED_DIR, MANIFEST_FILE)):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries: Dict[str, Dict[str, Dict]] = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_current(self, stage: str, key: str, input_hash: str, outputs: Sequence[str]) -> bool:
+        """入力のハッシュが前回と同じで、出力のファイルがすべて前回書き込んだ内容のままか。"""
+        record = self.entries.get(key, {}).get(stage)
+        if record is None or record["input"] != input_hash:
+            return False
+        return record["outputs"] == [file_content_hash(path) for path in outputs]
+
+    def record(self, stage: str, key: str, input_hash: str, outputs: Sequence[str]):
+        """出力を書き込んだ後に、入力と出力のハッシュを記録する (ファイルへの書き込みは save)。"""
+        self.entries.setdefault(key, {})[stage] = {"input": input_hash,
+                                                   "outputs": [file_content_hash(path) for path in outputs]}
+
+    def save(self):
+        """記録をファイルに書き込む (一時ファイルに書いてから置き換える)。"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+        os.replace(temporary, self.path)
+
+
+def data_files(base_path: str = DEFAULT_PROCESSED_DIR, year: int | None = None) -> List[str]:
+    """
+    年度 (None の場合は全年度) の選手データのファイル (<year>/<team>.csv, default_lineups_<year>.csv,
+    position_starts_<year>.csv) の base_path からの相対パス。
+    """
+    if year is not None:
+        years = [str(year)]
+    elif os.path.isdir(base_path):
+        years = sorted(name for name in os.listdir(base_path) if name.isdigit())
+    else:
+        years = []
+    files = []
+    for y in years:
+        directory = os.path.join(base_path, y)
+        if os.path.isdir(directory):
+            files += sorted(f"{y}/{name}" for name in os.listdir(directory) if name.endswith(".csv"))
+        files += [name for name in (f"default_lineups_{y}.csv", f"position_starts_{y}.csv")
+                  if os.path.exists(os.path.join(base_path, name))]
+    return files
+
+
+def data_version(year: int | None = None, team: str | None = None, base_path: str = DEFAULT_PROCESSED_DIR) -> str | None:
+    """
+    選手データのバージョンのトークン。
+
+    team を指定した場合は <base_path>/<year>/<team>.csv の内容のハッシュ (ファイルがない場合は None)、
+    team を省略した場合は年度 (year も省略した場合は全年度) の data_files をまとめたハッシュ。
+    """
+    if team is not None:
+        digest = file_content_hash(os.path.join(base_path, str(year), f"{team}.csv"))
+        return digest[:VERSION_LENGTH] if digest is not None else None
+    files = data_files(base_path, year)
+    return combined_hash([(name, file_content_hash(os.path.join(base_path, name))) for name in files])[:VERSION_LENGTH]
@@ -0,0 +1,438 @@
+# src/main/utils/markov.py
+
+import numpy as np
+from typing import List, Sequence, Tuple
+
+from .constants import (
+    EVENT_TYPES, BUNT_ATTEMPT_FACTOR, SACRIFICE_BUNT_SUCCESS_RATE, DOUBLE_PLAY_PROBABILITY,
+    GROUND_OUT_ADVANCE_PROBABILITY, SACRIFICE_FLY_PROBABILITY
+)
+from .player import Player
+from .transitions import (
+    SINGLE, DOUBLE, TRIPLE, HOMERUN, WALK, STRIKEOUT, GROUND_OUT, FLY_OUT,
+    DOUBLE_PLAY, GROUND_OUT_ADVANCE, SACRIFICE_FLY, SACRIFICE_BUNT, BUNT_FAIL,
+    NUM_DECISIONS, EXTRA_SECOND_BIT, EXTRA_FIRST_BIT, NEXT_MASK, RUNS, OUTS_ADDED,
+    EXTRA_SECOND_NEEDED, EXTRA_FIRST_NEEDED,
+    EXTRA_BASE_SINGLE_FROM_SECOND, EXTRA_BASE_SINGLE_FROM_FIRST, EXTRA_BASE_DOUBLE_FROM_FIRST,
+    EXTRA_BASE_SPEED_FACTOR, EXTRA_BASE_OUTS_FACTOR
+)
+
+# 塁状況は3ビットのマスク (1: 一塁, 2: 二塁, 4: 三塁)、状態番号は アウト数 * 8 + マスク
+NUM_BASE_OUT_STATES = 24
+EXIT_STATE = NUM_BASE_OUT_STATES # 3アウト (イニング終了)
+
+# 遷移の重みの列 (打席結果8種類 + 犠打企図)
+_W_BUNT = len(EVENT_TYPES)
+
+# 追加進塁の係数の列 (単打で二塁走者が生還, 単打で一塁走者が三塁へ, 二塁打で一塁走者が生還) と、それぞれの余事象、定数1
+_Q_SINGLE_SECOND, _Q_SINGLE_FIRST, _Q_DOUBLE_FIRST = 0, 2, 4
+_Q_ONE = 6
+
+
+_STATE_OUTS = np.repeat(np.arange(3), 8)
+_STATE_MASK = np.tile(np.arange(8), 3)
+_BUNT_SITUATION = (_STATE_OUTS < 2) & ((_STATE_MASK & 0b011) > 0)
+
+
+def _build_branches() -> List[Tuple[int, int, float, int, int, int, int]]:
+    """
+    BaseballGame の規則を (状態, 重みの列, 定数, 係数1, 係数2, 遷移先, 得点) の分岐に展開する。
+    走者の進み方と得点は transitions の遷移表から引く。
+    """
+    branches = []
+    for outs in range(3):
+        for mask in range(8):
+            on_first, on_third = mask & 1, (mask >> 2) & 1
+            state = outs * 8 + mask
+
+            def add(weight, const, outcome):
+                # 追加進塁の判定が必要な走者ごとに、成功・失敗の分岐に分ける
+                first_factor = _Q_DOUBLE_FIRST if outcome == DOUBLE else _Q_SINGLE_FIRST
+                for bits in range(NUM_DECISIONS):
+                    second_needed = EXTRA_SECOND_NEEDED[mask, outcome]
+                    if bits & EXTRA_SECOND_BIT and not second_needed:
+                        continue
+                    first_needed = EXTRA_FIRST_NEEDED[mask, outcome, bits & EXTRA_SECOND_BIT]
+                    if bits & EXTRA_FIRST_BIT and not first_needed:
+                        continue
+                    f1 = (_Q_SINGLE_SECOND if bits & EXTRA_SECOND_BIT else _Q_SINGLE_SECOND + 1) if second_needed else _Q_ONE
+                    f2 = (first_factor if bits & EXTRA_FIRST_BIT else first_factor + 1) if first_needed else _Q_ONE
+                    index = (mask, outs, outcome, bits)
+                    new_outs = outs + OUTS_ADDED[index]
+                    to = EXIT_STATE if new_outs >= 3 else new_outs * 8 + NEXT_MASK[index]
+                    branches.append((state, weight, const, f1, f2, to, int(RUNS[index])))
+
+            # 犠打 (0,1アウトで一塁か二塁に走者がいる場合)
+            if _BUNT_SITUATION[state]:
+                add(_W_BUNT, SACRIFICE_BUNT_SUCCESS_RATE, SACRIFICE_BUNT)
+                add(_W_BUNT, 1 - SACRIFICE_BUNT_SUCCESS_RATE, BUNT_FAIL)
+
+            for outcome in (SINGLE, DOUBLE, TRIPLE, HOMERUN, WALK, STRIKEOUT):
+                add(outcome, 1.0, outcome)
+
+            # ゴロアウト (併殺打 → 進塁打 → 通常のゴロの順に判定)
+            double_play = DOUBLE_PLAY_PROBABILITY if (on_first and outs < 2) else 0.0
+            advance = (1 - double_play) * GROUND_OUT_ADVANCE_PROBABILITY if mask else 0.0
+            if double_play:
+                add(GROUND_OUT, double_play, DOUBLE_PLAY)
+            if advance:
+                add(GROUND_OUT, advance, GROUND_OUT_ADVANCE)
+            add(GROUND_OUT, 1 - double_play - advance, GROUND_OUT)
+
+            # フライアウト (三塁走者がいて0,1アウトなら犠飛の判定)
+            sacrifice_fly = SACRIFICE_FLY_PROBABILITY if (on_third and outs < 2) else 0.0
+            if sacrifice_fly:
+                add(FLY_OUT, sacrifice_fly, SACRIFICE_FLY)
+            add(FLY_OUT, 1 - sacrifice_fly, FLY_OUT)
+
+    # (状態, 遷移先) の順に並べておき、同じ遷移をまとめて足し合わせられるようにする
+    branches.sort(key=lambda br: (br[0], br[5]))
+    return branches
+
+
+_BRANCHES = _build_branches()
+_BR_STATE = np.array([br[0] for br in _BRANCHES])
+_BR_WEIGHT = np.array([br[1] for br in _BRANCHES])
+_BR_CONST = np.array([br[2] for br in _BRANCHES])
+_BR_F1 = np.array([br[3] for br in _BRANCHES])
+_BR_F2 = np.array([br[4] for br in _BRANCHES])
+_BR_TO = np.array([br[5] for br in _BRANCHES])
+_BR_RUNS = np.array([br[6] for br in _BRANCHES], dtype=np.float64)
+
+_pair_keys = _BR_STATE * (NUM_BASE_OUT_STATES + 1) + _BR_TO
+_PAIR_STARTS = np.flatnonzero(np.r_[True, _pair_keys[1:] != _pair_keys[:-1]])
+_PAIR_INDEX = _pair_keys[_PAIR_STARTS]
+# 得点ごとに分けて集計する場合の (得点, 状態, 遷移先) の並び
+MAX_RUNS_PER_PLAY = 4
+_runs_keys = (_BR_RUNS.astype(np.int64) * NUM_BASE_OUT_STATES + _BR_STATE) * (NUM_BASE_OUT_STATES + 1) + _BR_TO
+_RUNS_ORDER = np.argsort(_runs_keys, kind="stable")
+_runs_keys = _runs_keys[_RUNS_ORDER]
+_RUNS_PAIR_STARTS = np.flatnonzero(np.r_[True, _runs_keys[1:] != _runs_keys[:-1]])
+_RUNS_PAIR_INDEX = _runs_keys[_RUNS_PAIR_STARTS]
+_STATE_STARTS = np.flatnonzero(np.r_[True, _BR_STATE[1:] != _BR_STATE[:-1]])
+_BR_WEIGHT_INDEX = _BR_STATE * (len(EVENT_TYPES) + 1) + _BR_WEIGHT
+_BR_F1_INDEX = _BR_STATE * (_Q_ONE + 1) + _BR_F1
+_BR_F2_INDEX = _BR_STATE * (_Q_ONE + 1) + _BR_F2
+
+
+# 塁上の走者が誰かは状態に含まれないため、後ろの塁の走者ほど直近の打者であるとみなして Speed を近似する
+# (一塁走者は1人前の打者、二塁走者は一塁に走者がいれば2人前、いなければ1人前の打者)。
+# 全員の Speed が等しい場合はこの近似による誤差はない。
+_FIRST_RUNNER_OFFSET = np.ones(8, dtype=np.int64)
+_SECOND_RUNNER_OFFSET = 1 + (np.arange(8) & 1)
+
+
+def _segment_sums(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """行を starts で区切った区間ごとの和を返す (np.add.reduceat(values, starts, axis=0) と同じ)。"""
+    cumulative = np.cumsum(values, axis=0)
+    ends = cumulative[np.r_[starts[1:] - 1, len(values) - 1]]
+    ends[1:] -= ends[:-1].copy()
+    return ends
+
+
+def lineup_arrays(lineups: Sequence[Sequence[Player]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    打順のリストを (打順数, 9, 8) の確率配列と (打順数, 9) の Speed 配列に変換する。
+    """
+    probabilities = np.array([[p.probabilities for p in lineup] for lineup in lineups], dtype=np.float64)
+    speeds = np.array([[p.speed for p in lineup] for lineup in lineups], dtype=np.float64)
+    return probabilities, speeds
+
+
+def _branch_probabilities(probabilities: np.ndarray, speeds: np.ndarray, slots: np.ndarray) -> np.ndarray:
+    """各分岐 (_BRANCHES) の確率を (分岐数, 打順数*打者数) の配列で返す。"""
+    num_lineups = probabilities.shape[0]
+    num_slots = len(slots)
+    num_rows = num_lineups * num_slots
+    # 以降は (状態, 列, 打順数*打者数) の並びで計算し、分岐の集計を連続したメモリ上の行の和にする
+    probabilities = probabilities[:, slots].reshape(num_rows, -1).T  # (8, 打順数*打者数)
+
+    # 各状態での重み (犠打を企図しない場合の打席結果の確率, 犠打企図の確率)
+    bunt = (probabilities[STRIKEOUT] + probabilities[GROUND_OUT] + probabilities[FLY_OUT]) * BUNT_ATTEMPT_FACTOR
+    bunt = _BUNT_SITUATION[:, None] * bunt[None, :] # (24, 打順数*打者数)
+    weights = np.empty((NUM_BASE_OUT_STATES, len(EVENT_TYPES) + 1, num_rows))
+    weights[:, :-1] = probabilities[None, :, :] * (1 - bunt)[:, None, :]
+    weights[:, -1] = bunt
+
+    # 追加進塁の確率 (走者の Speed とアウトカウントから計算)
+    first_runner = speeds[:, (slots[None, :] - _FIRST_RUNNER_OFFSET[:, None]) % 9].transpose(1, 0, 2).reshape(8, num_rows)
+    second_runner = speeds[:, (slots[None, :] - _SECOND_RUNNER_OFFSET[:, None]) % 9].transpose(1, 0, 2).reshape(8, num_rows)
+    outs_factor = EXTRA_BASE_OUTS_FACTOR[_STATE_OUTS][:, None]
+    first_runner = first_runner[_STATE_MASK]   # (24, 打順数*打者数)
+    second_runner = second_runner[_STATE_MASK]
+    factors = np.empty((NUM_BASE_OUT_STATES, _Q_ONE + 1, num_rows))
+    factors[:, _Q_SINGLE_SECOND] = np.clip((EXTRA_BASE_SINGLE_FROM_SECOND + second_runner * EXTRA_BASE_SPEED_FACTOR) * outs_factor, 0.0, 1.0)
+    factors[:, _Q_SINGLE_FIRST] = np.clip((EXTRA_BASE_SINGLE_FROM_FIRST + first_runner * EXTRA_BASE_SPEED_FACTOR) * outs_factor, 0.0, 1.0)
+    factors[:, _Q_DOUBLE_FIRST] = np.clip((EXTRA_BASE_DOUBLE_FROM_FIRST + first_runner * EXTRA_BASE_SPEED_FACTOR) * outs_factor, 0.0, 1.0)
+    for q in (_Q_SINGLE_SECOND, _Q_SINGLE_FIRST, _Q_DOUBLE_FIRST):
+        factors[:, q + 1] = 1 - factors[:, q]
+    factors[:, _Q_ONE] = 1.0
+
+    # 分岐ごとの確率 = 重み * 定数 * 追加進塁の係数2つ
+    weights = weights.reshape(-1, num_rows)
+    factors = factors.reshape(-1, num_rows)
+    coef = np.take(weights, _BR_WEIGHT_INDEX, axis=0) * _BR_CONST[:, None]
+    coef *= np.take(factors, _BR_F1_INDEX, axis=0)
+    coef *= np.take(factors, _BR_F2_INDEX, axis=0)
+    return coef
+
+
+def slot_transitions(probabilities: np.ndarray, speeds: np.ndarray, slots: Sequence[int] | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    打順の各打者について、1打席の状態遷移行列を計算する。
+
+    Args:
+        probabilities (np.ndarray): (打順数, 9, 8) 打席結果の確率。
+        speeds (np.ndarray): (打順数, 9) 各打者の Speed。
+        slots (Sequence[int] | None): 計算する打順の番号 (0始まり)。None の場合は9人全員。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]:
+            (イニング内の遷移 (打順数, 打者数, 24, 24), イニング終了の確率 (打順数, 打者数, 24), 期待得点 (打順数, 打者数, 24))
+    """
+    slots = np.arange(9) if slots is None else np.asarray(slots, dtype=np.int64)
+    num_lineups, num_slots = probabilities.shape[0], len(slots)
+    num_rows = num_lineups * num_slots
+    coef = _branch_probabilities(probabilities, speeds, slots)
+
+    # 同じ (状態, 遷移先) の分岐をまとめる (累積和の差分で区間ごとの和を取る)
+    transitions = np.zeros((NUM_BASE_OUT_STATES * (NUM_BASE_OUT_STATES + 1), num_rows))
+    transitions[_PAIR_INDEX] = _segment_sums(coef, _PAIR_STARTS)
+    transitions = np.ascontiguousarray(transitions.T).reshape(num_lineups, num_slots, NUM_BASE_OUT_STATES, NUM_BASE_OUT_STATES + 1)
+    runs = _segment_sums(coef * _BR_RUNS[:, None], _STATE_STARTS).T.reshape(num_lineups, num_slots, NUM_BASE_OUT_STATES)
+    return transitions[..., :EXIT_STATE], transitions[..., EXIT_STATE], runs
+
+
+def slot_transitions_by_runs(probabilities: np.ndarray, speeds: np.ndarray) -> np.ndarray:
+    """
+    打順の各打者について、1打席の状態遷移行列を打席で入った得点 (0-4点) ごとに分けて計算する。
+
+    Returns:
+        np.ndarray: (打順数, 9, 5, 24, 25) [.., 得点, 状態, 遷移先] の確率。遷移先の24はイニング終了 (3アウト)。
+    """
+    slots = np.arange(9)
+    num_lineups = probabilities.shape[0]
+    coef = _branch_probabilities(probabilities, speeds, slots)
+    transitions = np.zeros(((MAX_RUNS_PER_PLAY + 1) * NUM_BASE_OUT_STATES * (NUM_BASE_OUT_STATES + 1), coef.shape[1]))
+    transitions[_RUNS_PAIR_INDEX] = _segment_sums(coef[_RUNS_ORDER], _RUNS_PAIR_STARTS)
+    return np.ascontiguousarray(transitions.T).reshape(num_lineups, 9, MAX_RUNS_PER_PLAY + 1, NUM_BASE_OUT_STATES, NUM_BASE_OUT_STATES + 1)
+
+
+def solve_inning(transitions: np.ndarray, exits: np.ndarray, runs: np.ndarray) -> np.ndarray:
+    """
+    イニング終了までの期待得点と、次のイニングの先頭打者の分布を全状態について求める。
+
+    打者は1打席ごとに必ず次の打順に進むため、9人分の遷移行列の積で1巡分をまとめ、
+    1巡後に同じ打者に戻る循環を1回の連立方程式で解く。
+
+    Returns:
+        np.ndarray: (打順数, 9, 24, 10) 打順 b の打者が状態 s で打席に入るときの
+            [イニング終了までの期待得点, 次のイニングの先頭打者が 0..8 番である確率]。
+    """
+    num_lineups = transitions.shape[0]
+    # 各打者の打席で直接決まる値 (期待得点と、3アウトで次打者が先頭になる確率)
+    direct = np.zeros((num_lineups, 9, NUM_BASE_OUT_STATES, 10))
+    direct[..., 0] = runs
+    for b in range(9):
+        direct[:, b, :, 1 + (b + 1) % 9] = exits[:, b]
+
+    # x_0 = d_0 + T_0 d_1 + T_0 T_1 d_2 + ... + (T_0 ... T_8) x_0
+    identity = np.eye(NUM_BASE_OUT_STATES)
+    product = np.broadcast_to(identity, (num_lineups,) + identity.shape)
+    accumulated = np.zeros((num_lineups, NUM_BASE_OUT_STATES, 10))
+    for b in range(9):
+        accumulated = accumulated + product @ direct[:, b]
+        product = product @ transitions[:, b]
+
+    values = np.empty_like(direct)
+    values[:, 0] = np.linalg.solve(identity - product, accumulated)
+    # x_b = d_b + T_b x_{b+1} を後ろから順に計算する
+    following = values[:, 0]
+    for b in range(8, 0, -1):
+        following = direct[:, b] + transitions[:, b] @ following
+        values[:, b] = following
+    return values
+
+
+def game_expected_runs(values: np.ndarray, num_innings: int = 9, leadoff: int = 0) -> np.ndarray:
+    """solve_inning の結果から、num_innings イニングの1試合あたりの期待得点を計算する。"""
+    distribution = np.zeros(values.shape[:2])
+    distribution[:, leadoff] = 1.0
+    return _innings_expected_runs(values, distribution, num_innings)
+
+
+def _innings_expected_runs(values: np.ndarray, distribution: np.ndarray, num_innings: int) -> np.ndarray:
+    """先頭打者の分布 distribution (打順数, 9) から始まる num_innings イニングの期待得点を計算する。"""
+    inning_runs = values[:, :, 0, 0]          # (打順数, 9) 先頭打者ごとのイニング期待得点
+    next_leadoff = values[:, :, 0, 1:]        # (打順数, 9, 9) 先頭打者の遷移確率
+    total = np.zeros(inning_runs.shape[0])
+    for _ in range(num_innings):
+        total += (distribution * inning_runs).sum(axis=1)
+        distribution = np.einsum("lb,lbc->lc", distribution, next_leadoff)
+    return total
+
+
+def expected_runs_from_state(probabilities: np.ndarray, speeds: np.ndarray, outs: int, bases: int, batter: int,
+                             num_innings: int = 1) -> np.ndarray:
+    """
+    試合の途中の状況から、現在のイニングを含む num_innings イニングの終わりまでの期待得点をまとめて計算する。
+
+    Args:
+        probabilities (np.ndarray): (打順数, 9, 8) 打席結果の確率。
+        speeds (np.ndarray): (打順数, 9) 各打者の Speed。
+        outs (int): アウト数 (0-2)。
+        bases (int): 塁状況のマスク (1: 一塁, 2: 二塁, 4: 三塁)。
+        batter (int): 打席に入る打者の打順 (0始まり)。
+        num_innings (int): 現在のイニングを含めて評価するイニング数。1の場合はこのイニングの残りだけ。
+
+    Returns:
+        np.ndarray: (打順数,) 期待得点。
+    """
+    values = solve_inning(*slot_transitions(probabilities, speeds))
+    current = values[:, batter, outs * 8 + bases]  # (打順数, 10)
+    return current[:, 0] + _innings_expected_runs(values, current[:, 1:], num_innings - 1)
+
+
+def game_expected_runs_by_leadoff(values: np.ndarray, num_innings: int = 9) -> np.ndarray:
+    """
+    1回の先頭打者を 0..8 番のそれぞれにした場合の、1試合あたりの期待得点をまとめて計算する。
+
+    打順を k 人分回転させた打順は、元の打順の k 番打者から試合を始めることと同じなので、
+    戻り値の [:, k] は打順を k 人分回転させた打順の期待得点になる。
+
+    Returns:
+        np.ndarray: (打順数, 9) の期待得点。
+    """
+    inning_runs = values[:, :, 0, 0, None]    # (打順数, 9, 1)
+    next_leadoff = values[:, :, 0, 1:]        # (打順数, 9, 9)
+    distribution = np.broadcast_to(np.eye(9), next_leadoff.shape)
+    total = np.zeros(inning_runs.shape[:2])
+    for _ in range(num_innings):
+        total += (distribution @ inning_runs)[..., 0]
+        distribution = distribution @ next_leadoff
+    return total
+
+
+def expected_runs(probabilities: np.ndarray, speeds: np.ndarray, num_innings: int = 9) -> np.ndarray:
+    """
+    複数の打順について1試合あたりの期待得点をまとめて計算する。
+
+    Args:
+        probabilities (np.ndarray): (打順数, 9, 8) 打席結果の確率。
+        speeds (np.ndarray): (打順数, 9) 各打者の Speed。
+        num_innings (int): 1試合のイニング数。
+
+    Returns:
+        np.ndarray: (打順数,) 1試合あたりの期待得点。
+    """
+    values = solve_inning(*slot_transitions(probabilities, speeds))
+    return game_expected_runs(values, num_innings)
+
+
+def expected_runs_per_game(players: List[Player], num_innings: int = 9) -> float:
+    """
+    打順 (9名の Player のリスト) の1試合あたりの期待得点をマルコフ連鎖で厳密に計算する。
+
+    24種類の塁・アウト状況と9つの打順を状態とし、BaseballGame と同じ規則
+    (犠打・併殺打・進塁打・犠飛・Speedによる追加進塁) で遷移させる。
+    """
+    if len(players) != 9:
+        raise ValueError("players must contain exactly 9 players")
+    probabilities, speeds = lineup_arrays([players])
+    return float(expected_runs(probabilities, speeds, num_innings)[0])
+
+
+
+class IncrementalEvaluator:
+    """
+    打順の1試合あたりの期待得点を、打順の一部を変更したときに差分だけ計算し直して求めるクラス。
+
+    打者 b の遷移行列は b 番打者の確率と、走者とみなす直前の2人 (b-1, b-2 番) の Speed だけで決まる。
+    打者が変わった打順とその後ろの2つの打順の遷移行列だけを計算し直し (一度計算した
+    (打者, 走者の Speed) の組み合わせはメモから返す)、1巡分の遷移行列の積は変更のない先頭側の
+    途中結果 (累積積) を再利用する。
+    """
+    def __init__(self, players: Sequence[Player], num_innings: int = 9):
+        """
+        Args:
+            players (Sequence[Player]): 9名の打順。
+            num_innings (int): 1試合のイニング数。
+        """
+        if len(players) != 9:
+            raise ValueError("players must contain exactly 9 players")
+        self.num_innings = num_innings
+        self.transitions = np.zeros((9, NUM_BASE_OUT_STATES, NUM_BASE_OUT_STATES))
+        self.direct = np.zeros((9, NUM_BASE_OUT_STATES, 10))
+        # products[b] = T_0 ... T_{b-1}, accumulated[b] = d_0 + T_0 d_1 + ... + (T_0 ... T_{b-2}) d_{b-1}
+        self.products = np.empty((10, NUM_BASE_OUT_STATES, NUM_BASE_OUT_STATES))
+        self.accumulated = np.empty((10, NUM_BASE_OUT_STATES, 10))
+        self.products[0] = np.eye(NUM_BASE_OUT_STATES)
+        self.accumulated[0] = 0.0
+        self._slot_memo = {} # (打者の確率, 1人前の Speed, 2人前の Speed) -> (遷移, イニング終了の確率, 期待得点)
+        probabilities, speeds = lineup_arrays([players])
+        self.probabilities = probabilities[0]
+        self.speeds = speeds[0]
+        self.recomputed_slots = 9
+        self._set_slots(np.arange(9))
+        self.expected_runs = self._solve(0)
+
+    def _set_slots(self, slots: np.ndarray):
+        """slots の打順の遷移行列と直接の値 (期待得点・次のイニングの先頭打者) を現在の打順から設定する。"""
+        keys = [(self.probabilities[b].tobytes(), self.speeds[b - 1], self.speeds[b - 2]) for b in slots.tolist()]
+        missing = [i for i, key in enumerate(keys) if key not in self._slot_memo]
+        if missing:
+            transitions, exits, runs = slot_transitions(self.probabilities[None], self.speeds[None], slots[missing])
+            for j, i in enumerate(missing):
+                self._slot_memo[keys[i]] = (transitions[0, j], exits[0, j], runs[0, j])
+        for slot, key in zip(slots.tolist(), keys):
+            slot_transition, slot_exits, slot_runs = self._slot_memo[key]
+            self.transitions[slot] = slot_transition
+            self.direct[slot] = 0.0
+            self.direct[slot, :, 0] = slot_runs
+            self.direct[slot, :, 1 + (slot + 1) % 9] = slot_exits
+
+    def _solve(self, first: int) -> float:
+        """first 番目以降の累積積を更新し、1巡の循環を解いて期待得点を返す (solve_inning と同じ計算)。"""
+        for b in range(first, 9):
+            self.accumulated[b + 1] = self.accumulated[b] + self.products[b] @ self.direct[b]
+            self.products[b + 1] = self.products[b] @ self.transitions[b]
+        following = np.linalg.solve(np.eye(NUM_BASE_OUT_STATES) - self.products[9], self.accumulated[9])
+        # 各打者がイニングの先頭 (無死走者なし) のときの値だけを残す
+        leadoff_values = np.empty((9, 10))
+        leadoff_values[0] = following[0]
+        for b in range(8, 0, -1):
+            following = self.direct[b] + self.transitions[b] @ following
+            leadoff_values[b] = following[0]
+        # game_expected_runs と同じ計算 (1打順分)
+        distribution = np.zeros(9)
+        distribution[0] = 1.0
+        total = 0.0
+        for _ in range(self.num_innings):
+            total += distribution @ leadoff_values[:, 0]
+            distribution = distribution @ leadoff_values[:, 1:]
+        return float(total)
+
+    def update(self, players: Sequence[Player]) -> Tuple[float, float]:
+        """
+        打順を players に変更し、新しい期待得点と変更前との差を返す。
+        確率か Speed が変わった打順だけを検出して計算し直す (入れ替え・交代のどちらでもよい)。
+
+        Returns:
+            Tuple[float, float]: (1試合あたりの期待得点, 変更前からの増減)
+        """
+        if len(players) != 9:
+            raise ValueError("players must contain exactly 9 players")
+        probabilities, speeds = lineup_arrays([players])
+        probability_changed = np.flatnonzero((probabilities[0] != self.probabilities).any(axis=1))
+        speed_changed = np.flatnonzero(speeds[0] != self.speeds)
+        # Speed は走者として後ろの2人の打席の遷移に影響する
+        slots = np.union1d(probability_changed, np.r_[(speed_changed + 1) % 9, (speed_changed + 2) % 9]).astype(np.int64)
+        previous = self.expected_runs
+        self.recomputed_slots = len(slots)
+        if not len(slots):
+            return previous, 0.0
+        self.probabilities = probabilities[0]
+        self.speeds = speeds[0]
+        self._set_slots(slots)
+        self.expected_runs = self._solve(int(slots[0]))
+        return self.expected_runs, self.expected_runs - previous
@@ -0,0 +1,271 @@
+# src/main/utils/optimizer.py
+
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .batch_game import BatchBaseballGame, BatchGameResult, NUM_UNIFORMS
+from .constants import SEASON_GAMES
+from .markov import expected_runs
+from .player import Player
+from .sampling import CommonUniforms, SeedLike, as_generator
+
+# 打順は選手プール内のインデックスのタプルで表す
+Lineup = Tuple[int, ...]
+
+# 探索の近傍操作 (2人の入れ替え, 1人を別の打順へ移動, 控え選手との交代)
+MOVE_SWAP, MOVE_INSERT, MOVE_SUBSTITUTE = range(3)
+
+
+class LineupEvaluator:
+    """
+    打順の評価値 (1試合あたりの得点) を計算し、評価済みの打順はメモから返すクラス。
+
+    evaluator="markov" はマルコフ連鎖の期待得点、"simulation" は共通乱数を使った num_games 試合の平均得点で評価する。
+    共通乱数を使うため、シミュレーションでも同じ打順の評価値は常に同じになり、メモをそのまま使える。
+    """
+    def __init__(self, players: Sequence[Player], evaluator: str = "markov", num_games: int = SEASON_GAMES, seed: SeedLike = None):
+        """
+        Args:
+            players (Sequence[Player]): 選手プール。
+            evaluator (str): "markov" または "simulation"。
+            num_games (int): evaluator="simulation" の場合の1打順あたりの試合数。
+            seed (SeedLike): evaluator="simulation" の場合の共通乱数のシード。
+        """
+        if evaluator not in ("markov", "simulation"):
+            raise ValueError(f"Unknown evaluator: {evaluator}")
+        self.players = list(players)
+        self.evaluator = evaluator
+        self.num_games = num_games
+        self.probabilities = np.array([p.probabilities for p in self.players], dtype=np.float64)
+        self.speeds = np.array([p.speed for p in self.players], dtype=np.float64)
+        self.common_uniforms = None
+        if evaluator == "simulation":
+            self.common_uniforms = CommonUniforms(NUM_UNIFORMS, as_generator(seed).spawn(1)[0].bit_generator.seed_seq)
+        self.cache: Dict[Lineup, float] = {}
+        self.hits = 0
+
+    @property
+    def evaluations(self) -> int:
+        """実際に計算した (メモになかった) 打順の数。"""
+        return len(self.cache)
+
+    def season(self, lineups: Sequence[Lineup]) -> BatchGameResult:
+        """共通乱数で各打順の num_games 試合をシミュレートする。"""
+        engine = BatchBaseballGame([[self.players[i] for i in lineup] for lineup in lineups])
+        return engine.simulate_games(self.num_games, common_uniforms=self.common_uniforms, player_keys=np.array(lineups))
+
+    def evaluate_many(self, lineups: Sequence[Lineup]) -> np.ndarray:
+        """打順のリストをまとめて評価する。メモにない打順だけを1回の計算で評価する。"""
+        lineups = [tuple(lineup) for lineup in lineups]
+        new = list(dict.fromkeys(lineup for lineup in lineups if lineup not in self.cache))
+        self.hits += len(lineups) - len(new)
+        if new:
+            order = np.array(new)
+            if self.evaluator == "markov":
+                scores = expected_runs(self.probabilities[order], self.speeds[order])
+            else:
+                scores = self.season(new).scores.mean(axis=1)
+            self.cache.update(zip(new, scores.tolist()))
+        return np.array([self.cache[lineup] for lineup in lineups])
+
+    def __call__(self, lineup: Lineup) -> float:
+        return float(self.evaluate_many([lineup])[0])
+
+
+def random_lineup(pool_size: int, rng: np.random.Generator) -> Lineup:
+    """選手プールからランダムな打順を作る。"""
+    return tuple(rng.choice(pool_size, size=9, replace=False).tolist())
+
+
+def random_neighbor(lineup: Lineup, pool_size: int, rng: np.random.Generator) -> Lineup:
+    """
+    打順に近傍操作を1回適用した打順を返す。控え選手がいない場合は交代を選ばない。
+
+    - 入れ替え: 2つの打順の選手を入れ替える。
+    - 移動: 1人を抜き出して別の打順に入れ、間の選手をずらす。
+    - 交代: 1人を控え選手と入れ替える。
+    """
+    lineup = list(lineup)
+    move = rng.integers(3 if pool_size > 9 else 2)
+    if move == MOVE_SUBSTITUTE:
+        bench = np.setdiff1d(np.arange(pool_size), lineup)
+        lineup[rng.integers(9)] = int(bench[rng.integers(len(bench))])
+    else:
+        i, j = rng.choice(9, size=2, replace=False).tolist()
+        if move == MOVE_SWAP:
+            lineup[i], lineup[j] = lineup[j], lineup[i]
+        else:
+            lineup.insert(j, lineup.pop(i))
+    return tuple(lineup)
+
+
+def order_crossover(parent1: Lineup, parent2: Lineup, rng: np.random.Generator) -> Lineup:
+    """
+    順序交叉 (OX)。parent1 の連続した区間をそのまま受け継ぎ、残りの打順を parent2 の並び順で、
+    区間に含まれない選手から埋める。両親の選手が異なる場合 (控え選手を含む探索) も9名が重複なく揃う。
+    """
+    start, stop = sorted(rng.choice(10, size=2, replace=False).tolist())
+    child: List[int | None] = [None] * 9
+    child[start:stop] = parent1[start:stop]
+    kept = set(parent1[start:stop])
+    fill = iter(p for p in parent2[stop:] + parent2[:stop] if p not in kept)
+    for offset in range(9 - (stop - start)):
+        child[(stop + offset) % 9] = next(fill)
+    return tuple(child)
+
+
+class SearchResult:
+    """探索結果 (最良の打順と評価値、評価の推移)。"""
+    def __init__(self, lineup: Lineup, score: float, history: List[float]):
+        self.lineup = lineup
+        self.score = score
+        self.history = history # 反復ごとの最良の評価値
+
+
+def _out_of_budget(evaluate: LineupEvaluator, max_evaluations: int, deadline: float | None) -> bool:
+    return evaluate.evaluations >= max_evaluations or (deadline is not None and time.perf_counter() >= deadline)
+
+
+def simulated_annealing(evaluate: LineupEvaluator, pool_size: int, rng: np.random.Generator, max_evaluations: int = 2000,
+                        maximize: bool = True, initial_temperature: float = 0.05, final_temperature: float = 0.001,
+                        neighbors_per_step: int = 16, time_limit: float | None = None, start: Lineup | None = None,
+                        progress: Callable[[float], None] | None = None) -> SearchResult:
+    """
+    焼きなまし法で打順を探索する。各ステップで現在の打順の近傍を neighbors_per_step 個まとめて評価し、
+    その中の最良の打順へ Metropolis 基準で移る。温度は評価回数に応じて initial_temperature から
+    final_temperature まで幾何的に下げる (温度の単位は1試合あたりの得点)。
+
+    Args:
+        evaluate (LineupEvaluator): 打順の評価関数 (メモ付き)。
+        pool_size (int): 選手プールの人数。9名より多い場合は控え選手との交代も近傍に含める。
+        max_evaluations (int): 新たに評価する打順の数の上限。
+        maximize (bool): True は最高、False は最低の打順を探す。
+        time_limit (float | None): 秒数の上限。
+        start (Lineup | None): 初期の打順。None の場合はランダム。
+        progress (Callable[[float], None] | None): 進捗 (0-1) を受け取る関数。
+    """
+    sign = 1.0 if maximize else -1.0
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    current = start if start is not None else random_lineup(pool_size, rng)
+    current_score = sign * evaluate(current)
+    best, best_score = current, current_score
+    history = [sign * best_score]
+    initial_evaluations = evaluate.evaluations
+    stalled = 0
+    while not _out_of_budget(evaluate, initial_evaluations + max_evaluations, deadline):
+        fraction = (evaluate.evaluations - initial_evaluations) / max_evaluations
+        temperature = initial_temperature * (final_temperature / initial_temperature) ** min(fraction, 1.0)
+        before = evaluate.evaluations
+        candidates = [random_neighbor(current, pool_size, rng) for _ in range(neighbors_per_step)]
+        scores = sign * evaluate.evaluate_many(candidates)
+        # 近傍がすべて評価済みの状態が続く場合は、ランダムな打順からやり直す
+        stalled = stalled + 1 if evaluate.evaluations == before else 0
+        if stalled >= 10:
+            current = random_lineup(pool_size, rng)
+            current_score = sign * evaluate(current)
+            stalled = 0
+            continue
+        index = int(np.argmax(scores))
+        delta = scores[index] - current_score
+        if delta >= 0 or rng.random() < math.exp(delta / temperature):
+            current, current_score = candidates[index], float(scores[index])
+        if current_score > best_score:
+            best, best_score = current, current_score
+        history.append(sign * best_score)
+        if progress:
+            progress(min((evaluate.evaluations - initial_evaluations) / max_evaluations, 1.0))
+    return SearchResult(best, sign * best_score, history)
+
+
+def genetic_algorithm(evaluate: LineupEvaluator, pool_size: int, rng: np.random.Generator, max_evaluations: int = 2000,
+                      maximize: bool = True, population_size: int = 48, elite: int = 2, tournament_size: int = 3,
+                      mutation_rate: float = 0.3, time_limit: float | None = None,
+                      progress: Callable[[float], None] | None = None) -> SearchResult:
+    """
+    遺伝的アルゴリズムで打順を探索する。トーナメント選択した両親から順序交叉 (order_crossover) で子を作り、
+    mutation_rate の確率で近傍操作 (random_neighbor) を加える。上位 elite 個はそのまま次の世代に残す。
+    同じ打順の評価はメモから返すため、世代をまたいで残った打順は再計算しない。
+
+    Args:
+        evaluate (LineupEvaluator): 打順の評価関数 (メモ付き)。
+        pool_size (int): 選手プールの人数。
+        max_evaluations (int): 新たに評価する打順の数の上限。
+        maximize (bool): True は最高、False は最低の打順を探す。
+        population_size (int): 1世代の個体数。評価回数が少ない場合は4世代以上進めるように減らす。
+        time_limit (float | None): 秒数の上限。
+        progress (Callable[[float], None] | None): 進捗 (0-1) を受け取る関数。
+    """
+    sign = 1.0 if maximize else -1.0
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    initial_evaluations = evaluate.evaluations
+    population_size = max(elite + tournament_size, min(population_size, max_evaluations // 4))
+    population = [random_lineup(pool_size, rng) for _ in range(population_size)]
+    fitness = sign * evaluate.evaluate_many(population)
+    history = []
+    while True:
+        order = np.argsort(-fitness, kind="stable")
+        history.append(sign * float(fitness[order[0]]))
+        if progress:
+            progress(min((evaluate.evaluations - initial_evaluations) / max_evaluations, 1.0))
+        if _out_of_budget(evaluate, initial_evaluations + max_evaluations, deadline):
+            break
+
+        def select() -> Lineup:
+            entrants = rng.choice(population_size, size=tournament_size, replace=False)
+            return population[int(entrants[np.argmax(fitness[entrants])])]
+
+        children = [population[i] for i in order[:elite]]
+        while len(children) < population_size:
+            child = order_crossover(select(), select(), rng)
+            if rng.random() < mutation_rate:
+                child = random_neighbor(child, pool_size, rng)
+            children.append(child)
+        before = evaluate.evaluations
+        population = children
+        fitness = sign * evaluate.evaluate_many(population)
+        if evaluate.evaluations == before:
+            # 子がすべて評価済みの打順になった (収束した) 場合は、エリート以外をランダムな打順で入れ替える
+            population[elite:] = [random_lineup(pool_size, rng) for _ in range(population_size - elite)]
+            fitness = sign * evaluate.evaluate_many(population)
+    best = int(np.argmax(fitness))
+    return SearchResult(population[best], sign * float(fitness[best]), history)
+
+
+def random_search(evaluate: LineupEvaluator, pool_size: int, rng: np.random.Generator, max_evaluations: int = 2000,
+                  maximize: bool = True, batch_size: int = 256, time_limit: float | None = None,
+                  progress: Callable[[float], None] | None = None) -> SearchResult:
+    """
+    比較用のランダムサンプリング。ランダムな打順を max_evaluations 個評価し、最良のものを返す。
+    時間の上限を過ぎていても、最初のバッチ (評価済みの打順だけでも) は必ず評価して最良の打順を返す。
+    """
+    sign = 1.0 if maximize else -1.0
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    initial_evaluations = evaluate.evaluations
+    best, best_score = None, -np.inf
+    history = []
+    while True:
+        remaining = initial_evaluations + max_evaluations - evaluate.evaluations
+        lineups = [random_lineup(pool_size, rng) for _ in range(max(min(batch_size, remaining), 1))]
+        before = evaluate.evaluations
+        scores = sign * evaluate.evaluate_many(lineups)
+        index = int(np.argmax(scores))
+        if scores[index] > best_score:
+            best, best_score = lineups[index], float(scores[index])
+        history.append(sign * best_score)
+        if progress:
+            progress(min((evaluate.evaluations - initial_evaluations) / max(max_evaluations, 1), 1.0))
+        if evaluate.evaluations == before:
+            break # 新しい打順が引けない (すべて評価済み)
+        if _out_of_budget(evaluate, initial_evaluations + max_evaluations, deadline):
+            break
+    return SearchResult(best, sign * best_score, history)
+
+
+# 探索戦略の名前と関数
+STRATEGIES: Dict[str, Callable[..., SearchResult]] = {
+    "random": random_search,
+    "annealing": simulated_annealing,
+    "genetic": genetic_algorithm,
+}
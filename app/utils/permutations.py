@@ -0,0 +1,52 @@
+# src/main/utils/permutations.py
+
+import math
+import numpy as np
+
+
+def unrank_permutations(ranks: np.ndarray, n: int) -> np.ndarray:
+    """
+    Lehmer符号 (階乗進法) により、辞書順の順位から順列をまとめて復元する。
+
+    Args:
+        ranks (np.ndarray): (B,) 0 以上 n! 未満の順位。
+        n (int): 順列の長さ。
+
+    Returns:
+        np.ndarray: (B, n) の順列。順位 0 は [0, 1, ..., n-1]。
+    """
+    ranks = np.asarray(ranks, dtype=np.int64)
+    if ranks.size and (ranks.min() < 0 or ranks.max() >= math.factorial(n)):
+        raise ValueError(f"ranks must be in [0, {math.factorial(n)})")
+    remaining = np.broadcast_to(np.arange(n), (len(ranks), n)).copy()
+    permutations = np.empty((len(ranks), n), dtype=np.int64)
+    rows = np.arange(len(ranks))
+    for position in range(n):
+        base = math.factorial(n - 1 - position)
+        digits = (ranks // base) % (n - position)
+        permutations[:, position] = remaining[rows, digits]
+        # 選んだ要素を取り除き、残りを左に詰める
+        keep = np.ones(remaining.shape, dtype=bool)
+        keep[rows, digits] = False
+        remaining = remaining[keep].reshape(len(ranks), n - 1 - position)
+    return permutations
+
+
+def rank_permutations(permutations: np.ndarray) -> np.ndarray:
+    """
+    unrank_permutations の逆変換。順列から辞書順の順位を計算する。
+
+    Args:
+        permutations (np.ndarray): (B, n) の順列。
+
+    Returns:
+        np.ndarray: (B,) の順位。
+    """
+    permutations = np.asarray(permutations, dtype=np.int64)
+    n = permutations.shape[1]
+    ranks = np.zeros(len(permutations), dtype=np.int64)
+    for position in range(n):
+        # 後ろにある、より小さい要素の数が Lehmer 符号の桁
+        digits = (permutations[:, position + 1:] < permutations[:, position:position + 1]).sum(axis=1)
+        ranks += digits * math.factorial(n - 1 - position)
+    return ranks
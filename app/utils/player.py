@@ -5,9 +5,13 @@ import pandas as pd
 from typing import List, Dict, Tuple, Any
 
 from .constants import EVENT_TYPES, EVENT_CONFIG, STAT_KEYS
+from .sampling import AliasTable
+from .stats import NUM_STATS, OUTCOME_STAT_DELTAS, STAT_INDEX, PlayerStats
 
 class Player:
     """野球選手とその成績を管理するクラス。"""
+    __slots__ = ("name", "probabilities", "speed", "sampler", "stats_values")
+
     def __init__(self, name: str, probabilities: List[float], speed: int = 0):
         """
         Args:
@@ -23,45 +27,58 @@ class Player:
         self.name = name
         self.probabilities = np.array(probabilities)
         self.speed = speed # 新しく追加
-        self.stats: Dict[str, int] = {}
-        self.reset_stats()
+        self.sampler = AliasTable(self.probabilities) # 打席結果のサンプラー (構築時に一度だけ作成)
+        # 成績は STAT_KEYS の順の int64 配列で持つ (StatsMatrix が打順の行列の行のビューに付け替えることがある)
+        self.stats_values = np.zeros(NUM_STATS, dtype=np.int64)
+
+    @property
+    def stats(self) -> PlayerStats:
+        """成績を STAT_KEYS をキーとする辞書のように参照・更新するビュー。"""
+        return PlayerStats(self.stats_values)
 
     def reset_stats(self):
         """選手の成績を初期化する。"""
-        for key in STAT_KEYS:
-            self.stats[key] = 0
+        self.stats_values[:] = 0
+
+    def copy(self) -> "Player":
+        """
+        成績を持たない複製を返す。
 
-    def simulate_at_bat(self) -> Tuple[str, int]:
+        確率の配列とサンプラーは読み取り専用として元の選手と共有するため、AliasTable を作り直さない。
+        セッションをまたいで共有する選手から、成績を記録するための選手を作るときに使う。
+        """
+        player = Player.__new__(Player)
+        player.name = self.name
+        player.probabilities = self.probabilities
+        player.speed = self.speed
+        player.sampler = self.sampler
+        player.stats_values = np.zeros(NUM_STATS, dtype=np.int64)
+        return player
+
+    def simulate_at_bat(self, u: float | None = None, record: bool = True, rng: np.random.Generator | None = None) -> Tuple[str, int]:
         """
         1打席の結果をシミュレートし、成績を更新する。
 
+        Args:
+            u (float | None): 打席結果の決定に使う一様乱数。None の場合は rng (省略時は np.random) から生成する。
+            record (bool): False の場合は成績を更新しない (BaseballGame が打席の最終結果をまとめて集計する)。
+            rng (np.random.Generator | None): u を省略した場合に使う乱数生成器。
+
         Returns:
             Tuple[str, int]: (打席結果のイベント名, 打者と走者が進む塁の数)
         """
-        event_type: str = np.random.choice(EVENT_TYPES, p=self.probabilities)
-        event_details = EVENT_CONFIG[event_type]
-
-        self.stats["plate_appearances"] += 1
-
-        if not event_details["is_walk"]:
-            self.stats["at_bats"] += 1
-
-        if event_details["is_hit"]:
-            self.stats["hits"] += 1
-            self.stats["slugging_points"] += event_details["slugging_value"]
-
-        if event_details["is_walk"]:
-            self.stats["walks"] +=1
-
-        stat_counter_key = event_details["stat_counter_key"]
-        if stat_counter_key:
-            self.stats[stat_counter_key] += 1
-            
-        return event_type, event_details["bases_to_advance"]
+        if u is None:
+            u = rng.random() if rng is not None else np.random.rand()
+        code = self.sampler.sample(u)
+        event_type: str = EVENT_TYPES[code]
+        if record:
+            self.stats_values += OUTCOME_STAT_DELTAS[code]
+        return event_type, EVENT_CONFIG[event_type]["bases_to_advance"]
 
     def _get_stat(self, stat_name: str) -> int:
         """指定された統計値を取得する。存在しない場合は0を返す。"""
-        return self.stats.get(stat_name, 0)
+        index = STAT_INDEX.get(stat_name)
+        return 0 if index is None else int(self.stats_values[index])
 
     def batting_average(self) -> float:
         """打率 (安打 / 打数) を計算する。"""
@@ -0,0 +1,313 @@
+# src/main/utils/player_store.py
+"""
+全年度・全チームの選手データをまとめた列指向のストア。
+
+data/processed/<year>/<team>.csv と default_lineups_<year>.csv を1つのバイナリファイル
+(data/processed/player_store.bin) にまとめ、起動時に1回だけメモリマップで開く。打席結果の確率は
+(選手数, 8) の連続した float64 行列で、(年度, チーム) ごとの行の範囲の索引から、コピーせずにビューを返す。
+ストアは data_process (または下のコマンド) が作る。データの読み込み (load_data) はストアを開くだけで、
+ストアがない場合や元の CSV がストアを作った後に変わった場合 (ファイルのサイズか更新時刻が違う場合) は CSV を読み込む。
+
+ファイルの形式:
+    MAGIC (8バイト) | ヘッダーの長さ (uint64, リトルエンディアン) | ヘッダー (JSON) | 配列 (それぞれ ALIGNMENT バイト境界から)
+    ヘッダーは配列ごとの dtype・shape・ファイル内の位置と、(年度, チーム) の索引、元のファイルの情報を持つ。
+
+使い方 (リポジトリのルートで実行):
+    python -m app.utils.player_store --base-path ./data/processed
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Tuple
+
+from .constants import PROB_COLS
+from .player import Player
+
+MAGIC = b"NPBSTOR1"
+STORE_FILE = "player_store.bin"
+ALIGNMENT = 64
+# default_lineups_<year>.csv のカラム (Year 以外は文字列)
+LINEUP_COLUMNS = ["League", "Team", "Team_Abbr", "Position", "Player"]
+
+Signature = List[Tuple[str, int, int]]
+
+_stores: Dict[str, Tuple[Tuple, "PlayerStore | None"]] = {}
+_stores_lock = threading.Lock()
+
+
+def _encode_strings(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """文字列のリストを (開始位置の配列 (len + 1,), UTF-8 のバイト列) にする。"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _decode_strings(offsets: np.ndarray, data: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return [raw[start:stop].decode("utf-8") for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def source_signature(base_path: str) -> Signature:
+    """ストアの元になるファイル (<year>/<team>.csv と default_lineups_<year>.csv) の (相対パス, サイズ, 更新時刻) の一覧。"""
+    signature = []
+    if not os.path.isdir(base_path):
+        return signature
+    with os.scandir(base_path) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            if entry.is_dir() and entry.name.isdigit():
+                with os.scandir(entry.path) as files:
+                    for file in sorted(files, key=lambda e: e.name):
+                        if file.is_file() and file.name.endswith(".csv"):
+                            status = file.stat()
+                            signature.append((f"{entry.name}/{file.name}", status.st_size, status.st_mtime_ns))
+            elif entry.is_file() and entry.name.startswith("default_lineups_") and entry.name.endswith(".csv"):
+                status = entry.stat()
+                signature.append((entry.name, status.st_size, status.st_mtime_ns))
+    return signature
+
+
+class PlayerStore:
+    """
+    選手データの列指向のストア。配列はメモリマップ (またはメモリ上の配列) のビューで、読み出し専用。
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray], index: List[Tuple[int, str, int, int]], signature: Signature,
+                 path: str | None = None):
+        """
+        Args:
+            arrays (Dict[str, np.ndarray]): probabilities (選手数, 8)、out_ratio、speed、plate_appearances、
+                name_offsets・name_bytes (選手名)、lineup_year・lineup_columns (スタメンの年度と LINEUP_COLUMNS の文字列番号)、
+                string_offsets・string_bytes (スタメンの文字列)。
+            index (List[Tuple[int, str, int, int]]): (年度, チーム, 開始行, 終了行) のリスト。
+            signature (Signature): 元のファイルの情報 (source_signature)。
+            path (str | None): メモリマップしたファイルのパス。
+        """
+        self.arrays = arrays
+        self.index = {(int(year), team): (start, stop) for year, team, start, stop in index}
+        self.signature = [tuple(item) for item in signature]
+        self.path = path
+        self._names: List[str] | None = None
+        self._strings: List[str] | None = None
+
+    @property
+    def num_players(self) -> int:
+        return len(self.arrays["speed"])
+
+    def years(self) -> List[int]:
+        return sorted({year for year, _ in self.index})
+
+    def teams(self, year: int) -> List[str]:
+        return sorted(team for y, team in self.index if y == int(year))
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return (int(key[0]), key[1]) in self.index
+
+    def rows(self, year: int, team: str) -> slice:
+        """(年度, チーム) の選手の行の範囲。"""
+        start, stop = self.index[(int(year), team)]
+        return slice(start, stop)
+
+    def probabilities(self, year: int, team: str) -> np.ndarray:
+        """(選手数, 8) 打席結果の確率 (PROB_COLS の順) のビュー。"""
+        return self.arrays["probabilities"][self.rows(year, team)]
+
+    def speeds(self, year: int, team: str) -> np.ndarray:
+        return self.arrays["speed"][self.rows(year, team)]
+
+    def plate_appearances(self, year: int, team: str) -> np.ndarray:
+        """打席数 (data/raw にない選手は0) のビュー。"""
+        return self.arrays["plate_appearances"][self.rows(year, team)]
+
+    def names(self, year: int, team: str) -> List[str]:
+        if self._names is None:
+            self._names = _decode_strings(self.arrays["name_offsets"], self.arrays["name_bytes"])
+        rows = self.rows(year, team)
+        return self._names[rows]
+
+    def players(self, year: int, team: str) -> List[Player]:
+        """(年度, チーム) の全選手の Player のリスト (CSV の行の順)。"""
+        return [Player(name, probabilities, speed=speed) for name, probabilities, speed
+                in zip(self.names(year, team), self.probabilities(year, team), self.speeds(year, team).tolist())]
+
+    def frame(self, year: int, team: str) -> pd.DataFrame:
+        """data/processed/<year>/<team>.csv を読み込んだものと同じ DataFrame。"""
+        frame = pd.DataFrame(self.probabilities(year, team), columns=PROB_COLS)
+        frame.insert(0, "Player", self.names(year, team))
+        frame["Out_ratio"] = self.arrays["out_ratio"][self.rows(year, team)]
+        speeds = self.speeds(year, team)
+        frame["Speed"] = speeds.astype(np.int64) if np.array_equal(speeds, np.round(speeds)) else speeds
+        return frame
+
+    def default_lineups(self, year: int) -> pd.DataFrame:
+        """default_lineups_<year>.csv を読み込んだものと同じ DataFrame。ない場合は空の DataFrame。"""
+        mask = self.arrays["lineup_year"] == int(year)
+        if not mask.any():
+            return pd.DataFrame()
+        if self._strings is None:
+            self._strings = _decode_strings(self.arrays["string_offsets"], self.arrays["string_bytes"])
+        strings = np.array(self._strings, dtype=object)
+        frame = pd.DataFrame({"Year": self.arrays["lineup_year"][mask].astype(np.int64)})
+        for i, column in enumerate(LINEUP_COLUMNS):
+            frame[column] = strings[self.arrays["lineup_columns"][mask, i]]
+        return frame
+
+    def is_fresh(self, base_path: str) -> bool:
+        """元のファイルがストアを作ったときから変わっていないか。"""
+        return self.signature == source_signature(base_path)
+
+    def save(self, path: str):
+        """ストアをファイルに書き込む (一時ファイルに書いてから置き換える)。"""
+        header = {"index": [[year, team, start, stop] for (year, team), (start, stop) in self.index.items()],
+                  "signature": self.signature, "arrays": {}}
+        offset = 0
+        for name, array in self.arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        encoded = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        data_start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGNMENT) * ALIGNMENT
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(MAGIC + len(encoded).to_bytes(8, "little") + encoded)
+            for name, array in self.arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temporary, path)
+
+    @classmethod
+    def open(cls, path: str) -> "PlayerStore":
+        """ファイルをメモリマップで開く。配列はファイルのビューで、コピーしない。"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a player store")
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length).decode("utf-8"))
+        data_start = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            start = data_start + spec["offset"]
+            arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+        return cls(arrays, header["index"], header["signature"], path)
+
+
+def _plate_appearances(raw_path: str, names: Sequence[str]) -> np.ndarray:
+    """data/raw の CSV の打席数を選手名で引く。ファイルや選手がない場合は0。"""
+    try:
+        raw = pd.read_csv(raw_path)
+    except FileNotFoundError:
+        return np.zeros(len(names), dtype=np.int64)
+    counts = pd.to_numeric(raw["打席"], errors="coerce").fillna(0).astype(np.int64)
+    lookup = dict(zip(raw["選手"], counts))
+    return np.array([lookup.get(name, 0) for name in names], dtype=np.int64)
+
+
+def build_player_store(base_path: str = "./data/processed", raw_path: str = "./data/raw",
+                       plate_appearances: Dict[str, np.ndarray] | None = None) -> PlayerStore:
+    """
+    base_path の全年度・全チームの CSV と default_lineups_<year>.csv からストアを作る (メモリ上)。
+    plate_appearances ("<year>/<team>.csv" から CSV の行順の打席数への辞書) にあるチームは raw_path の CSV を読み込まない。
+    確率は CSV を読み込んだ値を使う (CSV の読み込みで丸められた値と一致させるため)。
+
+    Raises:
+        ValueError: CSV に選手データのカラム (PROB_COLS, Out_ratio, Speed) がない場合。
+    """
+    signature = source_signature(base_path)
+    known_counts = plate_appearances
+    frames, index, plate_appearances = [], [], []
+    start = 0
+    lineups = []
+    for name, _, _ in signature:
+        if name.startswith("default_lineups_"):
+            lineups.append(pd.read_csv(os.path.join(base_path, name)))
+            continue
+        year, file = name.split("/")
+        frame = pd.read_csv(os.path.join(base_path, name))
+        missing = [column for column in ["Player"] + PROB_COLS + ["Out_ratio", "Speed"] if column not in frame.columns]
+        if missing:
+            raise ValueError(f"{name} is missing columns: {missing}")
+        frames.append(frame)
+        team = file[:-4]
+        index.append((int(year), team, start, start + len(frame)))
+        if known_counts and name in known_counts:
+            counts = np.asarray(known_counts[name], dtype=np.int64)
+        else:
+            counts = _plate_appearances(os.path.join(raw_path, year, file), frame["Player"].tolist())
+        plate_appearances.append(counts)
+        start += len(frame)
+
+    players = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["Player"] + PROB_COLS + ["Out_ratio", "Speed"])
+    name_offsets, name_bytes = _encode_strings(players["Player"].astype(str).tolist())
+    lineup = pd.concat(lineups, ignore_index=True) if lineups else pd.DataFrame(columns=["Year"] + LINEUP_COLUMNS)
+    strings = sorted(set(lineup[LINEUP_COLUMNS].astype(str).to_numpy().ravel().tolist()))
+    string_ids = {s: i for i, s in enumerate(strings)}
+    string_offsets, string_bytes = _encode_strings(strings)
+    arrays = {
+        "probabilities": players[PROB_COLS].to_numpy(dtype=np.float64).reshape(-1, len(PROB_COLS)),
+        "out_ratio": players["Out_ratio"].to_numpy(dtype=np.float64),
+        "speed": players["Speed"].to_numpy(dtype=np.float64),
+        "plate_appearances": np.concatenate(plate_appearances) if plate_appearances else np.zeros(0, dtype=np.int64),
+        "name_offsets": name_offsets,
+        "name_bytes": name_bytes,
+        "lineup_year": lineup["Year"].to_numpy(dtype=np.int32),
+        "lineup_columns": np.array([[string_ids[str(v)] for v in row] for row in lineup[LINEUP_COLUMNS].to_numpy()],
+                                   dtype=np.int32).reshape(-1, len(LINEUP_COLUMNS)),
+        "string_offsets": string_offsets,
+        "string_bytes": string_bytes,
+    }
+    return PlayerStore(arrays, index, signature)
+
+
+def get_player_store(base_path: str = "./data/processed") -> PlayerStore | None:
+    """
+    base_path のストア (player_store.bin) を開いて返す。プロセス内では、元の CSV とストアのファイルが
+    変わらない間は同じストアを返す。ストアを作ったり書き込んだりはしない。
+
+    Returns:
+        PlayerStore | None: ストアがない場合、開けない場合、元の CSV がストアを作った後に変わった場合は None。
+    """
+    path = os.path.join(base_path, STORE_FILE)
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+    signature = source_signature(base_path)
+    state = (signature, status.st_size, status.st_mtime_ns)
+    key = os.path.abspath(base_path)
+    with _stores_lock:
+        cached = _stores.get(key)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+        try:
+            store = PlayerStore.open(path)
+        except (OSError, ValueError):
+            store = None
+        if store is not None and store.signature != signature:
+            store = None
+        _stores[key] = (state, store)
+    return store
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="全年度・全チームの選手データを1つのバイナリファイルにまとめる")
+    parser.add_argument("--base-path", default="./data/processed")
+    parser.add_argument("--raw-path", default="./data/raw")
+    args = parser.parse_args(argv)
+
+    store = build_player_store(args.base_path, args.raw_path)
+    path = os.path.join(args.base_path, STORE_FILE)
+    store.save(path)
+    print(f"{store.num_players:,} 選手 ({len(store.index)} チーム) を {path} に保存しました")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
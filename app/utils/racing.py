@@ -0,0 +1,143 @@
+# src/main/utils/racing.py
+
+import numpy as np
+from statistics import NormalDist
+
+
+class RunningStats:
+    """
+    候補 (打順) ごとの1試合あたり得点の試合数・合計・二乗和を保持し、平均と標準誤差を計算するクラス。
+    ラウンドごとに一部の候補だけ試合を追加しても、全試合の平均・分散がそのまま得られる。
+    """
+    def __init__(self, num_candidates: int):
+        self.count = np.zeros(num_candidates, dtype=np.int64)
+        self.total = np.zeros(num_candidates, dtype=np.float64)
+        self.total_sq = np.zeros(num_candidates, dtype=np.float64)
+
+    def add(self, candidates: np.ndarray, scores: np.ndarray):
+        """
+        Args:
+            candidates (np.ndarray): (k,) 試合を追加した候補の番号。
+            scores (np.ndarray): (k, 試合数) 各候補の試合ごとの得点。
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        self.count[candidates] += scores.shape[1]
+        self.total[candidates] += scores.sum(axis=1)
+        self.total_sq[candidates] += (scores * scores).sum(axis=1)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return np.divide(self.total, self.count, out=np.zeros_like(self.total), where=self.count > 0)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """不偏分散。試合数が2未満の候補は全候補の平均的な分散で代用する。"""
+        count = self.count
+        mean = self.mean
+        variance = np.divide(self.total_sq - count * mean * mean, count - 1, out=np.zeros_like(self.total), where=count > 1)
+        variance = np.maximum(variance, 0.0)
+        measured = count > 1
+        if measured.any() and not measured.all():
+            variance[~measured] = variance[measured].mean()
+        return variance
+
+    @property
+    def std_error(self) -> np.ndarray:
+        return np.sqrt(np.divide(self.variance, self.count, out=np.full_like(self.total, np.inf), where=self.count > 0))
+
+
+def z_value(confidence: float) -> float:
+    """両側の信頼水準 confidence に対応する標準正規分布の分位点を返す。"""
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def race_survivors(mean: np.ndarray, std_error: np.ndarray, alive: np.ndarray, z: float, largest: bool = True) -> np.ndarray:
+    """
+    信頼区間が現在の首位 (largest=False の場合は最下位) に届かない候補を除いた、生き残りのマスクを返す。
+
+    Args:
+        mean (np.ndarray): (候補数,) 平均得点。
+        std_error (np.ndarray): (候補数,) 平均得点の標準誤差。
+        alive (np.ndarray): (候補数,) 現在の生き残りのマスク。
+        z (float): 信頼区間の幅 (標準誤差の何倍か)。
+        largest (bool): True は最高、False は最低の打順を争う。
+    """
+    sign = 1.0 if largest else -1.0
+    score = sign * mean
+    candidates = np.flatnonzero(alive)
+    leader = candidates[np.argmax(score[candidates])]
+    # 首位の下側の信頼限界より、上側の信頼限界が低い候補を除く
+    reachable = score + z * std_error >= score[leader] - z * std_error[leader]
+    return alive & reachable
+
+
+def keep_best(mean: np.ndarray, alive: np.ndarray, count: int, largest: bool = True) -> np.ndarray:
+    """生き残りのうち平均得点の上位 (largest=False の場合は下位) count 件だけを残す。同点は番号の小さい方を残す。"""
+    candidates = np.flatnonzero(alive)
+    if len(candidates) <= count:
+        return alive
+    score = mean[candidates] if largest else -mean[candidates]
+    kept = candidates[np.lexsort((candidates, -score))[:count]]
+    survivors = np.zeros_like(alive)
+    survivors[kept] = True
+    return survivors
+
+
+def probability_best(mean: np.ndarray, std_error: np.ndarray, index: int, largest: bool = True) -> float:
+    """
+    候補 index の真の平均得点が、他のすべての候補より高い (largest=False の場合は低い) 確率を正規近似で求める。
+    各候補との比較を独立とみなした積で近似する。
+    """
+    sign = 1.0 if largest else -1.0
+    others = np.arange(len(mean)) != index
+    gap = sign * (mean[index] - mean[others])
+    scale = np.sqrt(std_error[index] ** 2 + std_error[others] ** 2)
+    z = np.divide(gap, scale, out=np.where(gap >= 0, np.inf, -np.inf), where=scale > 0)
+    cdf = NormalDist().cdf
+    return float(np.prod([cdf(value) if np.isfinite(value) else float(value > 0) for value in z]))
+
+
+class ScoreHistory:
+    """
+    ラウンドごとの各候補の試合ごとの得点を保持するクラス。共通乱数を使う場合に、同じ試合番号どうしの
+    得点差 (対応のある比較) で候補を打ち切るために使う。同じラウンドの候補は同じ試合番号の試合を行っている前提。
+    """
+    def __init__(self):
+        self.rounds = []
+
+    def add(self, candidates: np.ndarray, scores: np.ndarray):
+        self.rounds.append((np.asarray(candidates), np.asarray(scores, dtype=np.float64)))
+
+    def paired_difference(self, reference: int, num_candidates: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        各候補と候補 reference の、両方が行った試合での1試合あたりの得点差の平均と標準誤差を返す。
+        reference と1試合も共通の試合がない候補は (0, inf)。
+        """
+        count = np.zeros(num_candidates, dtype=np.int64)
+        total = np.zeros(num_candidates)
+        total_sq = np.zeros(num_candidates)
+        for candidates, scores in self.rounds:
+            row = np.flatnonzero(candidates == reference)
+            if not len(row):
+                continue
+            difference = scores - scores[row[0]]
+            count[candidates] += scores.shape[1]
+            total[candidates] += difference.sum(axis=1)
+            total_sq[candidates] += (difference * difference).sum(axis=1)
+        mean = np.divide(total, count, out=np.zeros(num_candidates), where=count > 0)
+        variance = np.divide(total_sq - count * mean * mean, count - 1, out=np.zeros(num_candidates), where=count > 1)
+        std_error = np.sqrt(np.divide(np.maximum(variance, 0.0), count, out=np.full(num_candidates, np.inf), where=count > 1))
+        std_error[reference] = 0.0
+        return mean, std_error
+
+
+def paired_race_survivors(history: ScoreHistory, mean: np.ndarray, alive: np.ndarray, z: float, largest: bool = True) -> np.ndarray:
+    """
+    race_survivors の対応のある比較版。現在の首位 (largest=False の場合は最下位) との得点差の信頼区間が、
+    首位に届かない (0 を超えられない) 候補を除いた生き残りのマスクを返す。
+    """
+    sign = 1.0 if largest else -1.0
+    candidates = np.flatnonzero(alive)
+    leader = int(candidates[np.argmax(sign * mean[candidates])])
+    difference, std_error = history.paired_difference(leader, len(mean))
+    return alive & (sign * difference + z * std_error >= 0)
@@ -0,0 +1,200 @@
+# src/main/utils/roster.py
+"""
+守備位置を考慮した、選手プールからの9名の選択と打順の最適化。
+
+各選手が先発出場した守備位置 (position_starts_<year>.csv、なければ default_lineups_<year>.csv のスタメン) から
+守れる位置を決め、全員が守備位置に就ける9名の組み合わせだけを列挙する。
+組み合わせごとに共通の並びでマルコフ連鎖の期待得点を計算して下限とし、並び替えで伸びる幅を加えた上界が
+それまでの最良の打順に届かない組み合わせは、打順の最適化を行わずに打ち切る。
+"""
+
+import math
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Set, Tuple
+
+from .constants import SEASON_GAMES
+from .league import pitcher_player
+from .markov import expected_runs
+from .optimizer import LineupEvaluator, simulated_annealing
+from .player import Player
+from .sampling import SeedLike, as_generator
+
+# 守備位置 (投手を除く) と指名打者の略称
+POSITIONS = ["捕", "一", "二", "三", "遊", "左", "中", "右"]
+DESIGNATED_HITTER = "指"
+# 守れるとみなす先発出場数の下限
+DEFAULT_MIN_STARTS = 10
+# 組み合わせごとに期待得点を計算する共通の並びの数
+DEFAULT_SCREEN_ORDERS = 16
+# 組み合わせごとの打順の最適化 (焼きなまし法) で評価する並びの数
+DEFAULT_ORDER_EVALUATIONS = 1500
+# 並び替えで伸びる幅を、最適化した組み合わせで観測した最大値の何倍と見積もるか
+MARGIN_FACTOR = 2.0
+# 並び替えで伸びる幅の見積もりの下限 (1試合あたりの得点。16通りの並びの最良値からの伸びは実データで 0.01-0.11 程度)
+MIN_MARGIN = 0.1
+# マルコフ連鎖で一度に評価する打順の数
+ROSTER_BATCH_SIZE = 256
+
+
+def load_position_eligibility(year: int, team_abbr: str, base_path: str = "./data/processed",
+                              min_starts: int = DEFAULT_MIN_STARTS) -> Dict[str, Set[str]]:
+    """
+    選手名から守れる守備位置の集合への辞書を返す。
+
+    position_starts_<year>.csv がある場合は先発出場数が min_starts 以上の守備位置、
+    ない場合は default_lineups_<year>.csv のスタメンの守備位置を使う。スタメンの守備位置は常に含める。
+    指名打者は誰でも務められるため辞書には含めない。
+    """
+    eligibility: Dict[str, Set[str]] = {}
+    starts_path = os.path.join(base_path, f"position_starts_{year}.csv")
+    if os.path.exists(starts_path):
+        starts = pd.read_csv(starts_path)
+        starts = starts[(starts["Team_Abbr"].str.upper() == team_abbr.upper()) & (starts["Starts"] >= min_starts)]
+        for name, position in zip(starts["Player"], starts["Position"]):
+            eligibility.setdefault(name, set()).add(position)
+    defaults_path = os.path.join(base_path, f"default_lineups_{year}.csv")
+    if os.path.exists(defaults_path):
+        defaults = pd.read_csv(defaults_path)
+        defaults = defaults[defaults["Team_Abbr"].str.upper() == team_abbr.upper()]
+        for name, position in zip(defaults["Player"], defaults["Position"]):
+            eligibility.setdefault(name, set()).add(position)
+    for positions in eligibility.values():
+        positions.discard(DESIGNATED_HITTER)
+    return {name: positions for name, positions in eligibility.items() if positions}
+
+
+def valid_rosters(players: Sequence[Player], eligibility: Dict[str, Set[str]], use_dh: bool = True) -> List[Dict[str, int]]:
+    """
+    全員が守備位置に就ける選手の組み合わせを列挙する。
+
+    Args:
+        players (Sequence[Player]): 選手プール。
+        eligibility (Dict[str, Set[str]]): 選手名から守れる守備位置の集合への辞書 (load_position_eligibility)。
+        use_dh (bool): True の場合は8つの守備位置と指名打者 (誰でもよい) の9名、False の場合は8つの守備位置の8名を選ぶ。
+
+    Returns:
+        List[Dict[str, int]]: 組み合わせごとの守備位置から選手プールの番号への辞書。
+            同じ選手の組み合わせは (守備位置の割り当てが複数あっても) 1つだけ返す。
+    """
+    candidates = {position: [i for i, p in enumerate(players) if position in eligibility.get(p.name, ())] for position in POSITIONS}
+    # 候補の少ない守備位置から割り当てる
+    order = sorted(POSITIONS, key=lambda position: len(candidates[position]))
+    rosters: Dict[frozenset, Dict[str, int]] = {}
+    assignment: Dict[str, int] = {}
+
+    def assign(depth: int):
+        if depth == len(order):
+            used = set(assignment.values())
+            for designated in (range(len(players)) if use_dh else [None]):
+                if designated in used:
+                    continue
+                members = frozenset(used if designated is None else used | {designated})
+                if members not in rosters:
+                    roster = dict(assignment)
+                    if designated is not None:
+                        roster[DESIGNATED_HITTER] = designated
+                    rosters[members] = roster
+            return
+        position = order[depth]
+        for index in candidates[position]:
+            if index not in assignment.values():
+                assignment[position] = index
+                assign(depth + 1)
+                del assignment[position]
+
+    assign(0)
+    return list(rosters.values())
+
+
+def _screen(players: Sequence[Player], rosters: List[List[int]], orders: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """各組み合わせを共通の並びで評価し、(組み合わせごとの最良の期待得点, その並び) を返す。"""
+    probabilities = np.array([p.probabilities for p in players], dtype=np.float64)
+    speeds = np.array([p.speed for p in players], dtype=np.float64)
+    lineups = np.array(rosters, dtype=np.int64)[:, orders].reshape(-1, 9) # (組み合わせ * 並び, 9)
+    scores = np.empty(len(lineups))
+    for start in range(0, len(lineups), ROSTER_BATCH_SIZE):
+        batch = lineups[start:start + ROSTER_BATCH_SIZE]
+        scores[start:start + ROSTER_BATCH_SIZE] = expected_runs(probabilities[batch], speeds[batch])
+    scores = scores.reshape(len(rosters), len(orders))
+    best = scores.argmax(axis=1)
+    return scores[np.arange(len(rosters)), best], orders[best]
+
+
+def select_lineup(players: Sequence[Player], eligibility: Dict[str, Set[str]], use_dh: bool = True,
+                  screen_orders: int = DEFAULT_SCREEN_ORDERS, order_evaluations: int = DEFAULT_ORDER_EVALUATIONS,
+                  margin: float | None = None, seed: SeedLike = None, progress_bar=None, status_text=None) -> Dict:
+    """
+    守備位置を考慮して選手プールから9名を選び、打順を最適化する (評価はマルコフ連鎖の期待得点)。
+
+    1. 守備位置に就ける組み合わせ (valid_rosters) を列挙する。DH 制でない場合は9番に投手を加える。
+    2. 全組み合わせを共通の screen_orders 通りの並びで評価し、最良の値を組み合わせの下限とする。
+    3. 下限の高い組み合わせから順に焼きなまし法で打順を最適化し、「下限 + 並び替えで伸びる幅」が
+       それまでの最良の期待得点に届かなくなった時点で残りを打ち切る。伸びる幅は margin を指定しない場合、
+       最適化した組み合わせで観測した (最適化後 - 下限) の最大値の MARGIN_FACTOR 倍 (MIN_MARGIN 以上) とする。
+       上界は見積もりのため、打ち切った組み合わせに最良の打順がないことは保証しない。
+
+    Args:
+        players (Sequence[Player]): 選手プール (投手を含まない)。
+        eligibility (Dict[str, Set[str]]): 選手名から守れる守備位置の集合への辞書。
+        use_dh (bool): DH 制を使うか。
+        screen_orders (int): 組み合わせごとに評価する共通の並びの数。
+        order_evaluations (int): 組み合わせごとの打順の最適化で評価する並びの数の上限。
+        margin (float | None): 並び替えで伸びる幅 (1試合あたりの得点)。None の場合は観測値から見積もる。
+        seed (SeedLike): 共通の並びと焼きなまし法の乱数のシード。
+
+    Returns:
+        Dict: "lineup" (選手名の打順), "players", "positions" (打順ごとの守備位置), "avg_score", "total_score",
+            "num_candidates" (守備位置を考慮しない場合の打順の数), "num_rosters" (守備位置に就ける組み合わせの数),
+            "num_valid_lineups" (組み合わせ * 9!), "refined" (打順を最適化した組み合わせの数), "pruned" (打ち切った数)。
+    """
+    rng = as_generator(seed)
+    rosters = valid_rosters(players, eligibility, use_dh)
+    if not rosters:
+        raise ValueError("No combination of players can cover every position")
+    pool = list(players) if use_dh else list(players) + [pitcher_player()]
+    pitcher = len(players)
+    members = [[roster[position] for position in POSITIONS] + [roster[DESIGNATED_HITTER] if use_dh else pitcher]
+               for roster in rosters]
+    labels = POSITIONS + [DESIGNATED_HITTER if use_dh else "投"]
+
+    if status_text:
+        status_text.text(f"守備位置に就ける {len(rosters):,} 通りの組み合わせを評価中...")
+    orders = np.array([rng.permutation(9) for _ in range(screen_orders)], dtype=np.int64)
+    lower, screen_order = _screen(pool, members, orders)
+
+    best_score, best_lineup, best_positions = -np.inf, None, None
+    observed_gain = 0.0
+    refined = 0
+    ranking = np.argsort(-lower, kind="stable")
+    for position_in_ranking, index in enumerate(ranking):
+        gain = margin if margin is not None else max(observed_gain * MARGIN_FACTOR, MIN_MARGIN)
+        if refined and lower[index] + gain < best_score:
+            break
+        evaluate = LineupEvaluator([pool[i] for i in members[index]])
+        result = simulated_annealing(evaluate, 9, rng, max_evaluations=order_evaluations,
+                                     start=tuple(screen_order[index].tolist()))
+        refined += 1
+        observed_gain = max(observed_gain, result.score - lower[index])
+        if result.score > best_score:
+            best_score = result.score
+            best_lineup = [pool[members[index][i]] for i in result.lineup]
+            best_positions = [labels[i] for i in result.lineup]
+        if progress_bar:
+            progress_bar.progress((position_in_ranking + 1) / len(rosters))
+        if status_text:
+            status_text.text(f"{refined} 通りの組み合わせの打順を最適化しました (最良 {best_score:.3f}点)")
+
+    return {
+        "lineup": [p.name for p in best_lineup],
+        "players": best_lineup,
+        "positions": best_positions,
+        "avg_score": float(best_score),
+        "total_score": float(best_score) * SEASON_GAMES,
+        "num_candidates": math.perm(len(players), 9) if len(players) >= 9 else 0,
+        "num_rosters": len(rosters),
+        "num_valid_lineups": len(rosters) * math.factorial(9),
+        "refined": refined,
+        "pruned": len(rosters) - refined,
+    }
@@ -0,0 +1,153 @@
+# src/main/utils/run_distribution.py
+"""
+動的計画法による、イニングと1試合の得点の厳密な分布。
+
+(塁・アウト状況, 打者, それまでの得点) を状態として1打席ずつ確率を進め、イニング終了までの
+得点の分布を先頭打者ごとに求める。1試合の分布はイニングの分布を先頭打者の移り変わりとともに
+num_innings 回たたみ込んで求める。走塁の規則と Speed の扱いはマルコフ連鎖 (markov) と同じ。
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence, Tuple
+
+from .markov import MAX_RUNS_PER_PLAY, NUM_BASE_OUT_STATES, EXIT_STATE, lineup_arrays, slot_transitions_by_runs
+from .player import Player
+
+# 1イニングの得点の上限 (これ以上の得点は上限の値にまとめる)
+DEFAULT_INNING_RUN_CAP = 15
+# 1試合の得点の上限 (これ以上の得点は上限の値にまとめる)
+DEFAULT_GAME_RUN_CAP = 30
+# イニングが終わっていない確率がこれより小さくなったら打ち切る
+DEFAULT_TOLERANCE = 1e-12
+# 1イニングの打席数の上限
+MAX_PLATE_APPEARANCES = 200
+# 一度に計算する打順の数
+DISTRIBUTION_BATCH_SIZE = 64
+
+
+def _add_shifted(target: np.ndarray, values: np.ndarray, shift: int):
+    """得点の軸 (最後の軸) を shift だけずらして加える。上限を超えた分は最後の要素にまとめる。"""
+    cap = target.shape[-1] - 1
+    if shift > cap:
+        target[..., cap] += values.sum(axis=-1)
+        return
+    target[..., shift:] += values[..., :cap + 1 - shift]
+    if shift:
+        target[..., cap] += values[..., cap + 1 - shift:].sum(axis=-1)
+
+
+def inning_run_distribution(probabilities: np.ndarray, speeds: np.ndarray, run_cap: int = DEFAULT_INNING_RUN_CAP,
+                            tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    """
+    先頭打者ごとに、イニングの得点と次のイニングの先頭打者の同時分布を求める。
+
+    Args:
+        probabilities (np.ndarray): (打順数, 9, 8) 打席結果の確率。
+        speeds (np.ndarray): (打順数, 9) 各打者の Speed。
+        run_cap (int): 得点の上限。run_cap 点以上はまとめて run_cap 点とする。
+        tolerance (float): イニングが終わっていない確率がこれより小さくなったら打ち切る。
+
+    Returns:
+        np.ndarray: (打順数, 9, 9, run_cap + 1) [.., 先頭打者, 次のイニングの先頭打者, 得点] の確率。
+    """
+    by_runs = slot_transitions_by_runs(probabilities, speeds) # (打順数, 9, 得点, 状態, 遷移先)
+    num_lineups = by_runs.shape[0]
+    leadoffs = np.arange(9)
+    # pending[l, 先頭打者, それまでの得点, 状態] はイニングが続いている確率
+    pending = np.zeros((num_lineups, 9, run_cap + 1, NUM_BASE_OUT_STATES))
+    pending[:, :, 0, 0] = 1.0
+    result = np.zeros((num_lineups, 9, 9, run_cap + 1))
+    for step in range(MAX_PLATE_APPEARANCES):
+        batter = (leadoffs + step) % 9
+        transitions = by_runs[:, batter] # (打順数, 先頭打者, 得点, 状態, 遷移先)
+        following = np.zeros((num_lineups, 9, run_cap + 1, NUM_BASE_OUT_STATES + 1))
+        for runs in range(MAX_RUNS_PER_PLAY + 1):
+            moved = pending @ transitions[:, :, runs] # (打順数, 先頭打者, それまでの得点, 遷移先)
+            _add_shifted(following.swapaxes(-1, -2), moved.swapaxes(-1, -2), runs)
+        # 3アウトになった確率を、得点と次の先頭打者ごとに記録する
+        result[:, leadoffs, (batter + 1) % 9] += following[..., EXIT_STATE]
+        pending = following[..., :EXIT_STATE]
+        if pending.sum(axis=(2, 3)).max() < tolerance:
+            break
+    return result
+
+
+def game_run_distribution(probabilities: np.ndarray, speeds: np.ndarray, num_innings: int = 9,
+                          run_cap: int = DEFAULT_GAME_RUN_CAP, inning_run_cap: int = DEFAULT_INNING_RUN_CAP) -> np.ndarray:
+    """
+    1試合 (num_innings イニング、1回の先頭は1番打者) の得点の分布を求める。
+
+    Returns:
+        np.ndarray: (打順数, run_cap + 1) 得点ごとの確率。run_cap 点以上はまとめて run_cap 点とする。
+    """
+    inning = inning_run_distribution(probabilities, speeds, min(inning_run_cap, run_cap))
+    num_lineups = inning.shape[0]
+    # game[l, 先頭打者, 得点]
+    game = np.zeros((num_lineups, 9, run_cap + 1))
+    game[:, 0, 0] = 1.0
+    for _ in range(num_innings):
+        following = np.zeros_like(game)
+        for runs in range(inning.shape[-1]):
+            moved = np.einsum("lcr,lcd->ldr", game, inning[..., runs])
+            _add_shifted(following, moved, runs)
+        game = following
+    return game.sum(axis=1)
+
+
+def run_distribution(players: Sequence[Player], num_innings: int = 9, run_cap: int = DEFAULT_GAME_RUN_CAP) -> np.ndarray:
+    """打順 (9名の Player のリスト) の1試合の得点の分布 ((run_cap + 1,) の確率) を返す。"""
+    if len(players) != 9:
+        raise ValueError("players must contain exactly 9 players")
+    probabilities, speeds = lineup_arrays([players])
+    return game_run_distribution(probabilities, speeds, num_innings, run_cap)[0]
+
+
+def distribution_stats(distribution: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    得点の分布 (..., 得点) の平均と標準偏差を返す。上限にまとめた得点は上限の値として数える。
+    """
+    runs = np.arange(distribution.shape[-1])
+    mean = distribution @ runs
+    variance = distribution @ (runs * runs) - mean * mean
+    return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+def probability_at_least(distribution: np.ndarray, runs: int) -> np.ndarray:
+    """得点の分布 (..., 得点) から runs 点以上を挙げる確率を返す。"""
+    return distribution[..., runs:].sum(axis=-1)
+
+
+def distribution_frame(distribution: np.ndarray) -> pd.DataFrame:
+    """得点の分布を (得点, 確率, その得点以上の確率) の表にする。最後の行は上限以上をまとめた値。"""
+    return pd.DataFrame({
+        "得点": np.arange(len(distribution)),
+        "確率": distribution,
+        "以上の確率": distribution[::-1].cumsum()[::-1],
+    })
+
+
+def rank_lineups(lineups: Sequence[Sequence[Player]], threshold: int | None = None, risk_aversion: float = 0.0,
+                 num_innings: int = 9, run_cap: int = DEFAULT_GAME_RUN_CAP) -> List[Dict]:
+    """
+    得点の分布を使って打順を順位付けする。
+
+    Args:
+        lineups (Sequence[Sequence[Player]]): 打順のリスト。
+        threshold (int | None): 指定した場合は threshold 点以上を挙げる確率の高い順に並べる。
+        risk_aversion (float): threshold を指定しない場合の評価値 (平均 - risk_aversion * 標準偏差) の係数。
+            正の値はばらつきの小さい打順を、負の値はばらつきの大きい打順を好む。
+
+    Returns:
+        List[Dict]: 評価値の高い順。各要素は "index" (lineups での番号)、"lineup" (選手名のリスト)、
+            "mean"、"std"、"score" (評価値) を持つ。
+    """
+    distributions = np.empty((len(lineups), run_cap + 1))
+    for start in range(0, len(lineups), DISTRIBUTION_BATCH_SIZE):
+        probabilities, speeds = lineup_arrays(lineups[start:start + DISTRIBUTION_BATCH_SIZE])
+        distributions[start:start + DISTRIBUTION_BATCH_SIZE] = game_run_distribution(probabilities, speeds, num_innings, run_cap)
+    mean, std = distribution_stats(distributions)
+    score = probability_at_least(distributions, threshold) if threshold is not None else mean - risk_aversion * std
+    order = np.lexsort((np.arange(len(lineups)), -score))
+    return [{"index": int(i), "lineup": [p.name for p in lineups[i]], "mean": float(mean[i]), "std": float(std[i]),
+             "score": float(score[i])} for i in order]
@@ -0,0 +1,198 @@
+# src/main/utils/run_expectancy.py
+"""
+塁・アウト状況別の得点期待値 (RE24) と、打席結果ごとの得点価値 (linear weights) の計算。
+
+BatchBaseballGame で大量のイニングをシミュレートし、各打席の (塁状況, アウト数) と
+イニング終了までの得点を固定サイズの集計用配列に流し込む (打席のログは残さない)。
+
+使い方 (リポジトリのルートで実行):
+    python -m app.utils.run_expectancy --year 2024 --team t --games 100000
+    python -m app.utils.run_expectancy --year 2024 --games 20000   # 全チームのスタメン (リーグ全体)
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import List, NamedTuple, Sequence
+
+from .batch_game import BatchBaseballGame
+from .constants import OUTCOME_TYPES
+from .eval_cache import get_evaluation_cache, is_cacheable_seed
+from .load_data import load_roster
+from .player import Player
+from .sampling import SeedLike, as_generator
+from .transitions import NUM_OUTCOMES
+
+NUM_STATES = 24
+EXIT_STATE = NUM_STATES # 3アウト (イニング終了)
+# 1打席の得点の最大値 (満塁本塁打)
+MAX_RUNS_PER_PLAY = 4
+# 塁状況のマスクの表示 (一塁・二塁・三塁の順)
+BASE_LABELS = ["___", "1__", "_2_", "12_", "__3", "1_3", "_23", "123"]
+
+
+class RunExpectancy(NamedTuple):
+    """得点期待値と得点価値の計算結果。"""
+    matrix: np.ndarray          # (3, 8) [アウト数, 塁状況のマスク] の得点期待値
+    std_error: np.ndarray       # (3, 8) 得点期待値の標準誤差 (イニング単位のクラスタで計算)
+    counts: np.ndarray          # (3, 8) 各状態での打席数
+    run_values: np.ndarray      # (len(OUTCOME_TYPES),) 打席結果ごとの得点価値 (発生しなかった結果は nan)
+    run_value_errors: np.ndarray  # (len(OUTCOME_TYPES),) 得点価値の標準誤差
+    outcome_counts: np.ndarray  # (len(OUTCOME_TYPES),) 打席結果ごとの回数
+    innings: int                # シミュレートしたイニング数
+
+
+class RunExpectancyAccumulator:
+    """
+    BatchBaseballGame.simulate_games の observer として、得点期待値と得点価値の十分統計量を集計するクラス。
+
+    試合ごとに現在のイニングの (状態ごとの打席数, 打席前までの得点の合計) だけを保持し、
+    イニングが終わった時点で「イニングの得点 - 打席前までの得点」(= その打席からイニング終了までの得点) を
+    状態ごとに合算する。得点価値は (打席結果, 打席前の状態, 打席後の状態, 得点) の回数から計算する。
+    """
+    def __init__(self):
+        self.sum_visits = np.zeros(NUM_STATES)
+        self.sum_runs = np.zeros(NUM_STATES)
+        # 標準誤差 (比推定量の分散) のためのイニングごとの二乗和・積和
+        self.sum_runs_sq = np.zeros(NUM_STATES)
+        self.sum_visits_sq = np.zeros(NUM_STATES)
+        self.sum_runs_visits = np.zeros(NUM_STATES)
+        self.innings = 0
+        self.transitions = np.zeros(NUM_OUTCOMES * NUM_STATES * (NUM_STATES + 1) * (MAX_RUNS_PER_PLAY + 1), dtype=np.int64)
+
+    def begin(self, num_games: int):
+        """試合のまとまりの開始時に、試合ごとの作業用の配列を用意する。"""
+        self.visits = np.zeros((num_games, NUM_STATES))
+        self.runs_before = np.zeros((num_games, NUM_STATES))
+        self.inning_runs = np.zeros(num_games)
+
+    def observe(self, games: np.ndarray, states: np.ndarray, outcomes: np.ndarray, runs: np.ndarray, next_states: np.ndarray):
+        """1ステップ分の打席 (各試合1打席) を集計する。"""
+        # 1ステップで各試合は1打席ずつなので (試合, 状態) は重複しない
+        self.visits[games, states] += 1
+        self.runs_before[games, states] += self.inning_runs[games]
+        self.inning_runs[games] += runs
+        key = ((outcomes * NUM_STATES + states) * (NUM_STATES + 1) + next_states) * (MAX_RUNS_PER_PLAY + 1) + runs
+        self.transitions += np.bincount(key, minlength=self.transitions.size)
+
+        finished = games[next_states == EXIT_STATE]
+        if finished.size:
+            visits = self.visits[finished]
+            remaining = self.inning_runs[finished, None] * visits - self.runs_before[finished]
+            self.sum_visits += visits.sum(axis=0)
+            self.sum_runs += remaining.sum(axis=0)
+            self.sum_runs_sq += (remaining * remaining).sum(axis=0)
+            self.sum_visits_sq += (visits * visits).sum(axis=0)
+            self.sum_runs_visits += (remaining * visits).sum(axis=0)
+            self.innings += finished.size
+            self.visits[finished] = 0.0
+            self.runs_before[finished] = 0.0
+            self.inning_runs[finished] = 0.0
+
+    def result(self) -> RunExpectancy:
+        """集計した値から得点期待値と得点価値を計算する。"""
+        visits = self.sum_visits
+        matrix = np.divide(self.sum_runs, visits, out=np.full(NUM_STATES, np.nan), where=visits > 0)
+        # 比推定量 R = ΣY/ΣN の分散 ≈ m/(m-1) Σ(Y_i - R N_i)^2 / (ΣN)^2 (i はイニング)
+        m = self.innings
+        residual = self.sum_runs_sq - 2 * matrix * self.sum_runs_visits + matrix * matrix * self.sum_visits_sq
+        variance = np.divide(np.maximum(residual, 0.0) * m / max(m - 1, 1), visits * visits,
+                             out=np.full(NUM_STATES, np.nan), where=visits > 0)
+
+        # 得点価値 = 打席の得点 + 打席後の状態の得点期待値 - 打席前の状態の得点期待値
+        counts = self.transitions.reshape(NUM_OUTCOMES, NUM_STATES, NUM_STATES + 1, MAX_RUNS_PER_PLAY + 1).astype(np.float64)
+        expectancy = np.r_[np.nan_to_num(matrix), 0.0]
+        values = (np.arange(MAX_RUNS_PER_PLAY + 1)[None, None, :] + expectancy[None, :, None]
+                  - expectancy[:NUM_STATES, None, None]) # (打席前の状態, 打席後の状態, 得点)
+        outcome_counts = counts.sum(axis=(1, 2, 3))
+        totals = (counts * values).sum(axis=(1, 2, 3))
+        run_values = np.divide(totals, outcome_counts, out=np.full(NUM_OUTCOMES, np.nan), where=outcome_counts > 0)
+        deviations = values[None] - run_values[:, None, None, None]
+        squares = (counts * deviations * deviations).sum(axis=(1, 2, 3))
+        run_value_variance = np.divide(squares, outcome_counts - 1, out=np.full(NUM_OUTCOMES, np.nan), where=outcome_counts > 1)
+        run_value_errors = np.sqrt(np.divide(run_value_variance, outcome_counts, out=np.full(NUM_OUTCOMES, np.nan), where=outcome_counts > 1))
+
+        return RunExpectancy(
+            matrix=matrix.reshape(3, 8),
+            std_error=np.sqrt(variance).reshape(3, 8),
+            counts=visits.reshape(3, 8).astype(np.int64),
+            run_values=run_values,
+            run_value_errors=run_value_errors,
+            outcome_counts=outcome_counts.astype(np.int64),
+            innings=m,
+        )
+
+
+def compute_run_expectancy(lineups: Sequence[Sequence[Player]], num_games: int = 10000, seed: SeedLike = None,
+                           use_cache: bool = True) -> RunExpectancy:
+    """
+    各打順で num_games 試合ずつシミュレートし、全打順をまとめた得点期待値と得点価値を計算する。
+
+    Args:
+        lineups (Sequence[Sequence[Player]]): 打順 (9名の Player のリスト) のリスト。チームなら1つ、リーグなら全チーム分。
+        num_games (int): 打順ごとの試合数 (1試合あたり9イニング)。
+        seed (SeedLike): 乱数のシード。
+        use_cache (bool): seed が整数の場合に、評価結果のキャッシュ (eval_cache) を使うか。
+
+    Returns:
+        RunExpectancy: 計算結果。
+    """
+    cache = get_evaluation_cache() if use_cache and is_cacheable_seed(seed) else None
+    key = None
+    if cache is not None:
+        key = cache.make_key("run_expectancy", [p for lineup in lineups for p in lineup], seed, num_games, len(lineups))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    accumulator = RunExpectancyAccumulator()
+    BatchBaseballGame(lineups).simulate_games(num_games, rng=as_generator(seed), observer=accumulator)
+    result = accumulator.result()
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def team_lineups(year: int, team: str | None = None, base_path: str = "./data/processed") -> List[List[Player]]:
+    """チームのスタメン (load_roster) の打順のリスト。team が None の場合は data/processed/<year> の全チーム。"""
+    if team is not None:
+        return [load_roster(year, team, base_path)[0]]
+    teams = sorted(name[:-4] for name in os.listdir(os.path.join(base_path, str(year))) if name.endswith(".csv"))
+    return [load_roster(year, abbr, base_path)[0] for abbr in teams]
+
+
+def run_expectancy_frame(result: RunExpectancy) -> pd.DataFrame:
+    """得点期待値を 塁状況 × アウト数 の表 (RE24) にする。"""
+    return pd.DataFrame(result.matrix.T.round(3), index=BASE_LABELS, columns=[f"{outs}アウト" for outs in range(3)])
+
+
+def run_values_frame(result: RunExpectancy) -> pd.DataFrame:
+    """打席結果ごとの得点価値と標準誤差の表。発生しなかった結果は除く。"""
+    table = pd.DataFrame({
+        "打席結果": OUTCOME_TYPES,
+        "回数": result.outcome_counts,
+        "得点価値": result.run_values.round(4),
+        "標準誤差": result.run_value_errors.round(4),
+    })
+    return table[table["回数"] > 0].reset_index(drop=True)
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="塁・アウト状況別の得点期待値 (RE24) と得点価値を計算する")
+    parser.add_argument("--year", type=int, default=2024)
+    parser.add_argument("--team", default=None, help="チームの略称。省略した場合は全チーム (リーグ全体)")
+    parser.add_argument("--games", type=int, default=10000, help="打順ごとの試合数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-path", default="./data/processed")
+    args = parser.parse_args(argv)
+
+    result = compute_run_expectancy(team_lineups(args.year, args.team, args.base_path), args.games, args.seed)
+    print(f"{result.innings:,} イニング")
+    print(run_expectancy_frame(result).to_string())
+    print(run_values_frame(result).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
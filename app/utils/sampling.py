@@ -0,0 +1,190 @@
+# src/main/utils/sampling.py
+
+import numpy as np
+from typing import Callable, List, Sequence, Tuple
+
+# 乱数の指定方法 (None: ランダム, int / SeedSequence: シード, Generator: そのまま使う)
+SeedLike = int | np.random.SeedSequence | np.random.Generator | None
+
+
+def as_generator(seed: SeedLike = None) -> np.random.Generator:
+    """シードなどから PCG64 の np.random.Generator を返す。Generator が渡された場合はそのまま返す。"""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def spawn_generators(seed: SeedLike, count: int) -> List[np.random.Generator]:
+    """
+    SeedSequence から互いに独立した子の乱数列を count 個作る。
+
+    同じ seed からは常に同じ子の乱数列が作られるため、試合や試行ごとに独立かつ再現可能な乱数を割り当てられる。
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed.spawn(count)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(child) for child in seed.spawn(count)]
+
+
+class AliasTable:
+    """
+    Walkerのエイリアス法による離散分布のサンプラー。
+
+    構築時に確率ベクトルを (prob, alias) の2つの表に変換しておき、
+    一様乱数1つから O(1) で整数コードを引く。
+    """
+    def __init__(self, probabilities: Sequence[float]):
+        """
+        Args:
+            probabilities (Sequence[float]): 合計が1になる確率のリスト。
+        """
+        p = np.asarray(probabilities, dtype=np.float64)
+        n = len(p)
+        scaled = p * n / p.sum()
+        self.prob = np.ones(n, dtype=np.float64)
+        self.alias = np.arange(n, dtype=np.int64)
+
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # 残りは丸め誤差分のみなので確率1のままにする
+        self.size = n
+        # スカラー版のサンプリングで使うPythonリスト (配列アクセスより速い)
+        self._prob_list = self.prob.tolist()
+        self._alias_list = self.alias.tolist()
+
+    def sample(self, u: float) -> int:
+        """一様乱数 u (0 <= u < 1) から整数コードを1つ引く。"""
+        x = u * self.size
+        i = int(x)
+        if i >= self.size:
+            i = self.size - 1
+        return i if x - i < self._prob_list[i] else self._alias_list[i]
+
+
+def alias_sample(prob: np.ndarray, alias: np.ndarray, rows: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    複数のエイリアス表を積み重ねた表から、行を指定してまとめてサンプリングする。
+
+    Args:
+        prob (np.ndarray): (R, K) の採択確率の表。
+        alias (np.ndarray): (R, K) のエイリアスの表。
+        rows (np.ndarray): (N,) 各サンプルで使う表の行。
+        u (np.ndarray): (N,) の一様乱数。
+
+    Returns:
+        np.ndarray: (N,) の整数コード。
+    """
+    k = prob.shape[-1]
+    x = u * k
+    column = np.minimum(x.astype(np.int64), k - 1)
+    accept = (x - column) < prob[rows, column]
+    return np.where(accept, column, alias[rows, column])
+
+
+class UniformBuffer:
+    """
+    一様乱数をまとめて生成しておき、1つずつ取り出すバッファ。
+
+    乱数生成器を1打席ごとに呼び出す代わりに、size 個ずつ一括で生成して使う。
+    使い切ったら自動的に補充する。
+    """
+    def __init__(self, size: int = 512, source: Callable[[int], np.ndarray] | None = None):
+        """
+        Args:
+            size (int): 一度に生成する乱数の数。
+            source (Callable[[int], np.ndarray] | None): 個数を受け取って一様乱数の配列を返す関数。
+                None の場合は np.random.random を使う。
+        """
+        self.size = size
+        self.source = source if source is not None else np.random.random
+        self._values: list = []
+        self._position = 0
+
+    def next(self) -> float:
+        """次の一様乱数を返す。"""
+        if self._position >= len(self._values):
+            self._values = self.source(self.size).tolist()
+            self._position = 0
+        value = self._values[self._position]
+        self._position += 1
+        return value
+
+
+class CommonUniforms:
+    """
+    共通乱数 (common random numbers) の表。(試合番号, 選手番号, その選手の試合内の打席番号) ごとに
+    決まった一様乱数の組を返す。
+
+    比較するすべての打順が同じ表を使うと、同じ選手の i 試合目の k 打席目は打順によらず同じ乱数で決まるため、
+    打順の間の得点差から運によるぶれの大部分が消える。表は BLOCK_SHAPE 単位のタイルごとに
+    SeedSequence から作るため、必要になった順序によらず、同じ seed からは常に同じ値になる。
+    試合数が多い場合は discard_games_before で使い終わった試合の分を捨てられる。
+    """
+    BLOCK_SHAPE = (16, 16, 8)
+
+    def __init__(self, width: int, seed: int | np.random.SeedSequence | None = None):
+        """
+        Args:
+            width (int): 1打席で使う一様乱数の数。
+            seed (int | np.random.SeedSequence | None): シード。None の場合は新たに生成する。
+        """
+        self.width = width
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.game_origin = 0 # values[0] の試合番号 (BLOCK_SHAPE[0] の倍数)
+        self.values = np.empty((0, 0, 0, width))
+
+    def _tile(self, block: Tuple[int, ...]) -> np.ndarray:
+        seed_sequence = np.random.SeedSequence(self.seed_sequence.entropy, spawn_key=self.seed_sequence.spawn_key + block)
+        return np.random.default_rng(seed_sequence).random(self.BLOCK_SHAPE + (self.width,))
+
+    def reserve(self, game_stop: int, num_players: int, num_plate_appearances: int):
+        """少なくとも試合番号 game_stop 未満・選手番号 num_players 未満・打席番号 num_plate_appearances 未満の表を用意する。"""
+        current = self.values.shape[:3]
+        shape = (game_stop - self.game_origin, num_players, num_plate_appearances)
+        if all(need <= have for need, have in zip(shape, current)):
+            return
+        new_shape = tuple(max(have, -(-need // size) * size) for need, have, size in zip(shape, current, self.BLOCK_SHAPE))
+        values = np.empty(new_shape + (self.width,))
+        values[:current[0], :current[1], :current[2]] = self.values
+        game_block_origin = self.game_origin // self.BLOCK_SHAPE[0]
+        for block in np.ndindex(*(n // size for n, size in zip(new_shape, self.BLOCK_SHAPE))):
+            start = [b * size for b, size in zip(block, self.BLOCK_SHAPE)]
+            if all(s < have for s, have in zip(start, current)):
+                continue # 既に作ったタイル
+            window = tuple(slice(s, s + size) for s, size in zip(start, self.BLOCK_SHAPE))
+            values[window] = self._tile((block[0] + game_block_origin,) + block[1:])
+        self.values = values
+
+    def discard_games_before(self, game: int):
+        """試合番号 game より前の試合の表を捨てる (以降はその試合の乱数を引けない)。"""
+        drop = (game - self.game_origin) // self.BLOCK_SHAPE[0] * self.BLOCK_SHAPE[0]
+        if drop > 0:
+            self.values = self.values[drop:].copy()
+            self.game_origin += drop
+
+    def take(self, games: np.ndarray, players: np.ndarray, plate_appearances: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            games (np.ndarray): (N,) 試合番号。
+            players (np.ndarray): (N,) 選手番号。
+            plate_appearances (np.ndarray): (N,) その選手のその試合での打席番号 (0始まり)。
+
+        Returns:
+            np.ndarray: (N, width) の一様乱数。
+        """
+        if len(games):
+            if games.min() < self.game_origin:
+                raise ValueError("games before game_origin have been discarded")
+            self.reserve(int(games.max()) + 1, int(players.max()) + 1, int(plate_appearances.max()) + 1)
+        return self.values[games - self.game_origin, players, plate_appearances]
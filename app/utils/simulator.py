@@ -1,13 +1,25 @@
 
 
+import os
+import math
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import List, Dict, Tuple, Any
-import random
 
 from .player import Player
 from .game import BaseballGame
-from .constants import EVENT_TYPES # CSV読み込み時の確認用
+from .game_log import GameLog
+from .batch_game import BatchBaseballGame, NUM_UNIFORMS
+from .stats import StatsMatrix, outcome_counts_to_stats, stats_frame
+from .transitions import NUM_OUTCOMES
+from .markov import expected_runs, lineup_arrays, slot_transitions, solve_inning, game_expected_runs_by_leadoff
+from .permutations import unrank_permutations, rank_permutations
+from .optimizer import STRATEGIES, LineupEvaluator
+from .racing import RunningStats, ScoreHistory, keep_best, paired_race_survivors, probability_best, race_survivors, z_value
+from .eval_cache import SeasonEvaluation, get_evaluation_cache, is_cacheable_seed
+from .sampling import CommonUniforms, SeedLike, as_generator, spawn_generators
+from .constants import EVENT_TYPES, SEASON_GAMES, STAT_KEYS # CSV読み込み時の確認用
 
 def load_players_from_csv(file_path: str, num_players: int = 9) -> List[Player]:
     """
@@ -77,39 +89,18 @@ def display_player_stats(players: List[Player]) -> pd.DataFrame:
     Returns:
         pd.DataFrame: 選手の成績をまとめたデータフレーム。
     """
-    stats_list = []
-    for player in players:
-        stats_list.append({
-            "選手名": player.name,
-            "打席": player._get_stat("plate_appearances"),
-            "打数": player._get_stat("at_bats"),
-            "安打": player._get_stat("hits"),
-            "単打": player._get_stat("singles"),
-            "二塁打": player._get_stat("doubles"),
-            "三塁打": player._get_stat("triples"),
-            "本塁打": player._get_stat("homeruns"),
-            "四死球": player._get_stat("walks"),
-            "打点": player._get_stat("runs_batted_in"),
-            "打率": round(player.batting_average(), 3),
-            "出塁率": round(player.on_base_percentage(), 3),
-            "長打率": round(player.slugging_percentage(), 3),
-            "OPS": round(player.ops(), 3),
-            "三振": player._get_stat("strikeouts"),
-            "併殺打": player._get_stat("double_plays"),
-            "犠打": player._get_stat("sacrifice_bunts"),
-            "進塁打": player._get_stat("ground_out_advances"),
-            "犠打失敗": player._get_stat("bunt_fails"),
-            "犠飛": player._get_stat("sacrifice_flies"),
-        })
-    return pd.DataFrame(stats_list)
+    values = np.array([player.stats_values for player in players], dtype=np.int64).reshape(len(players), -1)
+    return stats_frame([player.name for player in players], values)
 
-def simulate_season(num_games: int, players_list: List[Player]) -> Tuple[int, pd.DataFrame]:
+def simulate_season(num_games: int, players_list: List[Player], rng: SeedLike = None, use_cache: bool = True) -> Tuple[int, pd.DataFrame]:
     """
     指定された試合数のシーズンをシミュレートし、チームの総得点と各選手の通算成績を返す。
 
     Args:
         num_games (int): シミュレートする試合数。
         players_list (List[Player]): Playerオブジェクトのリスト。
+        rng (SeedLike): 乱数生成器またはシード。同じシードからは同じシーズンになる。
+        use_cache (bool): rng が整数のシードの場合に、評価結果のキャッシュ (eval_cache) を使うか。
 
     Returns:
         Tuple[int, pd.DataFrame]: (シーズン総得点, 各選手の通算成績DataFrame)
@@ -118,24 +109,55 @@ def simulate_season(num_games: int, players_list: List[Player]) -> Tuple[int, pd
         print("No players loaded. Cannot simulate season.")
         return 0, pd.DataFrame()
 
-    total_team_score = 0
-    
-    # シーズン開始時に選手の成績をリセット
-    for player in players_list:
-        player.reset_stats()
-
-    for game_num in range(num_games):
-        # 各試合ごとに新しいBaseballGameインスタンスを作成し、
-        # 同じPlayerオブジェクトのリスト（累積成績を持つ）を渡す
-        game = BaseballGame(players_list) 
-        game_score, _ = game.simulate_game()
-        total_team_score += game_score
-    
+    cache = get_evaluation_cache() if use_cache and is_cacheable_seed(rng) else None
+    key = cache.make_key("season", players_list, rng, num_games) if cache is not None else None
+    evaluation = cache.get(key) if cache is not None else None
+    if evaluation is None:
+        # 全試合を BatchBaseballGame で一度にシミュレートする
+        result = BatchBaseballGame([players_list]).simulate_games(num_games, rng=as_generator(rng))
+        scores = result.scores[0]
+        # 0試合の場合は平均・分散を 0 とする (総得点は 0)
+        evaluation = SeasonEvaluation(float(scores.mean()) if num_games > 0 else 0.0,
+                                      float(scores.var(ddof=1)) if num_games > 1 else 0.0,
+                                      outcome_counts_to_stats(result.outcome_counts[0], result.runs_batted_in[0]),
+                                      int(scores.sum()))
+        if cache is not None:
+            cache.put(key, evaluation)
+    total_team_score = evaluation.total
+
+    # シーズン通算成績を選手に反映する (シーズン開始時の成績はリセット)
+    _apply_season_stats(players_list, evaluation.stats)
+
     # 全試合終了後の選手成績を表示
     season_player_stats_df = display_player_stats(players_list)
     return total_team_score, season_player_stats_df
 
-def run_one_game_simulation(players_list: List[Player]):
+def _apply_season_stats(players_list: List[Player], season_stats: np.ndarray):
+    """STAT_KEYS 順の成績配列 (選手数, len(STAT_KEYS)) で選手の成績を置き換える。"""
+    stats = StatsMatrix(players_list)
+    stats.reset()
+    # 同じPlayerが複数の打順に入っている場合は合算する
+    stats.add_lineup_stats(season_stats)
+
+def simulate_games(num_games: int, players_list: List[Player], seed: SeedLike = None, log_mode: str = "full") -> List[Tuple[int, GameLog | List[int] | None]]:
+    """
+    BaseballGame で1試合ずつシミュレートし、各試合の (得点, ログ) を返す。
+    各試合には seed から SeedSequence.spawn で作った子の乱数列を割り当てるため、
+    同じ seed からは試合数によらず i 試合目が常に同じ結果になる。選手の成績は累積される。
+
+    Args:
+        num_games (int): シミュレートする試合数。
+        players_list (List[Player]): Playerオブジェクトのリスト。
+        seed (SeedLike): マスターシード。
+        log_mode (str): 各試合のログの記録方法 (BaseballGame.simulate_game を参照)。
+
+    Returns:
+        List[Tuple[int, GameLog | List[int] | None]]: 試合ごとの (得点, ログ)。
+    """
+    game = BaseballGame(players_list, log_mode=log_mode)
+    return [game.simulate_game(rng=game_rng) for game_rng in spawn_generators(seed, num_games)]
+
+def run_one_game_simulation(players_list: List[Player], rng: SeedLike = None):
     """
     1試合のシミュレーションを実行し、結果を詳細に表示する。
     注意：この関数を複数回呼び出すと、選手の成績は累積されます。
@@ -143,6 +165,7 @@ def run_one_game_simulation(players_list: List[Player]):
 
     Args:
         players_list (List[Player]): Playerオブジェクトのリスト。
+        rng (SeedLike): 乱数生成器またはシード。
     """
     if not players_list:
         print("No players loaded. Cannot simulate game.")
@@ -153,7 +176,7 @@ def run_one_game_simulation(players_list: List[Player]):
     # load_players_from_csv を再実行して新しいPlayerインスタンスのリストを渡す。
 
     game = BaseballGame(players_list)
-    final_score, game_log_data = game.simulate_game()
+    final_score, game_log_data = game.simulate_game(rng=as_generator(rng))
     print(f"最終スコア: {final_score}\n")
 
     print("--- イニングごとの打席結果 ---")
@@ -170,31 +193,522 @@ def run_one_game_simulation(players_list: List[Player]):
     player_stats_df = display_player_stats(players_list)
     print(player_stats_df.to_string())
 
-def generate_random_lineup(players_pool: List[Player], shuffle_only: bool = False) -> List[Player]:
+def generate_random_lineup(players_pool: List[Player], shuffle_only: bool = False, rng: SeedLike = None) -> List[Player]:
     """
     選手プールからランダムに9名を選び、ランダムな打順を生成する。
     shuffle_onlyがTrueの場合、与えられたplayers_poolをシャッフルする。
+    元のリストは変更しない。
+
+    Args:
+        rng (SeedLike): 乱数生成器またはシード。
     """
+    order = _random_lineup_indices(len(players_pool), shuffle_only, as_generator(rng))
+    return [players_pool[i] for i in order]
+
+def _random_lineup_indices(pool_size: int, shuffle_only: bool, rng: np.random.Generator) -> List[int]:
+    """選手プール内のインデックスで、ランダムな打順を作る。"""
     if shuffle_only:
-        if len(players_pool) != 9:
+        if pool_size != 9:
             raise ValueError("shuffle_onlyがTrueの場合、players_poolは9名の選手を含む必要があります。")
-        selected_players = list(players_pool) # コピーを作成して元のリストを変更しない
+        return rng.permutation(9).tolist()
+    if pool_size < 9:
+        raise ValueError("選手数が9名未満のため、打順を生成できません。")
+    return rng.choice(pool_size, size=9, replace=False).tolist()
+
+def _simulate_trials(players_pool: List[Player], shuffle_only: bool, num_games: int,
+                     trials: List[Tuple[int, np.random.SeedSequence]],
+                     common_seed: np.random.SeedSequence | None = None) -> List[Tuple[int, int, List[int], np.ndarray]]:
+    """
+    並列探索のワーカーで実行する処理。試行ごとに専用の乱数列から打順を作り、シーズンをシミュレートする。
+    選手の成績 (Player.stats) は変更せず、成績配列として返す。
+    common_seed を指定した場合、シーズンはすべての試行で同じ共通乱数 (選手プール内の番号で引く) を使う。
+
+    Returns:
+        List[Tuple[int, int, List[int], np.ndarray]]: (試行番号, 総得点, 打順のインデックス, 成績配列) のリスト。
+    """
+    common_uniforms = CommonUniforms(NUM_UNIFORMS, common_seed) if common_seed is not None else None
+    results = []
+    for trial_index, seed_sequence in trials:
+        rng = np.random.default_rng(seed_sequence)
+        order = _random_lineup_indices(len(players_pool), shuffle_only, rng)
+        lineup = [players_pool[i] for i in order]
+        result = BatchBaseballGame([lineup]).simulate_games(num_games, rng=rng, common_uniforms=common_uniforms, player_keys=[order])
+        stats = outcome_counts_to_stats(result.outcome_counts[0], result.runs_batted_in[0])
+        results.append((trial_index, int(result.scores.sum()), order, stats))
+    return results
+
+def find_best_and_worst_lineups_parallel(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None,
+                                         shuffle_only: bool = False, num_workers: int | None = None, seed: int | None = None,
+                                         num_games: int = SEASON_GAMES, common_random_numbers: bool = False) -> Tuple[Dict, Dict]:
+    """
+    打順の探索を ProcessPoolExecutor で並列に実行する。
+
+    試行 i の打順とシーズンの乱数は、マスターシードから SeedSequence.spawn で作った i 番目の乱数列だけで決まる。
+    得点が同じ場合は試行番号の小さい方を採用するため、ワーカー数によらず同じ結果になる。
+
+    Args:
+        num_workers (int | None): ワーカープロセス数。None の場合は CPU 数。1 の場合はプロセスを起動せずに実行する。
+        seed (int | None): マスターシード。None の場合は新たに生成し、結果の "seed" に記録する。
+        num_games (int): 1試行あたりの試合数。
+        common_random_numbers (bool): True の場合、すべての試行のシーズンに同じ共通乱数を使い、
+            打順の間の得点差が運ではなく打順の違いを反映するようにする。
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    master = np.random.SeedSequence(seed)
+    trial_seeds = list(enumerate(master.spawn(num_trials)))
+    common_seed = master.spawn(1)[0] if common_random_numbers else None
+
+    # ワーカーあたり数回に分けて渡し、進捗を細かく更新できるようにする
+    chunk_size = max(1, -(-num_trials // (num_workers * 4)))
+    chunks = [trial_seeds[i:i + chunk_size] for i in range(0, num_trials, chunk_size)]
+
+    results = []
+    completed = 0
+    def report(chunk_results):
+        nonlocal completed
+        results.extend(chunk_results)
+        completed += len(chunk_results)
+        if progress_bar and status_text:
+            progress_bar.progress(completed / num_trials)
+            status_text.text(f"シミュレーション中: {completed}/{num_trials} パターン完了")
+
+    if num_workers == 1:
+        for chunk in chunks:
+            report(_simulate_trials(players_for_exploration, shuffle_only, num_games, chunk, common_seed))
     else:
-        if len(players_pool) < 9:
-            raise ValueError("選手数が9名未満のため、打順を生成できません。")
-        selected_players = random.sample(players_pool, 9)
-    
-    random.shuffle(selected_players)
-    
-    return selected_players
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(_simulate_trials, players_for_exploration, shuffle_only, num_games, chunk, common_seed) for chunk in chunks]
+            for future in as_completed(futures):
+                report(future.result())
+
+    # 試行番号順に並べてから選ぶことで、完了順によらず同じ打順を選ぶ
+    results.sort(key=lambda r: r[0])
+    totals = np.array([r[1] for r in results])
+    best_index = int(np.argmax(totals))
+    worst_index = int(np.argmin(totals))
+
+    def lineup_info(index: int) -> Dict:
+        trial_index, total_score, order, stats = results[index]
+        lineup = [players_for_exploration[i] for i in order]
+        _apply_season_stats(lineup, stats)
+        return {
+            "avg_score": total_score / num_games,
+            "total_score": total_score,
+            "lineup": [p.name for p in lineup],
+            "player_stats": display_player_stats(lineup),
+            "trial": trial_index,
+            "seed": master.entropy,
+            "common_random_numbers": common_random_numbers,
+        }
+
+    return lineup_info(best_index), lineup_info(worst_index)
+
+# レース方式の探索で、最初のラウンドに各候補が行う試合数
+RACING_INITIAL_GAMES = 20
+# 1ラウンドごとに残す候補の割合の逆数 (successive halving の η)
+RACING_REDUCTION_FACTOR = 4
+# この数まで絞り込んだら、残りの試合をすべて生き残りに割り当てて終える
+RACING_FINALISTS = 4
+# 共通乱数を使う場合に一度にシミュレートする試合数 (共通乱数の表の大きさを抑える)
+RACING_COMMON_WINDOW = 256
+
+def find_best_and_worst_lineups_racing(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None,
+                                       shuffle_only: bool = False, seed: SeedLike = None, num_candidates: int | None = None,
+                                       initial_games: int = RACING_INITIAL_GAMES, confidence: float = 0.95, num_games: int = SEASON_GAMES,
+                                       common_random_numbers: bool = False) -> Tuple[Dict, Dict]:
+    """
+    少ない試合数で多くの打順を走らせ、明らかに劣る打順を早めに打ち切るレース方式 (successive halving) で探索する。
+
+    総試合数は num_trials 通りの打順で num_games 試合ずつシミュレートする場合と同じ。最初のラウンドで全候補が
+    initial_games 試合ずつ行い、以降のラウンドでは、平均得点の信頼区間が現在の首位 (最低の打順の場合は最下位) に
+    届かない候補を除き、さらに平均得点の上位 1/RACING_REDUCTION_FACTOR だけを残して、残りの候補に倍の試合数を割り当てる。
+    最高と最低の打順は別々に争い、どちらかで生き残っている候補が次のラウンドに進む。
+    両方の生き残りが RACING_FINALISTS 以下になったら、残りの試合を生き残りに均等に割り当てて終える。
+
+    Args:
+        num_trials (int): 予算とする打順の数。総試合数は num_trials * num_games。
+        num_candidates (int | None): 候補の打順の数。None の場合は総試合数の 1/3 を最初のラウンドに使う数。
+        initial_games (int): 最初のラウンドの1候補あたりの試合数。
+        confidence (float): 打ち切りに使う信頼区間の信頼水準。
+        num_games (int): 1シーズンの試合数 (total_score の換算に使う)。
+        common_random_numbers (bool): True の場合、どの候補も j 試合目には同じ共通乱数を使い、
+            首位との同じ試合どうしの得点差の信頼区間で打ち切る。得点差のぶれが小さいため、少ない試合数で打ち切れる。
+
+    Returns:
+        Tuple[Dict, Dict]: find_best_and_worst_lineups と同じ形式の (最高の打順, 最低の打順)。
+            それぞれ "games" (その打順の試合数), "std_error" (平均得点の標準誤差),
+            "confidence" (最後まで残った候補の中で真に最高 (最低) である確率の推定値),
+            "confidence_all" (試合をした全候補の中で真に最高 (最低) である確率の推定値。途中で打ち切った候補の
+            少ない試合数による誤差も含むため低めになる), "candidates" (候補の数) を持つ。
+    """
+    budget = num_trials * num_games
+    if num_candidates is None:
+        num_candidates = max(2, budget // (3 * initial_games))
+    rng = as_generator(seed)
+    orders = np.array([_random_lineup_indices(len(players_for_exploration), shuffle_only, rng) for _ in range(num_candidates)])
+    common_uniforms = CommonUniforms(NUM_UNIFORMS, rng.spawn(1)[0].bit_generator.seed_seq) if common_random_numbers else None
+    history = ScoreHistory() if common_random_numbers else None
+
+    stats = RunningStats(num_candidates)
+    outcome_counts = np.zeros((num_candidates, 9, NUM_OUTCOMES), dtype=np.int64)
+    runs_batted_in = np.zeros((num_candidates, 9))
+    alive_best = np.ones(num_candidates, dtype=bool)
+    alive_worst = np.ones(num_candidates, dtype=bool)
+    z = z_value(confidence)
+    games_per_candidate = initial_games
+    used = 0
+    while True:
+        candidates = np.flatnonzero(alive_best | alive_worst)
+        final = alive_best.sum() <= RACING_FINALISTS and alive_worst.sum() <= RACING_FINALISTS
+        games = (budget - used) // len(candidates)
+        if not final:
+            games = min(games_per_candidate, games)
+        if games <= 0:
+            break
+        engine = BatchBaseballGame([[players_for_exploration[i] for i in orders[c]] for c in candidates])
+        if common_uniforms is None:
+            _race_round(engine, candidates, games, stats, outcome_counts, runs_batted_in, None, rng=rng)
+        else:
+            # 生き残りはここまで同じ試合数をこなしているので、続きの試合番号の共通乱数を使う。
+            # 共通乱数の表が大きくなりすぎないよう、RACING_COMMON_WINDOW 試合ずつ進めて使い終わった分を捨てる
+            played = int(stats.count[candidates[0]])
+            for offset in range(0, games, RACING_COMMON_WINDOW):
+                window = min(RACING_COMMON_WINDOW, games - offset)
+                _race_round(engine, candidates, window, stats, outcome_counts, runs_batted_in, history, common_uniforms=common_uniforms,
+                            game_offset=played + offset, player_keys=orders[candidates])
+                common_uniforms.discard_games_before(played + offset + window)
+        used += games * len(candidates)
+        if progress_bar and status_text:
+            progress_bar.progress(min(used / budget, 1.0))
+            status_text.text(f"レース中: 残り {len(candidates)}/{num_candidates} パターン ({used:,}/{budget:,} 試合)")
+
+        if final:
+            break
+
+        mean, std_error = stats.mean, stats.std_error
+        # 信頼区間で届かない候補を除き、さらに平均得点の上位 (下位) 1/RACING_REDUCTION_FACTOR だけを残す
+        if history is None:
+            alive_best = race_survivors(mean, std_error, alive_best, z, largest=True)
+            alive_worst = race_survivors(mean, std_error, alive_worst, z, largest=False)
+        else:
+            alive_best = paired_race_survivors(history, mean, alive_best, z, largest=True)
+            alive_worst = paired_race_survivors(history, mean, alive_worst, z, largest=False)
+        alive_best = keep_best(mean, alive_best, max(RACING_FINALISTS, -(-alive_best.sum() // RACING_REDUCTION_FACTOR)), largest=True)
+        alive_worst = keep_best(mean, alive_worst, max(RACING_FINALISTS, -(-alive_worst.sum() // RACING_REDUCTION_FACTOR)), largest=False)
+        games_per_candidate *= 2
+
+    if progress_bar:
+        progress_bar.progress(1.0)
+    mean, std_error = stats.mean, stats.std_error
+    played = stats.count > 0
+    best_candidates, worst_candidates = np.flatnonzero(alive_best), np.flatnonzero(alive_worst)
+    best_index = int(best_candidates[np.argmax(mean[best_candidates])])
+    worst_index = int(worst_candidates[np.argmin(mean[worst_candidates])])
+
+    def confidence_within(index: int, members: np.ndarray, largest: bool) -> float:
+        # 候補の番号を members の中での番号に付け替えて確率を計算する
+        position = int(np.flatnonzero(members == index)[0])
+        return probability_best(mean[members], std_error[members], position, largest)
 
-def find_best_and_worst_lineups(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None, shuffle_only: bool = False) -> Tuple[Dict, Dict]:
+    def lineup_info(index: int, finalists: np.ndarray, largest: bool) -> Dict:
+        lineup = [players_for_exploration[i] for i in orders[index]]
+        _apply_season_stats(lineup, outcome_counts_to_stats(outcome_counts[index], runs_batted_in[index]))
+        return {
+            "avg_score": float(mean[index]),
+            "total_score": float(mean[index]) * num_games,
+            "lineup": [p.name for p in lineup],
+            "player_stats": display_player_stats(lineup),
+            "games": int(stats.count[index]),
+            "std_error": float(std_error[index]),
+            "confidence": confidence_within(index, finalists, largest),
+            "confidence_all": confidence_within(index, np.flatnonzero(played), largest),
+            "candidates": num_candidates,
+            "common_random_numbers": common_random_numbers,
+        }
+
+    return lineup_info(best_index, best_candidates, True), lineup_info(worst_index, worst_candidates, False)
+
+def _race_round(engine: BatchBaseballGame, candidates: np.ndarray, games: int, stats: RunningStats,
+                outcome_counts: np.ndarray, runs_batted_in: np.ndarray, history: ScoreHistory | None, **simulate_options):
+    """生き残りの候補に games 試合ずつ行わせ、得点と成績を加算する。history を指定した場合は試合ごとの得点も記録する。"""
+    result = engine.simulate_games(games, **simulate_options)
+    stats.add(candidates, result.scores)
+    if history is not None:
+        history.add(candidates, result.scores)
+    outcome_counts[candidates] += result.outcome_counts
+    runs_batted_in[candidates] += result.runs_batted_in
+
+def find_best_and_worst_lineups_optimized(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None,
+                                          strategy: str = "annealing", evaluator: str = "markov", confirm_with_simulation: bool = True,
+                                          seed: SeedLike = None, time_limit: float | None = None, num_games: int = SEASON_GAMES) -> Tuple[Dict, Dict]:
+    """
+    optimizer の探索戦略 (焼きなまし法・遺伝的アルゴリズムなど) で最高と最低の打順を探す。
+    評価した打順はメモされ、同じ打順は再計算しない。選手プールが9名より多い場合は控え選手との交代も探索する。
+
+    Args:
+        num_trials (int): 新たに評価する打順の数の上限。最高と最低の探索で半分ずつ使う。
+        strategy (str): optimizer.STRATEGIES のキー ("random", "annealing", "genetic")。
+        evaluator (str): "markov" はマルコフ連鎖の期待得点、"simulation" は共通乱数を使った num_games 試合の平均得点で評価する。
+        confirm_with_simulation (bool): evaluator="markov" のとき、最高・最低の打順を143試合のシミュレーションで確認するか。
+        seed (SeedLike): 探索と共通乱数のシード。
+        time_limit (float | None): 最高・最低それぞれの探索の秒数の上限。
+
+    Returns:
+        Tuple[Dict, Dict]: find_best_and_worst_lineups と同じ形式の (最高の打順, 最低の打順)。
+            それぞれ "evaluations" (評価した打順の数) と "cache_hits" (メモから返した回数) を持つ。
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    search_rng, best_rng, worst_rng, common_rng = spawn_generators(seed, 4)
+    evaluate = LineupEvaluator(players_for_exploration, evaluator, num_games, common_rng)
+    pool_size = len(players_for_exploration)
+    budget = max(1, num_trials // 2)
+
+    def report(offset: float, label: str):
+        def progress(fraction: float):
+            if progress_bar and status_text:
+                progress_bar.progress(min(offset + fraction / 2, 1.0))
+                status_text.text(f"{label}の打順を探索中: {evaluate.evaluations:,} パターン評価済み")
+        return progress
+
+    search = STRATEGIES[strategy]
+    best = search(evaluate, pool_size, search_rng, budget, maximize=True, time_limit=time_limit, progress=report(0.0, "最高"))
+    worst = search(evaluate, pool_size, search_rng, budget, maximize=False, time_limit=time_limit, progress=report(0.5, "最低"))
+    if progress_bar:
+        progress_bar.progress(1.0)
+
+    def lineup_info(result, rng) -> Dict:
+        lineup = [players_for_exploration[i] for i in result.lineup]
+        if evaluator == "markov":
+            info = _markov_lineup_info(lineup, result.score, confirm_with_simulation, rng)
+        else:
+            season = evaluate.season([result.lineup])
+            _apply_season_stats(lineup, outcome_counts_to_stats(season.outcome_counts[0], season.runs_batted_in[0]))
+            info = {
+                "avg_score": result.score,
+                "total_score": int(season.scores.sum()),
+                "lineup": [p.name for p in lineup],
+                "player_stats": display_player_stats(lineup),
+            }
+        info["evaluations"] = evaluate.evaluations
+        info["cache_hits"] = evaluate.hits
+        return info
+
+    return lineup_info(best, best_rng), lineup_info(worst, worst_rng)
+
+# マルコフ連鎖で一度に評価する打順の数 (進捗表示の単位)
+MARKOV_BATCH_SIZE = 256
+
+def find_best_and_worst_lineups_markov(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None, shuffle_only: bool = False, confirm_with_simulation: bool = True, seed: SeedLike = None) -> Tuple[Dict, Dict]:
+    """
+    ランダムな打順をマルコフ連鎖の期待得点で評価し、最高得点と最低得点の打順を特定する。
+    サンプリングによる誤差がないため、打順の順位付けは試行ごとにぶれない。
+
+    Args:
+        confirm_with_simulation (bool): True の場合、最高・最低の打順について
+            143試合のシミュレーションを行い、選手成績と実際の総得点を結果に加える。
+        seed (SeedLike): 打順の生成と確認用シミュレーションの乱数のシード。
+    """
+    lineup_rng, best_rng, worst_rng = spawn_generators(seed, 3)
+    lineups = [generate_random_lineup(players_for_exploration, shuffle_only=shuffle_only, rng=lineup_rng) for _ in range(num_trials)]
+    scores = np.empty(num_trials)
+    for start in range(0, num_trials, MARKOV_BATCH_SIZE):
+        stop = min(start + MARKOV_BATCH_SIZE, num_trials)
+        scores[start:stop] = expected_runs(*lineup_arrays(lineups[start:stop]))
+        if progress_bar and status_text:
+            progress_bar.progress(stop / num_trials)
+            status_text.text(f"期待得点を計算中: {stop}/{num_trials} パターン完了")
+
+    best_index, worst_index = int(np.argmax(scores)), int(np.argmin(scores))
+    return (_markov_lineup_info(lineups[best_index], float(scores[best_index]), confirm_with_simulation, best_rng),
+            _markov_lineup_info(lineups[worst_index], float(scores[worst_index]), confirm_with_simulation, worst_rng))
+
+def _markov_lineup_info(lineup: List[Player], score: float, confirm_with_simulation: bool, rng: SeedLike = None) -> Dict:
+    """マルコフ連鎖で評価した打順の結果を、find_best_and_worst_lineups と同じ形式の辞書にする。"""
+    info = {
+        "avg_score": score,
+        "total_score": score * SEASON_GAMES, # 143試合の期待総得点
+        "lineup": [p.name for p in lineup],
+        "player_stats": pd.DataFrame(),
+    }
+    if confirm_with_simulation:
+        simulated_total, player_stats_df = simulate_season(SEASON_GAMES, lineup, rng=rng)
+        info["simulated_total_score"] = simulated_total
+        info["player_stats"] = player_stats_df
+    return info
+
+def _keep_extremes(scores: np.ndarray, ranks: np.ndarray, top_k: int, largest: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """得点の高い (低い) 順、同点なら順位の小さい順に top_k 件を残す。"""
+    order = np.lexsort((ranks, -scores if largest else scores))[:top_k]
+    return scores[order], ranks[order]
+
+def _evaluate_rank_range(probabilities: np.ndarray, speeds: np.ndarray, start: int, stop: int, top_k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    全順列探索のワーカーで実行する処理。1番打者を選手0に固定した 8! 通りのうち、
+    Lehmer 順位が [start, stop) の打順と、それぞれを回転させた9通りの打順を評価する。
+
+    Args:
+        probabilities (np.ndarray): (9, 8) 選手ごとの打席結果の確率。
+        speeds (np.ndarray): (9,) 選手ごとの Speed。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            (上位の期待得点, 上位の9!中の順位, 下位の期待得点, 下位の9!中の順位)
+    """
+    top = (np.empty(0), np.empty(0, dtype=np.int64))
+    bottom = (np.empty(0), np.empty(0, dtype=np.int64))
+    rotations = (np.arange(9)[None, :] + np.arange(9)[:, None]) % 9  # rotations[k] = k人分回転させた並び
+    for batch_start in range(start, stop, MARKOV_BATCH_SIZE):
+        ranks = np.arange(batch_start, min(batch_start + MARKOV_BATCH_SIZE, stop))
+        base = np.zeros((len(ranks), 9), dtype=np.int64)
+        base[:, 1:] = 1 + unrank_permutations(ranks, 8)
+        values = solve_inning(*slot_transitions(probabilities[base], speeds[base]))
+        # 打順を回転させた9通りは、同じ解から先頭打者を変えるだけで評価できる
+        scores = game_expected_runs_by_leadoff(values).ravel()
+        lineups = base[:, rotations].reshape(-1, 9)
+        lineup_ranks = rank_permutations(lineups)
+        top = _keep_extremes(np.r_[top[0], scores], np.r_[top[1], lineup_ranks], top_k, largest=True)
+        bottom = _keep_extremes(np.r_[bottom[0], scores], np.r_[bottom[1], lineup_ranks], top_k, largest=False)
+    return top[0], top[1], bottom[0], bottom[1]
+
+def search_all_lineups(players: List[Player], top_k: int = 10, progress_bar=None, status_text=None,
+                       num_workers: int | None = None, confirm_with_simulation: bool = False, seed: SeedLike = None) -> Tuple[Dict, Dict, List[Dict]]:
+    """
+    9名の並び替え 9! = 362,880 通りをすべてマルコフ連鎖の期待得点で評価し、
+    真の最高・最低の打順と上位 top_k 件の打順を求める。
+
+    打順を回転させた9通りは同じイニングの解を共有するため、1番打者を固定した 8! 通りを解き、
+    先頭打者を変えて残りの打順を評価する。8! 通りの Lehmer 順位の範囲を分割して、複数のプロセスで並列に計算する。
+    同点の打順は 9! 通りの中の辞書順の順位が小さい方を上位とするため、ワーカー数によらず同じ結果になる。
+
+    Args:
+        players (List[Player]): 並び替える9名の選手。順位はこのリストの並びを基準とする。
+        top_k (int): 返す上位の打順の数。
+        num_workers (int | None): ワーカープロセス数。None の場合は CPU 数。
+        confirm_with_simulation (bool): True の場合、最高・最低の打順について143試合のシミュレーションも行う。
+        seed (SeedLike): 確認用シミュレーションの乱数のシード。
+
+    Returns:
+        Tuple[Dict, Dict, List[Dict]]: (最高の打順, 最低の打順, 上位 top_k 件の打順)。
+            上位の打順は "rank" (9! 中の順位), "avg_score", "total_score", "lineup" を持つ。
+    """
+    if len(players) != 9:
+        raise ValueError("playersは9名の選手を含む必要があります。")
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    probabilities, speeds = lineup_arrays([players])
+    probabilities, speeds = probabilities[0], speeds[0]
+
+    num_classes = math.factorial(8)
+    num_lineups = math.factorial(9)
+    shard_size = -(-num_classes // (num_workers * 8))
+    shards = [(start, min(start + shard_size, num_classes)) for start in range(0, num_classes, shard_size)]
+
+    results = []
+    completed = 0
+    def report(shard, shard_result):
+        nonlocal completed
+        results.append(shard_result)
+        completed += (shard[1] - shard[0]) * 9
+        if progress_bar and status_text:
+            progress_bar.progress(completed / num_lineups)
+            status_text.text(f"期待得点を計算中: {completed:,}/{num_lineups:,} パターン完了")
+
+    if num_workers == 1:
+        for shard in shards:
+            report(shard, _evaluate_rank_range(probabilities, speeds, shard[0], shard[1], top_k))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = {executor.submit(_evaluate_rank_range, probabilities, speeds, shard[0], shard[1], top_k): shard for shard in shards}
+            for future in as_completed(futures):
+                report(futures[future], future.result())
+
+    top_scores, top_ranks = _keep_extremes(np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results]), top_k, largest=True)
+    bottom_scores, bottom_ranks = _keep_extremes(np.concatenate([r[2] for r in results]), np.concatenate([r[3] for r in results]), top_k, largest=False)
+
+    def lineup_of(rank: int) -> List[Player]:
+        return [players[i] for i in unrank_permutations(np.array([rank]), 9)[0]]
+
+    top_lineups = []
+    for score, rank in zip(top_scores.tolist(), top_ranks.tolist()):
+        top_lineups.append({
+            "rank": rank,
+            "avg_score": score,
+            "total_score": score * SEASON_GAMES,
+            "lineup": [p.name for p in lineup_of(rank)],
+        })
+    best_rng, worst_rng = spawn_generators(seed, 2)
+    best = _markov_lineup_info(lineup_of(int(top_ranks[0])), float(top_scores[0]), confirm_with_simulation, best_rng)
+    worst = _markov_lineup_info(lineup_of(int(bottom_ranks[0])), float(bottom_scores[0]), confirm_with_simulation, worst_rng)
+    return best, worst, top_lineups
+
+def find_best_and_worst_lineups(num_trials: int, players_for_exploration: List[Player], progress_bar=None, status_text=None, shuffle_only: bool = False, evaluator: str = "simulation", confirm_with_simulation: bool = True, num_workers: int | None = None, seed: int | None = None, common_random_numbers: bool = False, strategy: str = "random", use_cache: bool = True) -> Tuple[Dict, Dict]:
     """
     指定された回数だけランダムな打順を生成し、シーズンシミュレーションを実行して、
     最高得点と最低得点の打順を特定する。
+
+    Args:
+        evaluator (str): "simulation" は各打順で143試合をシミュレートする。
+            "markov" はマルコフ連鎖の期待得点で評価する (find_best_and_worst_lineups_markov)。
+            "racing" は同じ総試合数でより多くの打順をレース方式で評価する (find_best_and_worst_lineups_racing)。
+        confirm_with_simulation (bool): evaluator="markov" のとき、最高・最低の打順をシミュレーションで確認するか。
+        num_workers (int | None): 指定した場合は find_best_and_worst_lineups_parallel で
+            指定数のプロセスで並列に探索する。
+        seed (int | None): マスターシード。試行 i の打順とシーズンは、SeedSequence.spawn で作った
+            i 番目の子の乱数列だけで決まるため、並列探索と同じ seed で同じ結果になる。
+        common_random_numbers (bool): evaluator が "simulation" か "racing" のとき、すべての打順に
+            同じ共通乱数 (選手ごと・試合ごと・打席ごとに決まった乱数) を使って比較する。
+            "simulation" では num_workers を指定しない場合も find_best_and_worst_lineups_parallel で実行する。
+        strategy (str): "random" 以外 ("annealing", "genetic") の場合は find_best_and_worst_lineups_optimized で
+            近傍探索を行う。evaluator は "markov" か "simulation" (共通乱数で評価) を指定する。
+        use_cache (bool): seed が整数の場合に、同じ条件の探索結果を評価結果のキャッシュ (eval_cache) から返すか。
+            num_workers は結果に影響しないためキーに含めない。
+
+    探索は選手のコピー (Player.copy) で行うため、キャッシュの有無にかかわらず players_for_exploration の成績は変更しない。
+    各打順の成績は結果の player_stats に入る。
     """
+    # 同じ Player が複数回含まれる場合も同じコピーを使う
+    copies = {id(player): player.copy() for player in players_for_exploration}
+    players = [copies[id(player)] for player in players_for_exploration]
+    cache = get_evaluation_cache() if use_cache and is_cacheable_seed(seed) else None
+    if cache is None:
+        return _find_best_and_worst_lineups(num_trials, players, progress_bar, status_text, shuffle_only, evaluator,
+                                            confirm_with_simulation, num_workers, seed, common_random_numbers, strategy)
+    key = cache.make_key("search", players, seed, SEASON_GAMES, num_trials, shuffle_only, evaluator,
+                         confirm_with_simulation, common_random_numbers, strategy)
+    result = cache.get(key)
+    if result is None:
+        result = _find_best_and_worst_lineups(num_trials, players, progress_bar, status_text, shuffle_only, evaluator,
+                                              confirm_with_simulation, num_workers, seed, common_random_numbers, strategy)
+        cache.put(key, result)
+    elif progress_bar:
+        progress_bar.progress(1.0)
+    return result
+
+def _find_best_and_worst_lineups(num_trials: int, players_for_exploration: List[Player], progress_bar, status_text, shuffle_only: bool,
+                                 evaluator: str, confirm_with_simulation: bool, num_workers: int | None, seed: int | None,
+                                 common_random_numbers: bool, strategy: str) -> Tuple[Dict, Dict]:
+    """find_best_and_worst_lineups の本体 (キャッシュを使わない)。"""
+    if strategy != "random":
+        if evaluator not in ("markov", "simulation"):
+            raise ValueError(f"strategy={strategy} does not support evaluator={evaluator}")
+        return find_best_and_worst_lineups_optimized(num_trials, players_for_exploration, progress_bar, status_text, strategy, evaluator,
+                                                     confirm_with_simulation, seed)
+    if evaluator == "markov":
+        return find_best_and_worst_lineups_markov(num_trials, players_for_exploration, progress_bar, status_text, shuffle_only, confirm_with_simulation, seed)
+    if evaluator == "racing":
+        return find_best_and_worst_lineups_racing(num_trials, players_for_exploration, progress_bar, status_text, shuffle_only, seed,
+                                                  common_random_numbers=common_random_numbers)
+    if evaluator != "simulation":
+        raise ValueError(f"Unknown evaluator: {evaluator}")
+    if num_workers is not None or common_random_numbers:
+        return find_best_and_worst_lineups_parallel(num_trials, players_for_exploration, progress_bar, status_text, shuffle_only,
+                                                    num_workers or 1, seed, common_random_numbers=common_random_numbers)
+
     best_lineup_info = {"avg_score": -1, "lineup": [], "player_stats": pd.DataFrame()}
     worst_lineup_info = {"avg_score": float('inf'), "lineup": [], "player_stats": pd.DataFrame()}
+    trial_rngs = spawn_generators(seed, num_trials)
 
     # all_players_dataからPlayerオブジェクトのリストを一度作成
     # all_players_list = []
@@ -205,11 +719,11 @@ def find_best_and_worst_lineups(num_trials: int, players_for_exploration: List[P
 
     for i in range(num_trials):
         # ランダムな打順を生成
-        current_lineup_players = generate_random_lineup(players_for_exploration, shuffle_only=shuffle_only)
+        current_lineup_players = generate_random_lineup(players_for_exploration, shuffle_only=shuffle_only, rng=trial_rngs[i])
         
-        # シーズンシミュレーションを実行
-        total_score, player_stats_df = simulate_season(143, current_lineup_players)
-        avg_score = total_score / 143
+        # シーズンシミュレーションを実行 (打順と同じ試行の乱数列を続けて使う)
+        total_score, player_stats_df = simulate_season(SEASON_GAMES, current_lineup_players, rng=trial_rngs[i])
+        avg_score = total_score / SEASON_GAMES
 
         # 最高得点の打順を更新
         if avg_score > best_lineup_info["avg_score"]:
@@ -245,7 +759,7 @@ if __name__ == '__main__':
 
         # 3. 143試合のシーズンシミュレーションを実行
         print("\n\n--- 143試合シーズンシミュレーション ---")
-        num_season_games = 143
+        num_season_games = SEASON_GAMES
         total_score, season_stats = simulate_season(num_season_games, players)
         avg_score = total_score / num_season_games if num_season_games > 0 else 0
         print(f"\nシーズン総得点: {total_score}")
@@ -0,0 +1,163 @@
+# src/main/utils/situation.py
+"""
+試合の途中の状況 (イニング・アウト数・塁状況・打者・点差) からの打順の評価と最適化。
+
+例: 「1アウト二塁で3番から始まる場合、3-5番に誰をどの順で置くと得点が最も多いか」を、
+候補の並びをすべて列挙してまとめて評価する。
+"""
+
+import itertools
+import numpy as np
+from typing import Dict, List, Sequence
+
+from .batch_game import BatchBaseballGame, GameState, NUM_UNIFORMS
+from .markov import expected_runs_from_state, lineup_arrays
+from .player import Player
+from .sampling import CommonUniforms, SeedLike, as_generator
+
+# 評価の目的
+# "runs": 期待得点 (マルコフ連鎖で厳密に計算)
+# "tie": 点差以上の得点を挙げて追いつく確率, "lead": 点差より多く得点して勝ち越す確率 (シミュレーションで推定)
+OBJECTIVES = ("runs", "tie", "lead")
+
+# マルコフ連鎖で一度に評価する打順の数
+SITUATION_BATCH_SIZE = 256
+# 確率を目的とする場合に、期待得点の上位から何通りをシミュレーションで評価するか
+DEFAULT_SCREEN = 32
+
+
+def evaluation_innings(state: GameState, innings: int | None = None, num_innings: int = 9) -> int:
+    """現在のイニングを含めて評価するイニング数。innings が None の場合は試合の終わり (num_innings 回) まで。"""
+    remaining = num_innings - state.inning + 1
+    if remaining < 1:
+        raise ValueError(f"inning must be between 1 and {num_innings}")
+    return remaining if innings is None else min(innings, remaining)
+
+
+def _validate_state(state: GameState):
+    if not (0 <= state.outs <= 2 and 0 <= state.bases <= 7 and 0 <= state.batter <= 8 and state.inning >= 1):
+        raise ValueError(f"Invalid game state: {state}")
+
+
+def _expected_runs_from_state(probabilities: np.ndarray, speeds: np.ndarray, state: GameState, innings: int) -> np.ndarray:
+    """打順の配列を SITUATION_BATCH_SIZE ずつに分けて expected_runs_from_state で評価する。"""
+    scores = np.empty(len(probabilities))
+    for start in range(0, len(probabilities), SITUATION_BATCH_SIZE):
+        stop = start + SITUATION_BATCH_SIZE
+        scores[start:stop] = expected_runs_from_state(probabilities[start:stop], speeds[start:stop],
+                                                      state.outs, state.bases, state.batter, innings)
+    return scores
+
+
+def simulate_from_state(lineups: Sequence[Sequence[Player]], state: GameState, innings: int | None = None,
+                        num_games: int = 2000, seed: SeedLike = None, num_innings: int = 9) -> np.ndarray:
+    """
+    各打順について、状況から評価するイニングの終わりまでを num_games 回シミュレートし、得点を返す。
+    すべての打順に共通乱数を使うため、打順の間の差は運によるぶれが小さい。
+
+    Returns:
+        np.ndarray: (打順数, num_games) この状況から挙げた得点。
+    """
+    _validate_state(state)
+    end_inning = state.inning + evaluation_innings(state, innings, num_innings) - 1
+    keys = {}
+    player_keys = [[keys.setdefault(id(p), len(keys)) for p in lineup] for lineup in lineups]
+    common_uniforms = CommonUniforms(NUM_UNIFORMS, as_generator(seed).spawn(1)[0].bit_generator.seed_seq)
+    result = BatchBaseballGame(lineups).simulate_games(num_games, end_inning, common_uniforms=common_uniforms,
+                                                       player_keys=np.array(player_keys), start_state=state)
+    return result.scores
+
+
+def evaluate_from_state(lineups: Sequence[Sequence[Player]], state: GameState, objective: str = "runs",
+                        innings: int | None = None, num_games: int = 2000, seed: SeedLike = None,
+                        num_innings: int = 9) -> np.ndarray:
+    """
+    試合の途中の状況から各打順を評価する。
+
+    Args:
+        lineups (Sequence[Sequence[Player]]): 9名の打順のリスト。
+        state (GameState): 状況。打者は state.batter 番から始まる。
+        objective (str): "runs" は期待得点、"tie" は state.deficit 点以上を挙げる確率、"lead" は state.deficit 点より多く挙げる確率。
+        innings (int | None): 現在のイニングを含めて評価するイニング数。None の場合は試合の終わりまで。
+        num_games (int): objective が "tie" か "lead" の場合の、打順ごとのシミュレーションの回数。
+        seed (SeedLike): シミュレーションの共通乱数のシード。
+
+    Returns:
+        np.ndarray: (打順数,) 評価値。
+    """
+    _validate_state(state)
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    if objective == "runs":
+        probabilities, speeds = lineup_arrays(lineups)
+        return _expected_runs_from_state(probabilities, speeds, state, evaluation_innings(state, innings, num_innings))
+    scores = simulate_from_state(lineups, state, innings, num_games, seed, num_innings)
+    needed = state.deficit if objective == "tie" else state.deficit + 1
+    return (scores >= needed).mean(axis=1)
+
+
+def optimize_from_state(players: Sequence[Player], state: GameState, slots: Sequence[int] | None = None,
+                        candidates: Sequence[Player] | None = None, objective: str = "runs", innings: int | None = None,
+                        top_k: int = 10, screen: int = DEFAULT_SCREEN, num_games: int = 2000, seed: SeedLike = None,
+                        num_innings: int = 9) -> List[Dict]:
+    """
+    試合の途中の状況から、指定した打順の枠に入れる選手とその並びを最適化する。
+    枠以外の打順は players のまま固定し、候補の選手から枠の数だけ選んだ並びをすべて列挙してまとめて評価する。
+
+    Args:
+        players (Sequence[Player]): 現在の9名の打順。
+        state (GameState): 状況。
+        slots (Sequence[int] | None): 最適化する打順の枠 (0始まり)。None の場合は state.batter から始まる3人。
+        candidates (Sequence[Player] | None): 枠に入れる候補の選手。None の場合は現在枠に入っている選手 (並び替えのみ)。
+            控え選手を含めてよいが、枠以外の打順の選手を含めてはいけない。
+        objective (str): 評価の目的 (evaluate_from_state を参照)。
+        top_k (int): 返す打順の数。
+        screen (int): objective が "tie" か "lead" の場合に、期待得点の上位から何通りをシミュレーションで評価するか。
+
+    Returns:
+        List[Dict]: 評価値の高い順の打順。各要素は "lineup" (選手名のリスト)、"players" (Player のリスト)、
+            "expected_runs" (期待得点)、objective が "tie" か "lead" の場合は "probability" を持つ。
+    """
+    _validate_state(state)
+    if len(players) != 9:
+        raise ValueError("players must contain exactly 9 players")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    slots = [(state.batter + i) % 9 for i in range(3)] if slots is None else [int(slot) for slot in slots]
+    if len(set(slots)) != len(slots) or not all(0 <= slot <= 8 for slot in slots):
+        raise ValueError("slots must be distinct batting-order indices between 0 and 8")
+    candidates = [players[slot] for slot in slots] if candidates is None else list(candidates)
+    fixed = {id(players[b]) for b in range(9) if b not in slots}
+    if any(id(p) in fixed for p in candidates):
+        raise ValueError("candidates must not include players fixed in the other slots")
+    if len(candidates) < len(slots):
+        raise ValueError("candidates must contain at least as many players as slots")
+
+    # 候補の並び (候補の番号の順列) ごとの打順の配列を作る
+    orders = np.array(list(itertools.permutations(range(len(candidates)), len(slots))), dtype=np.int64)
+    base_probabilities, base_speeds = lineup_arrays([players])
+    candidate_probabilities, candidate_speeds = lineup_arrays([candidates])
+    probabilities = np.repeat(base_probabilities, len(orders), axis=0)
+    speeds = np.repeat(base_speeds, len(orders), axis=0)
+    probabilities[:, slots] = candidate_probabilities[0][orders]
+    speeds[:, slots] = candidate_speeds[0][orders]
+    expected = _expected_runs_from_state(probabilities, speeds, state, evaluation_innings(state, innings, num_innings))
+
+    def lineup_of(order: np.ndarray) -> List[Player]:
+        lineup = list(players)
+        for slot, index in zip(slots, order.tolist()):
+            lineup[slot] = candidates[index]
+        return lineup
+
+    if objective == "runs":
+        ranking = np.lexsort((np.arange(len(orders)), -expected))[:top_k]
+        return [{"lineup": [p.name for p in lineup_of(orders[i])], "players": lineup_of(orders[i]),
+                 "expected_runs": float(expected[i])} for i in ranking]
+
+    # 確率は期待得点の上位 screen 通りだけをシミュレーションで評価する
+    screened = np.lexsort((np.arange(len(orders)), -expected))[:max(screen, top_k)]
+    lineups = [lineup_of(orders[i]) for i in screened]
+    probability = evaluate_from_state(lineups, state, objective, innings, num_games, seed, num_innings)
+    ranking = np.lexsort((-expected[screened], -probability))[:top_k]
+    return [{"lineup": [p.name for p in lineups[i]], "players": lineups[i], "expected_runs": float(expected[screened[i]]),
+             "probability": float(probability[i])} for i in ranking]
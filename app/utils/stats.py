@@ -0,0 +1,203 @@
+# src/main/utils/stats.py
+
+import numpy as np
+import pandas as pd
+from collections.abc import MutableMapping
+from typing import Iterator, List, Sequence, Tuple
+
+from .constants import STAT_KEYS
+from .transitions import (
+    SINGLE, DOUBLE, TRIPLE, HOMERUN, WALK, STRIKEOUT,
+    DOUBLE_PLAY, GROUND_OUT_ADVANCE, SACRIFICE_FLY, SACRIFICE_BUNT, BUNT_FAIL, NUM_OUTCOMES
+)
+
+# 成績の列番号 (STAT_KEYS のインデックス)
+STAT_INDEX = {key: index for index, key in enumerate(STAT_KEYS)}
+NUM_STATS = len(STAT_KEYS)
+(HITS, AT_BATS, WALKS, PLATE_APPEARANCES, RUNS_BATTED_IN, SINGLES, DOUBLES, TRIPLES, HOMERUNS, SLUGGING_POINTS,
+ STRIKEOUTS, DOUBLE_PLAYS, SACRIFICE_BUNTS, GROUND_OUT_ADVANCES, BUNT_FAILS, SACRIFICE_FLIES) = range(NUM_STATS)
+
+
+def _build_outcome_stat_deltas() -> np.ndarray:
+    """打席の最終結果1回あたりの各成績の増分 (打点を除く) の表を作る。"""
+    deltas = np.zeros((NUM_OUTCOMES, NUM_STATS), dtype=np.int64)
+    deltas[:, PLATE_APPEARANCES] = 1
+    # 犠打・犠打失敗・犠飛と四死球は打数に含めない
+    deltas[:, AT_BATS] = 1
+    deltas[[WALK, SACRIFICE_BUNT, BUNT_FAIL, SACRIFICE_FLY], AT_BATS] = 0
+    for outcome, counter, bases in ((SINGLE, SINGLES, 1), (DOUBLE, DOUBLES, 2), (TRIPLE, TRIPLES, 3), (HOMERUN, HOMERUNS, 4)):
+        deltas[outcome, HITS] = 1
+        deltas[outcome, counter] = 1
+        deltas[outcome, SLUGGING_POINTS] = bases
+    deltas[WALK, WALKS] = 1
+    deltas[STRIKEOUT, STRIKEOUTS] = 1
+    deltas[DOUBLE_PLAY, DOUBLE_PLAYS] = 1
+    deltas[SACRIFICE_BUNT, SACRIFICE_BUNTS] = 1
+    deltas[GROUND_OUT_ADVANCE, GROUND_OUT_ADVANCES] = 1
+    deltas[BUNT_FAIL, BUNT_FAILS] = 1
+    deltas[SACRIFICE_FLY, SACRIFICE_FLIES] = 1
+    return deltas
+
+
+# OUTCOME_STAT_DELTAS[打席結果] = 成績の増分 (STAT_KEYS の順)
+OUTCOME_STAT_DELTAS = _build_outcome_stat_deltas()
+
+
+def outcome_counts_to_stats(outcome_counts: np.ndarray, runs_batted_in: np.ndarray) -> np.ndarray:
+    """
+    打席結果の回数を STAT_KEYS の順に並んだ成績配列に変換する。
+
+    Args:
+        outcome_counts (np.ndarray): 最後の軸が OUTCOME_TYPES に対応する打席結果の回数。
+        runs_batted_in (np.ndarray): outcome_counts の最後の軸を除いた形の打点。
+
+    Returns:
+        np.ndarray: 最後の軸が STAT_KEYS に対応する int64 の成績配列。
+    """
+    stats = np.asarray(outcome_counts, dtype=np.int64) @ OUTCOME_STAT_DELTAS
+    stats[..., RUNS_BATTED_IN] += np.rint(runs_batted_in).astype(np.int64)
+    return stats
+
+
+def rate_stats(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    成績配列 (..., NUM_STATS) から打率・出塁率・長打率・OPS をまとめて計算する。分母が0の場合は0。
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: (打率, 出塁率, 長打率, OPS)
+    """
+    values = np.asarray(values)
+    at_bats = values[..., AT_BATS]
+    plate_appearances = values[..., PLATE_APPEARANCES]
+    zeros = np.zeros(at_bats.shape)
+    average = np.divide(values[..., HITS], at_bats, out=zeros.copy(), where=at_bats > 0)
+    on_base = np.divide(values[..., HITS] + values[..., WALKS], plate_appearances, out=zeros.copy(), where=plate_appearances > 0)
+    slugging = np.divide(values[..., SLUGGING_POINTS], at_bats, out=zeros.copy(), where=at_bats > 0)
+    return average, on_base, slugging, on_base + slugging
+
+
+def stats_frame(names: Sequence[str], values: np.ndarray) -> pd.DataFrame:
+    """
+    選手名と成績配列 (選手数, NUM_STATS) から、display_player_stats と同じ列の成績表を作る。
+    """
+    values = np.asarray(values, dtype=np.int64).reshape(-1, NUM_STATS)
+    average, on_base, slugging, ops = rate_stats(values)
+    return pd.DataFrame({
+        "選手名": list(names),
+        "打席": values[:, PLATE_APPEARANCES],
+        "打数": values[:, AT_BATS],
+        "安打": values[:, HITS],
+        "単打": values[:, SINGLES],
+        "二塁打": values[:, DOUBLES],
+        "三塁打": values[:, TRIPLES],
+        "本塁打": values[:, HOMERUNS],
+        "四死球": values[:, WALKS],
+        "打点": values[:, RUNS_BATTED_IN],
+        "打率": average.round(3),
+        "出塁率": on_base.round(3),
+        "長打率": slugging.round(3),
+        "OPS": ops.round(3),
+        "三振": values[:, STRIKEOUTS],
+        "併殺打": values[:, DOUBLE_PLAYS],
+        "犠打": values[:, SACRIFICE_BUNTS],
+        "進塁打": values[:, GROUND_OUT_ADVANCES],
+        "犠打失敗": values[:, BUNT_FAILS],
+        "犠飛": values[:, SACRIFICE_FLIES],
+    })
+
+
+class PlayerStats(MutableMapping):
+    """
+    選手1人分の成績配列を STAT_KEYS をキーとする辞書のように扱うためのビュー。
+    player.stats["hits"] += 1 のような従来の書き方は、配列の要素を直接更新する。
+    """
+    __slots__ = ("values",)
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __getitem__(self, key: str) -> int:
+        return int(self.values[STAT_INDEX[key]])
+
+    def __setitem__(self, key: str, value: int):
+        self.values[STAT_INDEX[key]] = value
+
+    def __delitem__(self, key: str):
+        raise TypeError("PlayerStats does not support deleting keys")
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(STAT_KEYS)
+
+    def __len__(self) -> int:
+        return NUM_STATS
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class StatsMatrix:
+    """
+    打順 (同じ選手を複数含んでもよい) の成績を (選手数, NUM_STATS) の int64 行列でまとめて管理するクラス。
+
+    構築時に各選手の成績配列 (Player.stats_values) をこの行列の行のビューに付け替えるため、
+    行列への一括加算はそのまま各選手の成績に反映される。
+    """
+    def __init__(self, players: Sequence):
+        """
+        Args:
+            players (Sequence[Player]): 打順の選手のリスト。
+        """
+        unique_players: List = []
+        row_of = {}
+        for player in players:
+            if id(player) not in row_of:
+                row_of[id(player)] = len(unique_players)
+                unique_players.append(player)
+        self.players = unique_players
+        self.row_of = row_of
+        # 打順の並びごとの行番号
+        self.rows = np.array([row_of[id(p)] for p in players], dtype=np.int64)
+        self.values = np.zeros((len(unique_players), NUM_STATS), dtype=np.int64)
+        for row, player in enumerate(unique_players):
+            self.values[row] = player.stats_values
+            player.stats_values = self.values[row]
+
+    def reset(self):
+        """全選手の成績を0にする。"""
+        self.values[:] = 0
+
+    def add_outcomes(self, rows: Sequence[int], outcomes: Sequence[int], runs_batted_in: Sequence[int] | None = None):
+        """
+        (行番号, 打席結果のコード, 打点) の列をまとめて成績に加算する。
+
+        Args:
+            rows (Sequence[int]): 各打席の打者の行番号 (row_of の値)。
+            outcomes (Sequence[int]): 各打席の最終結果のコード (OUTCOME_TYPES のインデックス)。
+            runs_batted_in (Sequence[int] | None): 各打席の打点。
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        np.add.at(self.values, rows, OUTCOME_STAT_DELTAS[np.asarray(outcomes, dtype=np.int64)])
+        if runs_batted_in is not None:
+            np.add.at(self.values[:, RUNS_BATTED_IN], rows, np.asarray(runs_batted_in, dtype=np.int64))
+
+    def add_event_codes(self, event_codes: Sequence[int], rbi_rows: Sequence[int] = (), rbi_runs: Sequence[int] = ()):
+        """
+        行番号 * NUM_OUTCOMES + 打席結果のコード で表した打席の列を bincount でまとめて成績に加算する。
+
+        Args:
+            event_codes (Sequence[int]): 各打席の (行番号 * NUM_OUTCOMES + 打席結果のコード)。
+            rbi_rows (Sequence[int]): 打点が記録された打席の行番号。
+            rbi_runs (Sequence[int]): rbi_rows に対応する打点。
+        """
+        num_players = len(self.players)
+        counts = np.bincount(np.asarray(event_codes, dtype=np.int64), minlength=num_players * NUM_OUTCOMES)
+        rbi = np.bincount(np.asarray(rbi_rows, dtype=np.int64), weights=rbi_runs, minlength=num_players)
+        self.values += outcome_counts_to_stats(counts.reshape(num_players, NUM_OUTCOMES), rbi)
+
+    def add_lineup_stats(self, lineup_stats: np.ndarray):
+        """打順の並びの成績配列 (打順の人数, NUM_STATS) を加算する。同じ選手の行は合算される。"""
+        np.add.at(self.values, self.rows, np.asarray(lineup_stats, dtype=np.int64))
+
+    def to_frame(self) -> pd.DataFrame:
+        """選手ごとの成績表 (stats_frame) を返す。"""
+        return stats_frame([p.name for p in self.players], self.values)
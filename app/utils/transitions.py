@@ -0,0 +1,172 @@
+# src/main/utils/transitions.py
+
+import numpy as np
+from typing import List, Tuple
+
+from .constants import EVENT_TYPES, OUTCOME_TYPES
+
+# 打席結果の整数コード (OUTCOME_TYPES のインデックス)
+SINGLE, DOUBLE, TRIPLE, HOMERUN, WALK, STRIKEOUT, GROUND_OUT, FLY_OUT = range(len(EVENT_TYPES))
+DOUBLE_PLAY, GROUND_OUT_ADVANCE, SACRIFICE_FLY, SACRIFICE_BUNT, BUNT_FAIL = range(len(EVENT_TYPES), len(OUTCOME_TYPES))
+NUM_OUTCOMES = len(OUTCOME_TYPES)
+
+# 塁状況は3ビットのマスク (1: 一塁, 2: 二塁, 4: 三塁)
+NUM_MASKS = 8
+NUM_OUTS = 3
+
+# 追加進塁の判定ビット (単打で二塁走者が生還 / 単打で一塁走者が三塁へ・二塁打で一塁走者が生還)
+EXTRA_SECOND_BIT = 1
+EXTRA_FIRST_BIT = 2
+NUM_DECISIONS = 4
+
+# RUNNER_SOURCE の値 (0-2: 元の塁, BATTER: 打者, EMPTY: 空き)
+BATTER = 3
+EMPTY = -1
+
+# 追加進塁の基本確率と、Speed・アウトカウントによる調整
+EXTRA_BASE_SINGLE_FROM_SECOND = 0.1
+EXTRA_BASE_SINGLE_FROM_FIRST = 0.1
+EXTRA_BASE_DOUBLE_FROM_FIRST = 0.1
+EXTRA_BASE_SPEED_FACTOR = 0.02
+EXTRA_BASE_OUTS_FACTOR = np.array([0.9, 1.0, 1.1])
+
+# 追加進塁の種類 (extra_base_probabilities の行)
+KIND_SINGLE_FROM_SECOND, KIND_SINGLE_FROM_FIRST, KIND_DOUBLE_FROM_FIRST = range(3)
+_EXTRA_BASE_BASE_PROBABILITIES = np.array([EXTRA_BASE_SINGLE_FROM_SECOND, EXTRA_BASE_SINGLE_FROM_FIRST, EXTRA_BASE_DOUBLE_FROM_FIRST])
+
+
+def extra_base_probabilities(speed) -> np.ndarray:
+    """
+    走者の Speed から、追加進塁の種類ごと・アウトカウントごとの確率を計算する。
+
+    Args:
+        speed: 走者の Speed (スカラーまたは配列)。
+
+    Returns:
+        np.ndarray: (..., 3 (種類), 3 (アウト数)) の確率。
+    """
+    speed = np.asarray(speed, dtype=np.float64)[..., None, None]
+    prob = (_EXTRA_BASE_BASE_PROBABILITIES[:, None] + speed * EXTRA_BASE_SPEED_FACTOR) * EXTRA_BASE_OUTS_FACTOR[None, :]
+    return np.clip(prob, 0.0, 1.0)
+
+
+# 打席結果と走者の塁から追加進塁の種類を引く表 (追加進塁の判定がない場合は None)
+EXTRA_BASE_KIND: List[List[int | None]] = [[None, None, None] for _ in range(NUM_OUTCOMES)]
+EXTRA_BASE_KIND[SINGLE][0] = KIND_SINGLE_FROM_FIRST
+EXTRA_BASE_KIND[SINGLE][1] = KIND_SINGLE_FROM_SECOND
+EXTRA_BASE_KIND[DOUBLE][0] = KIND_DOUBLE_FROM_FIRST
+
+# 打席結果の名前からコードを引く辞書
+OUTCOME_CODES = {name: code for code, name in enumerate(OUTCOME_TYPES)}
+
+
+def _resolve(mask: int, outs: int, outcome: int, bits: int) -> Tuple[List[int], int, int]:
+    """
+    1つの (塁状況, アウト数, 打席結果, 追加進塁の判定) について、各塁の新しい走者の出どころ・得点・増えるアウト数を返す。
+    BaseballGame の走塁規則の唯一の定義で、ここから遷移表を作る。
+    """
+    first, second, third = [base if mask >> base & 1 else EMPTY for base in range(3)]
+    new = [EMPTY, EMPTY, EMPTY]
+    runs = 0
+    outs_added = 0
+
+    if outcome == WALK:
+        # 押し出しの形でのみ進塁する
+        if first != EMPTY:
+            if second != EMPTY:
+                runs += third != EMPTY
+                new[2] = second
+            else:
+                new[2] = third
+            new[1] = first
+        else:
+            new[1], new[2] = second, third
+        new[0] = BATTER
+    elif outcome in (SACRIFICE_BUNT, GROUND_OUT_ADVANCE, SACRIFICE_FLY):
+        # 打者はアウトになり、走者は全員1つ進む
+        runs += third != EMPTY
+        new[2], new[1] = second, first
+        outs_added = 1
+    elif outcome == HOMERUN:
+        runs += 1 + (first != EMPTY) + (second != EMPTY) + (third != EMPTY)
+    elif outcome == TRIPLE:
+        runs += (first != EMPTY) + (second != EMPTY) + (third != EMPTY)
+        new[2] = BATTER
+    elif outcome == DOUBLE:
+        # 二・三塁走者は生還、一塁走者は追加進塁で生還
+        runs += (second != EMPTY) + (third != EMPTY)
+        if first != EMPTY:
+            if bits & EXTRA_FIRST_BIT:
+                runs += 1
+            else:
+                new[2] = first
+        new[1] = BATTER
+    elif outcome == SINGLE:
+        # 三塁走者は生還、二塁走者は追加進塁で生還、一塁走者は三塁が空いていれば追加進塁で三塁へ
+        runs += third != EMPTY
+        if second != EMPTY:
+            if bits & EXTRA_SECOND_BIT:
+                runs += 1
+            else:
+                new[2] = second
+        if first != EMPTY:
+            if new[2] == EMPTY and bits & EXTRA_FIRST_BIT:
+                new[2] = first
+            else:
+                new[1] = first
+        new[0] = BATTER
+    elif outcome == DOUBLE_PLAY:
+        # 一塁走者と打者がアウト、他の走者はそのまま
+        new[1], new[2] = second, third
+        outs_added = 2
+    else:
+        # 三振・ゴロ・フライ・犠打失敗は走者そのまま
+        new[0], new[1], new[2] = first, second, third
+        outs_added = 1
+    return new, runs, outs_added
+
+
+def _build_tables():
+    shape = (NUM_MASKS, NUM_OUTS, NUM_OUTCOMES, NUM_DECISIONS)
+    next_mask = np.zeros(shape, dtype=np.int64)
+    runs = np.zeros(shape, dtype=np.int64)
+    outs_added = np.zeros(shape, dtype=np.int64)
+    runner_source = np.full(shape + (3,), EMPTY, dtype=np.int64)
+    for index in np.ndindex(*shape):
+        new, r, o = _resolve(*index)
+        runner_source[index] = new
+        next_mask[index] = sum(1 << base for base in range(3) if new[base] != EMPTY)
+        runs[index] = r
+        outs_added[index] = o
+
+    # 追加進塁の判定が必要な場合 (判定しなければ乱数を消費しない)
+    masks = np.arange(NUM_MASKS)
+    extra_second_needed = np.zeros((NUM_MASKS, NUM_OUTCOMES), dtype=bool)
+    extra_second_needed[:, SINGLE] = masks & 2 > 0
+    extra_first_needed = np.zeros((NUM_MASKS, NUM_OUTCOMES, NUM_DECISIONS), dtype=bool)
+    for mask in range(NUM_MASKS):
+        for bits in range(NUM_DECISIONS):
+            # 単打では、二塁走者が三塁に残った場合は一塁走者は三塁を狙わない
+            third_open = not (mask & 2) or bool(bits & EXTRA_SECOND_BIT)
+            extra_first_needed[mask, SINGLE, bits] = bool(mask & 1) and third_open
+            extra_first_needed[mask, DOUBLE, bits] = bool(mask & 1)
+    return next_mask, runs, outs_added, runner_source, extra_second_needed, extra_first_needed
+
+
+# 遷移表: [塁状況, アウト数, 打席結果, 追加進塁の判定ビット] -> 新しい塁状況・得点・増えるアウト数・各塁の走者の出どころ
+NEXT_MASK, RUNS, OUTS_ADDED, RUNNER_SOURCE, EXTRA_SECOND_NEEDED, EXTRA_FIRST_NEEDED = _build_tables()
+
+# スカラー版のエンジン (BaseballGame) 用に、同じ表を Python のタプルで持つ (配列の要素アクセスより速い)
+# SCALAR_TRANSITIONS[塁状況][アウト数][打席結果][判定ビット] = (得点, 増えるアウト数, 各塁の走者の出どころ)
+SCALAR_TRANSITIONS = [
+    [
+        [
+            [(int(RUNS[m, o, e, b]), int(OUTS_ADDED[m, o, e, b]), tuple(RUNNER_SOURCE[m, o, e, b].tolist())) for b in range(NUM_DECISIONS)]
+            for e in range(NUM_OUTCOMES)
+        ]
+        for o in range(NUM_OUTS)
+    ]
+    for m in range(NUM_MASKS)
+]
+SCALAR_EXTRA_SECOND_NEEDED = EXTRA_SECOND_NEEDED.tolist()
+SCALAR_EXTRA_FIRST_NEEDED = EXTRA_FIRST_NEEDED.tolist()
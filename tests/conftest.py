@@ -0,0 +1,27 @@
+"""テストで共通に使う選手の打席結果の確率と、選手を作る関数。"""
+
+from app.utils.constants import EVENT_TYPES
+from app.utils.player import Player
+
+# 打席結果の確率 (EVENT_TYPES の順)
+REALISTIC_PROBABILITIES = [0.16, 0.05, 0.005, 0.03, 0.09, 0.2, 0.279, 0.186]
+POWER_PROBABILITIES = [0.13, 0.07, 0.002, 0.07, 0.13, 0.25, 0.2, 0.148]
+SLUGGER_PROBABILITIES = [0.15, 0.08, 0.005, 0.09, 0.15, 0.2, 0.175, 0.15]
+WEAK_PROBABILITIES = [0.12, 0.02, 0.002, 0.005, 0.04, 0.3, 0.313, 0.2]
+# 強打者と平均的な打者が交互に並ぶ打順の確率 (make_lineup の rows)
+MIXED_PROBABILITIES = (POWER_PROBABILITIES, REALISTIC_PROBABILITIES)
+
+
+def make_player(name, event_type=None, probabilities=None, speed=0):
+    """probabilities を省略した場合は、常に event_type の結果になる選手を作る。"""
+    if probabilities is None:
+        probabilities = [1.0 if e == event_type else 0.0 for e in EVENT_TYPES]
+    return Player(name=name, probabilities=probabilities, speed=speed)
+
+
+def make_lineup(speed=None, count=9, rows=(REALISTIC_PROBABILITIES,)):
+    """
+    P0, P1, ... の count 人の打順を作る。i 番目の選手の確率は rows[i % len(rows)]、
+    走力は speed (省略した場合は i % 5)。
+    """
+    return [Player(f"P{i}", rows[i % len(rows)], speed=i % 5 if speed is None else speed) for i in range(count)]
@@ -0,0 +1,83 @@
+import pytest
+import numpy as np
+
+from app.utils.batch_game import BatchBaseballGame
+from app.utils.game import BaseballGame
+from app.utils.stats import outcome_counts_to_stats
+from app.utils.constants import OUTCOME_TYPES, STAT_KEYS
+from conftest import REALISTIC_PROBABILITIES, make_player, make_lineup
+
+
+def test_strikeouts_only():
+    players = [make_player(f"K{i}", "strikeout") for i in range(9)]
+    result = BatchBaseballGame([players]).simulate_games(10, rng=np.random.default_rng(0))
+    assert result.scores.shape == (1, 10)
+    assert result.scores.sum() == 0
+    # 1試合27打席、9人で割り切れるので各打者3打席
+    stats = outcome_counts_to_stats(result.outcome_counts[0], result.runs_batted_in[0])
+    assert (stats[:, STAT_KEYS.index("plate_appearances")] == 30).all()
+    assert (stats[:, STAT_KEYS.index("strikeouts")] == 30).all()
+
+
+def test_homeruns_then_strikeouts():
+    # 1,3,5,7,9回に本塁打3本ずつ (1回: 1-6番, 2回: 7-9番, 3回: 1-6番, ...)
+    players = [make_player(f"HR{i}", "homerun") for i in range(3)] + [make_player(f"K{i}", "strikeout") for i in range(6)]
+    result = BatchBaseballGame([players]).simulate_games(5, rng=np.random.default_rng(0))
+    assert (result.scores == 15).all()
+    assert (result.runs_by_inning[0, :, 0] == 3).all()
+    assert (result.runs_by_inning[0, :, 1] == 0).all()
+    assert result.runs_batted_in[0, 0] == 5 * 5
+
+
+def test_multiple_lineups_are_independent():
+    strikeouts = [make_player(f"K{i}", "strikeout") for i in range(9)]
+    homeruns = [make_player(f"HR{i}", "homerun") for i in range(3)] + strikeouts[:6]
+    result = BatchBaseballGame([strikeouts, homeruns]).simulate_games(4, rng=np.random.default_rng(0))
+    assert (result.scores[0] == 0).all()
+    assert (result.scores[1] == 15).all()
+
+
+def test_chunking_matches_total_games():
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES) for i in range(9)]
+    engine = BatchBaseballGame([players], memory_budget_mb=0.001)
+    assert engine.games_per_chunk() < 50
+    result = engine.simulate_games(50, rng=np.random.default_rng(1))
+    assert result.scores.shape == (1, 50)
+    # 全試合で27アウト以上取られている
+    counts = result.outcome_counts[0].sum(axis=0)
+    outs = counts[OUTCOME_TYPES.index("strikeout"):].sum() + counts[OUTCOME_TYPES.index("double_play")]
+    assert outs >= 27 * 50
+
+
+def test_mean_runs_match_scalar_engine():
+    # 同じ選手で BaseballGame と平均得点が統計的に一致することを確認
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES, speed=i - 4) for i in range(9)]
+    np.random.seed(0)
+    scalar_scores = np.array([BaseballGame(players).simulate_game()[0] for _ in range(1500)])
+    batch_scores = BatchBaseballGame([players]).simulate_games(20000, rng=np.random.default_rng(0)).scores[0]
+    standard_error = np.sqrt(scalar_scores.var() / len(scalar_scores) + batch_scores.var() / len(batch_scores))
+    assert abs(scalar_scores.mean() - batch_scores.mean()) < 4 * standard_error
+
+
+def test_invalid_lineup_size():
+    with pytest.raises(ValueError):
+        BatchBaseballGame([[make_player("A", "strikeout")] * 8])
+
+
+def test_common_random_numbers_are_shared_between_lineups():
+    from app.utils.batch_game import NUM_UNIFORMS
+    from app.utils.sampling import CommonUniforms
+    players = make_lineup()
+    swapped = players[:]
+    swapped[3], swapped[4] = swapped[4], swapped[3]
+    # 同じ打順は同じ共通乱数で同じ結果になり、別のエンジン・別の試合番号の並びでも同じ試合は同じ結果になる
+    common = CommonUniforms(NUM_UNIFORMS, 5)
+    same = BatchBaseballGame([players, players]).simulate_games(30, common_uniforms=common).scores
+    assert np.array_equal(same[0], same[1])
+    later = BatchBaseballGame([players]).simulate_games(10, common_uniforms=CommonUniforms(NUM_UNIFORMS, 5), game_offset=20).scores
+    assert np.array_equal(later[0], same[0, 20:])
+    # 打順を少し入れ替えただけなら、独立な乱数より得点差のぶれがずっと小さい
+    engine = BatchBaseballGame([players, swapped])
+    crn = engine.simulate_games(2000, common_uniforms=CommonUniforms(NUM_UNIFORMS, 1)).scores
+    independent = engine.simulate_games(2000, rng=np.random.default_rng(1)).scores
+    assert np.var(crn[0] - crn[1]) * 4 < np.var(independent[0] - independent[1])
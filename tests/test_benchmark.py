@@ -0,0 +1,31 @@
+import os
+
+from app.utils.benchmark import compare_results, load_roster, load_results, run_benchmarks, save_result
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "processed")
+
+
+def test_run_benchmarks_on_real_roster():
+    lineup, pool = load_roster(2024, "t", DATA_PATH)
+    assert len(lineup) == 9 and len(set(map(id, lineup))) == 9
+    assert len(pool) >= 9
+    results = run_benchmarks(lineup, pool, warmup=0, repeats=2, num_games=5, num_seasons=1, num_trials=2)
+    assert set(results) == {"game", "season", "search_simulation", "search_markov"}
+    game = results["game"]["throughput"]
+    assert game["PAs/s"]["p50"] > game["games/s"]["p50"] > 0
+    assert len(results["season"]["seconds"]) == 2
+
+
+def test_compare_flags_regressions_beyond_threshold(tmp_path):
+    def result(rate):
+        return {"benchmarks": {"game": {"throughput": {"games/s": {"p5": rate, "p50": rate, "p95": rate}}}}}
+
+    path = str(tmp_path / "results.json")
+    save_result(path, "aaa111", result(100.0))
+    save_result(path, "bbb222", result(90.0))
+    results = load_results(path)
+    assert set(results) == {"aaa111", "bbb222"}
+    [row] = compare_results(results["aaa111"], results["bbb222"], threshold=0.05)
+    assert row["regression"] and abs(row["change"] + 0.1) < 1e-9
+    [row] = compare_results(results["aaa111"], results["bbb222"], threshold=0.2)
+    assert not row["regression"]
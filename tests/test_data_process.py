@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from app.utils.data_process import main, process_all, process_data, read_raw_data
+from app.utils.player_store import STORE_FILE, PlayerStore
+
+RAW_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "raw")
+
+
+def copy_raw(tmp_path):
+    raw = tmp_path / "raw"
+    for year, team in ((2023, "t"), (2024, "t"), (2024, "h")):
+        (raw / str(year)).mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(RAW_PATH, str(year), f"{team}.csv"), raw / str(year) / f"{team}.csv")
+    return raw
+
+
+def test_batch_output_is_byte_identical_to_per_team_processing(tmp_path):
+    raw = copy_raw(tmp_path)
+    for year, team in ((2023, "t"), (2024, "t"), (2024, "h")):
+        process_data(pd.read_csv(raw / str(year) / f"{team}.csv"), team, year, str(tmp_path / "single"), str(raw))
+    for year in (2023, 2024):
+        main(["t", "h", "g"], year, str(raw), str(tmp_path / "batch"))
+    for name in ("2023/t.csv", "2024/t.csv", "2024/h.csv"):
+        assert (tmp_path / "batch" / name).read_bytes() == (tmp_path / "single" / name).read_bytes()
+    assert not (tmp_path / "batch" / "2024" / "g.csv").exists()
+
+    store = PlayerStore.open(str(tmp_path / "batch" / STORE_FILE))
+    assert store.teams(2024) == ["h", "t"]
+    assert np.all(store.plate_appearances(2024, "h") >= 50)
+
+
+def test_zero_probabilities_are_floored_and_normalized(tmp_path):
+    columns = pd.read_csv(os.path.join(RAW_PATH, "2024", "t.csv"), nrows=0).columns
+    row = dict.fromkeys(columns, 0)
+    row.update({"選手": "A", "打席": 100, "安打": 30, "四球": 10, "三振": 20, "三塁打": 0, "盗塁": 5, "盗塁刺": 1})
+    (tmp_path / "2024").mkdir()
+    pd.DataFrame([row, dict(row, 選手="B", 打席=10)]).to_csv(tmp_path / "2024" / "x.csv", index=False)
+    processed = process_all(read_raw_data([2024], ["x"], str(tmp_path)))
+    frame = processed[(2024, "x")]
+    assert frame["Player"].tolist() == ["A"] and frame["Speed"].tolist() == [3]
+    probabilities = frame.iloc[0, 1:9].to_numpy(dtype=float)
+    assert np.isclose(probabilities.sum(), 1.0) and np.all(probabilities > 0)
+    assert frame["2B_ratio"].iloc[0] == frame["HR_ratio"].iloc[0] < 1e-3
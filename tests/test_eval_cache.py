@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.utils import constants
+from app.utils.batch_game import BatchBaseballGame
+from app.utils.eval_cache import EvaluationCache, SeasonEvaluation, configure_evaluation_cache
+from app.utils.player import Player
+from app.utils.sampling import as_generator
+from app.utils.simulator import display_player_stats, find_best_and_worst_lineups, simulate_season
+from conftest import make_lineup
+
+
+def test_disk_store_survives_restart_and_evicts_oldest(tmp_path):
+    cache = EvaluationCache(str(tmp_path), max_memory_entries=2)
+    keys = [cache.make_key("season", make_lineup(), seed, 10) for seed in range(3)]
+    for seed, key in enumerate(keys):
+        cache.put(key, SeasonEvaluation(float(seed), 1.0, np.full((9, 16), seed), 10 * seed))
+        os.utime(cache._path(key), (seed, seed)) # 書き込んだ順に古い更新時刻にする
+    assert len(cache.memory) == 2
+
+    reopened = EvaluationCache(str(tmp_path))
+    evaluation = reopened.get(keys[0])
+    assert evaluation.mean == 0.0 and reopened.hits == 1
+    evaluation.stats[:] = 99 # 返した値を変更してもキャッシュは変わらない
+    assert reopened.get(keys[0]).stats.max() == 0
+
+    size = len(open(next(tmp_path.iterdir()), "rb").read())
+    small = EvaluationCache(str(tmp_path), max_disk_bytes=2 * size)
+    small.put(small.make_key("season", make_lineup(), 3, 10), SeasonEvaluation(3.0, 1.0, np.full((9, 16), 3), 30))
+    assert len(list(tmp_path.glob("*.pkl"))) == 2
+    assert EvaluationCache(str(tmp_path)).get(keys[1]) is None # 最も長く使われていない結果が削除される
+
+
+def test_key_changes_with_players_constants_seed_and_options(monkeypatch):
+    cache = EvaluationCache()
+    key = cache.make_key("season", make_lineup(), 1, 143)
+    assert key == EvaluationCache().make_key("season", make_lineup(), 1, 143) # キャッシュのインスタンスに依存しない
+    assert key != cache.make_key("season", make_lineup(), 2, 143)
+    assert key != cache.make_key("season", make_lineup(), 1, 143, True)
+    monkeypatch.setattr(constants, "DOUBLE_PLAY_PROBABILITY", 0.5)
+    assert key != cache.make_key("season", make_lineup(), 1, 143)
+    monkeypatch.undo()
+
+    # 選手データが変わると打順の選手の確率が変わり、キーも変わる
+    edited = make_lineup()
+    edited[0] = Player("P0", [0.2, 0.05, 0.005, 0.03, 0.09, 0.2, 0.239, 0.186], speed=0)
+    assert key != cache.make_key("season", edited, 1, 143)
+
+
+def test_simulate_season_and_search_consult_default_cache(tmp_path):
+    cache = configure_evaluation_cache(str(tmp_path / "cache"))
+    lineup = make_lineup()
+    total, stats_df = simulate_season(30, lineup, rng=11)
+    assert cache.misses == 1
+    cached_total, cached_df = simulate_season(30, make_lineup(), rng=11)
+    assert cache.hits == 1
+    assert cached_total == total and cached_df.equals(stats_df)
+    assert cached_total == simulate_season(30, make_lineup(), rng=11, use_cache=False)[0]
+
+    # 探索はキャッシュにない場合もある場合も、渡した選手の成績を変更しない
+    before = display_player_stats(lineup)
+    best, worst = find_best_and_worst_lineups(5, lineup, shuffle_only=True, seed=4)
+    assert display_player_stats(lineup).equals(before)
+    again, _ = find_best_and_worst_lineups(5, lineup, shuffle_only=True, seed=4)
+    assert cache.hits == 2 and display_player_stats(lineup).equals(before)
+    assert again["lineup"] == best["lineup"] and again["player_stats"].equals(best["player_stats"])
+    configure_evaluation_cache(None)
+
+
+def test_simulate_season_total_is_exact_and_zero_games_is_empty():
+    total, stats_df = simulate_season(0, make_lineup(), rng=1, use_cache=False)
+    assert total == 0 and stats_df["打席"].sum() == 0
+    scores = BatchBaseballGame([make_lineup()]).simulate_games(7, rng=as_generator(1)).scores
+    assert simulate_season(7, make_lineup(), rng=1, use_cache=False)[0] == int(scores.sum())
+
+
+def test_concurrent_threads_share_one_cache(tmp_path):
+    lineup = make_lineup()
+    cache = EvaluationCache(str(tmp_path), max_memory_entries=4, max_disk_bytes=6000)
+    keys = [cache.make_key("season", lineup, seed, 10) for seed in range(12)]
+
+    def work(worker):
+        for step in range(100):
+            seed = (worker + step) % len(keys)
+            if cache.get(keys[seed]) is None:
+                cache.put(keys[seed], SeasonEvaluation(float(seed), 1.0, np.full((9, 16), seed), seed))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8))) # 例外があればここで送出される
+    assert cache.hits + cache.misses == 800
+    assert not list(tmp_path.glob("*.tmp"))
+    assert sum(path.stat().st_size for path in tmp_path.glob("*.pkl")) <= 6000
+
+
+def test_concurrent_sessions_simulate_through_default_cache(tmp_path):
+    # アプリの複数のセッションが同時に同じシードと打順でシーズンをシミュレートする場合
+    expected = {seed: simulate_season(20, make_lineup(), rng=seed, use_cache=False) for seed in range(3)}
+    cache = configure_evaluation_cache(str(tmp_path / "cache"))
+    try:
+        def session(index):
+            seed = index % 3
+            total, stats_df = simulate_season(20, make_lineup(), rng=seed)
+            return total == expected[seed][0] and stats_df.equals(expected[seed][1])
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(session, range(48)))
+        assert cache.hits + cache.misses == 48 and len(cache.memory) == 3
+    finally:
+        configure_evaluation_cache(None)
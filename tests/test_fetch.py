@@ -0,0 +1,109 @@
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("lxml")
+
+from app.utils.fetch import CacheMissError, HtmlCache, HtmlFetcher, serve_cache
+from app.utils.get_player_data import parse_player_table, player_data_url, scrape_all
+
+PLAYER_PAGE = """<html><head><meta charset="utf-8"></head><body><table>
+<tr><td></td><td>2024年度 阪神タイガース 個人打撃成績</td><td></td><td></td></tr>
+<tr><td></td><td>選 手</td><td>試合</td><td>打席</td></tr>
+<tr><td>*</td><td>山田　太郎</td><td>120</td><td>450</td></tr>
+<tr><td></td><td>鈴木 一郎</td><td>30</td><td>48</td></tr>
+</table></body></html>""".encode("utf-8")
+
+
+@contextmanager
+def running(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def flaky_server(body: bytes, failures: int):
+    """最初の failures 回は 503 を返し、その後は ETag 付きで body (If-None-Match が一致すれば 304) を返すサーバー。"""
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.headers.get("If-None-Match"))
+            if len(requests_seen) <= failures:
+                self.send_error(503)
+            elif self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", 0), Handler), requests_seen
+
+
+def test_retry_conditional_refetch_and_replay(tmp_path):
+    server, requests_seen = flaky_server(PLAYER_PAGE, failures=2)
+    with running(server) as base:
+        url = f"{base}/page.html"
+        fetcher = HtmlFetcher(str(tmp_path), backoff=0.0)
+        assert fetcher.fetch(url) == PLAYER_PAGE and fetcher.fetch(url) == PLAYER_PAGE
+        assert len(requests_seen) == 3 and fetcher.downloads == 1
+
+        # キャッシュにある URL は ETag を付けて確認し、304 ならキャッシュの HTML を使う
+        refetcher = HtmlFetcher(str(tmp_path))
+        assert refetcher.fetch(url) == PLAYER_PAGE
+        assert requests_seen[-1] == '"v1"' and refetcher.not_modified == 1
+
+    replay = HtmlFetcher(str(tmp_path), replay=True)
+    assert replay.fetch(url) == PLAYER_PAGE
+    with pytest.raises(CacheMissError):
+        replay.fetch(f"{base}/missing.html")
+
+
+def test_scrape_from_fixture_server_and_replay(tmp_path):
+    fixtures = HtmlCache(str(tmp_path / "fixtures"))
+    fixtures.put(player_data_url("t", "2024"), PLAYER_PAGE)
+    fixtures.save()
+    with running(serve_cache(str(tmp_path / "fixtures"))) as base:
+        fetcher = HtmlFetcher(str(tmp_path / "cache"), mirror=base, backoff=0.0)
+        results = scrape_all(["2024"], ["t", "g"], fetcher, str(tmp_path / "raw"))
+    assert list(results) == [("2024", "t")]
+    frame = pd.read_csv(tmp_path / "raw" / "2024" / "t.csv")
+    assert frame.columns.tolist() == ["選手", "試合", "打席"]
+    assert frame["選手"].tolist() == ["山田太郎", "鈴木一郎"] and frame["打席"].tolist() == [450, 48]
+
+    # キャッシュのキーは元の URL なので、リプレイモードでネットワークなしに同じ表を解析できる
+    replay = HtmlFetcher(str(tmp_path / "cache"), replay=True)
+    pd.testing.assert_frame_equal(parse_player_table(replay.fetch(player_data_url("t", "2024"))), results[("2024", "t")])
+
+
+def test_fetch_all_saves_index_once(tmp_path, monkeypatch):
+    fixtures = HtmlCache(str(tmp_path / "fixtures"))
+    urls = [player_data_url(team, "2024") for team in ("t", "g", "s")]
+    for url in urls:
+        fixtures.put(url, PLAYER_PAGE + url.encode())
+    assert HtmlCache(str(tmp_path / "fixtures")).index == {} # put は索引をメモリ上で更新するだけ
+    fixtures.save()
+
+    saves = []
+    original_save = HtmlCache.save
+    monkeypatch.setattr(HtmlCache, "save", lambda self: (saves.append(self), original_save(self)))
+    with running(serve_cache(str(tmp_path / "fixtures"))) as base:
+        fetcher = HtmlFetcher(str(tmp_path / "cache"), mirror=base, max_workers=3, backoff=0.0)
+        assert len(fetcher.fetch_all(urls)) == 3
+    assert len(saves) == 1 and fetcher.downloads == 3
+    assert sorted(HtmlCache(str(tmp_path / "cache")).index) == sorted(urls)
@@ -4,29 +4,14 @@ from collections import deque
 
 from app.utils.game import BaseballGame
 from app.utils.player import Player
-from app.utils.constants import EVENT_CONFIG
-
-class MockPlayer:
-    def __init__(self, name, event_type=None, speed=0):
-        self.name = name
-        self._event_type = event_type
-        self.speed = speed
-        self.stats = {"runs_batted_in": 0}
-
-    def simulate_at_bat(self):
-        if self._event_type:
-            return self._event_type, EVENT_CONFIG[self._event_type]["bases_to_advance"]
-        # デフォルトの確率で結果を返す (必要であれば)
-        probabilities = [0.1, 0.1, 0.01, 0.01, 0.1, 0.68] # 適当な確率
-        event_type = np.random.choice(list(EVENT_CONFIG.keys()), p=probabilities)
-        return event_type, EVENT_CONFIG[event_type]["bases_to_advance"]
+from conftest import REALISTIC_PROBABILITIES, make_player
 
 
 # --- advance_runnersメソッドのテスト ---
 
 def test_advance_runners_single_no_runners():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "single")
+    batter = make_player("Batter", "single")
     game.bases = [None, None, None]
     runs = game.advance_runners(batter, "single")
     assert runs == 0
@@ -36,8 +21,8 @@ def test_advance_runners_single_no_runners():
 
 def test_advance_runners_single_runner_on_first():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "single")
-    r1 = MockPlayer("R1", "out") # 走者
+    batter = make_player("Batter", "single")
+    r1 = make_player("R1", "strikeout") # 走者
     game.bases = [r1, None, None]
     runs = game.advance_runners(batter, "single")
     assert runs == 0
@@ -46,8 +31,8 @@ def test_advance_runners_single_runner_on_first():
 
 def test_advance_runners_single_runner_on_second_score(monkeypatch):
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "single")
-    r2 = MockPlayer("R2", "out") # 走者
+    batter = make_player("Batter", "single")
+    r2 = make_player("R2", "strikeout") # 走者
     game.bases = [None, r2, None]
     monkeypatch.setattr(game, 'should_advance_extra_base', lambda runner, current_base_index, event_type: False)
     runs = game.advance_runners(batter, "single")
@@ -59,8 +44,8 @@ def test_advance_runners_single_runner_on_second_score(monkeypatch):
 
 def test_advance_runners_single_runner_on_third_score():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "single")
-    r3 = MockPlayer("R3", "out") # 走者
+    batter = make_player("Batter", "single")
+    r3 = make_player("R3", "strikeout") # 走者
     game.bases = [None, None, r3]
     runs = game.advance_runners(batter, "single")
     assert runs == 1 # 三塁走者が本塁へ
@@ -70,8 +55,8 @@ def test_advance_runners_single_runner_on_third_score():
 
 def test_advance_runners_double_runner_on_first_score(monkeypatch):
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "double")
-    r1 = MockPlayer("R1", "out") # 走者
+    batter = make_player("Batter", "double")
+    r1 = make_player("R1", "strikeout") # 走者
     game.bases = [r1, None, None]
     monkeypatch.setattr(game, 'should_advance_extra_base', lambda runner, current_base_index, event_type: False)
     runs = game.advance_runners(batter, "double")
@@ -82,22 +67,22 @@ def test_advance_runners_double_runner_on_first_score(monkeypatch):
 
 def test_advance_runners_double_runner_on_second_score(monkeypatch):
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "double")
-    r2 = MockPlayer("R2", "out") # 走者
+    batter = make_player("Batter", "double")
+    r2 = make_player("R2", "strikeout") # 走者
     game.bases = [None, r2, None]
     monkeypatch.setattr(game, 'should_advance_extra_base', lambda runner, current_base_index, event_type: False)
     runs = game.advance_runners(batter, "double")
-    assert runs == 0
+    assert runs == 1 # 二塁打で二塁ランナーは本塁へ
     assert game.bases[0] is None
     assert game.bases[1] == batter
-    assert game.bases[2] == r2
+    assert game.bases[2] is None
 
 def test_advance_runners_homerun_grand_slam():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "homerun")
-    r1 = MockPlayer("R1", "out")
-    r2 = MockPlayer("R2", "out")
-    r3 = MockPlayer("R3", "out")
+    batter = make_player("Batter", "homerun")
+    r1 = make_player("R1", "strikeout")
+    r2 = make_player("R2", "strikeout")
+    r3 = make_player("R3", "strikeout")
     game.bases = [r1, r2, r3]
     runs = game.advance_runners(batter, "homerun")
     assert runs == 4 # 満塁ホームラン
@@ -105,7 +90,7 @@ def test_advance_runners_homerun_grand_slam():
 
 def test_advance_runners_walk_no_runners():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "walk")
+    batter = make_player("Batter", "walk")
     game.bases = [None, None, None]
     runs = game.advance_runners(batter, "walk")
     assert runs == 0
@@ -115,8 +100,8 @@ def test_advance_runners_walk_no_runners():
 
 def test_advance_runners_walk_runner_on_first():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "walk")
-    r1 = MockPlayer("R1", "out")
+    batter = make_player("Batter", "walk")
+    r1 = make_player("R1", "strikeout")
     game.bases = [r1, None, None]
     runs = game.advance_runners(batter, "walk")
     assert runs == 0
@@ -126,9 +111,9 @@ def test_advance_runners_walk_runner_on_first():
 
 def test_advance_runners_walk_runners_on_first_and_second():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "walk")
-    r1 = MockPlayer("R1", "out")
-    r2 = MockPlayer("R2", "out")
+    batter = make_player("Batter", "walk")
+    r1 = make_player("R1", "strikeout")
+    r2 = make_player("R2", "strikeout")
     game.bases = [r1, r2, None]
     runs = game.advance_runners(batter, "walk")
     assert runs == 0
@@ -138,10 +123,10 @@ def test_advance_runners_walk_runners_on_first_and_second():
 
 def test_advance_runners_walk_bases_loaded():
     game = BaseballGame([])
-    batter = MockPlayer("Batter", "walk")
-    r1 = MockPlayer("R1", "out")
-    r2 = MockPlayer("R2", "out")
-    r3 = MockPlayer("R3", "out")
+    batter = make_player("Batter", "walk")
+    r1 = make_player("R1", "strikeout")
+    r2 = make_player("R2", "strikeout")
+    r3 = make_player("R3", "strikeout")
     game.bases = [r1, r2, r3]
     runs = game.advance_runners(batter, "walk")
     assert runs == 1 # 押し出し
@@ -153,9 +138,9 @@ def test_advance_runners_walk_bases_loaded():
 
 def test_should_advance_extra_base_speed_effect(monkeypatch):
     game = BaseballGame([])
-    p_fast = MockPlayer("P_Fast", speed=10)
-    p_avg = MockPlayer("P_Avg", speed=0)
-    p_slow = MockPlayer("P_Slow", speed=-10)
+    p_fast = make_player("P_Fast", probabilities=REALISTIC_PROBABILITIES, speed=10)
+    p_avg = make_player("P_Avg", probabilities=REALISTIC_PROBABILITIES, speed=0)
+    p_slow = make_player("P_Slow", probabilities=REALISTIC_PROBABILITIES, speed=-10)
 
     game.outs = 1 # 1アウトで調整なし
     
@@ -171,7 +156,7 @@ def test_should_advance_extra_base_speed_effect(monkeypatch):
 
 def test_should_advance_extra_base_outs_effect(monkeypatch):
     game = BaseballGame([])
-    p_avg = MockPlayer("P_Avg", speed=0)
+    p_avg = make_player("P_Avg", probabilities=REALISTIC_PROBABILITIES, speed=0)
     
     # should_advance_extra_baseのbase_probが0.0なので、常にFalseになる
     game.outs = 0
@@ -196,7 +181,7 @@ def test_should_advance_extra_base_outs_effect(monkeypatch):
 
 def test_play_inning_basic():
     # 常にアウトになる選手でテスト
-    p_out = MockPlayer("OutPlayer", "out")
+    p_out = make_player("OutPlayer", "strikeout")
     players = [p_out] * 9
     game = BaseballGame(players)
     game.play_inning()
@@ -207,15 +192,15 @@ def test_play_inning_basic():
 def test_play_inning_with_score():
     # ホームランとアウトを組み合わせた選手でテスト
     players = [
-        MockPlayer("HR1", "homerun"),
-        MockPlayer("HR2", "homerun"),
-        MockPlayer("HR3", "homerun"),
-        MockPlayer("Out1", "out"),
-        MockPlayer("Out2", "out"),
-        MockPlayer("Out3", "out"),
-        MockPlayer("Out4", "out"),
-        MockPlayer("Out5", "out"),
-        MockPlayer("Out6", "out"),
+        make_player("HR1", "homerun"),
+        make_player("HR2", "homerun"),
+        make_player("HR3", "homerun"),
+        make_player("Out1", "strikeout"),
+        make_player("Out2", "strikeout"),
+        make_player("Out3", "strikeout"),
+        make_player("Out4", "strikeout"),
+        make_player("Out5", "strikeout"),
+        make_player("Out6", "strikeout"),
     ]
     game = BaseballGame(players)
     game.play_inning()
@@ -226,7 +211,7 @@ def test_play_inning_with_score():
 # --- simulate_gameメソッドのテスト ---
 
 def test_simulate_game_basic():
-    p_out = MockPlayer("OutPlayer", "out")
+    p_out = make_player("OutPlayer", "strikeout")
     players = [p_out] * 9
     game = BaseballGame(players)
     final_score, game_log = game.simulate_game(num_innings=1)
@@ -238,15 +223,15 @@ def test_simulate_game_basic():
 def test_simulate_game_with_score():
     # ホームランとアウトを組み合わせた選手でテスト
     players = [
-        MockPlayer("HR1", "homerun"),
-        MockPlayer("HR2", "homerun"),
-        MockPlayer("HR3", "homerun"),
-        MockPlayer("Out1", "out"),
-        MockPlayer("Out2", "out"),
-        MockPlayer("Out3", "out"),
-        MockPlayer("Out4", "out"),
-        MockPlayer("Out5", "out"),
-        MockPlayer("Out6", "out"),
+        make_player("HR1", "homerun"),
+        make_player("HR2", "homerun"),
+        make_player("HR3", "homerun"),
+        make_player("Out1", "strikeout"),
+        make_player("Out2", "strikeout"),
+        make_player("Out3", "strikeout"),
+        make_player("Out4", "strikeout"),
+        make_player("Out5", "strikeout"),
+        make_player("Out6", "strikeout"),
     ]
     game = BaseballGame(players)
     final_score, game_log = game.simulate_game(num_innings=1)
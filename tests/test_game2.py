@@ -4,28 +4,18 @@ from collections import deque
 
 from app.utils.game import BaseballGame
 from app.utils.player import Player
-from app.utils.constants import EVENT_CONFIG
-
-class MockPlayer:
-    def __init__(self, name, event_type, speed=0):
-        self.name = name
-        self._event_type = event_type
-        self.speed = speed
-        self.stats = {"runs_batted_in": 0}
-
-    def simulate_at_bat(self):
-        return self._event_type, EVENT_CONFIG[self._event_type]["bases_to_advance"]
+from conftest import make_player
 
 
 def test_walk_pushes_runners():
     players = [
-        MockPlayer("A", "walk"),
-        MockPlayer("B", "walk"),
-        MockPlayer("C", "walk"),
-        MockPlayer("D", "walk"),  # 押し出しで1点
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "walk"),
+        make_player("B", "walk"),
+        make_player("C", "walk"),
+        make_player("D", "walk"),  # 押し出しで1点
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     score, log = game.simulate_game(num_innings=1)
@@ -35,13 +25,13 @@ def test_walk_pushes_runners():
 
 def test_homerun_scores_all():
     players = [
-        MockPlayer("A", "walk"),
-        MockPlayer("B", "walk"),
-        MockPlayer("C", "walk"),
-        MockPlayer("D", "homerun"),  # 満塁ホームラン → 4点
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "walk"),
+        make_player("B", "walk"),
+        make_player("C", "walk"),
+        make_player("D", "homerun"),  # 満塁ホームラン → 4点
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     score, log = game.simulate_game(num_innings=1)
@@ -51,13 +41,13 @@ def test_homerun_scores_all():
 
 def test_single_advances_runners():
     players = [
-        MockPlayer("A", "single"),
-        MockPlayer("B", "single"),
-        MockPlayer("C", "single"),
-        MockPlayer("D", "single"),
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "single"),
+        make_player("B", "single"),
+        make_player("C", "single"),
+        make_player("D", "single"),
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     score, log = game.simulate_game(num_innings=1)
@@ -66,13 +56,13 @@ def test_single_advances_runners():
 
 def test_double_advances_runners_further():
     players = [
-        MockPlayer("A", "walk"),
-        MockPlayer("B", "double"),
-        MockPlayer("C", "double"),
-        MockPlayer("D", "double"),
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "walk"),
+        make_player("B", "double"),
+        make_player("C", "double"),
+        make_player("D", "double"),
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     score, log = game.simulate_game(num_innings=1)
@@ -81,26 +71,26 @@ def test_double_advances_runners_further():
 
 def test_out_does_not_score():
     players = [
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     score, log = game.simulate_game(num_innings=1)
     assert score == 0
     assert len(log[0]) == 3
-    assert all(e[1] == "out" for e in log[0])
+    assert all(e[1] == "strikeout" for e in log[0])
 
 
 def test_rbi_tracking():
     players = [
-        MockPlayer("A", "walk"),
-        MockPlayer("B", "walk"),
-        MockPlayer("C", "walk"),
-        MockPlayer("D", "homerun"),
-        MockPlayer("A", "out"),
-        MockPlayer("B", "out"),
-        MockPlayer("C", "out"),
+        make_player("A", "walk"),
+        make_player("B", "walk"),
+        make_player("C", "walk"),
+        make_player("D", "homerun"),
+        make_player("A", "strikeout"),
+        make_player("B", "strikeout"),
+        make_player("C", "strikeout"),
     ]
     game = BaseballGame(players)
     game.simulate_game(num_innings=1)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.utils.game import BaseballGame
+from app.utils.game_log import GameLog
+from conftest import make_lineup
+
+
+def test_log_modes_share_the_same_game():
+    results = {mode: BaseballGame(make_lineup()).simulate_game(rng=4, log_mode=mode) for mode in ("none", "summary", "full")}
+    scores = {score for score, _ in results.values()}
+    assert len(scores) == 1
+    assert results["none"][1] is None
+    full_log = results["full"][1]
+    assert results["summary"][1] == full_log.inning_runs()
+    assert sum(results["summary"][1]) == scores.pop()
+    assert len(full_log) == 9
+    assert all(isinstance(name, str) and isinstance(rbi, int) for inning in full_log for name, _, rbi in inning)
+
+
+def test_log_mode_none_still_records_stats():
+    players = make_lineup()
+    score, _ = BaseballGame(players).simulate_game(rng=1, log_mode="none")
+    assert sum(p.stats["runs_batted_in"] for p in players) == score
+    assert sum(p.stats["plate_appearances"] for p in players) >= 27
+
+
+def test_game_log_grows_and_decodes():
+    log = GameLog(["A", "B"], capacity=2)
+    log.start_inning()
+    for i in range(5):
+        log.append(i % 2, 3, 1)
+    log.start_inning()
+    log.append(0, 5, 0)
+    assert len(log) == 2
+    assert log[0][0] == ("A", "homerun", 1)
+    assert log[-1] == [("A", "strikeout", 0)]
+    assert log.inning_runs() == [5, 0]
+    frame = log.to_frame(["A", "B"])
+    assert frame.loc["A", 1] == "homerun(1), homerun(1), homerun(1)"
+    assert frame.loc["B", 2] == "-"
+
+
+def test_unknown_log_mode_raises():
+    with pytest.raises(ValueError):
+        BaseballGame(make_lineup()).simulate_game(log_mode="verbose")
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+
+from app.utils.league import (InningTables, LEAGUES, league_schedule, load_league, play_games, simulate_league,
+                              standings_frame)
+from app.utils.sampling import AliasTable
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "processed")
+NUM_RUNS = 16
+
+
+def fixed_tables(*teams):
+    """各チームの先頭打者ごとの (得点, 次の先頭打者) が決まっている表。teams[i][leadoff] = (得点, 次の先頭打者)"""
+    tables = []
+    for team in teams:
+        for runs, following in team:
+            row = np.zeros(9 * NUM_RUNS)
+            row[following * NUM_RUNS + runs] = 1.0
+            tables.append(AliasTable(row))
+    return InningTables(np.array([t.prob for t in tables]), np.array([t.alias for t in tables]), NUM_RUNS)
+
+
+def test_schedule_has_143_games_per_team():
+    leagues = [LEAGUES[0]] * 6 + [LEAGUES[1]] * 6
+    home, away = league_schedule(leagues, 2024)
+    assert len(home) == 858
+    assert np.all(np.bincount(home, minlength=12) + np.bincount(away, minlength=12) == 143)
+    assert set(np.bincount(home, minlength=12)) == {71, 72}
+    pairs = np.zeros((12, 12), dtype=np.int64)
+    np.add.at(pairs, (home, away), 1)
+    meetings = pairs + pairs.T
+    assert meetings[0, 1] == 25 and meetings[0, 6] == 3 and meetings[6, 11] == 25
+    assert set(np.abs(pairs - pairs.T)[:6, :6][~np.eye(6, dtype=bool)]) == {1}
+
+
+def test_walk_off_skipped_bottom_and_tie():
+    scoreless = [(0, (b + 1) % 9) for b in range(9)]
+    ninth_rally = scoreless[:8] + [(2, 0)]
+    big_ninth = scoreless[:8] + [(5, 0)]
+    every_inning = [(1, b) for b in range(9)]
+    tables = fixed_tables(scoreless, ninth_rally, big_ninth, every_inning)
+    home, away = play_games(tables, np.array([2, 3, 0]), np.array([1, 0, 0]), np.random.default_rng(0))
+    # 9回表に2点取られ、裏に5点取れる打線でも勝ち越した3点目で試合終了
+    assert (home[0], away[0]) == (3, 2)
+    # 9回表の時点でリードしていれば裏の攻撃はない
+    assert (home[1], away[1]) == (8, 0)
+    # 12回まで決着しなければ引き分け
+    assert (home[2], away[2]) == (0, 0)
+
+
+def test_simulated_league_is_consistent():
+    teams = load_league(2024, DATA_PATH)
+    assert len(teams) == 12 and all(t.pitcher_lineup[-1].name == "投手" for t in teams)
+    projection = simulate_league(teams, 20, seed=1, year=2024, batch_seasons=8)
+    assert np.all(projection.wins + projection.losses + projection.ties == 143)
+    assert np.array_equal(projection.wins.sum(axis=1), projection.losses.sum(axis=1))
+    assert np.array_equal(projection.runs_scored.sum(axis=1), projection.runs_allowed.sum(axis=1))
+    for league in LEAGUES:
+        columns = [i for i, team in enumerate(teams) if team.league == league]
+        assert np.all(np.sort(projection.league_rank[:, columns], axis=1) == np.arange(1, 7))
+        winners = projection.climax_winner[:, columns]
+        assert np.all(winners.sum(axis=1) == 1)
+        assert np.all(projection.league_rank[:, columns][winners] <= 3)
+    table = standings_frame(projection)
+    assert np.allclose(table.groupby("リーグ")["優勝"].sum(), 1.0)
+    assert np.allclose(table.groupby("リーグ")["CS進出"].sum(), 3.0)
@@ -0,0 +1,72 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from app.utils.data_process import update_processed
+from app.utils.manifest import MANIFEST_FILE, DataManifest, data_version
+from app.utils.player_store import STORE_FILE
+
+RAW_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "raw")
+
+
+def copy_raw(tmp_path):
+    raw = tmp_path / "raw"
+    (raw / "2024").mkdir(parents=True)
+    for team in ("t", "g"):
+        shutil.copy(os.path.join(RAW_PATH, "2024", f"{team}.csv"), raw / "2024" / f"{team}.csv")
+    return raw
+
+
+def test_only_changed_teams_are_rebuilt_and_invalidated(tmp_path):
+    raw, processed = copy_raw(tmp_path), tmp_path / "processed"
+    assert len(update_processed([2024], ["t", "g"], str(raw), str(processed))) == 2
+    assert (processed / MANIFEST_FILE).exists()
+    assert update_processed([2024], ["t", "g"], str(raw), str(processed)) == []
+    (processed / STORE_FILE).unlink() # 変更がなくても、ストアがなければ作り直す
+    assert update_processed([2024], ["t", "g"], str(raw), str(processed)) == []
+    assert (processed / STORE_FILE).exists()
+    versions = {team: data_version(2024, team, str(processed)) for team in ("t", "g")}
+    year_version = data_version(2024, base_path=str(processed))
+
+    frame = pd.read_csv(raw / "2024" / "t.csv")
+    frame.loc[frame["打席"].idxmax(), "本塁打"] += 1
+    frame.to_csv(raw / "2024" / "t.csv", index=False)
+    g_mtime = os.stat(processed / "2024" / "g.csv").st_mtime_ns
+    assert update_processed([2024], ["t", "g"], str(raw), str(processed)) == [str(processed / "2024" / "t.csv")]
+    assert os.stat(processed / "2024" / "g.csv").st_mtime_ns == g_mtime
+
+    assert data_version(2024, "t", str(processed)) != versions["t"]
+    assert data_version(2024, "g", str(processed)) == versions["g"]
+    assert data_version(2024, base_path=str(processed)) != year_version
+
+
+def test_edited_output_is_rebuilt(tmp_path):
+    raw, processed = copy_raw(tmp_path), tmp_path / "processed"
+    update_processed([2024], ["t"], str(raw), str(processed))
+    original = (processed / "2024" / "t.csv").read_bytes()
+    (processed / "2024" / "t.csv").write_text("Player\n")
+    assert not DataManifest(str(processed / MANIFEST_FILE)).is_current(
+        "processed", "2024/t", "unused", [str(processed / "2024" / "t.csv")])
+    assert len(update_processed([2024], ["t"], str(raw), str(processed))) == 1
+    assert (processed / "2024" / "t.csv").read_bytes() == original
+
+
+def test_unchanged_pages_are_not_reparsed(tmp_path):
+    pytest.importorskip("lxml")
+    from app.utils.fetch import HtmlCache, HtmlFetcher
+    from app.utils.get_player_data import player_data_url, scrape_all
+
+    page = ("<html><head><meta charset='utf-8'></head><body><table><tr><td></td><td>成績</td><td></td></tr>"
+            "<tr><td></td><td>選手</td><td>打席</td></tr><tr><td></td><td>山田</td><td>450</td></tr>"
+            "</table></body></html>").encode("utf-8")
+    cache = HtmlCache(str(tmp_path / "cache"))
+    cache.put(player_data_url("t", "2024"), page)
+    cache.save()
+    manifest = DataManifest(str(tmp_path / MANIFEST_FILE))
+    fetcher = HtmlFetcher(str(tmp_path / "cache"), replay=True)
+    assert list(scrape_all(["2024"], ["t"], fetcher, str(tmp_path / "raw"), manifest)) == [("2024", "t")]
+    reloaded = DataManifest(str(tmp_path / MANIFEST_FILE))
+    assert scrape_all(["2024"], ["t"], HtmlFetcher(str(tmp_path / "cache"), replay=True), str(tmp_path / "raw"), reloaded) == {}
+    assert list(scrape_all(["2024"], ["t"], fetcher, str(tmp_path / "raw"), reloaded, force=True)) == [("2024", "t")]
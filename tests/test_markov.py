@@ -0,0 +1,73 @@
+import numpy as np
+
+from app.utils.markov import IncrementalEvaluator, expected_runs, expected_runs_per_game, lineup_arrays
+from app.utils.batch_game import BatchBaseballGame
+from app.utils.simulator import find_best_and_worst_lineups
+from conftest import REALISTIC_PROBABILITIES, POWER_PROBABILITIES, make_player
+
+
+def test_deterministic_lineups():
+    strikeouts = [make_player(f"K{i}", "strikeout") for i in range(9)]
+    assert expected_runs_per_game(strikeouts) == 0.0
+    homeruns = [make_player(f"HR{i}", "homerun") for i in range(3)] + strikeouts[:6]
+    assert np.isclose(expected_runs_per_game(homeruns), 15.0)
+    assert np.isclose(expected_runs_per_game(homeruns, num_innings=1), 3.0)
+
+
+def test_matches_monte_carlo():
+    # Speedが全員同じなら走者の近似による誤差はなく、シミュレーションの平均と一致する
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES if i % 2 else POWER_PROBABILITIES, speed=3) for i in range(9)]
+    exact = expected_runs_per_game(players)
+    scores = BatchBaseballGame([players]).simulate_games(100000, rng=np.random.default_rng(0)).scores[0]
+    assert abs(scores.mean() - exact) < 4 * scores.std() / np.sqrt(len(scores))
+
+
+def test_batch_matches_single_lineup():
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES if i < 4 else POWER_PROBABILITIES, speed=i - 4) for i in range(9)]
+    lineups = [players, players[::-1], players[3:] + players[:3]]
+    batch = expected_runs(*lineup_arrays(lineups))
+    single = [expected_runs_per_game(lineup) for lineup in lineups]
+    assert np.allclose(batch, single)
+
+
+def test_find_best_and_worst_lineups_markov():
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES if i < 5 else POWER_PROBABILITIES) for i in range(9)]
+    best, worst = find_best_and_worst_lineups(50, players, shuffle_only=True, evaluator="markov", confirm_with_simulation=False)
+    assert best["avg_score"] >= worst["avg_score"]
+    assert sorted(best["lineup"]) == sorted(p.name for p in players)
+    assert best["player_stats"].empty
+
+    best, worst = find_best_and_worst_lineups(5, players, shuffle_only=True, evaluator="markov")
+    assert len(best["player_stats"]) == 9
+    assert "simulated_total_score" in worst
+
+
+def test_expected_runs_by_leadoff_matches_rotations():
+    from app.utils.markov import game_expected_runs_by_leadoff, slot_transitions, solve_inning
+    players = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES if i < 4 else POWER_PROBABILITIES, speed=i) for i in range(9)]
+    values = solve_inning(*slot_transitions(*lineup_arrays([players])))
+    rotated = [players[k:] + players[:k] for k in range(9)]
+    assert np.allclose(game_expected_runs_by_leadoff(values)[0], expected_runs(*lineup_arrays(rotated)))
+
+
+def test_incremental_evaluator_matches_full_recomputation():
+    rng = np.random.default_rng(5)
+    pool = [make_player(f"P{i}", probabilities=REALISTIC_PROBABILITIES if i % 3 else POWER_PROBABILITIES, speed=i % 6) for i in range(12)]
+    lineup = pool[:9]
+    evaluator = IncrementalEvaluator(lineup)
+    assert np.isclose(evaluator.expected_runs, expected_runs_per_game(lineup))
+    for step in range(30):
+        changed = list(lineup)
+        if step % 2:
+            i, j = rng.choice(9, size=2, replace=False)
+            changed[i], changed[j] = changed[j], changed[i]
+        else:
+            bench = [p for p in pool if p not in changed]
+            changed[rng.integers(9)] = bench[rng.integers(len(bench))]
+        runs, delta = evaluator.update(changed)
+        assert np.isclose(runs, expected_runs_per_game(changed))
+        assert np.isclose(delta, runs - expected_runs_per_game(lineup))
+        lineup = changed
+    # 変更のない打順は計算し直さない
+    assert evaluator.update(lineup) == (evaluator.expected_runs, 0.0)
+    assert evaluator.recomputed_slots == 0
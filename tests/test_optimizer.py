@@ -0,0 +1,65 @@
+import numpy as np
+
+from app.utils.optimizer import LineupEvaluator, order_crossover, random_neighbor, random_search, simulated_annealing, genetic_algorithm
+from app.utils.player import Player
+from app.utils.simulator import find_best_and_worst_lineups
+from conftest import REALISTIC_PROBABILITIES, SLUGGER_PROBABILITIES, WEAK_PROBABILITIES
+
+
+def make_pool(num_players: int = 12):
+    players = [Player(f"Slugger{i}", SLUGGER_PROBABILITIES, speed=3) for i in range(3)]
+    players += [Player(f"Weak{i}", WEAK_PROBABILITIES, speed=3) for i in range(3)]
+    players += [Player(f"Player{i}", REALISTIC_PROBABILITIES, speed=3) for i in range(num_players - 6)]
+    return players
+
+
+def test_neighbor_and_crossover_keep_valid_lineups():
+    rng = np.random.default_rng(0)
+    lineup = tuple(range(9))
+    other = tuple(rng.permutation(12)[:9].tolist())
+    for _ in range(200):
+        neighbor = random_neighbor(lineup, 12, rng)
+        assert len(set(neighbor)) == 9 and all(0 <= i < 12 for i in neighbor)
+        child = order_crossover(lineup, other, rng)
+        assert len(set(child)) == 9 and set(child) <= set(lineup) | set(other)
+    # 控え選手がいない場合は同じ9名の並び替えだけ
+    assert all(sorted(random_neighbor(lineup, 9, rng)) == list(range(9)) for _ in range(50))
+
+
+def test_evaluator_memoizes_lineups():
+    evaluate = LineupEvaluator(make_pool(), "simulation", num_games=5, seed=0)
+    first = evaluate((0, 1, 2, 3, 4, 5, 6, 7, 8))
+    scores = evaluate.evaluate_many([(0, 1, 2, 3, 4, 5, 6, 7, 8), (8, 7, 6, 5, 4, 3, 2, 1, 0)])
+    assert scores[0] == first
+    assert evaluate.evaluations == 2 and evaluate.hits == 1
+
+
+def test_random_search_always_returns_a_lineup():
+    evaluate = LineupEvaluator(make_pool())
+    expired = random_search(evaluate, 12, np.random.default_rng(5), 8, batch_size=4, time_limit=0.0)
+    assert expired.lineup is not None and np.isfinite(expired.score) and evaluate.evaluations == 4
+    # 最初のバッチがすべて評価済みの打順でも、その中の最良の打順を返す
+    memoized = random_search(evaluate, 12, np.random.default_rng(5), 8, batch_size=4, time_limit=0.0)
+    assert memoized.lineup == expired.lineup and memoized.score == expired.score
+
+
+def test_annealing_and_genetic_beat_random_search():
+    pool = make_pool()
+    budget = 600
+    random_best = random_search(LineupEvaluator(pool), len(pool), np.random.default_rng(1), budget).score
+    for search in (simulated_annealing, genetic_algorithm):
+        evaluate = LineupEvaluator(pool)
+        result = search(evaluate, len(pool), np.random.default_rng(1), budget)
+        assert result.score >= random_best
+        assert evaluate.evaluations <= budget + 64
+        # 最高の打順には控えの弱打者を入れない
+        assert not any(pool[i].name.startswith("Weak") for i in result.lineup)
+
+
+def test_find_best_and_worst_lineups_with_strategy():
+    pool = make_pool()
+    best, worst = find_best_and_worst_lineups(400, pool, evaluator="markov", confirm_with_simulation=False, seed=3, strategy="annealing", use_cache=False)
+    assert best["avg_score"] > worst["avg_score"]
+    assert best["evaluations"] <= 400 + 32
+    again, _ = find_best_and_worst_lineups(400, pool, evaluator="markov", confirm_with_simulation=False, seed=3, strategy="annealing", use_cache=False)
+    assert again["lineup"] == best["lineup"]
@@ -0,0 +1,22 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app.utils.permutations import rank_permutations, unrank_permutations
+
+
+def test_unrank_matches_lexicographic_order():
+    expected = np.array(list(itertools.permutations(range(5))))
+    assert (unrank_permutations(np.arange(len(expected)), 5) == expected).all()
+    assert (rank_permutations(expected) == np.arange(len(expected))).all()
+
+
+def test_round_trip_nine():
+    ranks = np.random.default_rng(0).integers(0, 362880, size=100)
+    assert (rank_permutations(unrank_permutations(ranks, 9)) == ranks).all()
+
+
+def test_invalid_rank():
+    with pytest.raises(ValueError):
+        unrank_permutations(np.array([120]), 5)
@@ -0,0 +1,65 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from app.utils.load_data import load_data_from_csv, load_default_lineups, load_roster
+from app.utils.player_store import STORE_FILE, PlayerStore, build_player_store, get_player_store
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "processed")
+RAW_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "raw")
+
+
+def copy_data(tmp_path):
+    base = tmp_path / "processed"
+    for year, team in ((2023, "t"), (2024, "t"), (2024, "g")):
+        (base / str(year)).mkdir(parents=True, exist_ok=True)
+        shutil.copy(os.path.join(DATA_PATH, str(year), f"{team}.csv"), base / str(year) / f"{team}.csv")
+    shutil.copy(os.path.join(DATA_PATH, "default_lineups_2024.csv"), base / "default_lineups_2024.csv")
+    return base
+
+
+def test_store_round_trip_matches_csv(tmp_path):
+    base = copy_data(tmp_path)
+    store = build_player_store(str(base), RAW_PATH)
+    store.save(str(tmp_path / "store.bin"))
+    opened = PlayerStore.open(str(tmp_path / "store.bin"))
+    assert opened.years() == [2023, 2024] and opened.teams(2024) == ["g", "t"]
+    for year, team in ((2023, "t"), (2024, "t"), (2024, "g")):
+        pd.testing.assert_frame_equal(opened.frame(year, team), pd.read_csv(base / str(year) / f"{team}.csv"))
+    pd.testing.assert_frame_equal(opened.default_lineups(2024), pd.read_csv(base / "default_lineups_2024.csv"))
+    assert opened.default_lineups(2023).empty
+
+    # 確率の行はファイルのメモリマップのビュー
+    probabilities = opened.probabilities(2024, "t")
+    assert isinstance(probabilities.base, np.memmap) and not probabilities.flags.writeable
+    assert np.all(opened.plate_appearances(2024, "t") >= 50)
+    players = opened.players(2024, "t")
+    assert [p.name for p in players] == opened.names(2024, "t")
+    assert np.array_equal(players[0].probabilities, probabilities[0])
+
+
+def test_loaders_open_store_and_fall_back_to_csv(tmp_path):
+    base = copy_data(tmp_path)
+    # ストアがない場合は CSV を読み込み、ストアを書き込まない
+    frame = load_data_from_csv(2024, "t", str(base))
+    assert get_player_store(str(base)) is None and not (base / STORE_FILE).exists()
+
+    build_player_store(str(base), RAW_PATH).save(str(base / STORE_FILE))
+    store = get_player_store(str(base))
+    assert store.path == str(base / STORE_FILE) and get_player_store(str(base)) is store
+    pd.testing.assert_frame_equal(load_data_from_csv(2024, "t", str(base)), frame)
+    lineup, pool = load_roster(2024, "t", str(base))
+    assert len(lineup) == 9 and len(pool) == len(frame)
+    assert load_default_lineups(2024, str(base)).shape[0] > 0
+
+    # ストアを作った後に CSV が変わった場合は CSV を読み込む
+    edited = frame.iloc[:10].copy()
+    edited.loc[0, "Player"] = "新人"
+    edited.to_csv(base / "2024" / "t.csv", index=False)
+    os.utime(base / "2024" / "t.csv", ns=(1, 1))
+    assert get_player_store(str(base)) is None
+    assert load_data_from_csv(2024, "t", str(base))["Player"].iloc[0] == "新人"
+    build_player_store(str(base), RAW_PATH).save(str(base / STORE_FILE))
+    assert get_player_store(str(base)).names(2024, "t")[0] == "新人"
@@ -0,0 +1,70 @@
+import numpy as np
+
+from app.utils.player import Player
+from app.utils.racing import RunningStats, keep_best, probability_best, race_survivors, z_value
+from app.utils.simulator import find_best_and_worst_lineups
+from conftest import REALISTIC_PROBABILITIES, POWER_PROBABILITIES
+
+
+def test_running_stats_matches_numpy_across_rounds():
+    rng = np.random.default_rng(0)
+    first, second = rng.poisson(4, (3, 5)), rng.poisson(4, (2, 7))
+    stats = RunningStats(3)
+    stats.add(np.arange(3), first)
+    stats.add(np.array([0, 2]), second)
+    all_scores = [np.r_[first[0], second[0]], first[1], np.r_[first[2], second[1]]]
+    assert np.allclose(stats.mean, [s.mean() for s in all_scores])
+    assert np.allclose(stats.variance, [s.var(ddof=1) for s in all_scores])
+    assert list(stats.count) == [12, 5, 12]
+
+
+def test_race_survivors_and_keep_best():
+    mean = np.array([5.0, 4.9, 2.0, 1.0])
+    std_error = np.full(4, 0.1)
+    alive = np.ones(4, dtype=bool)
+    assert race_survivors(mean, std_error, alive, z_value(0.95)).tolist() == [True, True, False, False]
+    assert race_survivors(mean, std_error, alive, z_value(0.95), largest=False).tolist() == [False, False, False, True]
+    assert keep_best(mean, alive, 1, largest=False).tolist() == [False, False, False, True]
+    assert probability_best(mean, std_error, 0) > 0.7
+    assert probability_best(mean, std_error, 3) < 1e-6
+
+
+def test_racing_search_tests_more_lineups_within_budget():
+    players = [Player(name=f"P{i}", probabilities=REALISTIC_PROBABILITIES if i % 2 else POWER_PROBABILITIES, speed=i % 5) for i in range(12)]
+    progress = []
+
+    class Recorder:
+        def progress(self, value):
+            progress.append(value)
+        def text(self, value):
+            pass
+
+    best, worst = find_best_and_worst_lineups(10, players, Recorder(), Recorder(), evaluator="racing", seed=3)
+    assert best["candidates"] > 10
+    assert best["avg_score"] >= worst["avg_score"]
+    assert 0.0 <= best["confidence_all"] <= best["confidence"] <= 1.0
+    assert best["games"] >= 20 and len(set(best["lineup"])) == 9
+    assert progress[-1] == 1.0
+    again = find_best_and_worst_lineups(10, players, evaluator="racing", seed=3, use_cache=False)
+    assert again[0]["lineup"] == best["lineup"] and again[1]["lineup"] == worst["lineup"]
+
+
+def test_common_uniforms_do_not_depend_on_request_order():
+    from app.utils.sampling import CommonUniforms
+    games, players, pas = np.array([70, 3, 40]), np.array([20, 1, 0]), np.array([3, 9, 2])
+    direct = CommonUniforms(2, 9).take(games, players, pas)
+    grown = CommonUniforms(2, 9)
+    grown.take(np.array([0]), np.array([0]), np.array([0]))
+    grown.discard_games_before(2)
+    assert np.array_equal(direct, grown.take(games, players, pas))
+    grown.discard_games_before(40)
+    assert np.array_equal(direct[[0, 2]], grown.take(games[[0, 2]], players[[0, 2]], pas[[0, 2]]))
+
+
+def test_searches_with_common_random_numbers():
+    players = [Player(name=f"P{i}", probabilities=REALISTIC_PROBABILITIES if i % 2 else POWER_PROBABILITIES, speed=i % 5) for i in range(12)]
+    best, worst = find_best_and_worst_lineups(10, players, evaluator="racing", seed=3, common_random_numbers=True)
+    assert best["common_random_numbers"] and best["avg_score"] >= worst["avg_score"]
+    serial = find_best_and_worst_lineups(6, players, seed=4, common_random_numbers=True, use_cache=False)
+    parallel = find_best_and_worst_lineups(6, players, num_workers=2, seed=4, common_random_numbers=True, use_cache=False)
+    assert serial[0]["lineup"] == parallel[0]["lineup"] and serial[0]["total_score"] == parallel[0]["total_score"]
@@ -0,0 +1,54 @@
+import math
+
+import pandas as pd
+
+from app.utils.player import Player
+from app.utils.roster import POSITIONS, load_position_eligibility, select_lineup, valid_rosters
+from conftest import REALISTIC_PROBABILITIES, POWER_PROBABILITIES, WEAK_PROBABILITIES
+
+
+def make_pool():
+    # 8名のレギュラー、一塁と外野を守れる強打者、誰の代わりにもならない控え2名
+    players = [Player(f"R{i}", REALISTIC_PROBABILITIES, speed=2) for i in range(8)]
+    players += [Player("Slugger", POWER_PROBABILITIES), Player("Bench1", WEAK_PROBABILITIES), Player("Bench2", WEAK_PROBABILITIES)]
+    eligibility = {f"R{i}": {position} for i, position in enumerate(POSITIONS)}
+    eligibility["Slugger"] = {"一", "左"}
+    return players, eligibility
+
+
+def test_valid_rosters_cover_every_position():
+    players, eligibility = make_pool()
+    rosters = valid_rosters(players, eligibility, use_dh=False)
+    # 強打者が一塁か左翼に入る場合と入らない場合の3通り
+    assert len(rosters) == 3
+    assert all(sorted(roster) == sorted(POSITIONS) for roster in rosters)
+    rosters = valid_rosters(players, eligibility, use_dh=True)
+    assert len({frozenset(roster.values()) for roster in rosters}) == len(rosters)
+    assert all(len(set(roster.values())) == 9 for roster in rosters)
+    # レギュラー8名 + 指名打者3通り、強打者が一塁か左翼を守る2通り * 指名打者3通り
+    # (レギュラーが指名打者に回る場合は、レギュラー8名 + 強打者の組み合わせと同じ)
+    assert len(rosters) == 3 + 2 * 3 - 2
+
+
+def test_select_lineup_prefers_slugger_and_adds_pitcher():
+    players, eligibility = make_pool()
+    selection = select_lineup(players, eligibility, use_dh=True, seed=0)
+    assert "Slugger" in selection["lineup"] and not {"Bench1", "Bench2"} & set(selection["lineup"])
+    assert sorted(selection["positions"]) == sorted(POSITIONS + ["指"])
+    assert selection["num_valid_lineups"] == selection["num_rosters"] * math.factorial(9)
+    assert selection["num_candidates"] == math.perm(len(players), 9)
+    assert selection["refined"] + selection["pruned"] == selection["num_rosters"]
+
+    no_dh = select_lineup(players, eligibility, use_dh=False, seed=0)
+    assert "投手" in no_dh["lineup"] and "Slugger" in no_dh["lineup"]
+    assert no_dh["positions"][no_dh["lineup"].index("投手")] == "投"
+
+
+def test_eligibility_from_position_starts_and_default_lineups(tmp_path):
+    pd.DataFrame({"Year": 2024, "League": "Central", "Team": "阪神", "Team_Abbr": "T", "Position": ["捕", "一"],
+                  "Player": ["A", "B"]}).to_csv(tmp_path / "default_lineups_2024.csv", index=False)
+    assert load_position_eligibility(2024, "t", str(tmp_path)) == {"A": {"捕"}, "B": {"一"}}
+    pd.DataFrame({"Year": 2024, "Team_Abbr": ["T", "T", "T", "G"], "Player": ["B", "C", "C", "D"],
+                  "Position": ["左", "二", "指", "遊"], "Starts": [30, 12, 40, 50]}).to_csv(tmp_path / "position_starts_2024.csv", index=False)
+    assert load_position_eligibility(2024, "t", str(tmp_path)) == {"A": {"捕"}, "B": {"一", "左"}, "C": {"二"}}
+    assert load_position_eligibility(2024, "t", str(tmp_path), min_starts=20) == {"A": {"捕"}, "B": {"一", "左"}}
@@ -0,0 +1,53 @@
+import numpy as np
+
+from app.utils.batch_game import BatchBaseballGame
+from app.utils.constants import EVENT_TYPES
+from app.utils.markov import expected_runs, lineup_arrays, slot_transitions, solve_inning
+from app.utils.player import Player
+from app.utils.run_distribution import (distribution_stats, game_run_distribution, inning_run_distribution,
+                                        probability_at_least, rank_lineups, run_distribution)
+from conftest import MIXED_PROBABILITIES, make_lineup
+
+
+def test_deterministic_lineup():
+    homeruns = [Player(f"HR{i}", [1.0 if e == "homerun" else 0.0 for e in EVENT_TYPES]) for i in range(3)]
+    strikeouts = [Player(f"K{i}", [1.0 if e == "strikeout" else 0.0 for e in EVENT_TYPES]) for i in range(6)]
+    distribution = run_distribution(homeruns + strikeouts)
+    assert np.isclose(distribution[15], 1.0)
+    # 上限を超えた得点は上限にまとめる
+    assert np.isclose(run_distribution(homeruns + strikeouts, run_cap=10)[10], 1.0)
+
+
+def test_moments_match_markov_chain():
+    probabilities, speeds = lineup_arrays([make_lineup(rows=MIXED_PROBABILITIES), make_lineup(speed=3, rows=MIXED_PROBABILITIES)])
+    inning = inning_run_distribution(probabilities, speeds)
+    values = solve_inning(*slot_transitions(probabilities, speeds))
+    # 先頭打者ごとの期待得点と次のイニングの先頭打者の分布が solve_inning と一致する
+    assert np.allclose(inning.sum(axis=3), values[:, :, 0, 1:], atol=1e-10)
+    assert np.allclose(inning.sum(axis=2) @ np.arange(inning.shape[-1]), values[:, :, 0, 0], atol=1e-5)
+
+    game = game_run_distribution(probabilities, speeds)
+    assert np.allclose(game.sum(axis=1), 1.0)
+    mean, std = distribution_stats(game)
+    assert np.allclose(mean, expected_runs(probabilities, speeds), atol=1e-4)
+    assert np.all(std > 0)
+
+
+def test_matches_monte_carlo_histogram():
+    players = make_lineup(speed=3, rows=MIXED_PROBABILITIES)
+    exact = run_distribution(players)
+    scores = BatchBaseballGame([players]).simulate_games(100000, rng=np.random.default_rng(0)).scores[0]
+    empirical = np.bincount(np.minimum(scores, len(exact) - 1), minlength=len(exact)) / len(scores)
+    # 各得点の確率の標準誤差は高々 0.0016 程度
+    assert np.abs(exact - empirical).max() < 0.006
+    assert np.isclose(probability_at_least(exact, 3), (scores >= 3).mean(), atol=0.006)
+
+
+def test_rank_lineups_by_threshold_and_risk():
+    lineups = [make_lineup(rows=MIXED_PROBABILITIES), make_lineup(rows=MIXED_PROBABILITIES)[::-1], make_lineup(speed=0, rows=MIXED_PROBABILITIES)]
+    by_mean = rank_lineups(lineups)
+    assert [r["mean"] for r in by_mean] == sorted((r["mean"] for r in by_mean), reverse=True)
+    by_shutout = rank_lineups(lineups, threshold=1)
+    assert sorted(r["index"] for r in by_shutout) == [0, 1, 2]
+    risky = rank_lineups(lineups, risk_aversion=-1.0)
+    assert all(np.isclose(r["score"], r["mean"] + r["std"]) for r in risky)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.utils.batch_game import BatchBaseballGame
+from app.utils.markov import lineup_arrays, slot_transitions, solve_inning
+from app.utils.run_expectancy import RunExpectancyAccumulator, compute_run_expectancy, run_values_frame
+from app.utils.transitions import DOUBLE, HOMERUN, SINGLE, STRIKEOUT, WALK
+from conftest import make_lineup
+
+
+def test_matrix_matches_markov_for_identical_batters():
+    lineup = make_lineup(speed=3)
+    result = compute_run_expectancy([lineup], num_games=3000, seed=0, use_cache=False)
+    assert result.innings == 27000
+    # 全員が同じ打者なら、どの打者から始まってもイニング終了までの期待得点は同じ
+    exact = solve_inning(*slot_transitions(*lineup_arrays([lineup])))[0, 0, :, 0].reshape(3, 8)
+    assert np.all(np.abs(result.matrix - exact) < 5 * result.std_error + 1e-9)
+    assert result.counts[0, 0] >= result.innings # 各イニングは無死走者なしから始まる
+
+
+def test_run_values_are_ordered_and_accumulate_across_calls():
+    lineup = make_lineup()
+    accumulator = RunExpectancyAccumulator()
+    engine = BatchBaseballGame([lineup])
+    engine.simulate_games(500, rng=np.random.default_rng(1), observer=accumulator)
+    engine.simulate_games(500, rng=np.random.default_rng(2), observer=accumulator)
+    result = accumulator.result()
+    assert result.innings == 9000
+    values = result.run_values
+    assert values[HOMERUN] > values[DOUBLE] > values[SINGLE] > values[WALK] > 0 > values[STRIKEOUT]
+    assert np.all(result.run_value_errors[result.outcome_counts > 1] > 0)
+    assert run_values_frame(result)["回数"].sum() == result.counts.sum()
@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.utils.sampling import AliasTable, UniformBuffer, alias_sample
+from conftest import REALISTIC_PROBABILITIES
+
+
+def test_alias_table_matches_probabilities():
+    probabilities = REALISTIC_PROBABILITIES
+    table = AliasTable(probabilities)
+    u = np.random.default_rng(0).random(200000)
+    codes = np.array([table.sample(x) for x in u[:20000]])
+    frequencies = np.bincount(codes, minlength=8) / len(codes)
+    assert np.allclose(frequencies, probabilities, atol=0.01)
+
+    # 配列版も同じ表から同じ結果を返す
+    rows = np.zeros(len(u), dtype=np.int64)
+    vector_codes = alias_sample(table.prob[None, :], table.alias[None, :], rows, u)
+    assert (vector_codes[:20000] == codes).all()
+    assert np.allclose(np.bincount(vector_codes, minlength=8) / len(u), probabilities, atol=0.003)
+
+
+def test_alias_table_never_returns_zero_probability_event():
+    table = AliasTable([0.0, 0.5, 0.0, 0.5])
+    codes = {table.sample(x) for x in np.linspace(0, 1, 1001, endpoint=False)}
+    assert codes == {1, 3}
+
+
+def test_uniform_buffer_refills():
+    calls = []
+    def source(n):
+        calls.append(n)
+        return np.full(n, 0.25)
+    buffer = UniformBuffer(size=4, source=source)
+    values = [buffer.next() for _ in range(10)]
+    assert values == [0.25] * 10
+    assert calls == [4, 4, 4]
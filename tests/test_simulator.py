@@ -0,0 +1,67 @@
+from app.utils.simulator import find_best_and_worst_lineups, search_all_lineups
+from app.utils.player import Player
+from conftest import MIXED_PROBABILITIES, make_lineup
+
+
+def test_parallel_search_is_independent_of_worker_count():
+    players = make_lineup(count=12, rows=MIXED_PROBABILITIES)
+    serial = find_best_and_worst_lineups(12, players, num_workers=1, seed=7, use_cache=False)
+    parallel = find_best_and_worst_lineups(12, players, num_workers=2, seed=7, use_cache=False)
+    for a, b in zip(serial, parallel):
+        assert a["lineup"] == b["lineup"]
+        assert a["total_score"] == b["total_score"]
+        assert a["trial"] == b["trial"]
+        assert a["player_stats"].equals(b["player_stats"])
+    best, worst = serial
+    assert best["total_score"] >= worst["total_score"]
+    assert len(set(best["lineup"])) == 9
+
+
+def test_parallel_search_progress_reaches_total():
+    class Recorder:
+        def __init__(self):
+            self.values = []
+        def progress(self, value):
+            self.values.append(value)
+        def text(self, value):
+            pass
+
+    progress_bar = Recorder()
+    find_best_and_worst_lineups(5, make_lineup(count=9, rows=MIXED_PROBABILITIES), progress_bar, Recorder(), shuffle_only=True, num_workers=1, seed=0, use_cache=False)
+    assert progress_bar.values[-1] == 1.0
+
+
+def test_search_all_lineups_finds_true_extremes():
+    # 強打者1人と三振8人: 強打者の打席が最も多い1番が最高、9番が最低
+    slugger = Player(name="S", probabilities=[0, 0, 0, 1.0, 0, 0, 0, 0])
+    others = [Player(name=f"K{i}", probabilities=[0.2, 0, 0, 0, 0, 0.8, 0, 0]) for i in range(8)]
+    best, worst, top = search_all_lineups([slugger] + others, top_k=3, num_workers=1)
+    assert best["lineup"][0] == "S"
+    assert worst["lineup"][-1] == "S"
+    assert len(top) == 3
+    assert top[0]["avg_score"] >= top[1]["avg_score"] >= top[2]["avg_score"]
+    assert top[0]["lineup"] == best["lineup"]
+
+
+def test_seeded_entry_points_are_reproducible():
+    from app.utils.game import BaseballGame
+    from app.utils.simulator import generate_random_lineup, simulate_games, simulate_season
+    players = make_lineup(count=12, rows=MIXED_PROBABILITIES)
+    assert generate_random_lineup(players, rng=3) == generate_random_lineup(players, rng=3)
+
+    lineup = players[:9]
+    assert simulate_season(20, lineup, rng=5, use_cache=False)[0] == simulate_season(20, lineup, rng=5, use_cache=False)[0]
+    assert BaseballGame(lineup).simulate_game(rng=5) == BaseballGame(lineup).simulate_game(rng=5)
+    # 試合ごとの子の乱数列は試合数によらない
+    short = simulate_games(3, lineup, seed=11)
+    long = simulate_games(6, lineup, seed=11)
+    assert short == long[:3]
+
+
+def test_serial_search_matches_parallel_search_with_same_seed():
+    players = make_lineup(count=12, rows=MIXED_PROBABILITIES)
+    serial = find_best_and_worst_lineups(6, players, seed=21, use_cache=False)
+    parallel = find_best_and_worst_lineups(6, players, num_workers=1, seed=21, use_cache=False)
+    for a, b in zip(serial, parallel):
+        assert a["lineup"] == b["lineup"]
+        assert a["total_score"] == b["total_score"]
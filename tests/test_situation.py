@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from app.utils.batch_game import GameState, initial_runners
+from app.utils.markov import expected_runs_per_game
+from app.utils.player import Player
+from app.utils.situation import evaluate_from_state, optimize_from_state, simulate_from_state
+from conftest import SLUGGER_PROBABILITIES, WEAK_PROBABILITIES, make_lineup
+
+
+def test_initial_runners_follow_markov_convention():
+    assert initial_runners(GameState(bases=0b010, batter=2)).tolist() == [-1, 1, -1]
+    assert initial_runners(GameState(bases=0b111, batter=1)).tolist() == [0, 8, 7]
+
+
+def test_markov_matches_simulation_from_state():
+    lineup = make_lineup(speed=3)
+    state = GameState(inning=8, outs=1, bases=0b010, batter=4)
+    expected = evaluate_from_state([lineup], state)[0]
+    simulated = simulate_from_state([lineup], state, num_games=40000, seed=0)[0]
+    assert abs(expected - simulated.mean()) < 4 * simulated.std() / np.sqrt(len(simulated))
+    # 1回の先頭から試合終了までは通常の期待得点と同じ
+    assert np.isclose(evaluate_from_state([lineup], GameState())[0], expected_runs_per_game(lineup))
+    # このイニングだけの評価は試合終了までより小さい
+    assert evaluate_from_state([lineup], state, innings=1)[0] < expected
+
+
+def test_optimize_next_batters_prefers_sluggers():
+    lineup = make_lineup(speed=3)
+    slugger, weak = Player("Slugger", SLUGGER_PROBABILITIES, speed=3), Player("Weak", WEAK_PROBABILITIES, speed=3)
+    state = GameState(inning=9, outs=1, bases=0b010, batter=2, deficit=1)
+    results = optimize_from_state(lineup, state, candidates=[lineup[2], lineup[3], lineup[4], slugger, weak], innings=1)
+    assert len(results) == 10
+    assert "Slugger" in results[0]["lineup"][2:5] and "Weak" not in results[0]["lineup"][2:5]
+    assert results[0]["lineup"][:2] == ["P0", "P1"] and results[0]["expected_runs"] >= results[-1]["expected_runs"]
+
+    tie = optimize_from_state(lineup, state, candidates=[lineup[2], slugger, weak], objective="tie", num_games=500, seed=1, top_k=3)
+    assert [info["probability"] for info in tie] == sorted((info["probability"] for info in tie), reverse=True)
+    with pytest.raises(ValueError):
+        optimize_from_state(lineup, state, candidates=[lineup[0]])
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from app.utils.stats import StatsMatrix, stats_frame, rate_stats, OUTCOME_STAT_DELTAS, STAT_INDEX, NUM_STATS
+from app.utils.transitions import SINGLE, HOMERUN, WALK, SACRIFICE_FLY, NUM_OUTCOMES
+from app.utils.game import BaseballGame
+from app.utils.player import Player
+from conftest import REALISTIC_PROBABILITIES
+
+
+def test_player_stats_view_updates_array():
+    player = Player("A", REALISTIC_PROBABILITIES)
+    player.stats["hits"] += 2
+    assert player.stats_values[STAT_INDEX["hits"]] == 2
+    assert dict(player.stats)["hits"] == 2
+    with pytest.raises(AttributeError):
+        player.unknown_attribute = 1  # __slots__
+
+
+def test_player_copy_shares_sampler_but_not_stats():
+    player = Player("A", REALISTIC_PROBABILITIES, speed=3)
+    player.stats["hits"] += 1
+    copied = player.copy()
+    assert copied.sampler is player.sampler and copied.speed == 3
+    assert copied.stats["hits"] == 0
+    copied.simulate_at_bat(0.0)
+    assert player.stats["plate_appearances"] == 0
+
+
+def test_walk_is_counted_once():
+    player = Player("W", [0, 0, 0, 0, 1.0, 0, 0, 0])
+    player.simulate_at_bat(0.5)
+    assert player.stats["walks"] == 1
+    assert player.stats["plate_appearances"] == 1
+    assert player.stats["at_bats"] == 0
+
+
+def test_stats_matrix_binds_player_rows_and_merges_duplicates():
+    a = Player("A", REALISTIC_PROBABILITIES)
+    b = Player("B", REALISTIC_PROBABILITIES)
+    matrix = StatsMatrix([a, b, a])
+    assert matrix.values.shape == (2, NUM_STATS)
+    matrix.add_event_codes([0 * NUM_OUTCOMES + HOMERUN, 1 * NUM_OUTCOMES + WALK, 0 * NUM_OUTCOMES + SACRIFICE_FLY], [0, 0], [1, 1])
+    assert a.stats["homeruns"] == 1 and a.stats["sacrifice_flies"] == 1
+    assert a.stats["at_bats"] == 1 and a.stats["runs_batted_in"] == 2
+    assert b.stats["walks"] == 1
+    matrix.add_outcomes([1], [SINGLE], [0])
+    assert b.stats["hits"] == 1
+    matrix.add_lineup_stats(np.ones((3, NUM_STATS), dtype=np.int64))
+    assert a.stats["walks"] == 2 and b.stats["walks"] == 2
+
+
+def test_rate_stats_and_frame():
+    values = np.zeros((2, NUM_STATS), dtype=np.int64)
+    values[0] = OUTCOME_STAT_DELTAS[SINGLE] + OUTCOME_STAT_DELTAS[HOMERUN] + OUTCOME_STAT_DELTAS[WALK]
+    average, on_base, slugging, ops = rate_stats(values)
+    assert np.allclose([average[0], on_base[0], slugging[0]], [1.0, 1.0, 2.5])
+    assert ops[1] == 0
+    frame = stats_frame(["X", "Y"], values)
+    assert frame.loc[0, "打席"] == 3 and frame.loc[0, "OPS"] == 3.5
+
+
+def test_game_stats_match_log():
+    players = [Player(f"P{i}", REALISTIC_PROBABILITIES, speed=i) for i in range(9)]
+    np.random.seed(3)
+    score, log = BaseballGame(players).simulate_game()
+    assert sum(p.stats["runs_batted_in"] for p in players) == score
+    assert sum(p.stats["plate_appearances"] for p in players) == sum(len(inning) for inning in log)
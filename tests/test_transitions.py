@@ -0,0 +1,48 @@
+import numpy as np
+
+from app.utils.transitions import (
+    NEXT_MASK, RUNS, OUTS_ADDED, RUNNER_SOURCE, EXTRA_FIRST_NEEDED, EXTRA_SECOND_NEEDED,
+    SINGLE, DOUBLE, HOMERUN, WALK, DOUBLE_PLAY, SACRIFICE_FLY, STRIKEOUT,
+    EXTRA_SECOND_BIT, EXTRA_FIRST_BIT, BATTER, EMPTY, extra_base_probabilities
+)
+
+
+def test_walk_with_bases_loaded_forces_a_run():
+    assert RUNS[0b111, 0, WALK, 0] == 1
+    assert NEXT_MASK[0b111, 0, WALK, 0] == 0b111
+    # 一・三塁では三塁走者は押し出されない
+    assert RUNS[0b101, 0, WALK, 0] == 0
+    assert list(RUNNER_SOURCE[0b101, 0, WALK, 0]) == [BATTER, 0, 2]
+
+
+def test_single_extra_base_decisions():
+    # 一・二塁で単打: 二塁走者が生還すれば一塁走者は三塁を狙える
+    assert EXTRA_SECOND_NEEDED[0b011, SINGLE]
+    assert not EXTRA_FIRST_NEEDED[0b011, SINGLE, 0]
+    assert EXTRA_FIRST_NEEDED[0b011, SINGLE, EXTRA_SECOND_BIT]
+    bits = EXTRA_SECOND_BIT | EXTRA_FIRST_BIT
+    assert RUNS[0b011, 1, SINGLE, bits] == 1
+    assert list(RUNNER_SOURCE[0b011, 1, SINGLE, bits]) == [BATTER, EMPTY, 0]
+    # 二塁打で一塁走者が生還
+    assert RUNS[0b001, 0, DOUBLE, EXTRA_FIRST_BIT] == 1
+    assert NEXT_MASK[0b001, 0, DOUBLE, EXTRA_FIRST_BIT] == 0b010
+
+
+def test_outs_and_runs_for_outs():
+    assert OUTS_ADDED[0b001, 0, DOUBLE_PLAY, 0] == 2
+    assert NEXT_MASK[0b101, 0, DOUBLE_PLAY, 0] == 0b100
+    assert RUNS[0b100, 1, SACRIFICE_FLY, 0] == 1
+    assert RUNS[0b111, 0, STRIKEOUT, 0] == 0 and NEXT_MASK[0b111, 0, STRIKEOUT, 0] == 0b111
+    assert (RUNS[:, :, HOMERUN, 0] == np.array([1, 2, 2, 3, 2, 3, 3, 4])[:, None]).all()
+
+
+def test_next_mask_matches_runner_source():
+    assert ((RUNNER_SOURCE != EMPTY) * np.array([1, 2, 4])).sum(axis=-1).tolist() == NEXT_MASK.tolist()
+
+
+def test_extra_base_probabilities():
+    table = extra_base_probabilities([0, 10, -10])
+    assert table.shape == (3, 3, 3)
+    assert np.allclose(table[0, :, 1], 0.1)
+    assert np.allclose(table[1, :, 2], (0.1 + 0.2) * 1.1)
+    assert (table[2] == 0).all()